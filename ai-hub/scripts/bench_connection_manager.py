@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark ConnectionManager skill-request throughput and latency.
+
+Drives thousands of concurrent ``send_skill_request`` calls through fake
+WebSockets that answer after a configurable delay, then reports throughput
+and p50/p99 round-trip latency. Useful for spotting serialization points in
+request registration, response dispatch and cleanup.
+
+Usage:
+    python scripts/bench_connection_manager.py [--devices 30] [--requests 5000]
+        [--delay-ms 1.0] [--disconnect-every 0]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from hub.routers.websocket import ConnectionManager  # noqa: E402
+
+
+class FakeSpokeSocket:
+    """Fake device socket that replies to each request after ``delay``."""
+
+    def __init__(self, manager: ConnectionManager, device_id: str, delay: float):
+        self.manager = manager
+        self.device_id = device_id
+        self.delay = delay
+
+    async def send_json(self, message: dict) -> None:
+        asyncio.get_running_loop().create_task(self._reply(message["request_id"]))
+
+    async def _reply(self, request_id: str) -> None:
+        # Jitter the delay so responses interleave across devices.
+        await asyncio.sleep(self.delay * random.uniform(0.5, 1.5))
+        await self.manager.handle_skill_response(
+            {"request_id": request_id, "success": True, "result": "ok"},
+            device_id=self.device_id,
+        )
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        pass
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``samples``."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(devices: int, requests: int, delay: float, disconnect_every: int) -> None:
+    """Run the benchmark and print a summary."""
+    manager = ConnectionManager()
+    device_ids = [f"device-{i}" for i in range(devices)]
+    for device_id in device_ids:
+        await manager.connect(device_id, FakeSpokeSocket(manager, device_id, delay))
+
+    latencies: list[float] = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        device_id = device_ids[i % devices]
+        start = time.perf_counter()
+        try:
+            await manager.send_skill_request(device_id, "BenchSkill", "ping", [i], {})
+        except (ConnectionError, ValueError):
+            failures += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    async def churn() -> None:
+        # Periodically drop and reconnect a device to exercise failure paths.
+        while True:
+            await asyncio.sleep(disconnect_every / 1000)
+            device_id = random.choice(device_ids)
+            await manager.disconnect(device_id)
+            await manager.connect(device_id, FakeSpokeSocket(manager, device_id, delay))
+
+    churn_task = asyncio.create_task(churn()) if disconnect_every else None
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    if churn_task:
+        churn_task.cancel()
+
+    ms = [s * 1000 for s in latencies]
+    print(f"devices={devices} requests={requests} delay={delay * 1000:.1f}ms")
+    print(f"completed={len(latencies)} failed={failures} elapsed={elapsed:.3f}s")
+    print(f"throughput={requests / elapsed:,.0f} req/s")
+    if ms:
+        print(
+            f"latency p50={_percentile(ms, 50):.2f}ms "
+            f"p99={_percentile(ms, 99):.2f}ms "
+            f"mean={statistics.fmean(ms):.2f}ms max={max(ms):.2f}ms"
+        )
+    print(f"pending after run={manager.pending_count()}")
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark ConnectionManager concurrent skill requests"
+    )
+    parser.add_argument("--devices", type=int, default=30, help="Fake devices")
+    parser.add_argument(
+        "--requests", type=int, default=5000, help="Concurrent requests to send"
+    )
+    parser.add_argument(
+        "--delay-ms", type=float, default=1.0, help="Mean device reply delay"
+    )
+    parser.add_argument(
+        "--disconnect-every",
+        type=int,
+        default=0,
+        help="Drop a random device every N ms (0 disables churn)",
+    )
+    args = parser.parse_args()
+    # Late replies to requests failed by churn are expected; keep output clean.
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(
+        run(args.devices, args.requests, args.delay_ms / 1000, args.disconnect_every)
+    )
+
+
+if __name__ == "__main__":
+    main()
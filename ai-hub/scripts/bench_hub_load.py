@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""Load-test the Hub with simulated Spokes and a scripted LLM gateway.
+
+Starts the FastAPI app in-process on a local port (temporary database,
+no TensorZero) and connects N simulated Spokes over ``/ws/device``. Each
+Spoke registers a generated skill catalog and answers skill requests
+after a configurable latency. TensorZero's ``inference`` and
+``inference_stream`` are replaced by a scripted fake that, for every chat
+request, calls ``search_skills``, then ``python_exec`` with skill calls on
+a chosen device (or on ``devices.hub`` for device-agnostic skills), then
+answers in text. M concurrent chat clients then drive the agent loop.
+
+Reports overall throughput and p50/p95/p99 per stage. Client-side stages
+are end-to-end latency and time to first delta. Hub stages come from the
+request traces: model calls, each tool, skill round trips split into
+transit and device time, and database statements by verb. A regression
+in search, routing or DB writes shows up in its own row. Everything
+shares one event loop, so absolute numbers include the simulated
+clients' and Spokes' own overhead; compare runs made with the same
+arguments.
+
+Usage:
+    python scripts/bench_hub_load.py [--spokes 4] [--clients 16]
+        [--requests 400] [--skills 8] [--skill-latency-ms 20]
+        [--llm-latency-ms 50] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Keep the run away from hub.db and the real log directory.
+_TMP = Path(tempfile.mkdtemp(prefix="hub-bench-"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{(_TMP / 'bench.db').as_posix()}"
+os.environ["CLUSTER_DB_PATH"] = str(_TMP / "cluster.db")
+os.environ["LOG_DIR"] = str(_TMP / "logs")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from hub.asteval_executor import python_executor  # noqa: E402
+from hub.config import settings  # noqa: E402
+from hub.database import dispose_engine, get_engine, init_db  # noqa: E402
+from hub.main import app  # noqa: E402
+from hub.routers import chat as chat_router  # noqa: E402
+from hub.session_writer import session_writer  # noqa: E402
+from hub.skill_service import DEVICE_AGNOSTIC_KEY  # noqa: E402
+from hub.tracing import tracer  # noqa: E402
+from hub.utils import normalize_device_name  # noqa: E402
+
+TOPICS = [
+    ("Weather", "weather forecast temperature rain wind"),
+    ("Calendar", "calendar events meetings schedule agenda"),
+    ("Music", "music playback songs playlist volume"),
+    ("Lights", "lights brightness color rooms scenes"),
+    ("Timer", "timer alarm countdown reminder clock"),
+    ("Notes", "notes memo write text journal"),
+    ("Files", "files directory search documents folders"),
+    ("System", "system cpu memory battery status"),
+    ("Mail", "mail inbox email messages unread"),
+    ("Maps", "maps directions route traffic distance"),
+]
+VERBS = ["get", "list", "search", "update", "check", "summarize"]
+
+# Prompt directive the fake gateway follows: "[bench] Skill.method@device :: words"
+_DIRECTIVE = re.compile(r"\[bench\] (\w+)\.(\w+)@(\w+) :: ([\w ]+)")
+
+
+@dataclass
+class SkillMethod:
+    """One method in the generated catalog."""
+
+    class_name: str
+    function_name: str
+    words: str
+    device_agnostic: bool
+
+    def descriptor(self) -> Dict[str, Any]:
+        """The /skills/register entry for this method."""
+        return {
+            "class_name": self.class_name,
+            "function_name": self.function_name,
+            "signature": f"{self.function_name}(query: str = '') -> dict",
+            "docstring": f"{self.function_name.replace('_', ' ')}: {self.words}.",
+            "device_agnostic": self.device_agnostic,
+        }
+
+
+def build_catalog(
+    skills: int, methods: int, agnostic_fraction: float
+) -> List[SkillMethod]:
+    """Generate ``skills`` skill classes with ``methods`` methods each."""
+    catalog = []
+    agnostic_count = int(round(skills * agnostic_fraction))
+    for i in range(skills):
+        topic, words = TOPICS[i % len(TOPICS)]
+        suffix = str(i // len(TOPICS)) if i >= len(TOPICS) else ""
+        noun = words.split()[0]
+        for j in range(methods):
+            verb = VERBS[j % len(VERBS)]
+            catalog.append(
+                SkillMethod(
+                    class_name=f"{topic}Skill{suffix}",
+                    function_name=f"{verb}_{noun}{j // len(VERBS) or ''}",
+                    words=words,
+                    device_agnostic=i < agnostic_count,
+                )
+            )
+    return catalog
+
+
+@dataclass
+class Samples:
+    """Latency samples (ms) per stage."""
+
+    stages: Dict[str, List[float]] = field(default_factory=dict)
+
+    def add(self, stage: str, ms: float) -> None:
+        self.stages.setdefault(stage, []).append(ms)
+
+    def clear(self) -> None:
+        self.stages.clear()
+
+
+class SimulatedSpoke:
+    """A Spoke that registers a catalog and answers skill requests."""
+
+    def __init__(
+        self,
+        name: str,
+        token: str,
+        catalog: List[SkillMethod],
+        latency: float,
+        concurrency: int,
+        result_bytes: int,
+    ) -> None:
+        self.name = name
+        self.token = token
+        self.catalog = catalog
+        self.latency = latency
+        self.result_payload = "x" * result_bytes
+        self._slots = asyncio.Semaphore(concurrency)
+        self._ws: Any = None
+        self._reader: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+        self.handled = 0
+
+    async def start(self, http: httpx.AsyncClient, ws_url: str) -> None:
+        """Register the catalog and open the device WebSocket."""
+        resp = await http.post(
+            "/skills/register",
+            json={"skills": [m.descriptor() for m in self.catalog]},
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        resp.raise_for_status()
+        self._ws = await websockets.connect(
+            f"{ws_url}/ws/device?token={self.token}", max_size=None
+        )
+        self._reader = asyncio.create_task(self._serve())
+
+    async def stop(self) -> None:
+        """Close the socket and stop answering."""
+        if self._reader is not None:
+            self._reader.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _serve(self) -> None:
+        async for raw in self._ws:
+            message = json.loads(raw)
+            if message.get("type") == "skill_request":
+                task = asyncio.create_task(self._reply(message, time.perf_counter()))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _reply(self, request: Dict[str, Any], received: float) -> None:
+        async with self._slots:
+            started = time.perf_counter()
+            # Jitter so replies interleave across devices.
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+            response: Dict[str, Any] = {
+                "type": "skill_response",
+                "request_id": request["request_id"],
+                "success": True,
+                "result": {
+                    "device": self.name,
+                    "skill": f"{request['skill_name']}.{request['method_name']}",
+                    "data": self.result_payload,
+                },
+            }
+            if request.get("trace_id"):
+                response["trace_id"] = request["trace_id"]
+                response["span_id"] = request.get("span_id")
+                response["timing"] = {
+                    "queue_ms": (started - received) * 1000,
+                    "exec_ms": (time.perf_counter() - started) * 1000,
+                }
+            self.handled += 1
+            await self._ws.send(json.dumps(response))
+
+
+class ScriptedGateway:
+    """Stands in for TensorZero: search, then python_exec, then answer."""
+
+    def __init__(self, latency: float, text_chunks: int, skill_calls: int) -> None:
+        self.latency = latency
+        self.text_chunks = text_chunks
+        self.skill_calls = skill_calls
+        self.calls = 0
+
+    def _plan(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Content blocks for the next model step of this conversation."""
+        texts = [str(m.get("content", "")) for m in messages]
+        step = sum("[Tool Results]" in t for t in texts)
+        directive = next((m for m in (_DIRECTIVE.search(t) for t in texts) if m), None)
+        self.calls += 1
+        if directive is None or step >= 2:
+            words = "Done. " + " ".join(f"word{i}" for i in range(self.text_chunks))
+            return [{"type": "text", "id": "0", "text": words}]
+
+        class_name, method, device, words = directive.groups()
+        if step == 0:
+            name, arguments = "search_skills", {"query": words}
+        else:
+            target = f"devices.{device}.{class_name}.{method}"
+            code = "\n".join(
+                f"r{i} = {target}(query={words!r})" for i in range(self.skill_calls)
+            )
+            name, arguments = "python_exec", {"code": f"{code}\nprint(r0)"}
+        return [
+            {
+                "type": "tool_call",
+                "id": f"call_{step}",
+                "name": name,
+                "raw_name": name,
+                "arguments": arguments,
+                "raw_arguments": json.dumps(arguments),
+            }
+        ]
+
+    async def inference(
+        self, messages: List[Dict[str, Any]], function_name: str, system: Any = None
+    ) -> Dict[str, Any]:
+        blocks = self._plan(messages)
+        await asyncio.sleep(self.latency)
+        return {"variant_name": "bench_fake", "content": blocks}
+
+    async def inference_stream(
+        self, messages: List[Dict[str, Any]], function_name: str, system: Any = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        blocks = self._plan(messages)
+
+        async def chunks() -> AsyncIterator[Dict[str, Any]]:
+            await asyncio.sleep(self.latency)
+            for block in blocks:
+                if block["type"] != "text":
+                    yield {"variant_name": "bench_fake", "content": [block]}
+                    continue
+                for word in block["text"].split(" "):
+                    yield {
+                        "variant_name": "bench_fake",
+                        "content": [{"type": "text", "id": "0", "text": word + " "}],
+                    }
+                    await asyncio.sleep(0)
+
+        return chunks()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``samples``."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def instrument_database(samples: Samples) -> None:
+    """Record every statement's duration as ``db <verb>``."""
+    engine = get_engine().sync_engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._bench_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_bench_query_start", None)
+        if start is not None:
+            verb = statement.lstrip().split(None, 1)[0].lower()
+            samples.add(f"db {verb}", (time.perf_counter() - start) * 1000)
+
+
+def _add_span(samples: Samples, span: Dict[str, Any], skill_ms: float) -> None:
+    name, attrs = span["name"], span["attributes"]
+    duration = span["duration_ms"] or 0.0
+    if span["parent_id"] is None:
+        samples.add("hub request", duration)
+    elif name == "tool":
+        samples.add(f"tool {attrs.get('tool')}", duration)
+        if attrs.get("tool") == "python_exec":
+            # Code execution, device lookup and routing around the skill calls
+            samples.add("python_exec overhead", duration - skill_ms)
+    elif name == "skill_request":
+        samples.add("skill round trip", duration)
+        if "transit_ms" in attrs:
+            samples.add("skill transit", attrs["transit_ms"])
+            samples.add("skill device", attrs["device_exec_ms"])
+            samples.add("skill device queue", attrs.get("device_queue_ms", 0))
+    else:
+        samples.add(name, duration)
+
+
+def collect_trace_stages(samples: Samples, limit: int) -> int:
+    """Turn finished request traces into per-stage samples.
+
+    Returns:
+        Number of tool calls and skill requests that failed.
+    """
+    errors = 0
+    for summary in tracer.recent(limit):
+        trace = tracer.get(summary["trace_id"])
+        spans = trace["spans"] if trace else []
+        skill_ms: Dict[str, float] = {}
+        for span in spans:
+            if span["name"] == "skill_request":
+                parent = span["parent_id"]
+                skill_ms[parent] = skill_ms.get(parent, 0.0) + span["duration_ms"]
+        for span in spans:
+            _add_span(samples, span, skill_ms.get(span["span_id"], 0.0))
+            if span["name"] != "llm" and "error" in span["attributes"]:
+                errors += 1
+    return errors
+
+
+async def _create_device(http: httpx.AsyncClient, user_token: str, name: str) -> str:
+    resp = await http.post(
+        "/api/devices/token",
+        json={"name": name},
+        headers={"Authorization": f"Bearer {user_token}"},
+    )
+    resp.raise_for_status()
+    return resp.json()["token"]
+
+
+async def _chat(
+    http: httpx.AsyncClient,
+    token: str,
+    payload: Dict[str, Any],
+    samples: Samples,
+) -> bool:
+    """Send one chat request; returns False if it failed."""
+    headers = {"Authorization": f"Bearer {token}"}
+    start = time.perf_counter()
+    if not payload["stream"]:
+        resp = await http.post("/api/v1/chat/completions", json=payload, headers=headers)
+        samples.add("client end-to-end", (time.perf_counter() - start) * 1000)
+        return resp.status_code == 200
+
+    ok = first = False
+    async with http.stream(
+        "POST", "/api/v1/chat/completions", json=payload, headers=headers
+    ) as resp:
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event_type = json.loads(line[6:]).get("type")
+            if event_type == "content_delta" and not first:
+                first = True
+                samples.add("client first delta", (time.perf_counter() - start) * 1000)
+            elif event_type == "done":
+                ok = True
+            elif event_type == "error":
+                ok = False
+    samples.add("client end-to-end", (time.perf_counter() - start) * 1000)
+    return ok and resp.status_code == 200
+
+
+async def drive_clients(
+    http: httpx.AsyncClient,
+    token: str,
+    clients: int,
+    requests: int,
+    targets: List[str],
+    stream: bool,
+    samples: Samples,
+) -> int:
+    """Run ``requests`` chats over ``clients`` concurrent sessions.
+
+    Returns:
+        Number of failed requests.
+    """
+    counter = iter(range(requests))
+    failures = 0
+
+    async def client() -> None:
+        nonlocal failures
+        headers = {"Authorization": f"Bearer {token}"}
+        session = await http.post("/sessions", json={}, headers=headers)
+        session_id = session.json()["id"]
+        for i in counter:
+            payload = {
+                "messages": [{"role": "user", "content": random.choice(targets)}],
+                "enable_tools": True,
+                "stream": stream,
+                "session_id": session_id,
+            }
+            if not await _chat(http, token, payload, samples):
+                failures += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return failures
+
+
+def _targets(catalog: List[SkillMethod], spoke_names: List[str]) -> List[str]:
+    """One prompt directive per (method, device) pair."""
+    prompts = []
+    for method in catalog:
+        devices = [DEVICE_AGNOSTIC_KEY] if method.device_agnostic else spoke_names
+        for device in devices:
+            prompts.append(
+                f"[bench] {method.class_name}.{method.function_name}@{device}"
+                f" :: {method.words}"
+            )
+    return prompts
+
+
+def report(
+    samples: Samples, completed: int, failures: int, elapsed: float
+) -> Dict[str, Any]:
+    """Print the results table and return it as a dict."""
+    stages = {}
+    for stage, values in sorted(samples.stages.items()):
+        stages[stage] = {
+            "count": len(values),
+            "per_second": len(values) / elapsed,
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "mean_ms": statistics.fmean(values),
+            "max_ms": max(values),
+        }
+
+    print(
+        f"completed={completed} failed={failures} elapsed={elapsed:.2f}s "
+        f"throughput={completed / elapsed:.1f} req/s"
+    )
+    print(
+        f"{'stage':<26}{'count':>8}{'/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'max ms':>10}"
+    )
+    for stage, row in stages.items():
+        print(
+            f"{stage:<26}{row['count']:>8}{row['per_second']:>9.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            f"{row['max_ms']:>10.2f}"
+        )
+    return {
+        "completed": completed,
+        "failed": failures,
+        "elapsed_s": elapsed,
+        "throughput_rps": completed / elapsed,
+        "stages": stages,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the Hub, run the load and return the results."""
+    random.seed(args.seed)
+    settings.tracing_enabled = True
+    settings.trace_buffer_size = args.requests
+    settings.trace_export_path = None
+    await init_db()
+
+    gateway = ScriptedGateway(
+        args.llm_latency_ms / 1000, args.text_chunks, args.skill_calls
+    )
+    chat_router.tz_inference = gateway.inference
+    chat_router.tz_inference_stream = gateway.inference_stream
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    serve_task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    base_url = f"http://127.0.0.1:{port}"
+    catalog = build_catalog(args.skills, args.methods, args.agnostic_fraction)
+    spokes: List[SimulatedSpoke] = []
+    limits = httpx.Limits(max_connections=args.clients + args.spokes + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as http:
+        credentials = {"username": "bench", "password": "bench-password"}
+        await http.post("/api/users/setup", json=credentials)
+        login = await http.post("/api/users/login", json=credentials)
+        user_token = login.json()["access_token"]
+
+        for i in range(args.spokes):
+            name = f"Bench Spoke {i}"
+            token = await _create_device(http, user_token, name)
+            spoke = SimulatedSpoke(
+                name,
+                token,
+                catalog,
+                args.skill_latency_ms / 1000,
+                args.spoke_concurrency,
+                args.result_bytes,
+            )
+            await spoke.start(http, f"ws://127.0.0.1:{port}")
+            spokes.append(spoke)
+        client_token = await _create_device(http, user_token, "Bench Client")
+        targets = _targets(catalog, [normalize_device_name(s.name) for s in spokes])
+
+        samples = Samples()
+        instrument_database(samples)
+        if args.warmup:
+            await drive_clients(
+                http,
+                client_token,
+                args.clients,
+                args.warmup,
+                targets,
+                args.stream,
+                samples,
+            )
+        samples.clear()
+        tracer.clear()
+
+        start = time.perf_counter()
+        failures = await drive_clients(
+            http,
+            client_token,
+            args.clients,
+            args.requests,
+            targets,
+            args.stream,
+            samples,
+        )
+        elapsed = time.perf_counter() - start
+        errors = collect_trace_stages(samples, args.requests)
+
+        for spoke in spokes:
+            await spoke.stop()
+
+    await session_writer.close()
+    server.should_exit = True
+    await serve_task
+    python_executor.shutdown()
+    await dispose_engine()
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+    print(
+        f"spokes={args.spokes} clients={args.clients} requests={args.requests} "
+        f"catalog={len(catalog)} methods stream={args.stream} "
+        f"llm_calls={gateway.calls} skill_calls={sum(s.handled for s in spokes)} "
+        f"tool_errors={errors}"
+    )
+    results = report(samples, args.requests - failures, failures, elapsed)
+    results["config"] = vars(args)
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spokes", type=int, default=4, help="Simulated Spokes")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=400, help="Measured chats")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured chats")
+    parser.add_argument("--skills", type=int, default=8, help="Skill classes per Spoke")
+    parser.add_argument("--methods", type=int, default=3, help="Methods per skill")
+    parser.add_argument(
+        "--agnostic-fraction",
+        type=float,
+        default=0.25,
+        help="Share of skill classes registered as device-agnostic (routed)",
+    )
+    parser.add_argument(
+        "--skill-latency-ms", type=float, default=20.0, help="Mean Spoke skill time"
+    )
+    parser.add_argument(
+        "--spoke-concurrency", type=int, default=8, help="Skill requests per Spoke"
+    )
+    parser.add_argument(
+        "--result-bytes", type=int, default=256, help="Size of each skill result"
+    )
+    parser.add_argument(
+        "--llm-latency-ms", type=float, default=50.0, help="Fake model latency"
+    )
+    parser.add_argument(
+        "--text-chunks", type=int, default=20, help="Words in the final answer"
+    )
+    parser.add_argument(
+        "--skill-calls", type=int, default=1, help="Skill calls per python_exec"
+    )
+    parser.add_argument(
+        "--no-stream",
+        dest="stream",
+        action="store_false",
+        help="Use non-streaming chat requests",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="Also write results here as JSON")
+    args = parser.parse_args()
+    # The agent loop logs every request at INFO; keep the table readable.
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
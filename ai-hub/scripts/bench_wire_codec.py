@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark WebSocket wire codecs (v1 JSON vs v2 msgpack) on realistic frames.
+
+Encodes and decodes representative Hub ↔ Spoke messages with each codec
+and reports frame size and per-message encode/decode time. Use it to pick
+``ws_compress_threshold_bytes`` and to check that v2 stays ahead of v1.
+
+Usage:
+    python scripts/bench_wire_codec.py [--iterations 2000] [--threshold 1024]
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from hub.wire import JsonCodec, MsgpackCodec, decode_frame  # noqa: E402
+
+
+def _words(rng: random.Random, count: int) -> str:
+    vocab = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(400)
+    ]
+    return " ".join(rng.choice(vocab) for _ in range(count))
+
+
+def build_payloads() -> Dict[str, Dict[str, Any]]:
+    """Messages shaped like real traffic, from tiny to very large."""
+    rng = random.Random(42)
+    request_id = "6f1c2a9e-8d7b-4c3a-9e2f-1b0a7c6d5e4f"
+    return {
+        "pong": {"type": "pong"},
+        "skill_request": {
+            "type": "skill_request",
+            "request_id": request_id,
+            "skill_name": "WeatherSkill",
+            "method_name": "get_current_weather",
+            "args": [],
+            "kwargs": {"location": "Seattle", "units": "imperial"},
+        },
+        "weather_result": {
+            "type": "skill_response",
+            "request_id": request_id,
+            "success": True,
+            "result": {
+                "location": "Seattle, WA",
+                "temp": 55.4,
+                "feels_like": 53.1,
+                "humidity": 81,
+                "condition": "Cloudy",
+                "hourly": [
+                    {"hour": h, "temp": 50 + rng.random() * 10, "rain": rng.random()}
+                    for h in range(24)
+                ],
+            },
+        },
+        "file_listing": {
+            "type": "skill_response",
+            "request_id": request_id,
+            "success": True,
+            "result": [
+                {
+                    "path": f"/home/user/projects/app/src/module_{i}/file_{i}.py",
+                    "size": rng.randint(100, 200_000),
+                    "modified": 1_760_000_000 + rng.randint(0, 10_000_000),
+                    "is_dir": False,
+                }
+                for i in range(500)
+            ],
+        },
+        "page_dump": {
+            "type": "skill_response",
+            "request_id": request_id,
+            "success": True,
+            "result": _words(rng, 20_000),
+        },
+    }
+
+
+def _time_per_call(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def run(iterations: int, threshold: int) -> List[Dict[str, Any]]:
+    """Benchmark every payload with each codec and print a table."""
+    codecs = {
+        "v1 json": JsonCodec(),
+        "v2 msgpack": MsgpackCodec(compress_threshold=0),
+        f"v2 msgpack+zlib>{threshold}": MsgpackCodec(compress_threshold=threshold),
+    }
+    rows = []
+    for name, message in build_payloads().items():
+        # Large payloads take longer; keep the total run time reasonable.
+        size_hint = len(json.dumps(message))
+        count = max(20, min(iterations, iterations * 2_000 // max(size_hint, 1)))
+        for codec_name, codec in codecs.items():
+            frame = codec.encode(message)
+            assert decode_frame(frame) == message
+            encode = _time_per_call(lambda: codec.encode(message), count)
+            decode = _time_per_call(lambda: decode_frame(frame), count)
+            rows.append(
+                {
+                    "payload": name,
+                    "codec": codec_name,
+                    "bytes": len(frame.encode() if isinstance(frame, str) else frame),
+                    "encode_us": encode * 1e6,
+                    "decode_us": decode * 1e6,
+                }
+            )
+
+    print(f"{'payload':<16}{'codec':<26}{'bytes':>10}{'encode µs':>12}{'decode µs':>12}")
+    for row in rows:
+        print(
+            f"{row['payload']:<16}{row['codec']:<26}{row['bytes']:>10}"
+            f"{row['encode_us']:>12.1f}{row['decode_us']:>12.1f}"
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+    run(args.iterations, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Per-session store for oversized tool results.
+
+Page text, MCP responses and search dumps can run to many thousands of
+characters, and whatever a tool returns is resent to the model on every
+later iteration. Results longer than ``tool_result_max_chars`` are kept
+here instead. The model gets a preview and a handle, and it reads further
+with ``read_artifact(handle, offset)`` from python_exec.
+
+Artifacts are scoped to the chat session (or to a single request when
+there is none), so a handle from one conversation cannot be read from
+another. Scopes are evicted least recently used, and each keeps at most
+``MAX_ARTIFACTS_PER_SCOPE`` artifacts. The store is in memory, so handles
+do not survive a restart and are only readable on the worker that made
+them.
+
+``read`` is called from python_exec threads, so access is locked.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Characters returned per read_artifact() call; below the offload threshold
+# so that reading a page does not create another artifact.
+ARTIFACT_PAGE_CHARS = 3000
+# Characters of the original result shown to the model.
+ARTIFACT_PREVIEW_CHARS = 1500
+MAX_ARTIFACTS_PER_SCOPE = 32
+MAX_SCOPES = 256
+
+
+@dataclass
+class ArtifactStats:
+    """Artifact store counters."""
+
+    stored: int = 0
+    reads: int = 0
+    misses: int = 0
+    chars_offloaded: int = 0
+    evictions: int = 0
+
+
+class ArtifactStore:
+    """Bounded, scope-keyed store of large tool results."""
+
+    def __init__(self, max_chars: Optional[int] = None) -> None:
+        self._max_chars = max_chars
+        # scope -> handle -> content
+        self._scopes: "OrderedDict[str, OrderedDict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = ArtifactStats()
+
+    @property
+    def max_chars(self) -> int:
+        """Results longer than this are stored (0 disables offloading)."""
+        if self._max_chars is not None:
+            return self._max_chars
+        return settings.tool_result_max_chars
+
+    def offload(self, scope: str, text: str) -> str:
+        """Return ``text``, or a preview plus handle if it is too long."""
+        if self.max_chars <= 0 or len(text) <= self.max_chars:
+            return text
+        handle = self.put(scope, text)
+        preview = text[:ARTIFACT_PREVIEW_CHARS]
+        return (
+            f"{preview}\n"
+            f"[... truncated: {len(text)} chars total. The full result is stored "
+            f'as artifact "{handle}". Read more with python_exec: '
+            f'print(read_artifact("{handle}", offset={len(preview)}))]'
+        )
+
+    def put(self, scope: str, content: str) -> str:
+        """Store ``content`` in ``scope`` and return its handle."""
+        handle = "art_" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            artifacts = self._scopes.get(scope)
+            if artifacts is None:
+                artifacts = self._scopes[scope] = OrderedDict()
+                while len(self._scopes) > MAX_SCOPES:
+                    _, evicted = self._scopes.popitem(last=False)
+                    self.stats.evictions += len(evicted)
+            self._scopes.move_to_end(scope)
+            if handle not in artifacts:
+                self.stats.stored += 1
+                self.stats.chars_offloaded += len(content)
+            artifacts[handle] = content
+            artifacts.move_to_end(handle)
+            while len(artifacts) > MAX_ARTIFACTS_PER_SCOPE:
+                artifacts.popitem(last=False)
+                self.stats.evictions += 1
+        logger.debug("Stored artifact %s (%d chars) in %s", handle, len(content), scope)
+        return handle
+
+    def read(
+        self,
+        scope: str,
+        handle: str,
+        offset: int = 0,
+        length: int = ARTIFACT_PAGE_CHARS,
+    ) -> str:
+        """Return one page of an artifact, noting where the next page starts.
+
+        Raises:
+            KeyError: If the handle is unknown in this scope (or evicted).
+        """
+        with self._lock:
+            content = self._scopes.get(scope, {}).get(str(handle))
+            if content is None:
+                self.stats.misses += 1
+                raise KeyError(f"Unknown or expired artifact handle: {handle}")
+            self.stats.reads += 1
+
+        offset = max(0, int(offset))
+        length = max(1, min(int(length), ARTIFACT_PAGE_CHARS))
+        page = content[offset : offset + length]
+        end = offset + len(page)
+        if end < len(content):
+            page += (
+                f"\n[... {len(content) - end} more chars; next: "
+                f'read_artifact("{handle}", offset={end})]'
+            )
+        return page
+
+    def invalidate(self, scope: str) -> None:
+        """Drop every artifact of a scope (e.g. a deleted session)."""
+        with self._lock:
+            self._scopes.pop(scope, None)
+
+    def clear(self) -> None:
+        """Drop all artifacts and counters (used by tests)."""
+        with self._lock:
+            self._scopes.clear()
+            self.stats = ArtifactStats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters and current size."""
+        with self._lock:
+            data = asdict(self.stats)
+            data["scopes"] = len(self._scopes)
+            data["artifacts"] = sum(len(a) for a in self._scopes.values())
+        data["max_chars"] = self.max_chars
+        return data
+
+
+# Global artifact store instance
+artifact_store = ArtifactStore()
@@ -3,17 +3,33 @@
 This module uses `asteval.Interpreter` to safely execute Python code with
 support for loops, conditionals, and function calls. Async skill calls are
 wrapped in sync proxies that block until the result is available.
+
+Code runs on a dedicated, fixed-size thread pool (never the event loop's
+default executor, whose threads would otherwise sit blocked on skill calls)
+using interpreters built ahead of time and discarded after one run.
 """
 
 import asyncio
+import contextvars
+import io
 import logging
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from asteval import Interpreter
 
+from .config import settings
+from .metrics import python_exec_queue_wait_seconds, timeouts_total
+
 logger = logging.getLogger(__name__)
 
+# Seconds a single skill call (or one devices.gather batch) may take.
+SKILL_CALL_TIMEOUT = 30.0
+
 
 @dataclass
 class ExecutionResult:
@@ -24,6 +40,17 @@ class ExecutionResult:
     error: Optional[str] = None
 
 
+@dataclass(frozen=True)
+class DeferredCall:
+    """A skill call recorded by ``.defer(...)``, run later by ``devices.gather``."""
+
+    label: str
+    start: Callable[[], Awaitable[Any]]
+
+    def __repr__(self) -> str:
+        return f"<deferred {self.label}>"
+
+
 class SyncMethodProxy:
     """Wraps an async method to be callable synchronously from asteval.
 
@@ -61,10 +88,11 @@ class SyncMethodProxy:
                 self._async_method(*args, **kwargs),
                 self._loop,
             )
-            result = future.result(timeout=30.0)
+            result = future.result(timeout=SKILL_CALL_TIMEOUT)
             logger.debug(f"[SyncProxy] Result: {result}")
             return result
         except TimeoutError:
+            timeouts_total.inc("python_exec_skill_call")
             raise TimeoutError(
                 f"Skill call timed out: {self._device_name}"
                 f".{self._skill_name}.{self._method_name}"
@@ -73,6 +101,13 @@ class SyncMethodProxy:
             logger.error(f"[SyncProxy] Error: {e}")
             raise
 
+    def defer(self, *args, **kwargs) -> DeferredCall:
+        """Record this call for ``devices.gather`` instead of running it now."""
+        return DeferredCall(
+            label=f"{self._device_name}.{self._skill_name}.{self._method_name}",
+            start=lambda: self._async_method(*args, **kwargs),
+        )
+
 
 class SyncSkillProxy:
     """Wraps a skill to provide sync method access."""
@@ -141,6 +176,7 @@ class SyncDevicesProxy:
     - devices.device_name.SkillClass.method() - sync skill calls
     - devices.search_skills(query) - sync search
     - devices.describe_function(path) - sync describe
+    - devices.gather(*calls) / devices.parallel(*calls) - concurrent calls
     """
 
     def __init__(
@@ -157,7 +193,7 @@ class SyncDevicesProxy:
             self._devices_proxy.search_skills(query, device_limit),
             self._loop,
         )
-        return future.result(timeout=30.0)
+        return future.result(timeout=SKILL_CALL_TIMEOUT)
 
     def describe_function(self, path: str) -> str:
         """Describe a function (sync wrapper)."""
@@ -165,7 +201,51 @@ class SyncDevicesProxy:
             self._devices_proxy.describe_function(path),
             self._loop,
         )
-        return future.result(timeout=30.0)
+        return future.result(timeout=SKILL_CALL_TIMEOUT)
+
+    def gather(self, *calls, return_exceptions: bool = False) -> List[Any]:
+        """Run deferred skill calls concurrently and return results in order.
+
+        Each call is created with ``.defer(...)`` on a skill method, e.g.
+        ``devices.gather(devices.a.Lights.off.defer(), devices.b.Lights.off.defer())``.
+        A single list of calls is accepted too.
+
+        Args:
+            calls: Deferred calls, or one list of them.
+            return_exceptions: Return failures in place of results instead
+                of raising the first one.
+
+        Returns:
+            Results in the same order as ``calls``.
+        """
+        if len(calls) == 1 and isinstance(calls[0], (list, tuple)):
+            calls = tuple(calls[0])
+        for call in calls:
+            if not isinstance(call, DeferredCall):
+                raise TypeError(
+                    "devices.gather() expects skill calls made with .defer(...), "
+                    "e.g. devices.<device>.<Skill>.<method>.defer(...)"
+                )
+        if not calls:
+            return []
+
+        logger.debug("[SyncProxy] Gathering %d calls: %s", len(calls), calls)
+
+        async def run_all() -> List[Any]:
+            return await asyncio.gather(
+                *(call.start() for call in calls),
+                return_exceptions=return_exceptions,
+            )
+
+        future = asyncio.run_coroutine_threadsafe(run_all(), self._loop)
+        try:
+            return list(future.result(timeout=SKILL_CALL_TIMEOUT))
+        except TimeoutError:
+            future.cancel()
+            timeouts_total.inc("python_exec_skill_call")
+            raise TimeoutError(f"devices.gather timed out ({len(calls)} calls)")
+
+    parallel = gather
 
     def __getattr__(self, device_name: str) -> SyncDeviceProxy:
         """Get a sync proxy for a specific device."""
@@ -176,77 +256,243 @@ class SyncDevicesProxy:
         )
 
 
-async def execute_with_asteval(
-    code: str,
-    devices_proxy,
-) -> Dict[str, Any]:
-    """Execute LLM-generated Python code using asteval.
+@dataclass
+class ExecutorStats:
+    """Counters for python_exec runs (times in seconds)."""
+
+    executions: int = 0
+    errors: int = 0
+    interpreters_created: int = 0
+    interpreters_prebuilt: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+    exec_time_total: float = 0.0
+    exec_time_max: float = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters plus mean queue wait and execution time."""
+        data = asdict(self)
+        runs = max(1, self.executions)
+        data["queue_wait_mean"] = self.queue_wait_total / runs
+        data["exec_time_mean"] = self.exec_time_total / runs
+        return data
+
+
+def _own_functions(symtable: Dict[str, Any]) -> None:
+    """Give an interpreter its own copy of each plain Python function.
+
+    Some symbols (asteval's ``open`` and ``type``, numpy's Python-level
+    functions) are module globals shared by every interpreter, and user
+    code may set attributes on them. With copies, such writes are dropped
+    along with the interpreter.
+    """
+    for name, value in list(symtable.items()):
+        if isinstance(value, types.FunctionType):
+            copy = types.FunctionType(
+                value.__code__,
+                value.__globals__,
+                value.__name__,
+                value.__defaults__,
+                value.__closure__,
+            )
+            copy.__kwdefaults__ = value.__kwdefaults__
+            copy.__qualname__ = value.__qualname__
+            copy.__module__ = value.__module__
+            copy.__doc__ = value.__doc__
+            copy.__dict__.update(value.__dict__)
+            symtable[name] = copy
+
+
+class InterpreterPool:
+    """Pool of interpreters built ahead of time, each used for one run.
+
+    Building an ``Interpreter`` sets up a full symbol table, so spares are
+    built off the request path. A used interpreter is never reset for
+    another run (that would mean reaching into asteval's internals); it is
+    dropped and :meth:`replenish` builds a fresh one. Thread-safe; at most
+    ``max_idle`` interpreters are kept ready.
+    """
+
+    def __init__(self, max_idle: int) -> None:
+        self._max_idle = max_idle
+        self._idle: List[Interpreter] = []
+        self._lock = threading.Lock()
+
+    def _build(self, stats: ExecutorStats) -> Interpreter:
+        aeval = Interpreter(writer=io.StringIO())
+        _own_functions(aeval.symtable)
+        with self._lock:
+            stats.interpreters_created += 1
+        return aeval
+
+    def acquire(self, stats: ExecutorStats, **symbols: Any) -> Interpreter:
+        """Take a fresh interpreter and bind ``symbols`` (e.g. ``devices``)."""
+        with self._lock:
+            aeval = self._idle.pop() if self._idle else None
+            if aeval is not None:
+                stats.interpreters_prebuilt += 1
+        if aeval is None:
+            aeval = self._build(stats)
+        aeval.symtable.update(symbols)
+        return aeval
+
+    def replenish(self, stats: ExecutorStats) -> None:
+        """Build a fresh interpreter in place of one that was used."""
+        with self._lock:
+            if len(self._idle) >= self._max_idle:
+                return
+        aeval = self._build(stats)
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(aeval)
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+
+class PythonExecExecutor:
+    """Runs python_exec code on a dedicated, bounded thread pool."""
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[InterpreterPool] = None
+        self._lock = threading.Lock()
+        self.stats = ExecutorStats()
+
+    @property
+    def max_workers(self) -> int:
+        """Number of code-execution threads."""
+        return self._max_workers or settings.python_exec_max_workers
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="python-exec",
+            )
+            self._pool = InterpreterPool(max_idle=self.max_workers)
+        return self._executor
+
+    async def run(self, code: str, devices_proxy, **symbols: Any) -> Dict[str, Any]:
+        """Execute ``code`` with ``devices`` bound to ``devices_proxy``.
+
+        Extra ``symbols`` (e.g. ``read_artifact``) are bound for this run only.
+
+        Returns:
+            Dict with "result" or "error" key
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        submitted = time.perf_counter()
+
+        def run_in_thread() -> Dict[str, Any]:
+            started = time.perf_counter()
+            sync_devices = SyncDevicesProxy(devices_proxy, loop)
+            aeval = self._pool.acquire(
+                self.stats,
+                devices=sync_devices,
+                device_manager=sync_devices,  # Alias
+                **symbols,
+            )
+            try:
+                return _run_code(aeval, code)
+            finally:
+                self._record(started - submitted, time.perf_counter() - started)
+                self._pool.replenish(self.stats)
+
+        # Awaiting the executor keeps the event loop running, so the sync
+        # proxies' run_coroutine_threadsafe calls can complete. Running in a
+        # copy of this context lets those calls nest under the current trace.
+        context = contextvars.copy_context()
+        result = await loop.run_in_executor(executor, context.run, run_in_thread)
+        if "error" in result:
+            with self._lock:
+                self.stats.errors += 1
+        return result
+
+    def _record(self, queue_wait: float, exec_time: float) -> None:
+        with self._lock:
+            stats = self.stats
+            stats.executions += 1
+            stats.queue_wait_total += queue_wait
+            stats.queue_wait_max = max(stats.queue_wait_max, queue_wait)
+            stats.exec_time_total += exec_time
+            stats.exec_time_max = max(stats.exec_time_max, exec_time)
+        python_exec_queue_wait_seconds.observe(queue_wait)
+        logger.debug(
+            "[asteval] queue_wait=%.1fms exec=%.1fms",
+            queue_wait * 1000,
+            exec_time * 1000,
+        )
 
-    This creates a fresh Interpreter for each execution (thread-safe),
-    injects the `devices` proxy as a sync wrapper, and captures output.
+    def get_stats(self) -> Dict[str, Any]:
+        """Return a snapshot of execution metrics."""
+        with self._lock:
+            data = self.stats.snapshot()
+        data["max_workers"] = self.max_workers
+        data["idle_interpreters"] = len(self._pool) if self._pool else 0
+        return data
 
-    To avoid deadlock, the asteval execution runs in a thread pool executor,
-    allowing the sync proxies to block the thread while the main event loop
-    continues running and can process the async skill calls.
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker threads (new runs recreate the pool)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._pool = None
 
-    Args:
-        code: Python code to execute
-        devices_proxy: The async DevicesProxy for skill access
 
-    Returns:
-        Dict with "result" or "error" key
-    """
+def _run_code(aeval: Interpreter, code: str) -> Dict[str, Any]:
+    """Run ``code`` on a prepared interpreter and collect its output."""
+    try:
+        logger.info(f"[asteval] Executing code:\n{code}")
 
-    # Get the current event loop (we'll pass it to the thread)
-    loop = asyncio.get_running_loop()
+        # Execute the code
+        result = aeval(code)
 
-    def run_in_thread():
-        """Run asteval in a thread so sync proxies can block without deadlock."""
-        import io
+        # Check for errors
+        if aeval.error:
+            error_msgs = []
+            for err in aeval.error:
+                error_msgs.append(str(err.get_error()))
+            error_str = "\n".join(error_msgs)
+            logger.error(f"[asteval] Errors: {error_str}")
+            return {"error": error_str}
 
-        # Use StringIO as writer to capture print output
-        output_buffer = io.StringIO()
+        # Combine output - get captured print output from the writer
+        output = aeval.writer.getvalue().strip()
+        if not output and result is not None:
+            output = str(result)
 
-        # Create sync wrapper for devices proxy
-        sync_devices = SyncDevicesProxy(devices_proxy, loop)
+        logger.info(f"[asteval] Output: {output or '(no output)'}")
+        return {"result": output or "(no output)"}
 
-        # Create a fresh interpreter (thread-safe)
-        # Use writer parameter to capture print output directly
-        aeval = Interpreter(
-            usersyms={
-                "devices": sync_devices,
-                "device_manager": sync_devices,  # Alias
-            },
-            writer=output_buffer,  # Capture print output to StringIO
-        )
+    except Exception as e:
+        logger.error(f"[asteval] Exception: {e}")
+        return {"error": f"{type(e).__name__}: {e}"}
 
-        try:
-            logger.info(f"[asteval] Executing code:\n{code}")
 
-            # Execute the code
-            result = aeval(code)
+# Global executor for hub python_exec
+python_executor = PythonExecExecutor()
 
-            # Check for errors
-            if aeval.error:
-                error_msgs = []
-                for err in aeval.error:
-                    error_msgs.append(str(err.get_error()))
-                error_str = "\n".join(error_msgs)
-                logger.error(f"[asteval] Errors: {error_str}")
-                return {"error": error_str}
 
-            # Combine output - get captured print output from StringIO
-            output = output_buffer.getvalue().strip()
-            if not output and result is not None:
-                output = str(result)
+async def execute_with_asteval(
+    code: str,
+    devices_proxy,
+    **symbols: Any,
+) -> Dict[str, Any]:
+    """Execute LLM-generated Python code using asteval.
 
-            logger.info(f"[asteval] Output: {output or '(no output)'}")
-            return {"result": output or "(no output)"}
+    Runs on the dedicated python_exec thread pool with a pooled
+    interpreter, so the sync proxies can block their thread while the main
+    event loop keeps processing the async skill calls.
 
-        except Exception as e:
-            logger.error(f"[asteval] Exception: {e}")
-            return {"error": f"{type(e).__name__}: {e}"}
+    Args:
+        code: Python code to execute
+        devices_proxy: The async DevicesProxy for skill access
+        symbols: Extra names to bind, such as ``read_artifact``
 
-    # Use await run_in_executor so the event loop keeps running
-    # This allows the sync proxies' run_coroutine_threadsafe calls to complete
-    return await loop.run_in_executor(None, run_in_thread)
+    Returns:
+        Dict with "result" or "error" key
+    """
+    return await python_executor.run(code, devices_proxy, **symbols)
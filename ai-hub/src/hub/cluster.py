@@ -0,0 +1,622 @@
+"""Cross-worker skill routing.
+
+A device's WebSocket lives in the uvicorn worker it connected to, so only
+that worker can deliver a skill request to it. This module is the pluggable
+layer that lets any worker reach any device. It has two parts:
+
+- a presence directory recording which worker owns each connected device
+- a request/response channel between workers
+
+``LocalCluster`` is the single-process default: every device is local and
+nothing crosses a process boundary. ``SqliteCluster`` is the stand-in for
+several workers on one machine. The directory lives in a small SQLite file
+the workers share, and each worker listens on a loopback TCP socket for
+requests forwarded by its peers, framed as newline-delimited JSON.
+
+Workers also broadcast skill-registry changes. Each worker's in-memory
+caches (search index, result cache, routing stats) can then drop what
+another worker made stale.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .device_directory import device_directory
+from .result_cache import skill_result_cache
+from .skill_index import skill_index
+from .skill_routing import skill_router
+
+logger = logging.getLogger(__name__)
+
+# Serves a forwarded skill request on the worker that owns the device.
+RequestHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+EventHandler = Callable[[Dict[str, Any]], None]
+
+# Largest JSON line accepted on the worker channel (skill results included).
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# Extra time a forwarding worker waits beyond the skill timeout, which the
+# owning worker enforces itself.
+FORWARD_GRACE_SECONDS = 5.0
+
+# Errors that keep their type across the channel; anything else arrives as
+# RuntimeError. These are the errors ConnectionManager.send_skill_request raises.
+_REMOTE_ERRORS = {
+    cls.__name__: cls for cls in (TimeoutError, ValueError, RuntimeError, ConnectionError)
+}
+
+
+def apply_event(event: Dict[str, Any]) -> None:
+    """Drop local cache state made stale by a change on another worker.
+
+    Only the affected device is touched; the rest of the user's index and
+    device directory stay warm.
+    """
+    user_id = event.get("user_id")
+    device_id = event.get("device_id")
+    if not user_id or not device_id:
+        return
+    kind = event.get("kind")
+    if kind == "device_changed":
+        # Registered or renamed; skills follow in their own event.
+        device_directory.invalidate(user_id)
+        return
+    if kind == "device_offline":
+        skill_index.remove_device(user_id, device_id)
+        device_directory.invalidate_candidates(user_id)
+        return
+
+    skill_result_cache.invalidate(user_id, device_id)
+    if kind == "device_deleted":
+        skill_index.remove_device(user_id, device_id)
+        device_directory.invalidate(user_id)
+        skill_router.forget_device(device_id)
+        return
+    # The event carries no skill rows; the next search reloads this device.
+    skill_index.mark_stale(user_id, device_id)
+    device_directory.invalidate_candidates(user_id)
+
+
+class ClusterBackend(ABC):
+    """Device directory and worker channel used by ``ConnectionManager``."""
+
+    worker_id: str
+
+    @abstractmethod
+    async def start(
+        self, handler: RequestHandler, on_event: EventHandler = apply_event
+    ) -> None:
+        """Start serving requests forwarded by other workers."""
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Stop serving and give up ownership of this worker's devices."""
+        pass
+
+    @abstractmethod
+    async def claim(self, device_id: str) -> None:
+        """Record that a device connected to this worker."""
+        pass
+
+    @abstractmethod
+    async def release(self, device_id: str) -> None:
+        """Record that a device left this worker (no-op if it moved on)."""
+        pass
+
+    @abstractmethod
+    async def refresh(self) -> None:
+        """Reload the directory so ``owner`` reflects other workers' devices."""
+        pass
+
+    @abstractmethod
+    def owner(self, device_id: str) -> Optional[str]:
+        """Return the worker holding a device connected elsewhere, if any."""
+        pass
+
+    @abstractmethod
+    def remote_devices(self) -> List[str]:
+        """Return devices connected to other live workers."""
+        pass
+
+    @abstractmethod
+    async def forward(
+        self, worker_id: str, request: Dict[str, Any], timeout: float
+    ) -> Any:
+        """Run a skill request on another worker and return its result.
+
+        Raises:
+            TimeoutError, ValueError, RuntimeError, ConnectionError: As
+                raised by the owning worker, or ConnectionError if it
+                cannot be reached.
+        """
+        pass
+
+    @abstractmethod
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Send a cache-invalidation event to every other worker."""
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Return backend counters for the admin stats endpoint."""
+        pass
+
+
+class LocalCluster(ClusterBackend):
+    """Single-worker backend: every connected device is local."""
+
+    def __init__(self) -> None:
+        """Name the worker after the host and process."""
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    async def start(
+        self, handler: RequestHandler, on_event: EventHandler = apply_event
+    ) -> None:
+        """Nothing to serve: no other worker forwards here."""
+
+    async def stop(self) -> None:
+        """Nothing to release."""
+
+    async def claim(self, device_id: str) -> None:
+        """Devices are tracked by ``ConnectionManager`` alone."""
+
+    async def release(self, device_id: str) -> None:
+        """Devices are tracked by ``ConnectionManager`` alone."""
+
+    async def refresh(self) -> None:
+        """There is no shared directory to reload."""
+
+    def owner(self, device_id: str) -> Optional[str]:
+        """Always None: no device is connected elsewhere."""
+        return None
+
+    def remote_devices(self) -> List[str]:
+        """Always empty: there are no other workers."""
+        return []
+
+    async def forward(
+        self, worker_id: str, request: Dict[str, Any], timeout: float
+    ) -> Any:
+        """Fail: there are no other workers to forward to."""
+        raise ConnectionError(f"Unknown worker {worker_id}")
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Drop the event: no other worker holds caches."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the backend name and worker ID."""
+        return {"backend": "local", "worker_id": self.worker_id}
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    """Frame a message as one JSON line."""
+    return json.dumps(message, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+class _PeerLink:
+    """Persistent connection to one peer worker, multiplexed by request id."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+
+    async def _ensure_connected(self) -> None:
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port, limit=MAX_MESSAGE_BYTES
+                )
+            except OSError as e:
+                raise ConnectionError(
+                    f"Cannot reach worker at {self.host}:{self.port}: {e}"
+                ) from e
+            self._reader_task = asyncio.create_task(self._read_loop(reader, self._writer))
+
+    async def _read_loop(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                future = self._pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if message.get("ok"):
+                    future.set_result(message.get("result"))
+                else:
+                    error = message.get("error", "Unknown error")
+                    error_cls = _REMOTE_ERRORS.get(
+                        message.get("error_type"), RuntimeError
+                    )
+                    future.set_exception(error_cls(error))
+        except (OSError, ValueError) as e:
+            logger.debug("Worker link %s:%s failed: %s", self.host, self.port, e)
+        finally:
+            # Mark the link closed so the next send reconnects.
+            writer.close()
+            self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(
+                    ConnectionError(f"Worker at {self.host}:{self.port} went away")
+                )
+        self._pending.clear()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        await self._ensure_connected()
+        async with self._write_lock:
+            self._writer.write(_encode(message))
+            await self._writer.drain()
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.send({"op": "request", "id": request_id, "payload": payload})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            await self._cancel(request_id)
+            raise TimeoutError(f"Worker at {self.host}:{self.port} did not respond")
+        except asyncio.CancelledError:
+            await asyncio.shield(self._cancel(request_id))
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _cancel(self, request_id: int) -> None:
+        try:
+            await self.send({"op": "cancel", "id": request_id})
+        except (ConnectionError, OSError):
+            pass
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        self._fail_pending()
+
+
+class SqliteCluster(ClusterBackend):
+    """Multi-worker backend: SQLite directory plus loopback TCP channel.
+
+    Every worker refreshes an in-memory copy of the directory each
+    ``refresh_interval`` seconds (and before failing a lookup), so
+    ``owner`` stays synchronous. A worker whose heartbeat is older than
+    ``stale_after`` seconds is treated as dead, along with its devices.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        worker_id: Optional[str] = None,
+        host: str = "127.0.0.1",
+        refresh_interval: float = 1.0,
+        stale_after: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.host = host
+        self.port: Optional[int] = None
+        self.refresh_interval = refresh_interval
+        self.stale_after = stale_after or max(5.0, 5 * refresh_interval)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._handler: Optional[RequestHandler] = None
+        self._on_event: EventHandler = apply_event
+        # device_id -> worker_id for devices on other live workers
+        self._owners: Dict[str, str] = {}
+        # worker_id -> (host, port) for other live workers
+        self._addresses: Dict[str, Tuple[str, int]] = {}
+        self._links: Dict[str, _PeerLink] = {}
+        self._serving: set[asyncio.Task] = set()
+        self._counters: Counter = Counter()
+
+    # -- directory ---------------------------------------------------------
+
+    async def _db(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run one statement on the directory file off the event loop."""
+
+        def run() -> List[tuple]:
+            with self._db_lock:
+                rows = self._conn.execute(sql, params).fetchall()
+                self._conn.commit()
+                return rows
+
+        return await asyncio.to_thread(run)
+
+    def _open(self) -> None:
+        """Open the directory file and create its tables."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cluster_workers ("
+            "worker_id TEXT PRIMARY KEY, host TEXT NOT NULL, "
+            "port INTEGER NOT NULL, heartbeat REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cluster_devices ("
+            "device_id TEXT PRIMARY KEY, worker_id TEXT NOT NULL, "
+            "claimed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    async def refresh(self) -> None:
+        """Heartbeat, drop dead workers, and reload the directory."""
+        now = time.time()
+        cutoff = now - self.stale_after
+        await self._db(
+            "UPDATE cluster_workers SET heartbeat = ? WHERE worker_id = ?",
+            (now, self.worker_id),
+        )
+        await self._db(
+            "DELETE FROM cluster_devices WHERE worker_id NOT IN "
+            "(SELECT worker_id FROM cluster_workers WHERE heartbeat >= ?)",
+            (cutoff,),
+        )
+        await self._db("DELETE FROM cluster_workers WHERE heartbeat < ?", (cutoff,))
+        workers = await self._db(
+            "SELECT worker_id, host, port FROM cluster_workers WHERE worker_id != ?",
+            (self.worker_id,),
+        )
+        devices = await self._db(
+            "SELECT device_id, worker_id FROM cluster_devices WHERE worker_id != ?",
+            (self.worker_id,),
+        )
+        self._addresses = {w: (h, p) for w, h, p in workers}
+        self._owners = {d: w for d, w in devices if w in self._addresses}
+        for worker_id in [w for w in self._links if w not in self._addresses]:
+            await self._links.pop(worker_id).close()
+
+    async def _refresh_loop(self) -> None:
+        """Refresh every ``refresh_interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except sqlite3.Error:
+                logger.exception("Cluster directory refresh failed")
+
+    async def claim(self, device_id: str) -> None:
+        """Take over the device's directory entry (a reconnect may move it here)."""
+        self._owners.pop(device_id, None)
+        try:
+            await self._db(
+                "INSERT OR REPLACE INTO cluster_devices VALUES (?, ?, ?)",
+                (device_id, self.worker_id, time.time()),
+            )
+        except sqlite3.Error:
+            logger.exception("Could not claim device %s", device_id)
+
+    async def release(self, device_id: str) -> None:
+        """Delete the device's entry unless another worker has claimed it since."""
+        try:
+            await self._db(
+                "DELETE FROM cluster_devices WHERE device_id = ? AND worker_id = ?",
+                (device_id, self.worker_id),
+            )
+        except sqlite3.Error:
+            logger.exception("Could not release device %s", device_id)
+
+    def owner(self, device_id: str) -> Optional[str]:
+        """Look the device up in the copy loaded by the last refresh."""
+        return self._owners.get(device_id)
+
+    def remote_devices(self) -> List[str]:
+        """Return devices in the copy loaded by the last refresh."""
+        return list(self._owners)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(
+        self, handler: RequestHandler, on_event: EventHandler = apply_event
+    ) -> None:
+        """Listen on a loopback port and register this worker in the directory."""
+        self._handler = handler
+        self._on_event = on_event
+        await asyncio.to_thread(self._open)
+        self._server = await asyncio.start_server(
+            self._serve_connection, self.host, 0, limit=MAX_MESSAGE_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        await self._db(
+            "INSERT OR REPLACE INTO cluster_workers VALUES (?, ?, ?, ?)",
+            (self.worker_id, self.host, self.port, time.time()),
+        )
+        await self.refresh()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        logger.info(
+            "Cluster worker %s listening on %s:%s", self.worker_id, self.host, self.port
+        )
+
+    async def stop(self) -> None:
+        """Close the channel and delete this worker and its devices."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._serving):
+            task.cancel()
+        for link in self._links.values():
+            await link.close()
+        self._links.clear()
+        self._owners.clear()
+        if self._conn is not None:
+            try:
+                await self._db(
+                    "DELETE FROM cluster_devices WHERE worker_id = ?", (self.worker_id,)
+                )
+                await self._db(
+                    "DELETE FROM cluster_workers WHERE worker_id = ?", (self.worker_id,)
+                )
+            except sqlite3.Error:
+                logger.exception("Could not remove worker %s", self.worker_id)
+            self._conn.close()
+            self._conn = None
+
+    # -- channel -----------------------------------------------------------
+
+    def _link(self, worker_id: str) -> _PeerLink:
+        """Return the (lazily opened) link to a live peer worker."""
+        link = self._links.get(worker_id)
+        if link is None:
+            address = self._addresses.get(worker_id)
+            if address is None:
+                raise ConnectionError(f"Unknown worker {worker_id}")
+            link = self._links[worker_id] = _PeerLink(*address)
+        return link
+
+    async def forward(
+        self, worker_id: str, request: Dict[str, Any], timeout: float
+    ) -> Any:
+        """Send the request over the peer link, allowing the owner's timeout."""
+        self._counters["forwarded"] += 1
+        try:
+            return await self._link(worker_id).request(
+                request, timeout + FORWARD_GRACE_SECONDS
+            )
+        except Exception:
+            self._counters["forward_errors"] += 1
+            raise
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Send the event to every live peer; unreachable peers are skipped."""
+        for worker_id in list(self._addresses):
+            try:
+                await self._link(worker_id).send({"op": "event", "event": event})
+                self._counters["events_sent"] += 1
+            except (ConnectionError, OSError) as e:
+                logger.warning("Could not notify worker %s: %s", worker_id, e)
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one peer's link until it closes."""
+        in_flight: Dict[int, asyncio.Task] = {}
+        write_lock = asyncio.Lock()
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "request":
+                    task = asyncio.create_task(
+                        self._serve_request(message, writer, write_lock)
+                    )
+                    in_flight[message["id"]] = task
+                    self._serving.add(task)
+                    task.add_done_callback(self._serving.discard)
+                    task.add_done_callback(
+                        lambda _t, i=message["id"]: in_flight.pop(i, None)
+                    )
+                elif op == "cancel":
+                    task = in_flight.get(message.get("id"))
+                    if task is not None:
+                        task.cancel()
+                elif op == "event":
+                    self._counters["events_received"] += 1
+                    self._on_event(message.get("event") or {})
+        except (OSError, ValueError) as e:
+            logger.debug("Peer link closed: %s", e)
+        finally:
+            for task in list(in_flight.values()):
+                task.cancel()
+            writer.close()
+
+    async def _serve_request(
+        self,
+        message: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+        write_lock: asyncio.Lock,
+    ) -> None:
+        """Run one forwarded request and write its result or error back."""
+        self._counters["served"] += 1
+        reply: Dict[str, Any] = {"op": "response", "id": message["id"]}
+        try:
+            reply["result"] = await self._handler(message["payload"])
+            reply["ok"] = True
+        except Exception as e:
+            reply.update(ok=False, error_type=type(e).__name__, error=str(e))
+        try:
+            async with write_lock:
+                writer.write(_encode(reply))
+                await writer.drain()
+        except OSError as e:
+            logger.debug("Could not reply to request %s: %s", message["id"], e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the address, live peers and channel counters."""
+        return {
+            "backend": "sqlite",
+            "worker_id": self.worker_id,
+            "address": f"{self.host}:{self.port}",
+            "peers": sorted(self._addresses),
+            "remote_devices": len(self._owners),
+            "counters": dict(self._counters),
+        }
+
+
+def create_cluster_backend() -> ClusterBackend:
+    """Build the backend for this worker from settings."""
+    if settings.workers <= 1:
+        return LocalCluster()
+    return SqliteCluster(
+        settings.cluster_db_path, refresh_interval=settings.cluster_refresh_seconds
+    )
+
+
+_backend: ClusterBackend = LocalCluster()
+
+
+def get_cluster() -> ClusterBackend:
+    """Return the backend used by this worker."""
+    return _backend
+
+
+def set_cluster(backend: ClusterBackend) -> None:
+    """Install the backend used by this worker (at startup)."""
+    global _backend
+    _backend = backend
+
+
+async def notify_skills_changed(
+    user_id: str, device_id: str, kind: str = "skills_changed"
+) -> None:
+    """Tell other workers a device changed.
+
+    Args:
+        user_id: Owner of the device.
+        device_id: Device that changed.
+        kind: ``skills_changed`` (skills registered or live again),
+            ``device_offline``, ``device_changed`` (registered or renamed)
+            or ``device_deleted``; see :func:`apply_event`.
+    """
+    await get_cluster().publish(
+        {"kind": kind, "user_id": user_id, "device_id": device_id}
+    )
@@ -35,6 +35,27 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     debug: bool = False
+    workers: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "Number of uvicorn worker processes. Only 1 is accepted for now: "
+            "skill routing works across workers, but artifacts, queued session "
+            "messages and cached session context are still per-process."
+        ),
+    )
+    cluster_db_path: Path = Field(
+        default_factory=lambda: HUB_ROOT / "cluster.db",
+        description="SQLite file holding the device directory shared by workers.",
+    )
+    cluster_refresh_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description=(
+            "How often each worker heartbeats and reloads the device directory. "
+            "A worker silent for five intervals is treated as gone."
+        ),
+    )
 
     # Security
     secret_key: str = Field(
@@ -56,6 +77,99 @@ class Settings(BaseSettings):
 
     # Skill Registry
     skill_expiry_seconds: int = 1800  # 30 minutes without heartbeat
+    presence_sweep_interval_seconds: int = 60  # How often stale devices expire
+    presence_write_interval_seconds: int = 30  # Min gap between ping writes
+
+    # Device-agnostic skill routing
+    skill_hedging_enabled: bool = Field(
+        default=False,
+        description=(
+            "Send a duplicate request for a device-agnostic skill to a second "
+            "device when the first is slower than its p95, and use whichever "
+            "answer arrives first. Only enable when such skills are idempotent."
+        ),
+    )
+    skill_hedge_delay_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="Hedge delay used until a device has enough latency samples.",
+    )
+    skill_cache_max_entries: int = Field(
+        default=1024,
+        ge=0,
+        description=(
+            "Capacity of the LRU result cache for skill methods registered "
+            "with cache_ttl_seconds. 0 disables caching."
+        ),
+    )
+
+    session_context_max_entries: int = Field(
+        default=256,
+        ge=0,
+        description=(
+            "Number of recent session histories kept in memory for incremental "
+            "chat requests (context_version). 0 reads every history from the DB."
+        ),
+    )
+    session_write_delay_seconds: float = Field(
+        default=0.005,
+        ge=0,
+        description=(
+            "How long persisted chat messages are queued so that concurrent "
+            "writes share one transaction. Session reads flush the queue "
+            "first. 0 commits every message on its own."
+        ),
+    )
+    session_write_max_batch: int = Field(
+        default=256,
+        ge=1,
+        description="Queued messages that trigger a write before the delay ends.",
+    )
+
+    # WebSocket wire protocol
+    ws_compress_threshold_bytes: int = Field(
+        default=1024,
+        ge=0,
+        description=(
+            "Protocol v2 frames whose msgpack payload is larger than this are "
+            "zlib-compressed (when that makes them smaller). 0 disables."
+        ),
+    )
+    skill_result_max_bytes: int = Field(
+        default=8 * 1024 * 1024,
+        ge=1024,
+        description=(
+            "Largest skill result a device may stream in skill_response_chunk "
+            "frames. Longer results are aborted and the device told to stop."
+        ),
+    )
+
+    # Metrics
+    metrics_enabled: bool = Field(
+        default=True,
+        description=(
+            "Record hot-path latency histograms and counters and serve them "
+            "at /metrics (Prometheus text format)."
+        ),
+    )
+
+    # Tracing
+    tracing_enabled: bool = Field(
+        default=True,
+        description=(
+            "Record a trace (LLM calls, tools, skill requests with device "
+            "timings) for every chat request; viewable at /api/traces."
+        ),
+    )
+    trace_buffer_size: int = Field(
+        default=200,
+        ge=0,
+        description="Number of finished traces kept in memory.",
+    )
+    trace_export_path: Optional[Path] = Field(
+        default=None,
+        description="If set, finished traces are appended here as JSON Lines.",
+    )
 
     # Logging
     log_dir: Path = Field(
@@ -95,6 +209,65 @@ class Settings(BaseSettings):
             "Higher values allow multi-step tool use but may increase latency."
         ),
     )
+    agent_max_parallel_tools: int = Field(
+        default=4,
+        ge=1,
+        le=32,
+        description=(
+            "Maximum number of tool calls from one model step that run "
+            "concurrently. Set to 1 to run tool calls one after another."
+        ),
+    )
+    tool_result_max_chars: int = Field(
+        default=4000,
+        ge=0,
+        description=(
+            "Tool results longer than this are stored as session artifacts; the "
+            "model gets a preview and reads the rest with read_artifact(). "
+            "0 sends every result in full."
+        ),
+    )
+    agent_context_token_budget: int = Field(
+        default=16000,
+        ge=0,
+        description=(
+            "Estimated prompt tokens (system prompt plus messages) allowed per "
+            "agent-loop model call. Older tool output is summarized, then the "
+            "oldest messages are dropped, to stay under it. 0 disables."
+        ),
+    )
+    agent_context_keep_recent: int = Field(
+        default=6,
+        ge=1,
+        description="Newest messages the agent loop always sends verbatim.",
+    )
+    python_exec_max_workers: int = Field(
+        default=8,
+        ge=1,
+        le=256,
+        description=(
+            "Threads dedicated to python_exec code. Each run holds a thread "
+            "while it waits on skill calls, so this bounds concurrent runs."
+        ),
+    )
+
+    @field_validator("workers")
+    @classmethod
+    def single_worker_only(cls, value: int) -> int:
+        """Refuse several workers until all per-request state is shared.
+
+        Args:
+            value: The configured worker count.
+
+        Returns:
+            The worker count (always 1).
+        """
+        if value > 1:
+            raise ValueError(
+                "workers > 1 is not supported yet: the artifact store, session "
+                "message writer and session context cache are per-process"
+            )
+        return value
 
     @field_validator("database_url", mode="before")
     @classmethod
@@ -115,16 +288,16 @@ class Settings(BaseSettings):
             return f"{sqlite_prefix}{database_path.as_posix()}"
         return value
 
-    @field_validator("log_dir", mode="before")
+    @field_validator("log_dir", "cluster_db_path", mode="before")
     @classmethod
     def normalize_log_dir(cls, value: Union[str, Path]) -> Path:
-        """Normalize log directory paths relative to the hub root.
+        """Normalize log directory and cluster file paths to the hub root.
 
         Args:
-            value: The configured log directory.
+            value: The configured path.
 
         Returns:
-            An absolute path for the log directory.
+            An absolute path.
         """
         path = value if isinstance(value, Path) else Path(value)
         if not path.is_absolute():
@@ -0,0 +1,241 @@
+"""Token budget for the prompt the agent loop sends each iteration.
+
+Every agent-loop iteration appends the model's reply and a ``[Tool
+Results]`` message, and the whole list goes to TensorZero on the next
+iteration (and, with session context, on later turns). ``fit`` bounds
+that prompt:
+
+1. Tokens are estimated per message (about four characters per token).
+2. The newest ``agent_context_keep_recent`` messages are always kept
+   verbatim.
+3. Once the estimate exceeds ``agent_context_token_budget``, older tool
+   output is collapsed, oldest first, into a short deterministic summary
+   (its header and the start of its body).
+4. If that is not enough, the oldest messages outside the recent window
+   are replaced by a single note.
+
+Summaries are cached per session by content digest, so an old tool
+result is summarized once rather than on every iteration and turn. Per
+iteration prompt-token estimates and model-step latency are logged and
+counted (see ``get_stats``).
+
+Like the skill index, all methods run on the event loop, so no locking is
+needed.
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text and JSON.
+CHARS_PER_TOKEN = 4
+# Role markers and separators TensorZero adds around each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Body characters kept in a tool output summary.
+SUMMARY_BODY_CHARS = 300
+# Sessions whose summaries are kept.
+MAX_SUMMARY_SESSIONS = 256
+
+TOOL_OUTPUT_PREFIX = "[Tool Result"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of ``text``."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the tokens a normalized message costs in the prompt."""
+    return estimate_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_tool_output(content: str) -> str:
+    """Collapse a tool output message to its header and the start of its body."""
+    header, _, body = content.partition("\n")
+    body = body.strip()
+    if len(body) <= SUMMARY_BODY_CHARS:
+        return content
+    omitted = len(body) - SUMMARY_BODY_CHARS
+    return (
+        f"{header} (summarized)\n{body[:SUMMARY_BODY_CHARS].rstrip()}\n"
+        f"[... {omitted} chars of older tool output omitted]"
+    )
+
+
+@dataclass
+class ContextStats:
+    """Prompt size and model-step counters (times in seconds)."""
+
+    iterations: int = 0
+    compactions: int = 0
+    tokens_before_total: int = 0
+    tokens_after_total: int = 0
+    tokens_after_max: int = 0
+    summaries_computed: int = 0
+    summary_cache_hits: int = 0
+    messages_dropped: int = 0
+    steps: int = 0
+    step_time_total: float = 0.0
+    step_time_max: float = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters plus mean prompt tokens and step time."""
+        data = asdict(self)
+        iterations = max(1, self.iterations)
+        data["tokens_before_mean"] = self.tokens_before_total / iterations
+        data["tokens_after_mean"] = self.tokens_after_total / iterations
+        data["step_time_mean"] = self.step_time_total / max(1, self.steps)
+        return data
+
+
+class ContextCompactor:
+    """Fits agent-loop messages into the configured token budget."""
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        keep_recent: Optional[int] = None,
+    ) -> None:
+        self._token_budget = token_budget
+        self._keep_recent = keep_recent
+        # session_id -> {content digest -> summary}
+        self._summaries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self.stats = ContextStats()
+
+    @property
+    def token_budget(self) -> int:
+        """Prompt budget in estimated tokens (0 disables compaction)."""
+        if self._token_budget is not None:
+            return self._token_budget
+        return settings.agent_context_token_budget
+
+    @property
+    def keep_recent(self) -> int:
+        """Number of newest messages always sent verbatim."""
+        if self._keep_recent is not None:
+            return self._keep_recent
+        return settings.agent_context_keep_recent
+
+    def fit(
+        self,
+        messages: List[Dict[str, Any]],
+        system: str = "",
+        session_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the messages to send, compacted to fit the budget.
+
+        ``messages`` is not modified. The system prompt counts against the
+        budget.
+
+        Args:
+            messages: Normalized (role/content) messages, oldest first.
+            system: System prompt sent with the messages.
+            session_id: Session whose summary cache to use, if any.
+        """
+        costs = [estimate_message_tokens(m) for m in messages]
+        system_tokens = estimate_tokens(system) if system else 0
+        before = system_tokens + sum(costs)
+        total = before
+        fitted = list(messages)
+        cutoff = max(0, len(fitted) - self.keep_recent)
+        budget = self.token_budget
+
+        if budget > 0 and total > budget:
+            summaries = self._session_summaries(session_id)
+            for i in range(cutoff):
+                if total <= budget:
+                    break
+                content = str(fitted[i].get("content") or "")
+                if not content.startswith(TOOL_OUTPUT_PREFIX):
+                    continue
+                summary = self._summary(content, summaries)
+                if summary == content:
+                    continue
+                fitted[i] = {**fitted[i], "content": summary}
+                new_cost = estimate_message_tokens(fitted[i])
+                total += new_cost - costs[i]
+                costs[i] = new_cost
+
+            dropped = 0
+            while total > budget and dropped < cutoff:
+                total -= costs[dropped]
+                dropped += 1
+            if dropped:
+                note = {
+                    "role": "user",
+                    "content": (
+                        f"[{dropped} earlier messages omitted to fit the context]"
+                    ),
+                }
+                fitted = [note] + fitted[dropped:]
+                total += estimate_message_tokens(note)
+                self.stats.messages_dropped += dropped
+            self.stats.compactions += 1
+
+        self.stats.iterations += 1
+        self.stats.tokens_before_total += before
+        self.stats.tokens_after_total += total
+        self.stats.tokens_after_max = max(self.stats.tokens_after_max, total)
+        logger.log(
+            logging.INFO if total != before else logging.DEBUG,
+            "[Agent Loop] Prompt ~%d tokens (~%d before compaction, budget %d)",
+            total,
+            before,
+            budget,
+        )
+        return fitted
+
+    def record_step(self, seconds: float) -> None:
+        """Record the latency of one model step."""
+        self.stats.steps += 1
+        self.stats.step_time_total += seconds
+        self.stats.step_time_max = max(self.stats.step_time_max, seconds)
+
+    def _session_summaries(self, session_id: Optional[str]) -> Dict[str, str]:
+        if session_id is None:
+            return {}
+        summaries = self._summaries.get(session_id)
+        if summaries is None:
+            summaries = self._summaries[session_id] = {}
+            while len(self._summaries) > MAX_SUMMARY_SESSIONS:
+                self._summaries.popitem(last=False)
+        self._summaries.move_to_end(session_id)
+        return summaries
+
+    def _summary(self, content: str, summaries: Dict[str, str]) -> str:
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        summary = summaries.get(digest)
+        if summary is not None:
+            self.stats.summary_cache_hits += 1
+            return summary
+        summary = summarize_tool_output(content)
+        summaries[digest] = summary
+        self.stats.summaries_computed += 1
+        return summary
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session's cached summaries."""
+        self._summaries.pop(session_id, None)
+
+    def clear(self) -> None:
+        """Drop all summaries and counters (used by tests)."""
+        self._summaries.clear()
+        self.stats = ContextStats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return a snapshot of prompt size and latency metrics."""
+        data = self.stats.snapshot()
+        data["token_budget"] = self.token_budget
+        data["keep_recent"] = self.keep_recent
+        data["sessions"] = len(self._summaries)
+        return data
+
+
+# Global context compactor instance
+context_compactor = ContextCompactor()
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from .config import settings
+from .metrics import instrument_engine
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,11 @@ class Device(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     last_seen: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
+    # Hash of the last fully applied skill manifest (delta registration).
+    skill_manifest_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True
+    )
+
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -45,6 +51,31 @@ class Device(Base):
     skills: Mapped[list["Skill"]] = relationship(
         back_populates="device", cascade="all, delete-orphan"
     )
+    presence: Mapped[Optional["DevicePresence"]] = relationship(
+        back_populates="device", cascade="all, delete-orphan"
+    )
+
+
+class DevicePresence(Base):
+    """Liveness record for a device's registered skills.
+
+    One row per live device, refreshed by skill heartbeats and WebSocket
+    pings. Skill queries join on this table; the presence sweeper deletes
+    rows that stop being refreshed.
+    """
+
+    __tablename__ = "device_presence"
+
+    device_id: Mapped[str] = mapped_column(ForeignKey("devices.id"), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(64), index=True)
+    last_heartbeat: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        index=True,
+    )
+
+    # Relationships
+    device: Mapped["Device"] = relationship(back_populates="presence")
 
 
 class Skill(Base):
@@ -62,8 +93,13 @@ class Skill(Base):
     docstring: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     # True when the hub may route to any connected device that has this skill.
     device_agnostic: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Seconds the hub may serve repeat calls from its result cache (0 = never).
+    cache_ttl_seconds: Mapped[int] = mapped_column(default=0)
+    # sha256 of the canonical method descriptor (see routers/skills.py).
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
 
-    # Status
+    # Time the row was registered. Liveness is tracked per device in
+    # DevicePresence, so this is no longer refreshed by heartbeats.
     last_heartbeat: Mapped[datetime] = mapped_column(
         DateTime,
         default=lambda: datetime.now(timezone.utc),
@@ -169,6 +205,7 @@ def get_engine():
     global _engine
     if _engine is None:
         _engine = create_async_engine(settings.database_url, echo=settings.debug)
+        instrument_engine(_engine.sync_engine)
     return _engine
 
 
@@ -226,6 +263,27 @@ async def init_db():
                         "ADD COLUMN device_agnostic BOOLEAN NOT NULL DEFAULT 0"
                     )
                 )
+
+            if "cache_ttl_seconds" not in skill_cols:
+                await conn.execute(
+                    text(
+                        "ALTER TABLE skills "
+                        "ADD COLUMN cache_ttl_seconds INTEGER NOT NULL DEFAULT 0"
+                    )
+                )
+
+            # Content-hash delta registration columns.
+            if "content_hash" not in skill_cols:
+                await conn.execute(
+                    text("ALTER TABLE skills ADD COLUMN content_hash VARCHAR(64)")
+                )
+
+            result = await conn.execute(text("PRAGMA table_info(devices)"))
+            device_cols = {row[1] for row in result.fetchall()}
+            if "skill_manifest_hash" not in device_cols:
+                await conn.execute(
+                    text("ALTER TABLE devices ADD COLUMN skill_manifest_hash VARCHAR(64)")
+                )
         except Exception:
             logger.exception("SQLite schema migration check failed")
             raise
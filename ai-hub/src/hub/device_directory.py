@@ -0,0 +1,155 @@
+"""Per-user device directory shared by all requests.
+
+Every chat request builds a fresh ``DevicesProxy``, and resolving
+``devices.<name>`` used to re-query the user's ``Device`` rows each time.
+This module keeps, per user:
+
+- an immutable snapshot of the user's devices, keyed by normalized name
+  and by ID
+- the devices offering each device-agnostic skill, most recent heartbeat
+  first
+
+Like the skill index, this is a cache rather than the source of truth. A
+user is loaded from the DB on first use. Device registration or deletion
+drops the user, and anything that changes which skills are live (skill
+registration, WebSocket connect/disconnect, presence expiry) drops only
+the candidate lists. Connected status is not copied here:
+``ConnectionManager.is_connected`` is already an in-memory lookup (and
+covers other workers).
+
+All methods run on the event loop, so no locking is needed.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from .database import Device
+from .utils import normalize_device_name
+
+logger = logging.getLogger(__name__)
+
+# Runs a statement on the caller's session (e.g. ``DevicesProxy._execute``).
+Execute = Callable[[Any], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class DirectoryDevice:
+    """The fields of a ``Device`` row needed to route skill calls."""
+
+    id: str
+    name: str
+    key: str
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, device: Device) -> "DirectoryDevice":
+        return cls(
+            id=device.id,
+            name=device.name,
+            key=normalize_device_name(device.name),
+            is_active=bool(device.is_active),
+        )
+
+
+@dataclass
+class UserDevices:
+    """Snapshot of one user's devices."""
+
+    by_id: Dict[str, DirectoryDevice]
+    # Normalized name -> device; an active device wins a name clash.
+    by_key: Dict[str, DirectoryDevice]
+    # Active devices only, keyed by normalized name (the ``devices.<key>``s).
+    active: Dict[str, DirectoryDevice]
+    # (skill, method) -> device IDs offering it as device-agnostic
+    candidates: Dict[Tuple[str, str], List[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Device]) -> "UserDevices":
+        devices = sorted(
+            (DirectoryDevice.from_row(d) for d in rows), key=lambda d: d.is_active
+        )
+        return cls(
+            by_id={d.id: d for d in devices},
+            by_key={d.key: d for d in devices},
+            active={d.key: d for d in devices if d.is_active},
+        )
+
+    def find(self, device_name: str) -> Optional[DirectoryDevice]:
+        """Resolve a device by (unnormalized) name, active or not."""
+        return self.by_key.get(normalize_device_name(device_name))
+
+
+@dataclass
+class DirectoryStats:
+    """Device directory counters."""
+
+    hits: int = 0
+    loads: int = 0
+    invalidations: int = 0
+
+
+class DeviceDirectory:
+    """Process-wide cache of each user's devices."""
+
+    def __init__(self) -> None:
+        self._users: Dict[str, UserDevices] = {}
+        # Bumped on invalidation so a load that raced it is not cached.
+        self._generations: Dict[str, int] = {}
+        self.stats = DirectoryStats()
+
+    async def get(self, user_id: str, execute: Execute) -> UserDevices:
+        """Return the user's devices, loading them on first use.
+
+        Args:
+            user_id: Owner of the devices.
+            execute: Runs a statement on the caller's DB session.
+        """
+        entry = self._users.get(user_id)
+        if entry is not None:
+            self.stats.hits += 1
+            return entry
+
+        generation = self._generations.get(user_id, 0)
+        result = await execute(select(Device).where(Device.user_id == user_id))
+        entry = UserDevices.from_rows(result.scalars().all())
+        self.stats.loads += 1
+        if self._generations.get(user_id, 0) == generation:
+            self._users[user_id] = entry
+        return entry
+
+    def generation(self, user_id: str) -> int:
+        """Device-set generation; changes whenever the user's devices may have."""
+        return self._generations.get(user_id, 0)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's devices after one was registered, changed or deleted."""
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        if self._users.pop(user_id, None) is not None:
+            self.stats.invalidations += 1
+            logger.debug("Device directory dropped user %s", user_id)
+
+    def invalidate_candidates(self, user_id: str) -> None:
+        """Drop a user's device-agnostic candidates after live skills changed."""
+        entry = self._users.get(user_id)
+        if entry is not None:
+            # A lookup in flight still holds (and fills) the old dict.
+            entry.candidates = {}
+
+    def clear(self) -> None:
+        """Drop all users and counters (used by tests)."""
+        self._users.clear()
+        self._generations.clear()
+        self.stats = DirectoryStats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters and the number of cached users."""
+        data = asdict(self.stats)
+        data["users"] = len(self._users)
+        return data
+
+
+# Global device directory instance
+device_directory = DeviceDirectory()
@@ -1,5 +1,6 @@
 """Main FastAPI application for Strawberry AI Hub."""
 
+import asyncio
 import logging
 import os
 import sys
@@ -10,10 +11,16 @@ import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
+from .asteval_executor import python_executor
+from .cluster import create_cluster_backend, get_cluster, set_cluster
 from .config import HUB_ROOT, settings
 from .database import dispose_engine, init_db
 from .logging_config import configure_logging
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import MetricsMiddleware, metrics
+from .presence import presence
 from .protocol import ProtocolVersionMiddleware
 from .routers import (
     admin_router,
@@ -26,6 +33,7 @@ from .routers import (
     websocket_router,
 )
 from .routers.websocket import connection_manager
+from .session_writer import session_writer
 from .tensorzero_gateway import get_gateway, shutdown_gateway
 
 logger = logging.getLogger(__name__)
@@ -55,6 +63,10 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("Initializing TensorZero gateway...")
         await get_gateway()
+        cluster = create_cluster_backend()
+        await cluster.start(connection_manager.serve_remote_request)
+        set_cluster(cluster)
+        presence.start(connection_manager.get_connected_devices)
         logger.info("Hub ready!")
 
     yield
@@ -63,6 +75,9 @@ async def lifespan(app: FastAPI):
     if "pytest" not in sys.modules:
         logger.info("Shutting down...")
 
+    await presence.stop()
+    python_executor.shutdown()
+
     # Shutdown TensorZero gateway
     try:
         await shutdown_gateway()
@@ -76,6 +91,18 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.exception("Error while shutting down WebSocket connection manager")
 
+    # Leave the worker cluster so peers stop routing to this process
+    try:
+        await get_cluster().stop()
+    except Exception:
+        logger.exception("Error while leaving the worker cluster")
+
+    # Write chat messages still queued for batching
+    try:
+        await session_writer.close()
+    except Exception:
+        logger.exception("Error while writing queued session messages")
+
     # Dispose database engine
     try:
         await dispose_engine()
@@ -107,6 +134,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so database time is attributed to the route being served
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(chat_router)
@@ -148,6 +178,14 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Hot-path metrics in Prometheus text format (see hub.metrics)."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404)
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Serve SPA - catch all other routes
 # Must be defined LAST locally to avoid shadowing other routes
 if os.path.exists(frontend_dir):
@@ -163,16 +201,28 @@ if os.path.exists(frontend_dir):
         return FileResponse(os.path.join(frontend_dir, "index.html"))
 
 
+async def _prepare_database() -> None:
+    """Create tables once before workers start, so they do not race."""
+    await init_db()
+    await dispose_engine()
+
+
 def main():
     """Run the server."""
     print(f"Starting Strawberry AI Hub on {settings.host}:{settings.port}")
     reload_dirs = [str(HUB_ROOT)] if settings.debug else None
+    workers = None
+    if settings.workers > 1 and not settings.debug:
+        workers = settings.workers
+        print(f"Running {workers} workers")
+        asyncio.run(_prepare_database())
     uvicorn.run(
         "hub.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
         reload_dirs=reload_dirs,
+        workers=workers,
     )
 
 
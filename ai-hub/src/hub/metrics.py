@@ -0,0 +1,326 @@
+"""Prometheus-style metrics for the Hub's hot paths.
+
+Counters and histograms live in process memory and are rendered in the
+Prometheus text exposition format (0.0.4) by ``GET /metrics``, so no
+client library or collector is needed. Every worker reports its own
+numbers; with several workers, scrape each one.
+
+Recording checks ``metrics_enabled`` first, so with metrics disabled a
+hook costs one attribute lookup. The endpoint then answers 404.
+
+Database statements are timed through SQLAlchemy cursor events and
+labelled with the route template of the request that ran them
+(``background`` outside a request). python_exec threads record
+observations too, so every metric guards its series with a lock.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached lookup up to a slow LLM call or skill timeout.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    """A named metric with one series per combination of label values."""
+
+    kind = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drop every series."""
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterator[str]:
+        """Yield exposition-format lines for this metric."""
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            series = sorted(self._series.items(), key=lambda item: str(item[0]))
+        for labels, value in series:
+            yield from self._render_series(labels, value)
+
+    def _render_series(self, labels: LabelValues, value: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. timeouts or cache hits."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add ``amount`` to the series for ``labels``."""
+        if not settings.metrics_enabled:
+            return
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current count for ``labels`` (0 if never incremented)."""
+        with self._lock:
+            return self._series.get(labels, 0.0)
+
+    def _render_series(self, labels: LabelValues, value: float) -> Iterator[str]:
+        labels_text = _format_labels(self.labelnames, labels)
+        yield f"{self.name}{labels_text} {_format_value(value)}"
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int) -> None:
+        # Per-bucket (not cumulative) counts; the last slot is +Inf.
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """Context manager that observes the elapsed time into a histogram."""
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: LabelValues) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies, iteration counts)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one value in the series for ``labels``."""
+        if not settings.metrics_enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+
+    def time(self, *labels: str) -> _Timer:
+        """Time a ``with`` block into the series for ``labels``."""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for ``labels``."""
+        with self._lock:
+            series = self._series.get(labels)
+            return series.count if series else 0
+
+    def _render_series(
+        self, labels: LabelValues, series: _HistogramSeries
+    ) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+            cumulative += count
+            le = _format_labels(names, labels + (_format_value(bound),))
+            yield f"{self.name}_bucket{le} {cumulative}"
+        plain = _format_labels(self.labelnames, labels)
+        yield f"{self.name}_sum{plain} {_format_value(series.total)}"
+        yield f"{self.name}_count{plain} {series.count}"
+
+
+class MetricsRegistry:
+    """Named metrics rendered together by the /metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric (used by tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+inference_seconds = metrics.histogram(
+    "hub_inference_seconds",
+    "TensorZero inference latency, to the end of the stream when streaming.",
+    ("function", "variant"),
+)
+agent_loop_iterations = metrics.histogram(
+    "hub_agent_loop_iterations",
+    "Model steps taken by one agent-loop request.",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+tool_seconds = metrics.histogram(
+    "hub_tool_seconds",
+    "Tool call execution time, including skill calls made by python_exec.",
+    ("tool",),
+)
+skill_roundtrip_seconds = metrics.histogram(
+    "hub_skill_roundtrip_seconds",
+    "WebSocket skill request round trip to a device.",
+    ("device",),
+)
+db_query_seconds = metrics.histogram(
+    "hub_db_query_seconds",
+    "Database statement execution time by request route.",
+    ("route",),
+    DB_BUCKETS,
+)
+python_exec_queue_wait_seconds = metrics.histogram(
+    "hub_python_exec_queue_wait_seconds",
+    "Time python_exec code waits for a free execution thread.",
+)
+timeouts_total = metrics.counter(
+    "hub_timeouts_total",
+    "Operations abandoned because they ran out of time.",
+    ("kind",),
+)
+fallbacks_total = metrics.counter(
+    "hub_fallbacks_total",
+    "Times a slower or alternative path was used after the first one failed.",
+    ("kind",),
+)
+cache_lookups_total = metrics.counter(
+    "hub_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+
+
+# ASGI scope of the request being served, for labelling database time.
+_request_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "hub_metrics_request_scope", default=None
+)
+
+
+def current_route() -> str:
+    """Route template of the request in progress (``background`` if none)."""
+    scope = _request_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that makes the current request visible to metrics."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] not in ("http", "websocket") or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+# The start time lives on the execution context, which is discarded when a
+# statement fails, so a failed query leaves nothing behind.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if settings.metrics_enabled and context is not None:
+        context._hub_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_hub_query_start", None)
+    if start is not None:
+        db_query_seconds.observe(time.perf_counter() - start, current_route())
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on ``engine`` (the sync engine of an async one)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,225 @@
+"""Device-level presence for registered skills.
+
+A device's skills are visible while it has a ``DevicePresence`` row.
+Heartbeats and WebSocket pings refresh that single row (O(1) writes no
+matter how many skills the device registered), and a background sweeper
+deletes rows that have not been refreshed within ``skill_expiry_seconds``.
+A device whose WebSocket closes loses its row (and index entries) at once.
+Skill queries join on presence instead of filtering timestamps per row.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import Device, DevicePresence, get_session_factory
+from .device_directory import device_directory
+from .skill_index import skill_index
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """Writes device presence and expires stale devices in the background."""
+
+    def __init__(self) -> None:
+        # Last presence write per device, used to coalesce frequent pings.
+        self._last_write: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def touch(
+        self,
+        db: AsyncSession,
+        device: Device,
+        now: Optional[datetime] = None,
+        min_interval: float = 0.0,
+    ) -> bool:
+        """Mark a device as live. The caller commits.
+
+        ``db`` must be a request-scoped session: a long-lived one can hand
+        back a presence row cached before the sweeper deleted or another
+        request rewrote it. Long-lived connections use :meth:`heartbeat`.
+
+        Args:
+            db: Session to write through.
+            device: Device that showed signs of life.
+            now: Timestamp to record (defaults to now).
+            min_interval: Skip the write when the previous one is more
+                recent than this many seconds (used for pings).
+
+        Returns:
+            True if a row was written.
+        """
+        now = now or datetime.now(timezone.utc)
+        if not self._due(device.id, now, min_interval):
+            return False
+
+        row = await db.get(DevicePresence, device.id)
+        if row is None:
+            db.add(
+                DevicePresence(
+                    device_id=device.id,
+                    user_id=device.user_id,
+                    last_heartbeat=now,
+                )
+            )
+        else:
+            row.last_heartbeat = now
+        self._last_write[device.id] = now
+        return True
+
+    async def heartbeat(
+        self,
+        device: Device,
+        now: Optional[datetime] = None,
+        min_interval: float = 0.0,
+    ) -> bool:
+        """Mark a device as live in a session of its own, and commit.
+
+        Used by the WebSocket endpoint, whose session lives as long as the
+        connection and so cannot be trusted to hold a fresh presence row.
+
+        Args:
+            device: Device that showed signs of life.
+            now: Timestamp to record (defaults to now).
+            min_interval: As for :meth:`touch`.
+
+        Returns:
+            True if a row was written.
+        """
+        now = now or datetime.now(timezone.utc)
+        if not self._due(device.id, now, min_interval):
+            return False
+
+        factory = get_session_factory()
+        async with factory() as db:
+            await self.touch(db, device, now)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another connection of the device inserted the row first.
+                await db.rollback()
+                await self.touch(db, device, now)
+                await db.commit()
+        return True
+
+    def _due(self, device_id: str, now: datetime, min_interval: float) -> bool:
+        """Whether enough time has passed since the device's last write."""
+        previous = self._last_write.get(device_id)
+        return previous is None or (now - previous).total_seconds() >= min_interval
+
+    async def sweep(
+        self,
+        connected_device_ids: Iterable[str] = (),
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """Expire devices that stopped heartbeating.
+
+        Devices with an open WebSocket are never expired.
+
+        Args:
+            connected_device_ids: Devices currently connected via WebSocket.
+            now: Reference time (defaults to now).
+
+        Returns:
+            IDs of expired devices.
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=settings.skill_expiry_seconds)
+        connected = set(connected_device_ids)
+
+        factory = get_session_factory()
+        async with factory() as db:
+            result = await db.execute(
+                select(DevicePresence.device_id, DevicePresence.user_id).where(
+                    DevicePresence.last_heartbeat < cutoff
+                )
+            )
+            stale = [(d, u) for d, u in result.all() if d not in connected]
+            if not stale:
+                return []
+            await db.execute(
+                delete(DevicePresence).where(
+                    DevicePresence.device_id.in_([d for d, _ in stale])
+                )
+            )
+            await db.commit()
+
+        for device_id, user_id in stale:
+            self._last_write.pop(device_id, None)
+            skill_index.remove_device(user_id, device_id)
+            device_directory.invalidate_candidates(user_id)
+        logger.info("Presence sweep expired %d device(s)", len(stale))
+        return [d for d, _ in stale]
+
+    async def drop(self, db: AsyncSession, device: Device) -> None:
+        """Take a device offline now (its WebSocket closed). The caller commits.
+
+        Skill rows are kept, so a reconnect with an unchanged manifest
+        needs a single ``/skills/sync`` round trip.
+        """
+        await db.execute(
+            delete(DevicePresence).where(DevicePresence.device_id == device.id)
+        )
+        self._last_write.pop(device.id, None)
+        skill_index.remove_device(device.user_id, device.id)
+        device_directory.invalidate_candidates(device.user_id)
+
+    def last_heartbeat(self, device_id: str) -> Optional[datetime]:
+        """Time of this process's last presence write for a device, if any."""
+        return self._last_write.get(device_id)
+
+    def forget(self, device_id: str) -> None:
+        """Drop cached state for a deleted device."""
+        self._last_write.pop(device_id, None)
+
+    def clear(self) -> None:
+        """Drop all cached state (used by tests)."""
+        self._last_write.clear()
+
+    def start(self, connected_device_ids: Callable[[], Iterable[str]]) -> None:
+        """Start the background sweeper.
+
+        Args:
+            connected_device_ids: Returns the currently connected devices.
+        """
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._sweep_loop(connected_device_ids))
+        logger.info(
+            "Started presence sweeper (interval: %ss)",
+            settings.presence_sweep_interval_seconds,
+        )
+
+    async def stop(self) -> None:
+        """Stop the background sweeper."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _sweep_loop(
+        self,
+        connected_device_ids: Callable[[], Iterable[str]],
+    ) -> None:
+        """Run :meth:`sweep` periodically until cancelled."""
+        while True:
+            await asyncio.sleep(settings.presence_sweep_interval_seconds)
+            try:
+                await self.sweep(connected_device_ids())
+            except Exception:
+                logger.exception("Presence sweep failed")
+
+
+# Global presence tracker instance
+presence = PresenceTracker()
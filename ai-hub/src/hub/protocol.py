@@ -16,8 +16,9 @@ from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoin
 logger = logging.getLogger(__name__)
 
 # Versions the Hub currently accepts. Add new entries here when the
-# wire schema evolves (e.g. {"v1", "v2"}).
-SUPPORTED_VERSIONS = frozenset({"v1"})
+# wire schema evolves. HTTP payloads are the same in v1 and v2; v2 only
+# changes WebSocket framing (see hub.wire).
+SUPPORTED_VERSIONS = frozenset({"v1", "v2"})
 
 # Header name sent by Spoke clients.
 PROTOCOL_VERSION_HEADER = "X-Protocol-Version"
@@ -0,0 +1,158 @@
+"""LRU + TTL cache for results of cacheable skill methods.
+
+Skills declare read-only methods as cacheable at registration
+(``cache_ttl_seconds`` on the method descriptor). Repeat calls with the
+same arguments are then answered by the Hub without a WebSocket round
+trip until the TTL runs out.
+
+Entries are keyed by (user, target, skill, method, normalized arguments),
+where the target is the device ID, or the device-agnostic key for calls
+any device may serve. Only successful results are cached.
+
+Like the skill index, all methods are synchronous and called from the
+event loop, so no locking is needed.
+"""
+
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# (user_id, target, skill_name, method_name, normalized args)
+CacheKey = Tuple[str, str, str, str, str]
+
+
+@dataclass
+class CacheStats:
+    """Result cache counters."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+def make_key(
+    user_id: str,
+    target: str,
+    skill_name: str,
+    method_name: str,
+    args: List[Any],
+    kwargs: Dict[str, Any],
+) -> CacheKey:
+    """Build a cache key; arguments are normalized to canonical JSON."""
+    normalized = json.dumps(
+        {"args": list(args), "kwargs": kwargs},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return (user_id, target, skill_name, method_name, normalized)
+
+
+class SkillResultCache:
+    """Bounded LRU cache whose entries expire after their own TTL."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self.stats = CacheStats()
+
+    @property
+    def max_entries(self) -> int:
+        """Capacity (0 disables the cache)."""
+        if self._max_entries is not None:
+            return self._max_entries
+        return settings.skill_cache_max_entries
+
+    def get(self, key: CacheKey, now: Optional[float] = None) -> Tuple[bool, Any]:
+        """Look up a result.
+
+        Returns:
+            ``(True, result)`` on a hit, ``(False, None)`` on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > (now if now is not None else time.monotonic()):
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                # Callers may mutate what they get back.
+                return True, copy.deepcopy(value)
+            del self._entries[key]
+            self.stats.expirations += 1
+        self.stats.misses += 1
+        return False, None
+
+    def put(
+        self,
+        key: CacheKey,
+        value: Any,
+        ttl_seconds: float,
+        now: Optional[float] = None,
+    ) -> None:
+        """Store a result for ``ttl_seconds``, evicting the LRU entry if full."""
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        now = now if now is not None else time.monotonic()
+        self._entries[key] = (now + ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        self.stats.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(
+        self,
+        user_id: Optional[str] = None,
+        target: Optional[str] = None,
+        skill_name: Optional[str] = None,
+        method_name: Optional[str] = None,
+    ) -> int:
+        """Drop entries matching every given field (all entries if none).
+
+        Returns:
+            Number of entries removed.
+        """
+        pattern = (user_id, target, skill_name, method_name)
+        stale = [
+            key
+            for key in self._entries
+            if all(want is None or want == got for want, got in zip(pattern, key))
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.stats.invalidations += len(stale)
+            logger.debug("Invalidated %d cached skill results", len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries and counters (used by tests)."""
+        self._entries.clear()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters, size and hit ratio."""
+        data = asdict(self.stats)
+        lookups = self.stats.hits + self.stats.misses
+        data["hit_ratio"] = self.stats.hits / lookups if lookups else 0.0
+        data["entries"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        return data
+
+
+# Global result cache instance
+skill_result_cache = SkillResultCache()
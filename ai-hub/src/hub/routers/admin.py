@@ -10,14 +10,24 @@ from pydantic import BaseModel
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..artifacts import artifact_store
+from ..asteval_executor import python_executor
 from ..auth import (
     create_access_token,
     get_current_user,
     get_password_hash,
     verify_password,
 )
+from ..cluster import get_cluster
 from ..config import HUB_ROOT
+from ..context_budget import context_compactor
 from ..database import User, get_db
+from ..device_directory import device_directory
+from ..result_cache import skill_result_cache
+from ..session_context import session_context
+from ..session_writer import session_writer
+from ..skill_routing import skill_router
+from ..tracing import tracer
 
 router = APIRouter(prefix="/api", tags=["admin"])
 
@@ -220,6 +230,7 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+    device_directory.invalidate(user_id)
     return {"status": "deleted"}
 
 
@@ -272,3 +283,102 @@ async def update_tensorzero_config(
     _write_text_atomic(TENSORZERO_CONFIG_PATH, config.content)
 
     return {"status": "updated"}
+
+
+# --- Runtime Stats ---
+
+
+@router.get("/stats/python-exec")
+async def get_python_exec_stats(user: User = Depends(get_current_user)):
+    """Get python_exec executor metrics (queue wait, execution time, pool)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return python_executor.get_stats()
+
+
+@router.get("/stats/agent-context")
+async def get_agent_context_stats(user: User = Depends(get_current_user)):
+    """Get agent-loop prompt metrics (estimated tokens, compactions, step time)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return context_compactor.get_stats()
+
+
+@router.get("/stats/artifacts")
+async def get_artifact_stats(user: User = Depends(get_current_user)):
+    """Get tool-result artifact metrics (stored, reads, offloaded chars)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return artifact_store.get_stats()
+
+
+@router.get("/stats/routing")
+async def get_routing_stats(user: User = Depends(get_current_user)):
+    """Get device-agnostic routing metrics (decisions, hedges, latencies)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return skill_router.get_stats()
+
+
+@router.get("/stats/skill-cache")
+async def get_skill_cache_stats(user: User = Depends(get_current_user)):
+    """Get skill result cache metrics (hits, misses, evictions, size)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return skill_result_cache.get_stats()
+
+
+@router.get("/stats/session-context")
+async def get_session_context_stats(user: User = Depends(get_current_user)):
+    """Get session context cache metrics (hits, loads, evictions, size)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return session_context.get_stats()
+
+
+@router.get("/stats/session-writes")
+async def get_session_write_stats(user: User = Depends(get_current_user)):
+    """Get session message write-behind metrics (batches, queue length)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return session_writer.get_stats()
+
+
+@router.get("/stats/cluster")
+async def get_cluster_stats(user: User = Depends(get_current_user)):
+    """Get this worker's cluster metrics (peers, forwarded requests)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return get_cluster().get_stats()
+
+
+# --- Traces ---
+
+
+@router.get("/traces")
+async def list_traces(limit: int = 50, user: User = Depends(get_current_user)):
+    """List the most recent chat request traces, newest first."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    return {"traces": tracer.recent(limit), "stats": tracer.get_stats()}
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, user: User = Depends(get_current_user)):
+    """Get one trace with its spans (LLM calls, tools, skill requests)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
@@ -11,12 +11,12 @@ File Summary:
 - _call_tensorzero: Simple pass-through to LLM (no tool execution)
 """
 
+import asyncio
 import json
 import logging
 import re as _re
 import time
 import uuid
-from datetime import datetime, timezone
 from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -27,9 +27,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import get_current_device
 from ..config import settings
-from ..database import Device, Message, Session, get_db
+from ..context_budget import context_compactor
+from ..database import Device, Session, get_db
+from ..metrics import agent_loop_iterations, fallbacks_total, inference_seconds
+from ..session_context import session_context
+from ..session_writer import session_writer
 from ..tensorzero_gateway import inference as tz_inference
 from ..tensorzero_gateway import inference_stream as tz_inference_stream
+from ..tracing import Span, tracer
 from ..utils import normalize_device_name
 from .websocket import ConnectionManager, get_connection_manager
 
@@ -53,6 +58,10 @@ class ChatCompletionRequest(BaseModel):
     Attributes:
         enable_tools: If True, Hub runs agent loop and executes tools.
                      If False, Hub just passes through to LLM (Spoke handles tools).
+        context_version: Session message count the client last saw. When set
+                     (with session_id), ``messages`` holds only the turns added
+                     since then and the Hub supplies the earlier ones. A stale
+                     version is rejected with 409 so the client can resend.
     """
 
     model: str = "gpt-4o-mini"
@@ -62,6 +71,7 @@ class ChatCompletionRequest(BaseModel):
     stream: bool = False
     enable_tools: bool = False
     session_id: Optional[str] = None
+    context_version: Optional[int] = None
 
 
 class ChatChoice(BaseModel):
@@ -81,6 +91,8 @@ class ChatCompletionResponse(BaseModel):
     model: str
     choices: List[ChatChoice]
     usage: Optional[Dict[str, Any]] = None
+    # Session version after this turn (incremental requests only).
+    context_version: Optional[int] = None
 
 
 def _normalize_messages(
@@ -140,6 +152,7 @@ async def _get_session_for_user(
     Raises:
         HTTPException: If the session does not exist for the user.
     """
+    await session_writer.flush_for_read(session_id)
     result = await db.execute(
         select(Session).where(
             Session.id == session_id,
@@ -168,23 +181,53 @@ async def _append_session_message(
     role: str,
     content: str,
 ) -> None:
-    """Append a message to a session and update cached session metadata."""
-    now = datetime.now(timezone.utc)
-    message = Message(
-        session_id=session.id,
-        role=role,
-        content=content,
-        created_at=now,
-    )
-    db.add(message)
+    """Queue a message for a session and update cached session metadata.
+
+    The write is batched with other messages (see ``session_writer``);
+    ``session`` reflects it immediately.
+    """
+    await session_writer.append(session, role, content)
+    session_context.append(session.id, role, content, session.message_count)
+
+
+async def _expand_incremental_request(
+    db: AsyncSession,
+    session: Session,
+    request: ChatCompletionRequest,
+) -> ChatCompletionRequest:
+    """Rebuild the full conversation for an incremental request.
 
-    session.last_activity = now
-    session.message_count += 1
+    Persists the new (non-system) messages and returns a copy of the
+    request whose ``messages`` are the session history followed by them.
+    System messages are passed through for this turn but not persisted.
 
-    if session.title is None and role == "user":
-        session.title = content[:50] + ("..." if len(content) > 50 else "")
+    Raises:
+        HTTPException: 409 if ``context_version`` is not the session's
+            current version; the client should resend the full conversation.
+    """
+    if request.context_version != session.message_count:
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                "Session context version mismatch "
+                f"(client={request.context_version}, hub={session.message_count}); "
+                "resend the full conversation"
+            ),
+        )
 
-    await db.commit()
+    history = await session_context.load(session, db.execute)
+    system_messages = [m for m in request.messages if m.role == "system"]
+    new_messages = [
+        m for m in request.messages if m.role != "system" and m.content.strip()
+    ]
+    for message in new_messages:
+        await _append_session_message(db, session, message.role, message.content)
+
+    messages = system_messages + [
+        ChatMessage(role=role, content=content) for role, content in history
+    ]
+    messages.extend(new_messages)
+    return request.model_copy(update={"messages": messages})
 
 
 @router.post("/v1/chat/completions")
@@ -201,22 +244,42 @@ async def chat_completions(
 
     When enable_tools=True, Hub runs the agent loop and executes tools.
     When enable_tools=False (default), Hub just passes through to LLM.
+
+    With session_id and context_version set, ``messages`` holds only the new
+    turns and the conversation is rebuilt from the session (incremental mode).
     """
     logger.info(
-        "[Chat] Received request: enable_tools=%s stream=%s messages=%s",
+        "[Chat] Received request: enable_tools=%s stream=%s messages=%s"
+        " context_version=%s",
         request.enable_tools,
         request.stream,
         len(request.messages),
+        request.context_version,
     )
 
+    if request.context_version is not None and not request.session_id:
+        raise HTTPException(
+            status_code=400, detail="context_version requires session_id"
+        )
+
     session: Optional[Session] = None
     if request.session_id:
         session = await _get_session_for_user(db, request.session_id, device.user_id)
 
-        latest_user_message = _extract_latest_user_message(request.messages)
-        if latest_user_message:
-            await _append_session_message(db, session, "user", latest_user_message)
-
+        if request.context_version is not None:
+            request = await _expand_incremental_request(db, session, request)
+        else:
+            latest_user_message = _extract_latest_user_message(request.messages)
+            if latest_user_message:
+                await _append_session_message(db, session, "user", latest_user_message)
+
+    trace = tracer.start_trace(
+        "chat_completions",
+        device=device.id,
+        session=request.session_id,
+        stream=request.stream,
+        enable_tools=request.enable_tools,
+    )
     if request.stream:
         stream_iter = _stream_chat_completions(
             request=request,
@@ -224,20 +287,26 @@ async def chat_completions(
             db=db,
             manager=manager,
             session=session,
+            trace=trace,
         )
         return StreamingResponse(stream_iter, media_type="text/event-stream")
 
-    if request.enable_tools:
-        logger.info("[Chat] Routing to agent loop (enable_tools=True)")
-        response = await _run_agent_loop(request, device, db, manager)
-    else:
-        logger.info("[Chat] Routing to pass-through (enable_tools=False)")
-        response = await _call_tensorzero(request, use_tools=False)
+    try:
+        if request.enable_tools:
+            logger.info("[Chat] Routing to agent loop (enable_tools=True)")
+            response = await _run_agent_loop(request, device, db, manager)
+        else:
+            logger.info("[Chat] Routing to pass-through (enable_tools=False)")
+            response = await _call_tensorzero(request, use_tools=False)
+    finally:
+        tracer.finish(trace)
 
     if session is not None:
         assistant_content = response.choices[0].message.content
         if assistant_content.strip():
             await _append_session_message(db, session, "assistant", assistant_content)
+        if request.context_version is not None:
+            response.context_version = session.message_count
 
     return response
 
@@ -340,18 +409,21 @@ async def _stream_chat_completions(
     db: AsyncSession,
     manager: ConnectionManager,
     session: Optional[Session] = None,
+    trace: Optional[Span] = None,
 ) -> AsyncIterator[str]:
     """Stream a chat completion response as SSE events.
 
-    Streams token-level ``content_delta`` events for the final LLM response
-    so the UI can display text as it is generated. Tool call events
-    (``tool_call_started``, ``tool_call_result``) are emitted non-streaming
-    since we need the full response to detect tool calls.
+    Streams ``content_delta`` events as the model generates text, in both
+    pass-through and agent-loop mode. In agent-loop mode tool calls are
+    detected mid-stream, and ``tool_call_started`` / ``tool_call_result``
+    events follow as each call runs. For incremental requests the final
+    ``done`` event carries the session's new ``context_version``.
 
     Args:
         request: Chat completion request.
         device: Authenticated device.
         db: Database session.
+        trace: Root span of the request's trace, finished with the stream.
 
     Yields:
         SSE data frames.
@@ -370,15 +442,16 @@ async def _stream_chat_completions(
                     final_assistant_content = str(event.get("content") or "")
                 yield _sse(event)
         else:
-            # Pass-through: stream the response token-by-token.
+            # Pass-through: forward each chunk as soon as TensorZero yields it.
             messages = _normalize_messages(request.messages, include_tool_call_id=True)
-            collected = await _stream_inference_as_deltas(
+            parts: list[str] = []
+            async for delta in _stream_inference_deltas(
                 messages=messages,
                 function_name="chat_no_tools",
-            )
-            for delta_event in collected["deltas"]:
-                yield _sse(delta_event)
-            final_assistant_content = collected["full_text"]
+            ):
+                parts.append(delta)
+                yield _sse({"type": "content_delta", "delta": delta})
+            final_assistant_content = "".join(parts)
             yield _sse({"type": "assistant_message", "content": final_assistant_content})
 
         if session is not None and final_assistant_content.strip():
@@ -389,12 +462,17 @@ async def _stream_chat_completions(
                 final_assistant_content,
             )
 
-        yield _sse({"type": "done"})
+        done: dict[str, Any] = {"type": "done"}
+        if session is not None and request.context_version is not None:
+            done["context_version"] = session.message_count
+        yield _sse(done)
     except HTTPException as e:
         yield _sse({"type": "error", "error": str(e.detail)})
     except Exception as e:
         logger.exception("[Chat Stream] Streaming failed")
         yield _sse({"type": "error", "error": str(e)})
+    finally:
+        tracer.finish(trace)
 
 
 def _classify_block_type(block: Any) -> str:
@@ -441,17 +519,19 @@ def _parse_response_blocks(
     return content, tool_calls, model_used
 
 
-async def _execute_single_tool(
+def _check_tool_call(
     tc: dict[str, Any],
-    skill_service: Any,
     seen_keys: set[str],
     repeated: dict[str, int],
     iteration: int,
-) -> tuple[dict[str, Any], bool]:
-    """Execute one tool call, handling duplicates and repeats.
+) -> bool:
+    """Apply the duplicate/repeat guards to one tool call.
+
+    Must run synchronously in model order so concurrent execution cannot
+    reorder the guards.
 
     Returns:
-        Tuple of (result dict, was_executed).
+        False if the call duplicates another call in the same response.
     """
     execution_key = (
         f"{tc['name']}:{json.dumps(tc['arguments'] or {}, sort_keys=True, default=str)}"
@@ -464,7 +544,7 @@ async def _execute_single_tool(
             tc.get("name"),
             tc.get("arguments"),
         )
-        return {"result": "(duplicate tool call skipped)"}, False
+        return False
 
     seen_keys.add(execution_key)
     repeated[execution_key] = repeated.get(execution_key, 0) + 1
@@ -477,9 +557,7 @@ async def _execute_single_tool(
             tc.get("name"),
             tc.get("arguments"),
         )
-
-    result = await skill_service.execute_tool(tc["name"], tc["arguments"])
-    return result, True
+    return True
 
 
 def _format_tool_result(
@@ -497,63 +575,97 @@ def _format_tool_result(
     return success, result_str, error_str
 
 
-async def _execute_tool_calls(
-    tool_calls: list[dict[str, Any]],
-    skill_service: Any,
-    seen_keys: set[str],
-    repeated: dict[str, int],
-    iteration: int,
-) -> AsyncIterator[dict[str, Any]]:
-    """Execute a batch of tool calls, yielding SSE events.
+class _ToolCallRunner:
+    """Run a model step's tool calls concurrently; report them in order.
 
-    Yields ``tool_call_started`` and ``tool_call_result`` events, then
-    a final internal ``_tool_summary`` pseudo-event with ``results``
-    (list[str]) and ``had_execution`` (bool) keys.
+    Each call starts as soon as it is parsed (often while the model is
+    still streaming), with at most ``max_parallel`` calls in flight.
+    Duplicate guards run at dispatch time in model order, and events and
+    results are reported in the original order.
     """
-    tool_results: list[str] = []
-    had_execution = False
-
-    for tc in tool_calls:
-        tool_call_id = str(tc.get("id") or "")
-        yield {
-            "type": "tool_call_started",
-            "tool_call_id": tool_call_id,
-            "tool_name": tc.get("name") or "",
-            "arguments": tc.get("arguments") or {},
-        }
 
-        result, was_executed = await _execute_single_tool(
-            tc,
-            skill_service,
-            seen_keys,
-            repeated,
-            iteration,
+    def __init__(
+        self,
+        skill_service: Any,
+        repeated: dict[str, int],
+        iteration: int,
+        max_parallel: Optional[int] = None,
+    ) -> None:
+        self._skill_service = skill_service
+        self._repeated = repeated
+        self._iteration = iteration
+        self._seen_keys: set[str] = set()
+        self._slots = asyncio.Semaphore(
+            max_parallel or settings.agent_max_parallel_tools
         )
-        if was_executed:
-            had_execution = True
+        self._tasks: list[asyncio.Future] = []
+        self.tool_calls: list[dict[str, Any]] = []
+
+    def start(self, tc: dict[str, Any]) -> None:
+        """Dispatch a tool call for execution right away."""
+        self.tool_calls.append(tc)
+        if _check_tool_call(tc, self._seen_keys, self._repeated, self._iteration):
+            self._tasks.append(asyncio.create_task(self._run(tc)))
+            return
+        skipped = asyncio.get_running_loop().create_future()
+        skipped.set_result(({"result": "(duplicate tool call skipped)"}, False))
+        self._tasks.append(skipped)
+
+    async def _run(self, tc: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+        async with self._slots:
+            result = await self._skill_service.execute_tool(tc["name"], tc["arguments"])
+        return result, True
+
+    def cancel(self) -> None:
+        """Cancel calls that have not finished (e.g. the client went away)."""
+        for task in self._tasks:
+            task.cancel()
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        """Yield SSE events for every started tool call, in order.
+
+        Yields ``tool_call_started`` and ``tool_call_result`` events, then
+        a final internal ``_tool_summary`` pseudo-event with ``results``
+        (list[str]) and ``had_execution`` (bool) keys.
+        """
+        tool_results: list[str] = []
+        had_execution = False
+
+        for tc, task in zip(self.tool_calls, self._tasks):
+            tool_call_id = str(tc.get("id") or "")
+            yield {
+                "type": "tool_call_started",
+                "tool_call_id": tool_call_id,
+                "tool_name": tc.get("name") or "",
+                "arguments": tc.get("arguments") or {},
+            }
 
-        success, result_str, error_str = _format_tool_result(result)
+            result, was_executed = await task
+            if was_executed:
+                had_execution = True
 
-        yield {
-            "type": "tool_call_result",
-            "tool_call_id": tool_call_id,
-            "tool_name": tc.get("name") or "",
-            "success": success,
-            "result": result_str,
-            "error": error_str,
-        }
+            success, result_str, error_str = _format_tool_result(result)
 
-        label = tc["name"]
-        if success:
-            tool_results.append(f"Tool {label}: {result_str}")
-        else:
-            tool_results.append(f"Tool {label} error: {error_str}")
+            yield {
+                "type": "tool_call_result",
+                "tool_call_id": tool_call_id,
+                "tool_name": tc.get("name") or "",
+                "success": success,
+                "result": result_str,
+                "error": error_str,
+            }
 
-    yield {
-        "type": "_tool_summary",
-        "results": tool_results,
-        "had_execution": had_execution,
-    }
+            label = tc["name"]
+            if success:
+                tool_results.append(f"Tool {label}: {result_str}")
+            else:
+                tool_results.append(f"Tool {label} error: {error_str}")
+
+        yield {
+            "type": "_tool_summary",
+            "results": tool_results,
+            "had_execution": had_execution,
+        }
 
 
 def _should_retry_empty_text(
@@ -590,6 +702,7 @@ async def _agent_loop_events(
         db=db,
         user_id=device.user_id,
         connection_manager=manager,
+        session_id=request.session_id,
     )
 
     messages: List[Dict[str, Any]] = []
@@ -604,48 +717,48 @@ async def _agent_loop_events(
     had_any_tool_execution = False
     did_empty_text_retry = False
     repeated_across_iterations: dict[str, int] = {}
+    steps = 0
 
     for iteration in range(max_iterations):
-        response = await tz_inference(
-            messages=messages,
-            function_name="chat",
-            system=system_prompt,
-        )
-
-        content, tool_calls, model_used = _parse_response_blocks(
-            response, iteration=iteration
-        )
-
-        # No tool calls → final text response (or empty-text retry).
-        if not tool_calls:
-            if _should_retry_empty_text(
-                had_any_tool_execution, content, did_empty_text_retry
-            ):
-                did_empty_text_retry = True
-                messages.append({"role": "user", "content": _EMPTY_TEXT_NUDGE})
-                continue
-
-            if content.strip():
-                for delta in _split_into_deltas(content):
-                    yield {"type": "content_delta", "delta": delta}
-            final_content = content
-            break
-
-        # Execute tool calls via helper generator.
-        seen_keys: set[str] = set()
-        async for event in _execute_tool_calls(
-            tool_calls,
-            skill_service,
-            seen_keys,
-            repeated_across_iterations,
-            iteration,
-        ):
-            if event["type"] == "_tool_summary":
-                tool_results = event["results"]
-                if event["had_execution"]:
-                    had_any_tool_execution = True
-            else:
-                yield event
+        steps += 1
+        # Stream the model step: text deltas go straight to the client and
+        # each tool call starts executing as soon as its block closes.
+        runner = _ToolCallRunner(skill_service, repeated_across_iterations, iteration)
+        content = ""
+        prompt = context_compactor.fit(messages, system_prompt, request.session_id)
+        step_start = time.perf_counter()
+        try:
+            async for event in _stream_model_step(prompt, system_prompt, iteration):
+                if event["type"] == "content_delta":
+                    yield event
+                elif event["type"] == "tool_call":
+                    runner.start(event["tool_call"])
+                else:
+                    content = event["content"]
+                    model_used = event["model"]
+            context_compactor.record_step(time.perf_counter() - step_start)
+
+            # No tool calls → final text response (or empty-text retry).
+            if not runner.tool_calls:
+                if _should_retry_empty_text(
+                    had_any_tool_execution, content, did_empty_text_retry
+                ):
+                    did_empty_text_retry = True
+                    messages.append({"role": "user", "content": _EMPTY_TEXT_NUDGE})
+                    continue
+
+                final_content = content
+                break
+
+            async for event in runner.events():
+                if event["type"] == "_tool_summary":
+                    tool_results = event["results"]
+                    if event["had_execution"]:
+                        had_any_tool_execution = True
+                else:
+                    yield event
+        finally:
+            runner.cancel()
 
         messages.append({"role": "assistant", "content": content})
         tool_output = "\n".join(tool_results)
@@ -661,6 +774,7 @@ async def _agent_loop_events(
         )
         final_content = content
 
+    agent_loop_iterations.observe(steps)
     if not (final_content or "").strip():
         logger.warning(
             "[Agent Loop] Empty model response after tool execution loop. variant=%s",
@@ -760,16 +874,23 @@ async def _call_tensorzero(
     # Choose function based on whether tools are enabled
     function_name = "chat" if use_tools else "chat_no_tools"
 
-    try:
-        response = await tz_inference(
-            messages=messages,
-            function_name=function_name,
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=502,
-            detail=f"LLM inference failed: {e}",
-        )
+    start = time.perf_counter()
+    with tracer.span("llm", function=function_name) as span:
+        try:
+            response = await tz_inference(
+                messages=messages,
+                function_name=function_name,
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=502,
+                detail=f"LLM inference failed: {e}",
+            )
+        if span is not None:
+            span.set(variant=_extract_model(response))
+    inference_seconds.observe(
+        time.perf_counter() - start, function_name, _extract_model(response)
+    )
 
     # Extract content from TensorZero response
     content = _extract_content(response)
@@ -840,57 +961,236 @@ def _split_into_deltas(text: str) -> list[str]:
     return parts
 
 
-async def _stream_inference_as_deltas(
+def _extract_chunk_text(chunk: Any) -> str:
+    """Extract text from a TensorZero streaming chunk (object or dict)."""
+    if hasattr(chunk, "content"):
+        blocks = chunk.content or []
+    elif isinstance(chunk, dict):
+        blocks = chunk.get("content") or []
+    else:
+        return ""
+    return "".join(_extract_text_from_block(block) for block in blocks)
+
+
+async def _stream_inference_deltas(
     messages: list[dict[str, Any]],
     function_name: str = "chat_no_tools",
     system: str | None = None,
-) -> dict[str, Any]:
-    """Run streaming inference and collect content_delta events.
+) -> AsyncIterator[str]:
+    """Run streaming inference, yielding text deltas as they arrive.
 
-    Tries TensorZero streaming first; falls back to non-streaming +
-    word-level splitting if streaming is not supported.
+    Each chunk is forwarded the moment TensorZero yields it. If streaming
+    fails before any text was produced, falls back to non-streaming
+    inference + word-level splitting. A failure after text has been
+    yielded is re-raised, since replaying would duplicate output.
 
-    Returns:
-        Dict with ``deltas`` (list of content_delta event dicts) and
-        ``full_text`` (the complete response text).
+    Yields:
+        Non-empty text deltas; concatenated they form the full response.
     """
+    yielded = False
+    variant = "unknown"
+    start = time.perf_counter()
+    # Not made current: the span stays open across yields to the caller.
+    span = tracer.start_span("llm", function=function_name, stream=True)
     try:
         stream = await tz_inference_stream(
             messages=messages,
             function_name=function_name,
             system=system,
         )
-
-        # Collect deltas from the streaming response
-        deltas: list[dict[str, Any]] = []
-        full_parts: list[str] = []
         async for chunk in stream:
-            # TensorZero chunks have varying shapes; extract text content
-            text = ""
-            if hasattr(chunk, "content"):
-                for block in chunk.content or []:
-                    text += _extract_text_from_block(block)
-            elif isinstance(chunk, dict):
-                for block in chunk.get("content") or []:
-                    text += _extract_text_from_block(block)
+            if variant == "unknown":
+                variant = _extract_model(chunk)
+            text = _extract_chunk_text(chunk)
             if text:
-                deltas.append({"type": "content_delta", "delta": text})
-                full_parts.append(text)
-
-        return {"deltas": deltas, "full_text": "".join(full_parts)}
+                yielded = True
+                yield text
+        inference_seconds.observe(time.perf_counter() - start, function_name, variant)
+        tracer.end_span(span, variant=variant)
+        return
     except Exception:
+        if yielded:
+            tracer.end_span(span, variant=variant, error="stream failed")
+            raise
         # Fallback: non-streaming inference + word-level splitting
         logger.debug("Streaming inference not available, falling back to chunked")
+        fallbacks_total.inc("inference_stream")
+        tracer.end_span(span, error="stream unavailable")
+
+    start = time.perf_counter()
+    with tracer.span("llm", function=function_name, stream=False) as span:
         response = await tz_inference(
             messages=messages,
             function_name=function_name,
             system=system,
         )
-        content = _extract_content(response)
-        deltas = [
-            {"type": "content_delta", "delta": d} for d in _split_into_deltas(content)
-        ]
-        return {"deltas": deltas, "full_text": content}
+        if span is not None:
+            span.set(variant=_extract_model(response))
+    inference_seconds.observe(
+        time.perf_counter() - start, function_name, _extract_model(response)
+    )
+    for delta in _split_into_deltas(_extract_content(response)):
+        yield delta
+
+
+class _StreamedBlocks:
+    """Assemble text and tool calls from TensorZero chat chunks.
+
+    Tool call chunks carry partial ``raw_arguments`` keyed by block ``id``.
+    Providers that leave ids empty send the name only on a call's first
+    chunk, so a named chunk after a named call starts a new call. A tool
+    call is complete once a chunk for a different block arrives or the
+    stream ends.
+    """
+
+    def __init__(self) -> None:
+        self.text_parts: list[str] = []
+        self.model = "unknown"
+        self._open: Optional[dict[str, str]] = None
+        self._tool_count = 0
+
+    def feed(self, chunk: Any) -> tuple[str, list[dict[str, Any]]]:
+        """Consume one chunk.
+
+        Returns:
+            Tuple of (text delta, tool calls completed by this chunk).
+        """
+        variant = getattr(chunk, "variant_name", None)
+        if variant is None and isinstance(chunk, dict):
+            variant = chunk.get("variant_name")
+        if variant:
+            self.model = str(variant)
+
+        text = ""
+        closed: list[dict[str, Any]] = []
+        for block in _get_content_blocks(chunk):
+            block_type = _classify_block_type(block)
+            block_id = str(_block_field(block, "id") or "")
+            name = str(_block_field(block, "raw_name") or "")
+            if self._open is not None and (
+                block_id != self._open["id"]
+                or (not block_id and name and self._open["name"])
+            ):
+                closed.append(self._close())
+            if block_type == "tool_call":
+                if self._open is None:
+                    self._tool_count += 1
+                    self._open = {"id": block_id, "name": "", "arguments": ""}
+                self._open["name"] += name
+                self._open["arguments"] += str(
+                    _block_field(block, "raw_arguments") or ""
+                )
+            elif block_type == "text":
+                text += _extract_text_from_block(block)
+        if text:
+            self.text_parts.append(text)
+        return text, [tc for tc in closed if tc["name"]]
+
+    @property
+    def saw_tool_call(self) -> bool:
+        """Whether any tool call block has been seen."""
+        return self._tool_count > 0
+
+    def finish(self) -> list[dict[str, Any]]:
+        """Close the trailing tool call, if any."""
+        if self._open is None:
+            return []
+        tc = self._close()
+        return [tc] if tc["name"] else []
+
+    def _close(self) -> dict[str, Any]:
+        block = self._open or {}
+        self._open = None
+        try:
+            arguments = json.loads(block.get("arguments") or "{}")
+        except json.JSONDecodeError:
+            arguments = {}
+        if not isinstance(arguments, dict):
+            arguments = {}
+        return {
+            "id": block.get("id") or f"call_{self._tool_count}",
+            "name": block.get("name", ""),
+            "arguments": arguments,
+        }
+
+
+def _block_field(block: Any, name: str) -> Any:
+    """Read a field from an object- or dict-style content block."""
+    if isinstance(block, dict):
+        return block.get(name)
+    return getattr(block, name, None)
+
+
+async def _stream_model_step(
+    messages: list[dict[str, Any]],
+    system: str,
+    iteration: int,
+) -> AsyncIterator[dict[str, Any]]:
+    """Run one streamed agent-loop inference.
+
+    Yields ``content_delta`` events as text arrives and a ``tool_call``
+    event as each tool call block closes, then a final ``step_done`` event
+    with the full ``content`` and ``model``. Falls back to non-streaming
+    inference when streaming fails before producing any output.
+    """
+    blocks = _StreamedBlocks()
+    produced = False
+    start = time.perf_counter()
+    # Not made current: tool calls started mid-stream nest under the root.
+    span = tracer.start_span("llm", function="chat", iteration=iteration, stream=True)
+    try:
+        stream = await tz_inference_stream(
+            messages=messages,
+            function_name="chat",
+            system=system,
+        )
+        async for chunk in stream:
+            text, closed = blocks.feed(chunk)
+            if text:
+                produced = True
+                yield {"type": "content_delta", "delta": text}
+            for tc in closed:
+                produced = True
+                yield {"type": "tool_call", "tool_call": tc}
+        for tc in blocks.finish():
+            yield {"type": "tool_call", "tool_call": tc}
+        inference_seconds.observe(time.perf_counter() - start, "chat", blocks.model)
+        tracer.end_span(span, variant=blocks.model)
+        content = "".join(blocks.text_parts)
+        if not content.strip() and not blocks.saw_tool_call:
+            logger.warning(
+                "[Agent Loop] Empty model step. variant=%s iteration=%s",
+                blocks.model,
+                iteration,
+            )
+        yield {"type": "step_done", "content": content, "model": blocks.model}
+        return
+    except Exception:
+        if produced:
+            tracer.end_span(span, variant=blocks.model, error="stream failed")
+            raise
+        logger.debug("Streaming inference not available, falling back to chunked")
+        fallbacks_total.inc("inference_stream")
+        tracer.end_span(span, error="stream unavailable")
+
+    start = time.perf_counter()
+    with tracer.span("llm", function="chat", iteration=iteration, stream=False) as span:
+        response = await tz_inference(
+            messages=messages,
+            function_name="chat",
+            system=system,
+        )
+        content, tool_calls, model_used = _parse_response_blocks(
+            response, iteration=iteration
+        )
+        if span is not None:
+            span.set(variant=model_used)
+    inference_seconds.observe(time.perf_counter() - start, "chat", model_used)
+    for delta in _split_into_deltas(content) if content.strip() else []:
+        yield {"type": "content_delta", "delta": delta}
+    for tc in tool_calls:
+        yield {"type": "tool_call", "tool_call": tc}
+    yield {"type": "step_done", "content": content, "model": model_used}
 
 
 # Also expose as /inference for TensorZero compatibility
@@ -10,8 +10,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from ..auth import create_access_token, get_current_user, get_user_id_from_token
+from ..cluster import notify_skills_changed
 from ..config import settings
 from ..database import Device, User, get_db
+from ..device_directory import device_directory
+from ..presence import presence
+from ..result_cache import skill_result_cache
+from ..skill_index import skill_index
+from ..skill_routing import skill_router
 from ..utils import normalize_device_name
 from .websocket import (
     ConnectionManager,
@@ -168,6 +174,8 @@ async def register_device(
             existing.last_seen = now
             existing.is_active = True
             await db.commit()
+            device_directory.invalidate(user_id)
+            await notify_skills_changed(user_id, existing.id, kind="device_changed")
 
             logger.info(
                 "Device reconnected: %s (%s) for user %s",
@@ -203,6 +211,8 @@ async def register_device(
     )
     db.add(device)
     await db.commit()
+    device_directory.invalidate(user_id)
+    await notify_skills_changed(user_id, new_device_id, kind="device_changed")
 
     logger.info(
         "New device registered: %s (%s) for user %s",
@@ -279,6 +289,8 @@ async def create_device_token(
     )
     db.add(device)
     await db.commit()
+    device_directory.invalidate(current_user.id)
+    await notify_skills_changed(current_user.id, device.id, kind="device_changed")
 
     # Generate JWT for the device
     access_token = create_access_token(
@@ -322,4 +334,10 @@ async def delete_device(
 
     await db.delete(device)
     await db.commit()
+    skill_index.remove_device(current_user.id, device_id)
+    device_directory.invalidate(current_user.id)
+    presence.forget(device_id)
+    skill_router.forget_device(device_id)
+    skill_result_cache.invalidate(current_user.id, device_id)
+    await notify_skills_changed(current_user.id, device_id, kind="device_deleted")
     return {"status": "deleted"}
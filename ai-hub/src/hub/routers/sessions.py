@@ -4,13 +4,17 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..artifacts import artifact_store
 from ..auth import get_current_device
+from ..context_budget import context_compactor
 from ..database import Device, Message, Session, get_db
+from ..session_context import session_context
+from ..session_writer import session_writer
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -33,6 +37,7 @@ async def _get_session_for_user(
     Raises:
         HTTPException: If the session does not exist for the user.
     """
+    await session_writer.flush_for_read(session_id)
     result = await db.execute(
         select(Session).where(
             Session.id == session_id,
@@ -76,6 +81,7 @@ class SessionListResponse(BaseModel):
     """Response containing list of sessions."""
 
     sessions: List[SessionInfo]
+    # Number of matching sessions, not just those on this page.
     total: int
 
 
@@ -89,11 +95,17 @@ class MessageInfo(BaseModel):
 
 
 class SessionMessagesResponse(BaseModel):
-    """Response containing session messages."""
+    """Response containing session messages.
+
+    Pass ``next_after_id`` as ``after_id`` to fetch the next page; it is
+    None on the last page.
+    """
 
     session_id: str
     messages: List[MessageInfo]
+    # Number of messages in the session, not just those on this page.
     total: int
+    next_after_id: Optional[int] = None
 
 
 class MessageCreate(BaseModel):
@@ -146,29 +158,62 @@ async def list_sessions(
     limit: int = 50,
     offset: int = 0,
     days: Optional[int] = Query(None, description="Filter to sessions from last N days"),
+    since: Optional[datetime] = Query(
+        None, description="Only sessions with activity at or after this time"
+    ),
+    after_id: Optional[str] = Query(
+        None, description="With since: skip sessions up to this one at since"
+    ),
 ):
     """List sessions for the current user.
 
     Returns sessions from all devices belonging to the same user,
     ordered by last activity (most recent first).
 
+    ``since`` turns the list into a change feed: pass the newest
+    ``last_activity`` seen so far to get only sessions that gained
+    messages or were renamed since then. Deleted sessions are not
+    reported. The feed is ordered oldest first by ``(last_activity, id)``,
+    so it pages by key rather than offset: pass the last session's
+    ``last_activity`` and ``id`` as ``since`` and ``after_id``. A session
+    that gains activity while a client pages moves to the end of the feed
+    instead of shifting the sessions not yet read.
+
     Args:
         limit: Maximum number of sessions to return
         offset: Number of sessions to skip
         days: If provided, only return sessions with activity in the last N days
+        since: If provided, only return sessions with activity at or after it
+        after_id: With ``since``, only return sessions after this one among
+            those whose activity is exactly ``since``
     """
+    await session_writer.flush_for_read()
+
     # Build query for this user's sessions
     query = select(Session).where(Session.user_id == device.user_id)
 
-    # Apply date filter if requested
+    # Apply date filters if requested
     if days is not None:
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
         query = query.where(Session.last_activity >= cutoff)
+    order = [Session.last_activity.desc()]
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc)
+        if after_id is None:
+            query = query.where(Session.last_activity >= since)
+        else:
+            query = query.where(
+                or_(
+                    Session.last_activity > since,
+                    and_(Session.last_activity == since, Session.id > after_id),
+                )
+            )
+        order = [Session.last_activity, Session.id]
 
-    # Get sessions ordered by last activity
-    result = await db.execute(
-        query.order_by(Session.last_activity.desc()).limit(limit).offset(offset)
-    )
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+
+    result = await db.execute(query.order_by(*order).limit(limit).offset(offset))
     sessions = result.scalars().all()
 
     # Use cached title and message_count (no N+1 queries)
@@ -186,7 +231,7 @@ async def list_sessions(
         for s in sessions
     ]
 
-    return SessionListResponse(sessions=session_infos, total=len(session_infos))
+    return SessionListResponse(sessions=session_infos, total=total or 0)
 
 
 @router.get("/{session_id}", response_model=SessionInfo)
@@ -214,21 +259,51 @@ async def get_session(
 @router.get("/{session_id}/messages", response_model=SessionMessagesResponse)
 async def get_session_messages(
     session_id: str,
+    response: Response,
     device: Device = Depends(get_current_device),
     db: AsyncSession = Depends(get_db),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Only messages with an ID greater than this"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Maximum number of messages to return"
+    ),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Get all messages for a session."""
+    """Get messages for a session, oldest first.
+
+    Without ``after_id``/``limit`` every message is returned. The ETag is
+    the session's last message ID plus the requested page, so a client
+    holding a copy of a page can send ``If-None-Match`` with the same
+    ``after_id``/``limit`` and gets 304 until a message is added.
+    """
     # Verify session access
-    await _get_session_for_user(db, session_id, device.user_id)
+    session = await _get_session_for_user(db, session_id, device.user_id)
 
-    # Get messages
-    result = await db.execute(
-        select(Message)
-        .where(Message.session_id == session_id)
-        .order_by(Message.created_at)
+    last_id = await db.scalar(
+        select(func.max(Message.id)).where(Message.session_id == session_id)
     )
+    etag = f'"{session_id}-{last_id or 0}-{after_id or 0}-{limit or 0}"'
+    if if_none_match is not None and {etag, "*"} & {
+        tag.strip() for tag in if_none_match.split(",")
+    }:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # Get messages
+    query = select(Message).where(Message.session_id == session_id)
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    query = query.order_by(Message.id)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
     messages = result.scalars().all()
 
+    next_after_id = None
+    if limit is not None and len(messages) == limit and messages[-1].id != last_id:
+        next_after_id = messages[-1].id
+
     return SessionMessagesResponse(
         session_id=session_id,
         messages=[
@@ -240,7 +315,8 @@ async def get_session_messages(
             )
             for m in messages
         ],
-        total=len(messages),
+        total=session.message_count,
+        next_after_id=next_after_id,
     )
 
 
@@ -255,28 +331,18 @@ async def add_message(
     # Verify session access
     session = await _get_session_for_user(db, session_id, device.user_id)
 
-    # Create message
-    now = datetime.now(timezone.utc)
-    message = Message(
-        session_id=session_id,
-        role=request.role,
-        content=request.content,
-        created_at=now,
+    # Queue the message (and session metadata), then write it with whatever
+    # else is queued so the response can carry its ID.
+    message = await session_writer.append(session, request.role, request.content)
+    await session_writer.flush()
+    if message.id is None:
+        # Not persisted: withdraw it so the timer cannot write it after the
+        # client has been told to retry.
+        session_writer.discard(session, message)
+        raise HTTPException(status_code=503, detail="Message could not be saved")
+    session_context.append(
+        session_id, request.role, request.content, session.message_count
     )
-    db.add(message)
-
-    # Update session metadata
-    session.last_activity = now
-    session.message_count += 1
-
-    # Set title from first user message if not already set
-    if session.title is None and request.role == "user":
-        session.title = request.content[:50] + (
-            "..." if len(request.content) > 50 else ""
-        )
-
-    await db.commit()
-    await db.refresh(message)
 
     return MessageInfo(
         id=message.id,
@@ -298,6 +364,9 @@ async def delete_session(
 
     await db.delete(session)
     await db.commit()
+    session_context.invalidate(session_id)
+    context_compactor.invalidate(session_id)
+    artifact_store.invalidate(session_id)
 
     return {"status": "deleted"}
 
@@ -315,12 +384,16 @@ async def update_session(
     device: Device = Depends(get_current_device),
     db: AsyncSession = Depends(get_db),
 ):
-    """Update session details (e.g. title)."""
+    """Update session details (e.g. title).
+
+    A rename counts as activity, so it shows up in the ``since`` feed.
+    """
     # Verify session access
     session = await _get_session_for_user(db, session_id, device.user_id)
 
     if request.title is not None:
         session.title = request.title
+        session.last_activity = datetime.now(timezone.utc)
 
     await db.commit()
     await db.refresh(session)
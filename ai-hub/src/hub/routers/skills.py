@@ -1,38 +1,102 @@
 """Skill registry endpoints."""
 
-from datetime import datetime, timedelta, timezone
-from typing import Any, List, Optional
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import get_current_device
-from ..config import settings
-from ..database import Device, Skill, get_db
+from ..cluster import notify_skills_changed
+from ..database import Device, DevicePresence, Skill, get_db
+from ..device_directory import DirectoryDevice, device_directory
+from ..presence import presence
+from ..result_cache import skill_result_cache
+from ..skill_index import skill_index
 from ..skill_service import DevicesProxy
-from ..utils import normalize_device_name
 from .websocket import ConnectionManager, get_connection_manager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/skills", tags=["skills"])
 
+# Method descriptor fields covered by the content hash. Spoke and Hub must
+# hash the same fields in the same canonical form (see wire-schema-v1.md).
+SKILL_HASH_FIELDS = (
+    "class_name",
+    "function_name",
+    "signature",
+    "docstring",
+    "device_agnostic",
+)
+
+# Hashed only when they differ from their default, so descriptors that do
+# not use them keep the hashes they had before the field existed.
+OPTIONAL_HASH_FIELDS = {"cache_ttl_seconds": 0}
+
+
+def skill_content_hash(skill: Any) -> str:
+    """Compute the content hash for one skill method descriptor.
+
+    The hash is sha256 over compact, key-sorted JSON of
+    ``SKILL_HASH_FIELDS``, plus any ``OPTIONAL_HASH_FIELDS`` that are set.
+    Missing optional fields hash as their defaults.
+
+    Args:
+        skill: ``SkillInfo``, ``Skill`` row, or a plain dict.
+
+    Returns:
+        Lowercase hex digest.
+    """
+    defaults = {"docstring": None, "device_agnostic": False}
+    if isinstance(skill, dict):
+        data = {f: skill.get(f, defaults.get(f)) for f in SKILL_HASH_FIELDS}
+    else:
+        data = {f: getattr(skill, f, defaults.get(f)) for f in SKILL_HASH_FIELDS}
+    data["device_agnostic"] = bool(data["device_agnostic"])
+    for name, default in OPTIONAL_HASH_FIELDS.items():
+        if isinstance(skill, dict):
+            value = skill.get(name, default)
+        else:
+            value = getattr(skill, name, default)
+        if value is not None and value != default:
+            data[name] = value
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def manifest_hash(method_hashes: Iterable[str]) -> str:
+    """Compute the manifest hash from a device's method hashes.
+
+    Args:
+        method_hashes: Per-method content hashes (any order).
+
+    Returns:
+        sha256 hex digest over the sorted, newline-joined hashes.
+    """
+    joined = "\n".join(sorted(set(method_hashes)))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
 
 async def _get_user_devices(
     db: AsyncSession,
     user_id: str,
-) -> dict[str, Device]:
+) -> dict[str, DirectoryDevice]:
     """Fetch devices for a user keyed by device ID.
 
     Args:
-        db: Active database session.
+        db: Active database session (used only on a directory miss).
         user_id: User identifier to scope devices.
 
     Returns:
-        Mapping of device ID to Device row.
+        Mapping of device ID to device directory entry.
     """
-    result = await db.execute(select(Device).where(Device.user_id == user_id))
-    return {device.id: device for device in result.scalars().all()}
+    return (await device_directory.get(user_id, db.execute)).by_id
 
 
 class SkillInfo(BaseModel):
@@ -43,12 +107,43 @@ class SkillInfo(BaseModel):
     signature: str
     docstring: Optional[str] = None
     device_agnostic: bool = False
+    # Seconds the hub may cache results of this (read-only) method.
+    cache_ttl_seconds: int = Field(default=0, ge=0)
 
 
 class SkillRegisterRequest(BaseModel):
-    """Request to register skills."""
+    """Request to register skills.
+
+    Without ``method_hashes`` this is a full replace. With them it is the
+    second step of delta registration: ``skills`` carries only the methods
+    the Hub reported as missing from ``/skills/sync``.
+    """
 
     skills: List[SkillInfo]
+    manifest_hash: Optional[str] = None
+    method_hashes: Optional[List[str]] = None
+
+
+class SkillSyncRequest(BaseModel):
+    """Manifest announcement for delta registration."""
+
+    manifest_hash: str
+    method_hashes: List[str]
+
+
+class SkillSyncResponse(BaseModel):
+    """Result of comparing a Spoke manifest with the Hub's rows.
+
+    Attributes:
+        status: ``unchanged`` (nothing to do), ``updated`` (removals applied,
+            nothing to upload) or ``incomplete`` (upload ``missing``).
+        missing: Method hashes the Hub does not have yet.
+        removed: Number of stale rows deleted.
+    """
+
+    status: Literal["unchanged", "updated", "incomplete"]
+    missing: List[str] = Field(default_factory=list)
+    removed: int = 0
 
 
 class SkillExecuteRequest(BaseModel):
@@ -72,6 +167,7 @@ class SkillResponse(BaseModel):
     signature: str
     docstring: Optional[str]
     device_agnostic: bool
+    cache_ttl_seconds: int = 0
     last_heartbeat: datetime
 
 
@@ -82,6 +178,105 @@ class SkillListResponse(BaseModel):
     total: int
 
 
+def _check_manifest(manifest: str, method_hashes: List[str]) -> None:
+    """Reject manifests whose hash does not match their method hashes."""
+    if manifest_hash(method_hashes) != manifest:
+        raise HTTPException(
+            status_code=400,
+            detail="manifest_hash does not match method_hashes",
+        )
+
+
+async def _load_device_skills(db: AsyncSession, device_id: str) -> list[Skill]:
+    """Load every skill row for a device."""
+    result = await db.execute(select(Skill).where(Skill.device_id == device_id))
+    return list(result.scalars().all())
+
+
+async def _delete_stale_skills(
+    db: AsyncSession,
+    rows: list[Skill],
+    keep_hashes: set[str],
+) -> list[Skill]:
+    """Delete rows whose content hash is not in ``keep_hashes``.
+
+    Returns:
+        The rows that were kept.
+    """
+    stale_ids = [r.id for r in rows if r.content_hash not in keep_hashes]
+    if stale_ids:
+        await db.execute(delete(Skill).where(Skill.id.in_(stale_ids)))
+    return [r for r in rows if r.content_hash in keep_hashes]
+
+
+def _new_skill_row(device_id: str, info: SkillInfo, now: datetime) -> Skill:
+    """Build a Skill row from a registration descriptor."""
+    return Skill(
+        device_id=device_id,
+        class_name=info.class_name,
+        function_name=info.function_name,
+        signature=info.signature,
+        docstring=info.docstring,
+        device_agnostic=info.device_agnostic,
+        cache_ttl_seconds=info.cache_ttl_seconds,
+        content_hash=skill_content_hash(info),
+        last_heartbeat=now,
+    )
+
+
+@router.post("/sync", response_model=SkillSyncResponse)
+async def sync_skills(
+    request: SkillSyncRequest,
+    device: Device = Depends(get_current_device),
+    db: AsyncSession = Depends(get_db),
+):
+    """Compare a Spoke's skill manifest with the Hub's registered rows.
+
+    An unchanged manifest costs one round trip and no row writes. Otherwise
+    stale rows are deleted and the hashes the Hub lacks are returned so the
+    Spoke can upload just those methods via ``/skills/register``.
+    """
+    _check_manifest(request.manifest_hash, request.method_hashes)
+    now = datetime.now(timezone.utc)
+
+    await presence.touch(db, device, now)
+
+    if device.skill_manifest_hash == request.manifest_hash:
+        await db.commit()
+        if not skill_index.has_device(device.user_id, device.id):
+            # The device expired from presence; make its rows searchable again.
+            rows = await _load_device_skills(db, device.id)
+            skill_index.replace_device(device.user_id, device.id, rows)
+            device_directory.invalidate_candidates(device.user_id)
+            await notify_skills_changed(device.user_id, device.id)
+        return SkillSyncResponse(status="unchanged")
+
+    wanted = set(request.method_hashes)
+    rows = await _load_device_skills(db, device.id)
+    kept = await _delete_stale_skills(db, rows, wanted)
+    missing = sorted(wanted - {r.content_hash for r in kept})
+
+    if not missing:
+        device.skill_manifest_hash = request.manifest_hash
+    await db.commit()
+
+    skill_index.replace_device(device.user_id, device.id, kept)
+    skill_result_cache.invalidate(device.user_id, device.id)
+    device_directory.invalidate_candidates(device.user_id)
+    await notify_skills_changed(device.user_id, device.id)
+    logger.info(
+        "Skill sync for device %s: removed=%d missing=%d",
+        device.id,
+        len(rows) - len(kept),
+        len(missing),
+    )
+    return SkillSyncResponse(
+        status="incomplete" if missing else "updated",
+        missing=missing,
+        removed=len(rows) - len(kept),
+    )
+
+
 @router.post("/register")
 async def register_skills(
     request: SkillRegisterRequest,
@@ -90,27 +285,56 @@ async def register_skills(
 ):
     """Register skills from a device.
 
-    This replaces all existing skills for the device.
+    Without ``method_hashes`` this replaces all existing skills for the
+    device. With them, only the supplied (previously missing) methods are
+    inserted and rows outside the manifest are deleted.
     """
-    # Delete existing skills for this device
-    await db.execute(delete(Skill).where(Skill.device_id == device.id))
-
-    # Add new skills
     now = datetime.now(timezone.utc)
-    for skill_info in request.skills:
-        skill = Skill(
-            device_id=device.id,
-            class_name=skill_info.class_name,
-            function_name=skill_info.function_name,
-            signature=skill_info.signature,
-            docstring=skill_info.docstring,
-            device_agnostic=skill_info.device_agnostic,
-            last_heartbeat=now,
-        )
-        db.add(skill)
 
+    if request.method_hashes is None:
+        # Full replace (legacy clients).
+        await db.execute(delete(Skill).where(Skill.device_id == device.id))
+        rows = [_new_skill_row(device.id, info, now) for info in request.skills]
+        db.add_all(rows)
+        device.skill_manifest_hash = manifest_hash(r.content_hash for r in rows)
+    else:
+        if request.manifest_hash is None:
+            raise HTTPException(
+                status_code=400,
+                detail="manifest_hash is required with method_hashes",
+            )
+        _check_manifest(request.manifest_hash, request.method_hashes)
+
+        wanted = set(request.method_hashes)
+        existing = await _load_device_skills(db, device.id)
+        rows = await _delete_stale_skills(db, existing, wanted)
+        have = {r.content_hash for r in rows}
+        for info in request.skills:
+            row = _new_skill_row(device.id, info, now)
+            if row.content_hash not in wanted or row.content_hash in have:
+                continue
+            have.add(row.content_hash)
+            db.add(row)
+            rows.append(row)
+
+        missing = wanted - have
+        if missing:
+            await db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail=f"{len(missing)} declared method(s) were not uploaded",
+            )
+        device.skill_manifest_hash = request.manifest_hash
+
+    await presence.touch(db, device, now)
     await db.commit()
 
+    # Keep the in-memory search index in step with the new registration.
+    skill_index.replace_device(device.user_id, device.id, rows)
+    skill_result_cache.invalidate(device.user_id, device.id)
+    device_directory.invalidate_candidates(device.user_id)
+    await notify_skills_changed(device.user_id, device.id)
+
     return {
         "message": f"Registered {len(request.skills)} skills",
         "device_id": device.id,
@@ -122,20 +346,19 @@ async def heartbeat(
     device: Device = Depends(get_current_device),
     db: AsyncSession = Depends(get_db),
 ):
-    """Update heartbeat for all skills on this device."""
+    """Refresh this device's presence, keeping all of its skills alive."""
     now = datetime.now(timezone.utc)
 
-    # Update all skills for this device
-    result = await db.execute(select(Skill).where(Skill.device_id == device.id))
-    skills = result.scalars().all()
-
-    for skill in skills:
-        skill.last_heartbeat = now
-
+    await presence.touch(db, device, now)
     await db.commit()
 
+    result = await db.execute(
+        select(func.count()).select_from(Skill).where(Skill.device_id == device.id)
+    )
+    skill_count = result.scalar_one()
+
     return {
-        "message": f"Heartbeat updated for {len(skills)} skills",
+        "message": f"Heartbeat updated for {skill_count} skills",
         "timestamp": now.isoformat(),
     }
 
@@ -152,15 +375,8 @@ async def execute_skill(
     Routes the skill call to the target device through the WebSocket connection.
     """
     # Find target device by normalized name (must be same user)
-    # Get all user devices and match by normalized name
-    user_devices = await _get_user_devices(db, device.user_id)
-
-    target_device = None
-    request_normalized = normalize_device_name(request.device_name)
-    for target in user_devices.values():
-        if normalize_device_name(target.name) == request_normalized:
-            target_device = target
-            break
+    proxy = DevicesProxy(db=db, user_id=device.user_id, connection_manager=manager)
+    target_device = await proxy.find_device(request.device_name)
 
     if not target_device:
         raise HTTPException(
@@ -175,15 +391,14 @@ async def execute_skill(
             detail=f"Device '{request.device_name}' is not currently connected",
         )
 
-    # Execute skill via WebSocket
+    # Execute skill via WebSocket (or the result cache for cacheable methods)
     try:
-        result = await manager.send_skill_request(
-            device_id=target_device.id,
+        result = await proxy.execute_skill(
+            device_name=target_device.name,
             skill_name=request.skill_name,
             method_name=request.method_name,
             args=request.args,
             kwargs=request.kwargs,
-            timeout=30.0,
         )
 
         return {
@@ -206,6 +421,22 @@ async def execute_skill(
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+@router.delete("/cache")
+async def invalidate_skill_cache(
+    skill_name: Optional[str] = None,
+    method_name: Optional[str] = None,
+    device: Device = Depends(get_current_device),
+):
+    """Drop cached skill results for this device's user.
+
+    Optionally narrowed to one skill class and method.
+    """
+    removed = skill_result_cache.invalidate(
+        device.user_id, skill_name=skill_name, method_name=method_name
+    )
+    return {"invalidated": removed}
+
+
 @router.get("", response_model=SkillListResponse)
 async def list_skills(
     device: Device = Depends(get_current_device),
@@ -219,17 +450,19 @@ async def list_skills(
     # Get all devices for this user
     user_devices = await _get_user_devices(db, device.user_id)
 
-    # Get skills from those devices
-    query = select(Skill).where(Skill.device_id.in_(user_devices.keys()))
-
-    if not include_expired:
-        expiry_time = datetime.now(timezone.utc) - timedelta(
-            seconds=settings.skill_expiry_seconds
+    # Get skills from those devices; live devices have a presence row.
+    query = select(Skill, DevicePresence.last_heartbeat).where(
+        Skill.device_id.in_(user_devices.keys())
+    )
+    if include_expired:
+        query = query.outerjoin(
+            DevicePresence, Skill.device_id == DevicePresence.device_id
         )
-        query = query.where(Skill.last_heartbeat > expiry_time)
+    else:
+        query = query.join(DevicePresence, Skill.device_id == DevicePresence.device_id)
 
     result = await db.execute(query)
-    skills = result.scalars().all()
+    rows = result.all()
 
     return SkillListResponse(
         skills=[
@@ -242,11 +475,12 @@ async def list_skills(
                 signature=s.signature,
                 docstring=s.docstring,
                 device_agnostic=s.device_agnostic,
-                last_heartbeat=s.last_heartbeat,
+                cache_ttl_seconds=s.cache_ttl_seconds or 0,
+                last_heartbeat=seen or s.last_heartbeat,
             )
-            for s in skills
+            for s, seen in rows
         ],
-        total=len(skills),
+        total=len(rows),
     )
 
 
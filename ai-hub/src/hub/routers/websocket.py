@@ -2,10 +2,13 @@
 
 import asyncio
 import logging
+import time
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+import anyio
 from fastapi import (
     APIRouter,
     Depends,
@@ -14,18 +17,88 @@ from fastapi import (
     WebSocket,
     WebSocketDisconnect,
 )
-from sqlalchemy import delete, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import decode_token
+from ..cluster import ClusterBackend, get_cluster, notify_skills_changed
+from ..config import settings
 from ..database import Device, Skill, get_db
+from ..device_directory import device_directory
+from ..metrics import skill_roundtrip_seconds, timeouts_total
+from ..presence import presence
 from ..protocol import PROTOCOL_VERSION_HEADER, SUPPORTED_VERSIONS
+from ..skill_index import skill_index
+from ..tracing import tracer
+from ..wire import JsonCodec, WireCodec, WireError, get_codec, receive_message
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
 
+@dataclass
+class _ResultStream:
+    """Skill result arriving in ``skill_response_chunk`` frames."""
+
+    parts: List[str] = field(default_factory=list)
+    next_seq: int = 0
+    size: int = 0
+
+    def add(self, seq: Any, data: Any, max_bytes: int) -> None:
+        """Append the next chunk.
+
+        Raises:
+            ValueError: If the chunk is out of order, not text, or takes the
+                result past ``max_bytes``.
+        """
+        if seq != self.next_seq:
+            raise ValueError(f"Result chunk {seq} arrived, expected {self.next_seq}")
+        if not isinstance(data, str):
+            raise ValueError("Result chunk is not text")
+        self.size += len(data.encode("utf-8"))
+        if self.size > max_bytes:
+            raise ValueError(f"Skill result exceeded {max_bytes} bytes")
+        self.parts.append(data)
+        self.next_seq += 1
+
+
+@dataclass(eq=False)
+class _DeviceChannel:
+    """Live connection and in-flight skill requests for one device.
+
+    Each device owns its pending-request table, so registering, resolving
+    and failing requests never touches another device's state.
+    """
+
+    websocket: WebSocket
+    # Frame encoding negotiated for this connection
+    codec: WireCodec = field(default_factory=JsonCodec)
+    # Map request_id -> Future for skill requests sent to this device
+    pending: Dict[str, asyncio.Future] = field(default_factory=dict)
+    # Map request_id -> partial result for requests answered in chunks
+    streams: Dict[str, _ResultStream] = field(default_factory=dict)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send a message using the connection's wire codec."""
+        await self.codec.send(self.websocket, message)
+
+    def fail_pending(self, exc: Exception) -> int:
+        """Fail every unresolved request on this device.
+
+        Returns:
+            Number of futures failed.
+        """
+        failed = 0
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+                failed += 1
+        self.pending.clear()
+        self.streams.clear()
+        return failed
+
+
 class ConnectionManager:
     """Manages active WebSocket connections for devices.
 
@@ -33,65 +106,83 @@ class ConnectionManager:
     - Adding/removing connections
     - Sending skill requests to devices
     - Broadcasting messages
+
+    State is sharded per device and only mutated from the Hub's event loop
+    between awaits, so no lock is needed: concurrent requests to different
+    devices never contend, and a disconnect only touches that device's
+    in-flight requests.
+
+    When the Hub runs several workers, devices connected to another worker
+    are reached through the cluster backend (see ``hub.cluster``).
     """
 
-    def __init__(self):
-        # Map device_id -> WebSocket connection
-        self._connections: Dict[str, WebSocket] = {}
-        # Map request_id -> Future for pending skill requests
-        self._pending_requests: Dict[str, asyncio.Future] = {}
-        # Map request_id -> target device_id for cleanup on disconnect
-        self._request_device_ids: Dict[str, str] = {}
-        # Lock for thread-safe operations
-        self._lock = asyncio.Lock()
-
-    async def connect(self, device_id: str, websocket: WebSocket):
+    def __init__(self, cluster: ClusterBackend | None = None):
+        # Map device_id -> connection and its pending requests
+        self._channels: Dict[str, _DeviceChannel] = {}
+        self._cluster = cluster
+
+    @property
+    def cluster(self) -> ClusterBackend:
+        """Cluster backend (the worker-wide one unless given explicitly)."""
+        return self._cluster if self._cluster is not None else get_cluster()
+
+    async def connect(
+        self,
+        device_id: str,
+        websocket: WebSocket,
+        codec: WireCodec | None = None,
+    ):
         """Register a new device connection.
 
+        A new connection for an already-connected device replaces the old
+        socket. Requests in flight keep waiting and may be answered on the
+        new connection.
+
         Args:
             device_id: Device identifier
             websocket: WebSocket connection
+            codec: Frame encoding negotiated for the connection (default v1)
         """
-        async with self._lock:
-            # Close existing connection if any
-            if device_id in self._connections:
-                old_ws = self._connections[device_id]
-                try:
-                    await old_ws.close()
-                except Exception:
-                    pass
-
-            self._connections[device_id] = websocket
-            logger.info(f"Device {device_id} connected via WebSocket")
+        old = self._channels.get(device_id)
+        channel = _DeviceChannel(websocket=websocket, codec=codec or JsonCodec())
+        if old is not None:
+            channel.pending = old.pending
+        self._channels[device_id] = channel
+        logger.info(f"Device {device_id} connected via WebSocket")
+        await self.cluster.claim(device_id)
+
+        # Close existing connection if any
+        if old is not None and old.websocket is not websocket:
+            try:
+                await old.websocket.close()
+            except Exception:
+                pass
 
-    async def disconnect(self, device_id: str):
+    async def disconnect(self, device_id: str, websocket: WebSocket | None = None):
         """Unregister a device connection.
 
         Args:
             device_id: Device identifier
+            websocket: The socket that closed. When given, a newer connection
+                for the same device is left alone.
         """
-        async with self._lock:
-            if device_id in self._connections:
-                del self._connections[device_id]
-                logger.info(f"Device {device_id} disconnected")
-
-            # Fail any in-flight requests targeting this device immediately
-            # instead of waiting for per-request timeout.
-            for request_id, target_device_id in list(self._request_device_ids.items()):
-                if target_device_id != device_id:
-                    continue
-                future = self._pending_requests.get(request_id)
-                if future and not future.done():
-                    future.set_exception(
-                        ConnectionError(
-                            f"Device {device_id} disconnected before replying"
-                        )
-                    )
-                self._pending_requests.pop(request_id, None)
-                self._request_device_ids.pop(request_id, None)
+        channel = self._channels.get(device_id)
+        if channel is None:
+            return
+        if websocket is not None and channel.websocket is not websocket:
+            return
+        del self._channels[device_id]
+        logger.info(f"Device {device_id} disconnected")
+
+        # Fail this device's in-flight requests immediately instead of
+        # waiting for per-request timeout.
+        channel.fail_pending(
+            ConnectionError(f"Device {device_id} disconnected before replying")
+        )
+        await self.cluster.release(device_id)
 
     def is_connected(self, device_id: str) -> bool:
-        """Check if a device is currently connected.
+        """Check if a device is currently connected (to any worker).
 
         Args:
             device_id: Device identifier
@@ -99,7 +190,7 @@ class ConnectionManager:
         Returns:
             True if connected, False otherwise
         """
-        return device_id in self._connections
+        return device_id in self._channels or self.cluster.owner(device_id) is not None
 
     async def send_skill_request(
         self,
@@ -127,18 +218,26 @@ class ConnectionManager:
             ValueError: If device is not connected
             TimeoutError: If device doesn't respond in time
             RuntimeError: If skill execution fails
+            ConnectionError: If the device disconnects before replying
         """
         # Generate unique request ID
         request_id = str(uuid.uuid4())
 
-        # Atomically resolve the socket and register the pending future.
-        async with self._lock:
-            websocket = self._connections.get(device_id)
-            if websocket is None:
-                raise ValueError(f"Device {device_id} is not connected")
-            future = asyncio.get_running_loop().create_future()
-            self._pending_requests[request_id] = future
-            self._request_device_ids[request_id] = device_id
+        # Resolve the socket and register the pending future without awaiting
+        # in between, so a concurrent disconnect cannot slip in.
+        channel = self._channels.get(device_id)
+        skill = f"{skill_name}.{method_name}"
+        if channel is None:
+            with tracer.span("skill_request", device=device_id, skill=skill) as span:
+                if span is not None:
+                    span.set(forwarded=True)
+                return await self._forward_skill_request(
+                    device_id, skill_name, method_name, args, kwargs, timeout
+                )
+        future = asyncio.get_running_loop().create_future()
+        pending = channel.pending
+        pending[request_id] = future
+        span = tracer.start_span("skill_request", device=device_id, skill=skill)
 
         try:
             # Send request
@@ -150,61 +249,206 @@ class ConnectionManager:
                 "args": args,
                 "kwargs": kwargs,
             }
+            if span is not None:
+                # Echoed back with the device's queue/exec timing
+                message["trace_id"] = span.trace_id
+                message["span_id"] = span.span_id
 
-            await websocket.send_json(message)
+            start = time.perf_counter()
+            await channel.send(message)
             logger.debug(f"Sent skill request {request_id} to device {device_id}")
 
             # Wait for response with timeout
             result = await asyncio.wait_for(future, timeout=timeout)
+            skill_roundtrip_seconds.observe(time.perf_counter() - start, device_id)
             return result
 
         except asyncio.TimeoutError:
             logger.error(f"Skill request {request_id} timed out after {timeout}s")
+            timeouts_total.inc("skill_request")
+            tracer.end_span(span, error="timeout")
+            await self._send_cancel(device_id, request_id)
             raise TimeoutError(f"Device {device_id} did not respond in time")
 
+        except asyncio.CancelledError:
+            tracer.end_span(span, error="cancelled")
+            await asyncio.shield(self._send_cancel(device_id, request_id))
+            raise
+
+        except Exception as e:
+            tracer.end_span(span, error=f"{type(e).__name__}: {e}")
+            raise
+
         finally:
             # Clean up pending request
-            async with self._lock:
-                self._pending_requests.pop(request_id, None)
-                self._request_device_ids.pop(request_id, None)
+            pending.pop(request_id, None)
+            channel.streams.pop(request_id, None)
+            tracer.end_span(span)
+
+    async def _forward_skill_request(
+        self,
+        device_id: str,
+        skill_name: str,
+        method_name: str,
+        args: list,
+        kwargs: dict,
+        timeout: float,
+    ) -> Any:
+        """Send a skill request through the worker that owns the device."""
+        owner = self.cluster.owner(device_id)
+        if owner is None:
+            # The directory may not have caught up with a fresh connection.
+            await self.cluster.refresh()
+            owner = self.cluster.owner(device_id)
+        if owner is None:
+            raise ValueError(f"Device {device_id} is not connected")
+        logger.debug(f"Forwarding skill request for {device_id} to worker {owner}")
+        return await self.cluster.forward(
+            owner,
+            {
+                "device_id": device_id,
+                "skill_name": skill_name,
+                "method_name": method_name,
+                "args": args,
+                "kwargs": kwargs,
+                "timeout": timeout,
+            },
+            timeout,
+        )
+
+    async def serve_remote_request(self, request: dict) -> Any:
+        """Run a skill request forwarded by another worker.
+
+        Only devices connected to this worker are served, so a stale
+        directory entry can never bounce a request between workers.
+        """
+        device_id = request["device_id"]
+        if device_id not in self._channels:
+            raise ValueError(f"Device {device_id} is not connected")
+        return await self.send_skill_request(
+            device_id,
+            request["skill_name"],
+            request["method_name"],
+            request.get("args") or [],
+            request.get("kwargs") or {},
+            timeout=request.get("timeout", 30.0),
+        )
 
-    async def handle_skill_response(self, response: dict):
+    async def _send_cancel(self, device_id: str, request_id: str) -> None:
+        """Tell a device to stop working on a request nobody is waiting for."""
+        channel = self._channels.get(device_id)
+        if channel is None:
+            return
+        try:
+            await channel.send({"type": "cancel", "request_id": request_id})
+        except Exception as e:
+            logger.debug(f"Could not send cancel for {request_id}: {e}")
+
+    async def handle_skill_response(self, response: dict, device_id: str | None = None):
         """Handle a skill response from a device.
 
         Args:
             response: Response message with request_id, success, result/error
+            device_id: Device the response arrived from. Restricts the lookup
+                to that device's requests; when omitted every connected
+                device is checked.
         """
         request_id = response.get("request_id")
         if not request_id:
             logger.warning("Received skill response without request_id")
             return
 
-        async with self._lock:
-            future = self._pending_requests.get(request_id)
-            if not future:
-                logger.warning(f"Received response for unknown request {request_id}")
-                return
+        channel = self._find_channel(request_id, device_id)
+        if not channel:
+            logger.warning(f"Received response for unknown request {request_id}")
+            return
 
-            if future.done():
-                logger.debug(
-                    f"Received response for already-completed request {request_id}"
-                )
-                return
+        future = channel.pending[request_id]
+        stream = channel.streams.pop(request_id, None)
+        tracer.record_device_timing(response.get("span_id"), response.get("timing"))
+        if future.done():
+            logger.debug(
+                f"Received response for already-completed request {request_id}"
+            )
+            return
 
-            # Resolve the future
-            if response.get("success"):
-                future.set_result(response.get("result"))
+        # Resolve the future
+        if not response.get("success"):
+            error = response.get("error", "Unknown error")
+            future.set_exception(RuntimeError(error))
+        elif "chunks" in response:
+            # Result was streamed ahead in skill_response_chunk frames
+            stream = stream or _ResultStream()
+            if stream.next_seq != response["chunks"]:
+                future.set_exception(
+                    RuntimeError(
+                        f"Skill result incomplete: got {stream.next_seq} of "
+                        f"{response['chunks']} chunks"
+                    )
+                )
             else:
-                error = response.get("error", "Unknown error")
-                future.set_exception(RuntimeError(error))
+                future.set_result("".join(stream.parts))
+        else:
+            future.set_result(response.get("result"))
+
+    async def handle_skill_response_chunk(self, chunk: dict, device_id: str) -> None:
+        """Buffer one piece of a skill result streamed by a device.
+
+        Chunks must arrive in ``seq`` order and the result may not grow past
+        ``skill_result_max_bytes``. Otherwise the request fails right away
+        and the device is told to stop producing it.
+
+        Args:
+            chunk: Chunk message with request_id, seq and data
+            device_id: Device the chunk arrived from
+        """
+        request_id = chunk.get("request_id")
+        channel = self._find_channel(request_id, device_id) if request_id else None
+        if not channel or channel.pending[request_id].done():
+            # Late chunks of a request that already failed or timed out
+            logger.debug(f"Dropped result chunk for inactive request {request_id}")
+            return
+
+        stream = channel.streams.setdefault(request_id, _ResultStream())
+        try:
+            stream.add(
+                chunk.get("seq"), chunk.get("data"), settings.skill_result_max_bytes
+            )
+        except ValueError as e:
+            logger.warning(f"Aborting skill request {request_id}: {e}")
+            channel.streams.pop(request_id, None)
+            channel.pending[request_id].set_exception(RuntimeError(str(e)))
+            await self._send_cancel(device_id, request_id)
+
+    def _find_channel(
+        self,
+        request_id: str,
+        device_id: str | None,
+    ) -> _DeviceChannel | None:
+        """Look up the channel a request is pending on."""
+        if device_id is not None:
+            channel = self._channels.get(device_id)
+            return channel if channel and request_id in channel.pending else None
+        for channel in self._channels.values():
+            if request_id in channel.pending:
+                return channel
+        return None
+
+    def pending_count(self, device_id: str | None = None) -> int:
+        """Number of in-flight skill requests (for one device or overall)."""
+        if device_id is not None:
+            channel = self._channels.get(device_id)
+            return len(channel.pending) if channel else 0
+        return sum(len(c.pending) for c in self._channels.values())
 
     def get_connected_devices(self) -> list[str]:
-        """Get list of currently connected device IDs.
+        """Get list of currently connected device IDs (on any worker).
 
         Returns:
             List of device IDs
         """
-        return list(self._connections.keys())
+        remote = [d for d in self.cluster.remote_devices() if d not in self._channels]
+        return list(self._channels.keys()) + remote
 
     async def shutdown(self) -> None:
         """Gracefully shutdown all connections and cancel pending requests.
@@ -213,21 +457,22 @@ class ConnectionManager:
         """
         logger.info("Shutting down WebSocket connection manager...")
 
-        # Cancel all pending futures
-        for request_id, future in list(self._pending_requests.items()):
-            if not future.done():
-                future.cancel()
-        self._pending_requests.clear()
-        self._request_device_ids.clear()
+        channels = list(self._channels.items())
+        self._channels.clear()
+
+        for device_id, channel in channels:
+            # Cancel pending futures
+            for future in channel.pending.values():
+                if not future.done():
+                    future.cancel()
+            channel.pending.clear()
 
-        # Close all WebSocket connections
-        for device_id, websocket in list(self._connections.items()):
+            # Close the WebSocket connection
             try:
-                await websocket.close(code=1001, reason="Server shutdown")
+                await channel.websocket.close(code=1001, reason="Server shutdown")
                 logger.debug(f"Closed WebSocket for device {device_id}")
             except Exception as e:
                 logger.debug(f"Error closing WebSocket for {device_id}: {e}")
-        self._connections.clear()
 
         logger.info("WebSocket connection manager shutdown complete")
 
@@ -331,6 +576,35 @@ async def get_device_from_token(
         raise HTTPException(status_code=401, detail="Authentication failed")
 
 
+async def _handle_device_message(
+    message: Dict[str, Any],
+    device: Device,
+    websocket: WebSocket,
+    codec: WireCodec,
+    manager: ConnectionManager,
+) -> None:
+    """Handle one decoded message received from a device."""
+    msg_type = message.get("type")
+
+    if msg_type == "skill_response":
+        # Response to a skill execution request
+        await manager.handle_skill_response(message, device_id=device.id)
+
+    elif msg_type == "skill_response_chunk":
+        # Piece of a skill result streamed ahead of its skill_response
+        await manager.handle_skill_response_chunk(message, device.id)
+
+    elif msg_type == "ping":
+        # Heartbeat ping; refreshes presence at most once per interval
+        await codec.send(websocket, {"type": "pong"})
+        await presence.heartbeat(
+            device, min_interval=settings.presence_write_interval_seconds
+        )
+
+    else:
+        logger.warning(f"Unknown message type from {device.id}: {msg_type}")
+
+
 @router.websocket("/device")
 async def websocket_device_endpoint(
     websocket: WebSocket,
@@ -348,7 +622,8 @@ async def websocket_device_endpoint(
         token: JWT authentication token
         device_id: Optional Hub-assigned device ID (overrides JWT device).
             Used when multiple Spokes share one auth token.
-        protocol_version: Optional wire protocol version (e.g., v1).
+        protocol_version: Optional wire protocol version. ``v2`` switches
+            the connection to binary msgpack frames (see hub.wire).
     """
     # Validate wire protocol version when provided.
     try:
@@ -387,32 +662,27 @@ async def websocket_device_endpoint(
 
     # Accept connection
     await websocket.accept()
+    codec = get_codec(version)
 
     # Register connection
-    await manager.connect(device.id, websocket)
+    await manager.connect(device.id, websocket, codec)
+    device_directory.invalidate_candidates(device.user_id)
 
-    # Update last_seen
+    # Update last_seen and mark the device's skills live
     device.last_seen = datetime.now(timezone.utc)
     await db.commit()
+    await presence.heartbeat(device, device.last_seen)
+    await _restore_indexed_skills(db, device)
 
     try:
         # Listen for messages
         while True:
-            message = await websocket.receive_json()
-
-            # Handle different message types
-            msg_type = message.get("type")
-
-            if msg_type == "skill_response":
-                # Response to a skill execution request
-                await manager.handle_skill_response(message)
-
-            elif msg_type == "ping":
-                # Heartbeat ping
-                await websocket.send_json({"type": "pong"})
-
-            else:
-                logger.warning(f"Unknown message type from {device.id}: {msg_type}")
+            try:
+                message = await receive_message(websocket)
+            except WireError as e:
+                logger.warning(f"Dropped malformed frame from {device.id}: {e}")
+                continue
+            await _handle_device_message(message, device, websocket, codec, manager)
 
     except WebSocketDisconnect:
         logger.info(f"Device {device.id} disconnected")
@@ -421,12 +691,31 @@ async def websocket_device_endpoint(
         logger.error(f"WebSocket error for device {device.id}: {e}")
 
     finally:
-        # Unregister connection
-        await manager.disconnect(device.id)
-
-        # Remove stale skills — the Spoke re-registers them on reconnect.
-        try:
-            await db.execute(delete(Skill).where(Skill.device_id == device.id))
-            await db.commit()
-        except Exception:
-            logger.exception("Failed to clean up skills for device %s", device.id)
+        # Unregister connection and hide the device's skills. Skill rows are
+        # kept so an unchanged manifest re-registers with a single
+        # /skills/sync round trip.
+        await manager.disconnect(device.id, websocket)
+        device_directory.invalidate_candidates(device.user_id)
+        if not manager.is_connected(device.id):
+            # The endpoint may be unwinding from a cancellation; finish the
+            # write instead of abandoning it halfway.
+            with anyio.CancelScope(shield=True):
+                try:
+                    await presence.drop(db, device)
+                    await db.commit()
+                    await notify_skills_changed(
+                        device.user_id, device.id, kind="device_offline"
+                    )
+                except Exception:
+                    logger.exception("Failed to mark device %s offline", device.id)
+
+
+async def _restore_indexed_skills(db: AsyncSession, device: Device) -> None:
+    """Make a reconnecting device's skill rows searchable again."""
+    if skill_index.is_loaded(device.user_id) and not skill_index.has_device(
+        device.user_id, device.id
+    ):
+        result = await db.execute(select(Skill).where(Skill.device_id == device.id))
+        skill_index.replace_device(device.user_id, device.id, result.scalars().all())
+    # Other workers dropped the device from their indexes on disconnect.
+    await notify_skills_changed(device.user_id, device.id)
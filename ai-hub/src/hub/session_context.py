@@ -0,0 +1,143 @@
+"""In-memory LRU of recent session histories for incremental chat.
+
+A chat request may carry ``context_version`` alongside ``session_id``.
+``messages`` then holds only the turns added since that version, and the
+Hub rebuilds the earlier conversation from the ``messages`` table. This
+module keeps the most recently used histories in memory so a busy voice
+session does not re-read its whole history on every utterance.
+
+A session's version is its ``message_count``, which the Hub bumps on every
+persisted message. An entry is only served when its version matches the
+session row loaded for the request, so messages written by another worker
+(or through the sessions API) make the entry reload from the DB instead
+of serving a stale history.
+
+Like the skill index, all methods run on the event loop, so no locking is
+needed.
+"""
+
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from .config import settings
+from .database import Message, Session
+
+logger = logging.getLogger(__name__)
+
+# Runs a statement on the caller's session (e.g. ``db.execute``).
+Execute = Callable[[Any], Awaitable[Any]]
+
+# (role, content)
+ContextMessage = Tuple[str, str]
+
+
+@dataclass
+class SessionContext:
+    """Persisted messages of one session at a given version."""
+
+    version: int
+    messages: List[ContextMessage] = field(default_factory=list)
+
+
+@dataclass
+class ContextStats:
+    """Session context cache counters."""
+
+    hits: int = 0
+    loads: int = 0
+    appends: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class SessionContextCache:
+    """Bounded LRU of session histories keyed by session ID."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self.stats = ContextStats()
+
+    @property
+    def max_entries(self) -> int:
+        """Capacity (0 disables the cache; histories are always loaded)."""
+        if self._max_entries is not None:
+            return self._max_entries
+        return settings.session_context_max_entries
+
+    async def load(self, session: Session, execute: Execute) -> List[ContextMessage]:
+        """Return the session's persisted messages, oldest first.
+
+        Args:
+            session: Session row loaded for the current request.
+            execute: Runs a statement on the caller's DB session.
+        """
+        entry = self._entries.get(session.id)
+        if entry is not None and entry.version == session.message_count:
+            self._entries.move_to_end(session.id)
+            self.stats.hits += 1
+            return list(entry.messages)
+
+        result = await execute(
+            select(Message.role, Message.content)
+            .where(Message.session_id == session.id)
+            .order_by(Message.created_at, Message.id)
+        )
+        messages = [(role, content) for role, content in result.all()]
+        self.stats.loads += 1
+        self._store(session.id, SessionContext(session.message_count, messages))
+        return list(messages)
+
+    def append(self, session_id: str, role: str, content: str, version: int) -> None:
+        """Record a message just persisted as ``version`` of the session.
+
+        An entry that is not exactly one version behind missed a write
+        elsewhere and is dropped, so the next load re-reads the DB.
+        """
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        if entry.version != version - 1:
+            self.invalidate(session_id)
+            return
+        entry.messages.append((role, content))
+        entry.version = version
+        self.stats.appends += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session after it was deleted or changed outside the chat path."""
+        if self._entries.pop(session_id, None) is not None:
+            self.stats.invalidations += 1
+            logger.debug("Session context dropped session %s", session_id)
+
+    def _store(self, session_id: str, entry: SessionContext) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all sessions and counters (used by tests)."""
+        self._entries.clear()
+        self.stats = ContextStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters, size and capacity."""
+        data = asdict(self.stats)
+        data["sessions"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        return data
+
+
+# Global session context cache instance
+session_context = SessionContextCache()
@@ -0,0 +1,336 @@
+"""Write-behind queue for session messages.
+
+Every chat turn used to commit the user message and the assistant message
+separately, each followed by its own ``Session`` metadata update. With
+SQLite that is several fsyncs per turn on the request path. Messages are
+now queued here and written by a short-lived background task, after
+``session_write_delay_seconds``, in a single transaction. That transaction
+holds every queued insert plus one ``message_count``/``last_activity``/
+``title`` update per session.
+
+Read-your-writes: the in-memory ``Session`` row of the writing request is
+updated immediately, without marking it dirty. The session endpoints and
+the chat session lookup call :meth:`SessionMessageWriter.flush` before
+reading, so a reader in this worker always sees queued messages. Other
+workers see them once the batch commits (a few milliseconds later).
+
+When a batch fails, each session's messages are retried in their own
+transaction, so one bad row (e.g. for a session deleted mid-turn) does
+not hold back other sessions. Messages that still fail are put back and
+retried on a timer, and dropped with an error log after
+``MAX_WRITE_ATTEMPTS`` failures.
+
+The queue is flushed on shutdown. Like the skill index, all methods run
+on the event loop, so no locking beyond the flush lock is needed.
+"""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .config import settings
+from .database import Message, Session, get_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingMessage:
+    """A queued message; ``id`` is set once its batch has committed."""
+
+    session_id: str
+    role: str
+    content: str
+    created_at: datetime
+    title: Optional[str] = None
+    id: Optional[int] = None
+    attempts: int = 0
+
+
+@dataclass
+class WriterStats:
+    """Write-behind queue counters."""
+
+    queued: int = 0
+    written: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    read_flushes: int = 0
+    errors: int = 0
+    dropped: int = 0
+
+
+class SessionMessageWriter:
+    """Batches session message inserts and metadata updates."""
+
+    # Failed writes per message before it is dropped.
+    MAX_WRITE_ATTEMPTS = 3
+    # Minimum wait before retrying messages whose write failed.
+    RETRY_DELAY_SECONDS = 1.0
+
+    def __init__(
+        self,
+        delay_seconds: Optional[float] = None,
+        max_batch: Optional[int] = None,
+    ) -> None:
+        self._delay_seconds = delay_seconds
+        self._max_batch = max_batch
+        self._pending: List[PendingMessage] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = WriterStats()
+
+    @property
+    def delay_seconds(self) -> float:
+        """How long messages wait for company (0 writes on every append)."""
+        if self._delay_seconds is not None:
+            return self._delay_seconds
+        return settings.session_write_delay_seconds
+
+    @property
+    def max_batch(self) -> int:
+        """Queue length that triggers a write without waiting for the delay."""
+        if self._max_batch is not None:
+            return self._max_batch
+        return settings.session_write_max_batch
+
+    async def append(
+        self,
+        session: Session,
+        role: str,
+        content: str,
+        now: Optional[datetime] = None,
+    ) -> PendingMessage:
+        """Queue a message and update the session's cached metadata.
+
+        ``session`` is updated in memory (message_count, last_activity and,
+        for the first user message, title) without being marked dirty, so
+        the caller's DB session never writes those columns itself.
+
+        Args:
+            session: Session row loaded for the current request.
+            role: Message role.
+            content: Message text.
+            now: Timestamp to record (defaults to now).
+
+        Returns:
+            The queued message.
+        """
+        now = now or datetime.now(timezone.utc)
+        title = None
+        if session.title is None and role == "user":
+            title = content[:50] + ("..." if len(content) > 50 else "")
+            set_committed_value(session, "title", title)
+        set_committed_value(session, "message_count", session.message_count + 1)
+        set_committed_value(session, "last_activity", now)
+
+        pending = PendingMessage(
+            session_id=session.id,
+            role=role,
+            content=content,
+            created_at=now,
+            title=title,
+        )
+        self._pending.append(pending)
+        self.stats.queued += 1
+
+        if self.delay_seconds <= 0 or len(self._pending) >= self.max_batch:
+            await self.flush()
+        else:
+            self._schedule(self.delay_seconds)
+        return pending
+
+    def discard(self, session: Session, pending: PendingMessage) -> None:
+        """Take an unwritten message back out of the queue.
+
+        Used when the caller reports the write as failed, so a retry from
+        the client cannot store the message twice. Reverts the in-memory
+        metadata ``append`` applied to ``session``.
+        """
+        if pending.id is not None:
+            return
+        self._pending = [p for p in self._pending if p is not pending]
+        set_committed_value(session, "message_count", session.message_count - 1)
+        if pending.title is not None and session.title == pending.title:
+            set_committed_value(session, "title", None)
+
+    def has_pending(self, session_id: Optional[str] = None) -> bool:
+        """Whether messages (of one session, or of any) are still queued."""
+        if session_id is None:
+            return bool(self._pending)
+        return any(p.session_id == session_id for p in self._pending)
+
+    async def flush_for_read(self, session_id: Optional[str] = None) -> None:
+        """Write queued messages before a session read, if there are any.
+
+        Also waits for a batch that is being written, since its messages
+        have already left the queue but are not committed yet.
+        """
+        if self.has_pending(session_id) or self._lock.locked():
+            self.stats.read_flushes += 1
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write every queued message, in one transaction when possible.
+
+        Does not raise: messages whose write failed stay queued for a
+        retry (see ``MAX_WRITE_ATTEMPTS``) and keep ``id`` unset.
+        """
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                await self._write(batch)
+            except Exception:
+                self.stats.errors += 1
+                logger.exception(
+                    "Writing %d queued session messages failed; retrying per session",
+                    len(batch),
+                )
+                failed = await self._write_per_session(batch)
+            else:
+                failed = []
+                self._record_batch(batch)
+            retry = self._requeue(failed)
+        if retry:
+            self._schedule(max(self.delay_seconds, self.RETRY_DELAY_SECONDS))
+
+    async def _write_per_session(
+        self, batch: List[PendingMessage]
+    ) -> List[PendingMessage]:
+        """Write each session's messages on their own; return those that failed."""
+        per_session: Dict[str, List[PendingMessage]] = {}
+        for pending in batch:
+            per_session.setdefault(pending.session_id, []).append(pending)
+
+        failed: List[PendingMessage] = []
+        for session_id, messages in per_session.items():
+            try:
+                await self._write(messages)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(
+                    "Writing %d messages for session %s failed: %s",
+                    len(messages),
+                    session_id,
+                    e,
+                )
+                failed.extend(messages)
+            else:
+                self._record_batch(messages)
+        return failed
+
+    def _requeue(self, failed: List[PendingMessage]) -> bool:
+        """Put failed messages back in front of the queue, dropping exhausted ones.
+
+        Returns:
+            Whether any message was put back.
+        """
+        retry = []
+        for pending in failed:
+            pending.attempts += 1
+            if pending.attempts < self.MAX_WRITE_ATTEMPTS:
+                retry.append(pending)
+                continue
+            self.stats.dropped += 1
+            logger.error(
+                "Dropping %s message for session %s after %d failed writes",
+                pending.role,
+                pending.session_id,
+                pending.attempts,
+            )
+        self._pending[:0] = retry
+        return bool(retry)
+
+    def _record_batch(self, batch: List[PendingMessage]) -> None:
+        self.stats.batches += 1
+        self.stats.written += len(batch)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+
+    async def _write(self, batch: List[PendingMessage]) -> None:
+        rows = [
+            Message(
+                session_id=p.session_id,
+                role=p.role,
+                content=p.content,
+                created_at=p.created_at,
+            )
+            for p in batch
+        ]
+        per_session: Dict[str, List[PendingMessage]] = {}
+        for pending in batch:
+            per_session.setdefault(pending.session_id, []).append(pending)
+
+        factory = get_session_factory()
+        async with factory() as db:
+            db.add_all(rows)
+            for session_id, messages in per_session.items():
+                values: Dict[str, Any] = {
+                    "message_count": Session.message_count + len(messages),
+                    "last_activity": messages[-1].created_at,
+                }
+                title = next((m.title for m in messages if m.title), None)
+                if title is not None:
+                    values["title"] = func.coalesce(Session.title, title)
+                await db.execute(
+                    update(Session).where(Session.id == session_id).values(**values)
+                )
+            await db.commit()
+
+        for pending, row in zip(batch, rows):
+            pending.id = row.id
+
+    def _schedule(self, delay: float) -> None:
+        """Start the flush timer unless one is already waiting."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # Let flush() start a new timer if it has to retry.
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Writing queued session messages failed")
+
+    async def close(self) -> None:
+        """Cancel the pending timer and write what is queued (on shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        if self._task is not None:
+            # No retries after shutdown; failed messages are logged above.
+            self._task.cancel()
+            self._task = None
+
+    def clear(self) -> None:
+        """Drop queued messages and counters (used by tests)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._pending.clear()
+        self._lock = asyncio.Lock()
+        self.stats = WriterStats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counters and queue length."""
+        data = asdict(self.stats)
+        data["pending"] = len(self._pending)
+        data["delay_seconds"] = self.delay_seconds
+        return data
+
+
+# Global session message writer instance
+session_writer = SessionMessageWriter()
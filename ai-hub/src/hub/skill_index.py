@@ -0,0 +1,432 @@
+"""In-memory inverted index for skill search.
+
+The Hub answers ``search_skills`` on every LLM tool call. Scanning every
+``Skill`` row and doing substring checks grows linearly with the registry,
+so this module keeps a per-user inverted index that is updated
+incrementally as devices register, are deleted, or expire from presence.
+
+Ranking uses Okapi BM25 over the method name, class name and docstring.
+Tokenization mirrors the Spoke's ``_tokenize_to_words`` (camelCase and
+underscore aware) so online and offline search behave the same way.
+
+The index is a cache, not the source of truth: a user's index is hydrated
+from the ``skills`` table on first use, and mutations for users that have
+not been hydrated yet are ignored (the next hydration will pick them up).
+"""
+
+import bisect
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# BM25 tuning constants (standard defaults).
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Query terms shorter than this only match whole tokens. Longer terms also
+# match tokens they are a prefix of ("weath" -> "weather").
+MIN_PREFIX_LENGTH = 3
+
+# Common English stop words stripped from queries. Kept in sync with the
+# Spoke's ``_SEARCH_STOP_WORDS``: action words like "on"/"off"/"set" are
+# deliberately absent because smart-home skills depend on them.
+_SEARCH_STOP_WORDS = frozenset(
+    {
+        "a",
+        "an",
+        "the",
+        "is",
+        "to",
+        "for",
+        "of",
+        "in",
+        "it",
+        "and",
+        "or",
+        "my",
+        "me",
+        "i",
+        "do",
+        "can",
+        "you",
+        "please",
+        "what",
+        "how",
+    }
+)
+
+# Regex to split camelCase / PascalCase into separate words.
+# "HassTurnOn" -> ["Hass", "Turn", "On"]
+_CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize text into lowercase word tokens (with repeats).
+
+    Handles camelCase splitting (HassTurnOn -> hass, turn, on),
+    underscores and general punctuation, matching the Spoke tokenizer.
+
+    Args:
+        text: Raw searchable text (names, docstrings).
+
+    Returns:
+        List of lowercase tokens in document order.
+    """
+    expanded = _CAMEL_RE.sub(" ", text or "")
+    return [t for t in re.split(r"[^a-zA-Z0-9]+", expanded.lower()) if t]
+
+
+def parse_query(query: str) -> List[str]:
+    """Parse a search query into unique terms, stripping stop words.
+
+    Args:
+        query: Raw user/model query.
+
+    Returns:
+        Ordered list of unique query terms.
+    """
+    raw_terms = list(dict.fromkeys(tokenize(query)))
+    terms = [t for t in raw_terms if t not in _SEARCH_STOP_WORDS]
+    # Fall back to the original terms if stop-word stripping removed everything
+    return terms or raw_terms
+
+
+@dataclass(frozen=True)
+class IndexedSkill:
+    """A single skill method registered by one device."""
+
+    device_id: str
+    class_name: str
+    function_name: str
+    signature: str
+    docstring: Optional[str] = None
+    device_agnostic: bool = False
+    cache_ttl_seconds: int = 0
+
+    @classmethod
+    def from_row(cls, device_id: str, row: Any) -> "IndexedSkill":
+        """Build from a ``Skill`` ORM row or a ``SkillInfo``-like object."""
+        return cls(
+            device_id=device_id,
+            class_name=row.class_name,
+            function_name=row.function_name,
+            signature=row.signature,
+            docstring=row.docstring,
+            device_agnostic=bool(row.device_agnostic),
+            cache_ttl_seconds=getattr(row, "cache_ttl_seconds", None) or 0,
+        )
+
+
+@dataclass
+class _UserIndex:
+    """Inverted index for one user's skills."""
+
+    docs: Dict[int, IndexedSkill] = field(default_factory=dict)
+    term_freqs: Dict[int, Dict[str, int]] = field(default_factory=dict)
+    doc_lengths: Dict[int, int] = field(default_factory=dict)
+    postings: Dict[str, set[int]] = field(default_factory=dict)
+    device_docs: Dict[str, set[int]] = field(default_factory=dict)
+    # Devices whose skills changed on another worker; reloaded on next use.
+    stale: set[str] = field(default_factory=set)
+    total_length: int = 0
+    next_doc_id: int = 0
+    loaded: bool = False
+    # Sorted vocabulary for prefix lookups; rebuilt lazily after mutations.
+    _vocab: Optional[List[str]] = None
+
+    def add(self, skill: IndexedSkill) -> None:
+        """Index one skill document."""
+        doc_id = self.next_doc_id
+        self.next_doc_id += 1
+
+        tokens = tokenize(
+            f"{skill.function_name} {skill.class_name} {skill.docstring or ''}"
+        )
+        freqs: Dict[str, int] = {}
+        for token in tokens:
+            freqs[token] = freqs.get(token, 0) + 1
+
+        self.docs[doc_id] = skill
+        self.term_freqs[doc_id] = freqs
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        for token in freqs:
+            if token not in self.postings:
+                self._vocab = None
+                self.postings[token] = set()
+            self.postings[token].add(doc_id)
+        self.device_docs.setdefault(skill.device_id, set()).add(doc_id)
+
+    def remove_device(self, device_id: str) -> int:
+        """Drop every document owned by a device.
+
+        Returns:
+            Number of documents removed.
+        """
+        doc_ids = self.device_docs.pop(device_id, set())
+        for doc_id in doc_ids:
+            self.docs.pop(doc_id, None)
+            self.total_length -= self.doc_lengths.pop(doc_id, 0)
+            for token in self.term_freqs.pop(doc_id, {}):
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[token]
+                    self._vocab = None
+        return len(doc_ids)
+
+    def matching_docs(self, term: str) -> set[int]:
+        """Return doc ids whose tokens equal or start with ``term``."""
+        if len(term) < MIN_PREFIX_LENGTH:
+            return set(self.postings.get(term, ()))
+
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        matched: set[int] = set()
+        position = bisect.bisect_left(self._vocab, term)
+        while position < len(self._vocab) and self._vocab[position].startswith(term):
+            matched |= self.postings[self._vocab[position]]
+            position += 1
+        return matched
+
+    def term_frequency(self, doc_id: int, term: str) -> int:
+        """Sum frequencies of tokens in a doc that match ``term``."""
+        freqs = self.term_freqs[doc_id]
+        if len(term) < MIN_PREFIX_LENGTH:
+            return freqs.get(term, 0)
+        return sum(tf for token, tf in freqs.items() if token.startswith(term))
+
+
+class SkillIndex:
+    """Process-wide, per-user inverted index over registered skills.
+
+    All methods are synchronous and never await, so they are safe to call
+    from any coroutine on the Hub's event loop without extra locking.
+    """
+
+    def __init__(self) -> None:
+        self._users: Dict[str, _UserIndex] = {}
+        # Bumped on every mutation so hydration can detect concurrent writes.
+        self._generations: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Hydration
+    # ------------------------------------------------------------------
+
+    def is_loaded(self, user_id: str) -> bool:
+        """Whether the user's index has been hydrated from the database."""
+        index = self._users.get(user_id)
+        return bool(index and index.loaded)
+
+    def generation(self, user_id: str) -> int:
+        """Return the mutation counter for a user."""
+        return self._generations.get(user_id, 0)
+
+    def load_user(
+        self,
+        user_id: str,
+        skills: Iterable[Any],
+        generation: int,
+    ) -> None:
+        """Replace a user's index with rows loaded from the database.
+
+        If the user's index was mutated after ``generation`` was read (for
+        example a device registered while the query was in flight), the
+        loaded data is still used for the current search but the user is
+        not marked as loaded, so the next search re-hydrates.
+
+        Args:
+            user_id: Owner of the skills.
+            skills: ``Skill`` rows of live (present) devices.
+            generation: Value of :meth:`generation` read before the query.
+        """
+        index = _UserIndex()
+        for row in skills:
+            index.add(IndexedSkill.from_row(row.device_id, row))
+
+        index.loaded = self.generation(user_id) == generation
+        self._users[user_id] = index
+        logger.debug(
+            "Hydrated skill index for user %s (%d skills, loaded=%s)",
+            user_id,
+            len(index.docs),
+            index.loaded,
+        )
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _mutable(self, user_id: str) -> Optional[_UserIndex]:
+        """Bump the generation and return the index if it is hydrated."""
+        self._generations[user_id] = self.generation(user_id) + 1
+        index = self._users.get(user_id)
+        if index is None or not index.loaded:
+            return None
+        return index
+
+    def replace_device(
+        self,
+        user_id: str,
+        device_id: str,
+        skills: Iterable[Any],
+    ) -> None:
+        """Replace all skills for a device (called on registration).
+
+        Args:
+            user_id: Owner of the device.
+            device_id: Device whose skills changed.
+            skills: Objects exposing the ``SkillInfo`` fields.
+        """
+        index = self._mutable(user_id)
+        if index is None:
+            return
+        index.remove_device(device_id)
+        index.stale.discard(device_id)
+        for skill in skills:
+            index.add(IndexedSkill.from_row(device_id, skill))
+
+    def has_device(self, user_id: str, device_id: str) -> bool:
+        """Whether a hydrated user index currently holds a device."""
+        index = self._users.get(user_id)
+        return bool(index and index.loaded and device_id in index.device_docs)
+
+    def remove_device(self, user_id: str, device_id: str) -> None:
+        """Drop a device's skills (presence expiry or deletion)."""
+        index = self._mutable(user_id)
+        if index is None:
+            return
+        removed = index.remove_device(device_id)
+        index.stale.discard(device_id)
+        if removed:
+            logger.debug(
+                "Removed %d indexed skills for device %s", removed, device_id
+            )
+
+    def mark_stale(self, user_id: str, device_id: str) -> None:
+        """Drop a device's skills until they are reloaded from the DB.
+
+        Used when another worker changed the device's skills: the rest of
+        the user's index stays valid, and :meth:`stale_devices` tells the
+        next search which device to reload.
+        """
+        index = self._mutable(user_id)
+        if index is None:
+            return
+        index.remove_device(device_id)
+        index.stale.add(device_id)
+
+    def stale_devices(self, user_id: str) -> List[str]:
+        """Return devices of a hydrated user index that need reloading."""
+        index = self._users.get(user_id)
+        if index is None or not index.loaded:
+            return []
+        return sorted(index.stale)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop a user's index entirely (forces re-hydration)."""
+        self._users.pop(user_id, None)
+        self._generations[user_id] = self.generation(user_id) + 1
+
+    def clear(self) -> None:
+        """Drop all indexed data (used by tests and shutdown)."""
+        self._users.clear()
+        self._generations.clear()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        device_ids: Optional[Iterable[str]] = None,
+    ) -> List[tuple[IndexedSkill, float]]:
+        """Search a user's skills and rank by BM25.
+
+        Documents must contain every query term; if nothing does, the
+        search falls back to documents matching any term. This keeps
+        "turn on" from matching everything via "on" while still letting
+        multi-concept queries find partial matches.
+
+        Args:
+            user_id: Owner of the skills.
+            query: Free-text query. Empty returns every skill unscored.
+            device_ids: Optional allow-list of device IDs.
+
+        Returns:
+            List of ``(skill, score)`` sorted by descending score.
+        """
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+
+        allowed = set(device_ids) if device_ids is not None else None
+
+        def _visible(doc_id: int) -> bool:
+            return allowed is None or index.docs[doc_id].device_id in allowed
+
+        terms = parse_query(query)
+        if not terms:
+            return [
+                (skill, 0.0)
+                for doc_id, skill in index.docs.items()
+                if _visible(doc_id)
+            ]
+
+        term_docs = {term: index.matching_docs(term) for term in terms}
+        candidates = set.intersection(*term_docs.values())
+        if not candidates:
+            candidates = set.union(*term_docs.values())
+        candidates = {d for d in candidates if _visible(d)}
+        if not candidates:
+            return []
+
+        doc_count = len(index.docs)
+        avg_length = index.total_length / doc_count if doc_count else 0.0
+        scored: List[tuple[IndexedSkill, float]] = []
+        for doc_id in candidates:
+            length_norm = BM25_K1 * (
+                1 - BM25_B + BM25_B * index.doc_lengths[doc_id] / (avg_length or 1.0)
+            )
+            score = 0.0
+            for term, docs in term_docs.items():
+                if doc_id not in docs:
+                    continue
+                tf = index.term_frequency(doc_id, term)
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                score += idf * tf * (BM25_K1 + 1) / (tf + length_norm)
+            scored.append((index.docs[doc_id], score))
+
+        scored.sort(key=lambda item: -item[1])
+        return scored
+
+    def find_method(
+        self,
+        user_id: str,
+        class_name: str,
+        function_name: str,
+        device_ids: Iterable[str],
+    ) -> List[IndexedSkill]:
+        """Return the indexed rows of one method on the given devices."""
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        return [
+            index.docs[doc_id]
+            for device_id in device_ids
+            for doc_id in index.device_docs.get(device_id, ())
+            if index.docs[doc_id].class_name == class_name
+            and index.docs[doc_id].function_name == function_name
+        ]
+
+
+# Global skill index instance
+skill_index = SkillIndex()
@@ -0,0 +1,152 @@
+"""Latency-aware routing for device-agnostic skills.
+
+Any present device may serve a device-agnostic skill, so the Hub keeps an
+exponentially weighted moving average (EWMA) of round-trip time and error
+rate per (device, skill) and routes to the fastest healthy device. A
+window of recent round-trip times gives a p95 estimate, which sets how
+long to wait on the first device before sending a hedged duplicate
+request to the next one.
+
+Stats are in-memory and per-process; a restarted Hub simply relearns them.
+"""
+
+import logging
+import math
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the moving averages.
+EWMA_ALPHA = 0.2
+
+# Devices whose recent error rate exceeds this are tried last.
+UNHEALTHY_ERROR_RATE = 0.5
+
+# Round-trip samples kept per (device, skill) for the p95 estimate.
+LATENCY_WINDOW = 50
+
+# Samples needed before the p95 estimate replaces the default hedge delay.
+MIN_SAMPLES_FOR_P95 = 5
+
+
+@dataclass
+class _RouteStats:
+    """Moving averages for one (device, skill) pair."""
+
+    rtt_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, rtt: float, ok: bool) -> None:
+        self.error_ewma += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_ewma)
+        if not ok:
+            return
+        self.samples.append(rtt)
+        if self.rtt_ewma is None:
+            self.rtt_ewma = rtt
+        else:
+            self.rtt_ewma += EWMA_ALPHA * (rtt - self.rtt_ewma)
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < MIN_SAMPLES_FOR_P95:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class SkillRouter:
+    """Tracks per-device skill latency and picks routing order."""
+
+    def __init__(self) -> None:
+        self._stats: Dict[Tuple[str, str], _RouteStats] = {}
+        self._counters: Counter = Counter()
+        self._routed: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, device_id: str, skill: str, rtt: float, ok: bool) -> None:
+        """Record the outcome of one request.
+
+        Args:
+            device_id: Device that served (or failed) the request.
+            skill: ``"SkillClass.method"``.
+            rtt: Round-trip time in seconds.
+            ok: Whether the device returned a result.
+        """
+        with self._lock:
+            stats = self._stats.setdefault((device_id, skill), _RouteStats())
+            stats.record(rtt, ok)
+
+    def rank(self, device_ids: Iterable[str], skill: str) -> List[str]:
+        """Order candidate devices, fastest healthy device first.
+
+        Devices without samples sort first so new devices get measured;
+        ties keep the caller's order (most recent heartbeat first).
+        """
+        with self._lock:
+
+            def key(device_id: str) -> Tuple[bool, float]:
+                stats = self._stats.get((device_id, skill))
+                if stats is None:
+                    return (False, 0.0)
+                unhealthy = stats.error_ewma > UNHEALTHY_ERROR_RATE
+                return (unhealthy, stats.rtt_ewma or 0.0)
+
+            return sorted(device_ids, key=key)
+
+    def hedge_delay(self, device_id: str, skill: str, default: float) -> float:
+        """Seconds to wait on ``device_id`` before hedging to another device.
+
+        Uses the device's p95 round-trip time once enough samples exist.
+        """
+        with self._lock:
+            stats = self._stats.get((device_id, skill))
+            p95 = stats.p95() if stats else None
+        return default if p95 is None else p95
+
+    def count(self, event: str, device_id: Optional[str] = None) -> None:
+        """Bump a routing counter (``routed`` counts per device)."""
+        with self._lock:
+            self._counters[event] += 1
+            if event == "routed" and device_id:
+                self._routed[device_id] += 1
+
+    def forget_device(self, device_id: str) -> None:
+        """Drop stats for a deleted device."""
+        with self._lock:
+            for key in [k for k in self._stats if k[0] == device_id]:
+                del self._stats[key]
+            self._routed.pop(device_id, None)
+
+    def clear(self) -> None:
+        """Drop all stats and counters (used by tests)."""
+        with self._lock:
+            self._stats.clear()
+            self._counters.clear()
+            self._routed.clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        """Return counters and per-route averages (times in seconds)."""
+        with self._lock:
+            routes = [
+                {
+                    "device_id": device_id,
+                    "skill": skill,
+                    "rtt_ewma": stats.rtt_ewma,
+                    "error_rate": stats.error_ewma,
+                    "p95": stats.p95(),
+                    "samples": len(stats.samples),
+                }
+                for (device_id, skill), stats in self._stats.items()
+            ]
+            return {
+                "counters": dict(self._counters),
+                "routed_by_device": dict(self._routed),
+                "routes": routes,
+            }
+
+
+# Global router instance
+skill_router = SkillRouter()
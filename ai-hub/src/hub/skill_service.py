@@ -8,22 +8,43 @@ This module provides:
 The `devices` object routes skill calls to target devices via WebSocket.
 """
 
+import asyncio
+import functools
 import json
 import logging
+import time
 import traceback
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .artifacts import artifact_store
 from .config import settings
-from .database import Device, Skill
+from .database import Device, DevicePresence, Skill
+from .device_directory import DeviceDirectory, DirectoryDevice, UserDevices
+from .device_directory import device_directory as global_device_directory
+from .metrics import cache_lookups_total, fallbacks_total, tool_seconds
+from .presence import presence
+from .result_cache import SkillResultCache, make_key, skill_result_cache
+from .skill_index import SkillIndex
+from .skill_index import skill_index as global_skill_index
+from .skill_routing import skill_router
+from .tracing import tracer
 from .utils import normalize_device_name
 
 logger = logging.getLogger(__name__)
 DEVICE_AGNOSTIC_KEY = "hub"
 
+# Errors after which a device-agnostic call moves on to the next device.
+_ROUTABLE_ERRORS = (TimeoutError, RuntimeError, ValueError, ConnectionError)
+
+# Tools reported under their own name in metrics; model-invented tool names
+# (dynamic skill calls) share one label.
+_BUILTIN_TOOLS = frozenset({"search_skills", "describe_function", "python_exec"})
+
 
 # Default system prompt for online mode (Hub executes tools).
 # Users can override this via the SYSTEM_PROMPT env var / settings.
@@ -94,8 +115,16 @@ You have exactly 3 tools and a set of python skills to help you execute tasks:
   final output. Avoid importing. Just use the default python functions.
 - Use the `devices` object for remote devices:
   - devices.<device>.<SkillClass>.<method>(...)
+- To run several skill calls at once (e.g. the same action on many
+  devices), add `.defer(...)` to each call instead of calling it, and pass
+  them to `devices.gather(...)`. The calls run concurrently and the
+  results come back as a list in the same order. Prefer this over a loop
+  for multi-device tasks.
 - print the final output, so the result is surfaced to you to summarize.
   Otherwise, you won't see a result.
+- Long tool results are truncated and stored as artifacts. To see more,
+  run print(read_artifact("<handle>", offset=<n>)) with the handle and
+  offset given in the truncation note.
 - Do NOT use offline-mode syntax like device.<SkillClass>.<method>(...) in online mode.
 
 ## Searching Tips
@@ -126,6 +155,13 @@ Documentation lookup:
      devices.<device>.Context7Skill
      .query_docs(libraryId='...', query='getting started'))")
 
+Several devices at once:
+- User: "Turn off the lights everywhere"
+  a) search_skills(query="lights off")
+  b) python_exec(code="print(devices.gather(
+     devices.<device1>.LightSkill.turn_off.defer(),
+     devices.<device2>.LightSkill.turn_off.defer()))")
+
 ## Rules
 
 1. Use python_exec to call skills - do NOT call skill methods directly as tools.
@@ -140,6 +176,21 @@ the most relevant and proceed unless you NEED clarification.
 """
 
 
+def _device_key(devices: Dict[str, DirectoryDevice], device_id: str) -> str:
+    """Return the model-facing key of ``device_id`` (or the ID itself)."""
+    return next(
+        (name for name, device in devices.items() if device.id == device_id),
+        device_id,
+    )
+
+
+def _live_skills():
+    """Select skill rows of devices that currently have presence."""
+    return select(Skill).join(
+        DevicePresence, Skill.device_id == DevicePresence.device_id
+    )
+
+
 class DevicesProxy:
     """Proxy object for accessing skills across all devices.
 
@@ -151,31 +202,49 @@ class DevicesProxy:
         db: AsyncSession,
         user_id: str,
         connection_manager: Any,
+        skill_index: Optional[SkillIndex] = None,
+        result_cache: Optional[SkillResultCache] = None,
+        device_directory: Optional[DeviceDirectory] = None,
     ):
         self._db = db
         self._user_id = user_id
         self._connection_manager = connection_manager
-        self._device_cache: Dict[str, Device] = {}
+        self._skill_index = skill_index or global_skill_index
+        self._result_cache = (
+            result_cache if result_cache is not None else skill_result_cache
+        )
+        self._device_directory = device_directory or global_device_directory
+        # One snapshot per proxy, so a request sees a consistent device set.
+        self._devices: Optional[UserDevices] = None
+        # Tool calls in one model step run concurrently but share this
+        # session, which does not allow concurrent operations.
+        self._db_lock = asyncio.Lock()
+
+    async def _execute(self, stmt: Any) -> Any:
+        """Execute a statement on the shared session, one at a time."""
+        async with self._db_lock:
+            return await self._db.execute(stmt)
+
+    async def _get_directory(self) -> UserDevices:
+        """Get the user's devices from the shared device directory."""
+        if self._devices is None:
+            self._devices = await self._device_directory.get(
+                self._user_id, self._execute
+            )
+        return self._devices
 
-    async def _get_user_devices(self) -> Dict[str, Device]:
+    async def _get_user_devices(self) -> Dict[str, DirectoryDevice]:
         """Get all active devices for the current user."""
-        if self._device_cache:
-            return self._device_cache
+        return (await self._get_directory()).active
 
-        result = await self._db.execute(
-            select(Device).where(
-                Device.user_id == self._user_id,
-                Device.is_active,
-            )
-        )
-        devices = result.scalars().all()
-        self._device_cache = {normalize_device_name(d.name): d for d in devices}
-        return self._device_cache
+    async def find_device(self, device_name: str) -> Optional[DirectoryDevice]:
+        """Resolve one of the user's devices (active or not) by name."""
+        return (await self._get_directory()).find(device_name)
 
     def _sort_group_devices(
         self,
         unique_devices: list[str],
-        devices: Dict[str, Device],
+        devices: Dict[str, DirectoryDevice],
         connected_device_ids: set[str],
     ) -> list[str]:
         """Sort group devices with connected ones first, then alphabetical."""
@@ -197,42 +266,59 @@ class DevicesProxy:
 
         return sorted(unique_devices, key=_sort_key)
 
+    async def _ensure_skill_index(self, devices: Dict[str, DirectoryDevice]) -> None:
+        """Hydrate the user's in-memory skill index from the DB if needed."""
+        if self._skill_index.is_loaded(self._user_id):
+            await self._reload_stale_devices()
+            return
+
+        generation = self._skill_index.generation(self._user_id)
+        result = await self._execute(
+            _live_skills().where(Skill.device_id.in_([d.id for d in devices.values()]))
+        )
+        self._skill_index.load_user(
+            self._user_id,
+            result.scalars().all(),
+            generation=generation,
+        )
+
+    async def _reload_stale_devices(self) -> None:
+        """Reload devices whose skills another worker changed."""
+        stale = self._skill_index.stale_devices(self._user_id)
+        if not stale:
+            return
+
+        generation = self._skill_index.generation(self._user_id)
+        result = await self._execute(_live_skills().where(Skill.device_id.in_(stale)))
+        rows: Dict[str, List[Skill]] = {device_id: [] for device_id in stale}
+        for row in result.scalars().all():
+            rows[row.device_id].append(row)
+        if self._skill_index.generation(self._user_id) != generation:
+            # Changed while the query ran; this search goes without them and
+            # the next one retries.
+            return
+        for device_id, skills in rows.items():
+            self._skill_index.replace_device(self._user_id, device_id, skills)
+
     async def search_skills(
         self,
         query: str = "",
         device_limit: int = 10,
     ) -> List[Dict[str, Any]]:
-        """Search for skills across all devices."""
+        """Search for skills across all devices.
+
+        Matches are served from the per-user inverted index and ranked by
+        BM25 relevance; identical methods on several devices are grouped
+        into one result.
+        """
         devices = await self._get_user_devices()
+        await self._ensure_skill_index(devices)
 
-        expiry_time = datetime.now(timezone.utc) - timedelta(
-            seconds=settings.skill_expiry_seconds
+        matches = self._skill_index.search(
+            self._user_id,
+            query,
+            device_ids=[d.id for d in devices.values()],
         )
-        result = await self._db.execute(
-            select(Skill)
-            .where(Skill.device_id.in_([d.id for d in devices.values()]))
-            .where(Skill.last_heartbeat > expiry_time)
-        )
-        skills = result.scalars().all()
-
-        # Filter by query — try all-words first for precision, then
-        # fall back to any-word matching if nothing is found.  This keeps
-        # "turn on" from matching everything via "on" while still allowing
-        # single-concept queries like "react documentation" to work.
-        if query:
-            query_words = query.lower().split()
-
-            def _matches(s: Skill, mode: str) -> bool:
-                searchable = (
-                    f"{s.function_name} {s.class_name} {s.docstring or ''}"
-                ).lower()
-                check = all if mode == "all" else any
-                return check(w in searchable for w in query_words)
-
-            filtered = [s for s in skills if _matches(s, "all")]
-            if not filtered:
-                filtered = [s for s in skills if _matches(s, "any")]
-            skills = filtered
 
         # Group by (class_name, function_name, signature)
         skill_groups: Dict[tuple, Dict] = {}
@@ -245,7 +331,7 @@ class DevicesProxy:
         if self._connection_manager:
             connected_device_ids = set(self._connection_manager.get_connected_devices())
 
-        for s in skills:
+        for s, score in matches:
             key = (s.class_name, s.function_name, s.signature)
             device_name = device_id_to_name.get(s.device_id, "unknown")
 
@@ -263,8 +349,10 @@ class DevicesProxy:
                     "devices": [],
                     "device_ids": [],
                     "device_agnostic": True,
+                    "score": score,
                 }
 
+            skill_groups[key]["score"] = max(skill_groups[key]["score"], score)
             skill_groups[key]["devices"].append(device_name)
             skill_groups[key]["device_ids"].append(s.device_id)
             skill_groups[key]["device_agnostic"] = (
@@ -275,7 +363,12 @@ class DevicesProxy:
         results = []
         max_devices = max(1, min(device_limit, 100))
 
-        for key, group in sorted(skill_groups.items(), key=lambda x: x[0][0]):
+        # Most relevant first; class/method name keeps ties deterministic.
+        ranked_groups = sorted(
+            skill_groups.items(),
+            key=lambda x: (-x[1]["score"], x[0][0], x[0][1]),
+        )
+        for key, group in ranked_groups:
             unique_devices = sorted(set(group["devices"]))
             is_device_agnostic = bool(group.get("device_agnostic", False))
 
@@ -338,21 +431,13 @@ class DevicesProxy:
         method_name = parts[1]
 
         devices = await self._get_user_devices()
-        expiry_time = datetime.now(timezone.utc) - timedelta(
-            seconds=settings.skill_expiry_seconds
-        )
-
-        result = await self._db.execute(
-            select(Skill)
-            .where(Skill.device_id.in_([d.id for d in devices.values()]))
-            .where(Skill.last_heartbeat > expiry_time)
-            .where(Skill.class_name == class_name)
-            .where(Skill.function_name == method_name)
+        await self._ensure_skill_index(devices)
+        instances = self._skill_index.find_method(
+            self._user_id, class_name, method_name, [d.id for d in devices.values()]
         )
-        skill = result.scalars().first()
-
-        if not skill:
+        if not instances:
             return f"Function not found: {path}"
+        skill = instances[0]
 
         # Format output
         output = f"def {skill.signature}:"
@@ -360,19 +445,11 @@ class DevicesProxy:
             output += f'\n    """{skill.docstring}"""'
 
         # Add device info
-        result = await self._db.execute(
-            select(Skill)
-            .where(Skill.device_id.in_([d.id for d in devices.values()]))
-            .where(Skill.last_heartbeat > expiry_time)
-            .where(Skill.class_name == class_name)
-            .where(Skill.function_name == method_name)
-        )
-        all_instances = result.scalars().all()
         device_id_to_name = {
             d.id: normalize_device_name(d.name) for d in devices.values()
         }
         device_names = sorted(
-            set(device_id_to_name.get(s.device_id, "unknown") for s in all_instances)
+            set(device_id_to_name.get(s.device_id, "unknown") for s in instances)
         )
 
         if device_names:
@@ -390,33 +467,92 @@ class DevicesProxy:
         args: List[Any],
         kwargs: Dict[str, Any],
     ) -> Any:
-        """Execute a skill on a specific device via WebSocket."""
+        """Execute a skill on a specific device via WebSocket.
+
+        Methods registered with ``cache_ttl_seconds`` are answered from the
+        result cache while fresh. Calling any other method of the same skill
+        on the same target drops that skill's cached results, since it may
+        have changed the state they describe.
+        """
         devices = await self._get_user_devices()
         normalized = normalize_device_name(device_name)
 
         if normalized == DEVICE_AGNOSTIC_KEY:
-            return await self._execute_device_agnostic_skill(
+            target = DEVICE_AGNOSTIC_KEY
+        else:
+            device = devices.get(normalized)
+            if not device:
+                available = ", ".join(sorted(devices.keys()))
+                raise ValueError(
+                    f"Device '{device_name}' not found."
+                    f" Available devices: {available or '(none)'}"
+                )
+            target = device.id
+
+        ttl = await self._cache_ttl(devices, target, skill_name, method_name)
+        key = make_key(self._user_id, target, skill_name, method_name, args, kwargs)
+        if ttl:
+            hit, cached = self._result_cache.get(key)
+            cache_lookups_total.inc("skill_result", "hit" if hit else "miss")
+            if hit:
+                return cached
+        else:
+            self._result_cache.invalidate(self._user_id, target, skill_name)
+
+        if target == DEVICE_AGNOSTIC_KEY:
+            result = await self._execute_device_agnostic_skill(
                 devices=devices,
                 skill_name=skill_name,
                 method_name=method_name,
                 args=args,
                 kwargs=kwargs,
             )
-
-        device = devices.get(normalized)
-        if not device:
-            available = ", ".join(sorted(devices.keys()))
-            raise ValueError(
-                f"Device '{device_name}' not found."
-                f" Available devices: {available or '(none)'}"
+        else:
+            result = await self._execute_on_device(
+                device_name, target, skill_name, method_name, args, kwargs
             )
 
-        if not self._connection_manager.is_connected(device.id):
+        if ttl:
+            self._result_cache.put(key, result, ttl)
+        return result
+
+    async def _cache_ttl(
+        self,
+        devices: Dict[str, DirectoryDevice],
+        target: str,
+        skill_name: str,
+        method_name: str,
+    ) -> int:
+        """Return how long results of a method may be cached (0 = never)."""
+        if self._result_cache.max_entries <= 0:
+            return 0
+        await self._ensure_skill_index(devices)
+
+        agnostic = target == DEVICE_AGNOSTIC_KEY
+        device_ids = [d.id for d in devices.values()] if agnostic else [target]
+        rows = self._skill_index.find_method(
+            self._user_id, skill_name, method_name, device_ids
+        )
+        if agnostic:
+            rows = [r for r in rows if r.device_agnostic]
+        return min((r.cache_ttl_seconds for r in rows), default=0)
+
+    async def _execute_on_device(
+        self,
+        device_name: str,
+        device_id: str,
+        skill_name: str,
+        method_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Send a skill call to one connected device."""
+        if not self._connection_manager.is_connected(device_id):
             raise ValueError(f"Device '{device_name}' is not currently connected")
 
         try:
             result = await self._connection_manager.send_skill_request(
-                device_id=device.id,
+                device_id=device_id,
                 skill_name=skill_name,
                 method_name=method_name,
                 args=args,
@@ -431,40 +567,21 @@ class DevicesProxy:
 
     async def _execute_device_agnostic_skill(
         self,
-        devices: Dict[str, Device],
+        devices: Dict[str, DirectoryDevice],
         skill_name: str,
         method_name: str,
         args: List[Any],
         kwargs: Dict[str, Any],
     ) -> Any:
-        """Execute a device-agnostic skill via heartbeat-prioritized fallback."""
-        expiry_time = datetime.now(timezone.utc) - timedelta(
-            seconds=settings.skill_expiry_seconds
-        )
-        result = await self._db.execute(
-            select(Skill)
-            .where(Skill.device_id.in_([d.id for d in devices.values()]))
-            .where(Skill.class_name == skill_name)
-            .where(Skill.function_name == method_name)
-            .where(Skill.device_agnostic.is_(True))
-            .where(Skill.last_heartbeat > expiry_time)
-            .order_by(Skill.last_heartbeat.desc())
+        """Execute a device-agnostic skill on the best connected device."""
+        candidate_device_ids = await self._agnostic_candidates(
+            devices, skill_name, method_name
         )
-        candidates = result.scalars().all()
-
-        if not candidates:
+        if not candidate_device_ids:
             raise ValueError(
                 f"Device-agnostic skill '{skill_name}.{method_name}' not found."
             )
 
-        candidate_device_ids: list[str] = []
-        seen: set[str] = set()
-        for skill in candidates:
-            if skill.device_id in seen:
-                continue
-            seen.add(skill.device_id)
-            candidate_device_ids.append(skill.device_id)
-
         connected = [
             d_id
             for d_id in candidate_device_ids
@@ -476,34 +593,139 @@ class DevicesProxy:
                 "no connected devices currently provide this skill."
             )
 
+        return await self._route_device_agnostic(
+            connected, devices, skill_name, method_name, args, kwargs
+        )
+
+    async def _agnostic_candidates(
+        self,
+        devices: Dict[str, DirectoryDevice],
+        skill_name: str,
+        method_name: str,
+    ) -> List[str]:
+        """Devices offering a device-agnostic skill, latest heartbeat first.
+
+        Read from the skill index; cached in the device directory until
+        live skills change.
+        """
+        cache = (await self._get_directory()).candidates
+        key = (skill_name, method_name)
+        if key in cache:
+            return cache[key]
+
+        await self._ensure_skill_index(devices)
+        rows = self._skill_index.find_method(
+            self._user_id, skill_name, method_name, [d.id for d in devices.values()]
+        )
+        device_ids = list(dict.fromkeys(r.device_id for r in rows if r.device_agnostic))
+        never = datetime.min.replace(tzinfo=timezone.utc)
+        cache[key] = sorted(
+            device_ids,
+            key=lambda d: presence.last_heartbeat(d) or never,
+            reverse=True,
+        )
+        return cache[key]
+
+    async def _route_device_agnostic(
+        self,
+        device_ids: list[str],
+        devices: Dict[str, DirectoryDevice],
+        skill_name: str,
+        method_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Send a device-agnostic call to the fastest healthy device.
+
+        Candidates are ordered by the router's latency/error averages. A
+        failed device falls through to the next one right away; with
+        hedging enabled, a duplicate request goes to the next device once
+        the first is slower than its p95, and the first answer wins.
+        """
+        skill = f"{skill_name}.{method_name}"
+        queue = skill_router.rank(device_ids, skill)
+        pending: Dict[asyncio.Task, str] = {}
+        hedge_device: Optional[str] = None
         errors: list[str] = []
-        for device_id in connected:
-            try:
-                return await self._connection_manager.send_skill_request(
-                    device_id=device_id,
-                    skill_name=skill_name,
-                    method_name=method_name,
-                    args=args,
-                    kwargs=kwargs,
-                    timeout=30.0,
+
+        def launch() -> str:
+            device_id = queue.pop(0)
+            task = asyncio.create_task(
+                self._timed_skill_request(
+                    device_id, skill_name, method_name, args, kwargs
                 )
-            except (TimeoutError, RuntimeError, ValueError) as exc:
-                device_key = next(
-                    (
-                        name
-                        for name, device in devices.items()
-                        if device.id == device_id
-                    ),
-                    device_id,
+            )
+            pending[task] = device_id
+            return device_id
+
+        primary = launch()
+        try:
+            while pending:
+                delay = None
+                if settings.skill_hedging_enabled and queue and hedge_device is None:
+                    delay = skill_router.hedge_delay(
+                        primary, skill, settings.skill_hedge_delay_seconds
+                    )
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
                 )
-                errors.append(f"{device_key}: {exc}")
-                continue
+                if not done:
+                    hedge_device = launch()
+                    skill_router.count("hedges_sent")
+                    continue
+
+                for task in done:
+                    device_id = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except _ROUTABLE_ERRORS as exc:
+                        errors.append(f"{_device_key(devices, device_id)}: {exc}")
+                        skill_router.count("failovers")
+                        fallbacks_total.inc("skill_device")
+                        continue
+                    skill_router.count("routed", device_id)
+                    if device_id == hedge_device:
+                        skill_router.count("hedge_wins")
+                    return result
+
+                if not pending and queue:
+                    primary = launch()
+        finally:
+            # Losing or abandoned attempts are cancelled (the device is told too).
+            for task in pending:
+                task.cancel()
 
         raise RuntimeError(
             f"All fallback devices failed for '{skill_name}.{method_name}'. "
             f"Attempts: {', '.join(errors)}"
         )
 
+    async def _timed_skill_request(
+        self,
+        device_id: str,
+        skill_name: str,
+        method_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Send one skill request and record its latency with the router."""
+        skill = f"{skill_name}.{method_name}"
+        start = time.perf_counter()
+        try:
+            result = await self._connection_manager.send_skill_request(
+                device_id=device_id,
+                skill_name=skill_name,
+                method_name=method_name,
+                args=args,
+                kwargs=kwargs,
+                timeout=30.0,
+            )
+        except _ROUTABLE_ERRORS:
+            skill_router.record(device_id, skill, time.perf_counter() - start, False)
+            raise
+        skill_router.record(device_id, skill, time.perf_counter() - start, True)
+        return result
+
     def __getattr__(self, device_name: str) -> "DeviceProxy":
         """Get a proxy for a specific device."""
         return DeviceProxy(self, device_name)
@@ -573,7 +795,9 @@ class MethodProxy:
 class HubSkillService:
     """Service for executing tools on the Hub.
 
-    Provides search_skills, describe_function, and python_exec.
+    Provides search_skills, describe_function, and python_exec. Results
+    longer than ``tool_result_max_chars`` are stored as artifacts of the
+    session (or of this request, without one) and replaced by a preview.
     """
 
     def __init__(
@@ -581,11 +805,13 @@ class HubSkillService:
         db: AsyncSession,
         user_id: str,
         connection_manager: Any,
+        session_id: Optional[str] = None,
     ):
         self.db = db
         self.user_id = user_id
         self.connection_manager = connection_manager
         self._devices_proxy: Optional[DevicesProxy] = None
+        self.artifact_scope = session_id or f"request-{uuid.uuid4().hex[:12]}"
 
     @property
     def devices(self) -> DevicesProxy:
@@ -612,6 +838,25 @@ class HubSkillService:
         Returns:
             Dict with "result" or "error" key
         """
+        label = tool_name if tool_name in _BUILTIN_TOOLS else "dynamic_skill"
+        with tracer.span("tool", tool=tool_name) as span, tool_seconds.time(label):
+            result = await self._execute_tool(tool_name, arguments)
+            if span is not None and "error" in result:
+                span.set(error=str(result["error"])[:200])
+        value = result.get("result")
+        if value is not None:
+            text = value if isinstance(value, str) else str(value)
+            offloaded = artifact_store.offload(self.artifact_scope, text)
+            if offloaded is not text:
+                result = {**result, "result": offloaded}
+        return result
+
+    async def _execute_tool(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Run a tool call without offloading its result."""
         try:
             if tool_name == "search_skills":
                 query = arguments.get("query", "")
@@ -665,21 +910,17 @@ class HubSkillService:
                 # If it's more nested than expected, fall back to last segment
                 method_name = parts[-1]
 
-        expiry_time = datetime.now(timezone.utc) - timedelta(
-            seconds=settings.skill_expiry_seconds
-        )
-
         stmt = (
             select(Skill, Device)
             .join(Device, Skill.device_id == Device.id)
+            .join(DevicePresence, Skill.device_id == DevicePresence.device_id)
             .where(Device.user_id == self.user_id)
             .where(Skill.function_name == method_name)
-            .where(Skill.last_heartbeat > expiry_time)
         )
         if class_name:
             stmt = stmt.where(Skill.class_name == class_name)
 
-        result = await self.db.execute(stmt)
+        result = await self.devices._execute(stmt)
         matches = result.all()
 
         if not matches:
@@ -758,7 +999,11 @@ class HubSkillService:
         """
         from .asteval_executor import execute_with_asteval
 
-        return await execute_with_asteval(code, self.devices)
+        return await execute_with_asteval(
+            code,
+            self.devices,
+            read_artifact=functools.partial(artifact_store.read, self.artifact_scope),
+        )
 
     async def get_system_prompt(self, requesting_device_key: str) -> str:
         """Get the system prompt for online mode.
@@ -766,35 +1011,99 @@ class HubSkillService:
         Uses the custom system prompt from settings if configured,
         otherwise falls back to DEFAULT_ONLINE_MODE_PROMPT.
 
-        The prompt includes the set of valid ``devices.<device>`` keys
-        so the model does not invent device names.
+        The prompt ends with the set of valid ``devices.<device>`` keys so
+        the model does not invent device names. Everything before that list
+        is identical for every request, so provider-side prompt caching can
+        reuse it. The assembled prompt is cached per user until the user's
+        device set changes.
         """
-        devices = await self.devices._get_user_devices()
-
         # The hub itself is a control plane and should not be used as a target
         # device for spoke-originated runs.
-        filtered_device_keys: list[str] = []
-        filtered_device_keys.append(DEVICE_AGNOSTIC_KEY)
+        hide_hub_device = requesting_device_key != "strawberry_hub"
+        generation = self.devices._device_directory.generation(self.user_id)
+        cached = system_prompt_cache.get(self.user_id, hide_hub_device, generation)
+        cache_lookups_total.inc("system_prompt", "miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+        devices = await self.devices._get_user_devices()
+        filtered_device_keys = [DEVICE_AGNOSTIC_KEY]
         for key in sorted(devices.keys()):
-            if key == "strawberry_hub" and requesting_device_key != "strawberry_hub":
+            if key == "strawberry_hub" and hide_hub_device:
                 continue
             filtered_device_keys.append(key)
 
-        device_keys = ", ".join(filtered_device_keys)
-
-        # Use custom prompt from settings if provided, else default.
-        base_prompt = (
-            settings.system_prompt.strip()
-            if settings.system_prompt and settings.system_prompt.strip()
-            else DEFAULT_ONLINE_MODE_PROMPT
+        prompt = (
+            f"{system_prompt_prefix()}"
+            "VALID DEVICE KEYS (use exactly these after 'devices.'):\n"
+            f"{', '.join(filtered_device_keys)}\n"
         )
+        system_prompt_cache.put(self.user_id, hide_hub_device, generation, prompt)
+        return prompt
 
-        return (
-            f"{base_prompt}\n\n"
-            "VALID DEVICE KEYS (use exactly these after 'devices.'):\n"
-            f"{device_keys or '(none)'}\n\n"
-            "IMPORTANT:\n"
-            "- Never invent device names. Always pick a device from "
-            "search_skills() results or from the list above.\n"
-            f"- For device-agnostic skills, use devices.{DEVICE_AGNOSTIC_KEY}.\n"
+
+def system_prompt_prefix() -> str:
+    """The static part of the online-mode prompt, before the device keys."""
+    return _build_prompt_prefix(settings.system_prompt)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_prompt_prefix(custom_prompt: str) -> str:
+    """Build the prompt prefix for a configured custom prompt.
+
+    Cached on ``custom_prompt`` alone. That is only valid because the
+    result depends on nothing else: ``DEFAULT_ONLINE_MODE_PROMPT`` and
+    ``DEVICE_AGNOSTIC_KEY`` are constants and no per-user or per-device
+    data goes in. Anything added here that can change at runtime must
+    become an argument, or the cache will serve stale prefixes.
+    """
+    # Use custom prompt from settings if provided, else default.
+    base_prompt = (
+        custom_prompt.strip()
+        if custom_prompt and custom_prompt.strip()
+        else DEFAULT_ONLINE_MODE_PROMPT
+    )
+    return (
+        f"{base_prompt}\n\n"
+        "IMPORTANT:\n"
+        "- Never invent device names. Always pick a device from "
+        "search_skills() results or from the device keys below.\n"
+        f"- For device-agnostic skills, use devices.{DEVICE_AGNOSTIC_KEY}.\n\n"
+    )
+
+
+class SystemPromptCache:
+    """Assembled online-mode prompts, keyed by user and device-set generation.
+
+    An entry is reused only while the user's device generation and the
+    configured custom prompt are unchanged.
+    """
+
+    def __init__(self) -> None:
+        # (user_id, hides hub device) -> (generation, custom prompt, prompt)
+        self._entries: Dict[Tuple[str, bool], Tuple[int, str, str]] = {}
+
+    def get(self, user_id: str, hide_hub_device: bool, generation: int) -> Optional[str]:
+        """Return the cached prompt, or None if stale or missing."""
+        entry = self._entries.get((user_id, hide_hub_device))
+        if entry is None or entry[:2] != (generation, settings.system_prompt):
+            return None
+        return entry[2]
+
+    def put(
+        self, user_id: str, hide_hub_device: bool, generation: int, prompt: str
+    ) -> None:
+        """Cache a prompt built for ``generation`` of the user's devices."""
+        self._entries[(user_id, hide_hub_device)] = (
+            generation,
+            settings.system_prompt,
+            prompt,
         )
+
+    def clear(self) -> None:
+        """Drop all entries (used by tests)."""
+        self._entries.clear()
+
+
+# Global system prompt cache instance
+system_prompt_cache = SystemPromptCache()
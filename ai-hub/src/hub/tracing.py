@@ -0,0 +1,273 @@
+"""End-to-end request traces for chat requests.
+
+``chat_completions`` starts a trace, and the work it causes is recorded
+as nested spans: model calls, tool calls and skill requests to devices.
+Skill requests carry ``trace_id`` and ``span_id`` in the
+``skill_request`` frame. The Spoke echoes them in its ``skill_response``
+along with a ``timing`` breakdown (``queue_ms``, ``exec_ms``), which is
+attached to the span as ``device_queue_ms`` and ``device_exec_ms``. The
+rest of the span's time is reported as ``transit_ms``: WebSocket transit
+plus Hub-side handling.
+
+The current span is kept in a context variable, so spans started by
+concurrent tool calls nest under the right parent. Finished traces are
+kept in a ring buffer served by ``GET /api/traces``, and are appended to
+``trace_export_path`` as JSON Lines when that is set. No collector is
+needed.
+
+Like the skill index, everything runs on the event loop except python_exec
+code, whose skill calls are scheduled back onto the loop.
+"""
+
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float  # Unix time
+    duration_ms: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("_started")
+        return data
+
+
+@dataclass
+class TracerStats:
+    """Tracer counters."""
+
+    started: int = 0
+    finished: int = 0
+    spans: int = 0
+    dropped_spans: int = 0
+    export_errors: int = 0
+
+
+# Span that new spans are parented to.
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "hub_current_span", default=None
+)
+
+
+class _ActiveSpan:
+    """Context manager that makes a span current for its block."""
+
+    def __init__(self, tracer: "Tracer", span: Optional[Span]) -> None:
+        self._tracer = tracer
+        self._span = span
+        self._token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self._span is not None:
+            self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._span is None:
+            return
+        _current_span.reset(self._token)
+        if exc is not None:
+            self._span.set(error=f"{type(exc).__name__}: {exc}")
+        self._tracer.end_span(self._span)
+
+
+class Tracer:
+    """Builds traces and keeps the most recent finished ones."""
+
+    # Spans kept per trace; later ones are counted as dropped.
+    MAX_SPANS_PER_TRACE = 512
+
+    def __init__(self) -> None:
+        # trace_id -> spans recorded so far (root first)
+        self._active: Dict[str, List[Span]] = {}
+        # span_id -> open span, for timings reported by devices
+        self._open: Dict[str, Span] = {}
+        self._finished: Deque[Dict[str, Any]] = deque()
+        self.stats = TracerStats()
+
+    def start_trace(self, name: str, **attributes: Any) -> Optional[Span]:
+        """Start a trace and make its root span current.
+
+        Returns:
+            The root span, or None when tracing is disabled.
+        """
+        if not settings.tracing_enabled:
+            return None
+        trace_id = secrets.token_hex(16)
+        root = self._new_span(trace_id, None, name, attributes)
+        self._active[trace_id] = [root]
+        _current_span.set(root)
+        self.stats.started += 1
+        return root
+
+    def start_span(self, name: str, **attributes: Any) -> Optional[Span]:
+        """Start a child of the current span without making it current.
+
+        Use for work that spans generator yields; call ``end_span`` when
+        done. Returns None outside a trace.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        spans = self._active.get(parent.trace_id)
+        if spans is None:
+            return None
+        if len(spans) >= self.MAX_SPANS_PER_TRACE:
+            self.stats.dropped_spans += 1
+            return None
+        span = self._new_span(parent.trace_id, parent.span_id, name, attributes)
+        spans.append(span)
+        return span
+
+    def span(self, name: str, **attributes: Any) -> _ActiveSpan:
+        """Time a ``with`` block as a child of the current span.
+
+        The block's span is current inside it, so work started there nests
+        under it. Yields None (and records nothing) outside a trace.
+        """
+        return _ActiveSpan(self, self.start_span(name, **attributes))
+
+    def end_span(self, span: Optional[Span], **attributes: Any) -> None:
+        """Record a span's duration, adding any final attributes."""
+        if span is None or span.duration_ms is not None:
+            return
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+        span.set(**attributes)
+        self._open.pop(span.span_id, None)
+        device_ms = span.attributes.get("device_exec_ms")
+        if device_ms is not None:
+            device_ms += span.attributes.get("device_queue_ms") or 0
+            span.set(transit_ms=round(span.duration_ms - device_ms, 3))
+
+    def current(self) -> Optional[Span]:
+        """The current span, if a trace is in progress."""
+        return _current_span.get()
+
+    def record_device_timing(self, span_id: Any, timing: Any) -> None:
+        """Attach the timing a Spoke echoed in its skill_response."""
+        span = self._open.get(span_id) if isinstance(span_id, str) else None
+        if span is None or not isinstance(timing, dict):
+            return
+        for key in ("queue_ms", "exec_ms"):
+            value = timing.get(key)
+            if isinstance(value, (int, float)):
+                span.set(**{f"device_{key}": round(float(value), 3)})
+
+    def finish(self, root: Optional[Span]) -> None:
+        """End a trace and export it."""
+        if root is None:
+            return
+        self.end_span(root)
+        spans = self._active.pop(root.trace_id, None)
+        if spans is None:
+            return
+        for span in spans:
+            # Work abandoned mid-way (cancelled tools, client gone)
+            if span.duration_ms is None:
+                span.set(unfinished=True)
+                self.end_span(span)
+        trace = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "start": root.start,
+            "duration_ms": root.duration_ms,
+            "spans": [span.to_dict() for span in spans],
+        }
+        self._finished.append(trace)
+        while len(self._finished) > settings.trace_buffer_size:
+            self._finished.popleft()
+        self.stats.finished += 1
+        self.stats.spans += len(spans)
+        if settings.trace_export_path is not None:
+            self._export(trace)
+
+    def _new_span(
+        self,
+        trace_id: str,
+        parent_id: Optional[str],
+        name: str,
+        attributes: Dict[str, Any],
+    ) -> Span:
+        span = Span(
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            name=name,
+            start=time.time(),
+            attributes=dict(attributes),
+        )
+        self._open[span.span_id] = span
+        return span
+
+    def _export(self, trace: Dict[str, Any]) -> None:
+        try:
+            path = settings.trace_export_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(trace, default=str) + "\n")
+        except OSError as e:
+            self.stats.export_errors += 1
+            logger.warning("Could not export trace %s: %s", trace["trace_id"], e)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of the newest finished traces, newest first."""
+        traces = list(self._finished)[-limit:] if limit > 0 else []
+        return [
+            {
+                "trace_id": t["trace_id"],
+                "name": t["name"],
+                "start": t["start"],
+                "duration_ms": t["duration_ms"],
+                "span_count": len(t["spans"]),
+            }
+            for t in reversed(traces)
+        ]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """A finished trace with all its spans."""
+        for trace in self._finished:
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+    def clear(self) -> None:
+        """Drop all traces and reset stats (used by tests)."""
+        self._active.clear()
+        self._open.clear()
+        self._finished.clear()
+        self.stats = TracerStats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return tracer counters."""
+        data = asdict(self.stats)
+        data["active"] = len(self._active)
+        data["buffered"] = len(self._finished)
+        return data
+
+
+# Global tracer instance
+tracer = Tracer()
@@ -0,0 +1,133 @@
+"""WebSocket frame codecs for the Hub ↔ Spoke wire protocol.
+
+``v1`` sends every message as a JSON text frame. ``v2`` sends binary
+frames: one header byte followed by the msgpack-encoded message, which
+is zlib-compressed when it is larger than ``ws_compress_threshold_bytes``
+and compression actually saves space. Message shapes are the same in
+both versions (see docs/wire-schema-v1.md and docs/wire-schema-v2.md).
+
+The version is chosen per connection by the Spoke through
+``X-Protocol-Version`` / ``protocol_version`` when it opens the socket.
+Incoming frames are decoded by their type rather than the negotiated
+version, so a text frame is always read as JSON.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Optional, Union
+
+import msgpack
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .config import settings
+
+# First byte of a v2 frame.
+FRAME_PLAIN = 0x00
+FRAME_ZLIB = 0x01
+
+# Fast compression; frames are small and latency matters more than ratio.
+ZLIB_LEVEL = 1
+
+Frame = Union[str, bytes]
+
+
+class WireError(ValueError):
+    """A frame could not be decoded."""
+
+
+class JsonCodec:
+    """Protocol v1: JSON text frames."""
+
+    version = "v1"
+
+    def encode(self, message: Dict[str, Any]) -> str:
+        """Encode a message as a text frame."""
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    async def send(self, websocket: WebSocket, message: Dict[str, Any]) -> None:
+        """Send a message on a socket."""
+        await websocket.send_json(message)
+
+
+class MsgpackCodec:
+    """Protocol v2: msgpack binary frames, compressed above a threshold."""
+
+    version = "v2"
+
+    def __init__(self, compress_threshold: Optional[int] = None) -> None:
+        self._compress_threshold = compress_threshold
+
+    @property
+    def compress_threshold(self) -> int:
+        """Payload size (bytes) above which frames are compressed (0 never)."""
+        if self._compress_threshold is not None:
+            return self._compress_threshold
+        return settings.ws_compress_threshold_bytes
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        """Encode a message as a binary frame."""
+        payload = msgpack.packb(message, use_bin_type=True)
+        threshold = self.compress_threshold
+        if threshold > 0 and len(payload) > threshold:
+            compressed = zlib.compress(payload, ZLIB_LEVEL)
+            if len(compressed) < len(payload):
+                return bytes((FRAME_ZLIB,)) + compressed
+        return bytes((FRAME_PLAIN,)) + payload
+
+    async def send(self, websocket: WebSocket, message: Dict[str, Any]) -> None:
+        """Send a message on a socket."""
+        await websocket.send_bytes(self.encode(message))
+
+
+WireCodec = Union[JsonCodec, MsgpackCodec]
+
+CODECS = {"v1": JsonCodec, "v2": MsgpackCodec}
+
+
+def get_codec(version: Optional[str]) -> WireCodec:
+    """Return the codec for a negotiated version (v1 when none was declared)."""
+    return CODECS.get(version or "v1", JsonCodec)()
+
+
+def decode_frame(frame: Frame) -> Dict[str, Any]:
+    """Decode a text (v1) or binary (v2) frame into a message.
+
+    Raises:
+        WireError: If the frame is malformed.
+    """
+    try:
+        if isinstance(frame, str):
+            message = json.loads(frame)
+        else:
+            if not frame:
+                raise WireError("Empty binary frame")
+            header, payload = frame[0], frame[1:]
+            if header == FRAME_ZLIB:
+                payload = zlib.decompress(payload)
+            elif header != FRAME_PLAIN:
+                raise WireError(f"Unknown frame header {header:#04x}")
+            message = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    except WireError:
+        raise
+    except Exception as e:
+        raise WireError(f"Malformed frame: {e}") from e
+
+    if not isinstance(message, dict):
+        raise WireError("Frame does not hold an object")
+    return message
+
+
+async def receive_message(websocket: WebSocket) -> Dict[str, Any]:
+    """Receive and decode the next frame from a socket.
+
+    Raises:
+        WebSocketDisconnect: If the client went away.
+        WireError: If the frame is malformed.
+    """
+    event = await websocket.receive()
+    if event["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(event.get("code", 1000))
+    data = event.get("bytes")
+    if data is None:
+        data = event.get("text") or ""
+    return decode_frame(data)
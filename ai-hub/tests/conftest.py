@@ -26,7 +26,34 @@ os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
 
 # Now import hub modules
 from hub import database  # noqa: E402 - ignore import order so we can set test database
+from hub.artifacts import artifact_store  # noqa: E402 - ignore import order
+from hub.context_budget import context_compactor  # noqa: E402 - ignore import order
 from hub.database import dispose_engine, reset_engine  # noqa: E402 - ignore import order
+from hub.device_directory import device_directory  # noqa: E402 - ignore import order
+from hub.metrics import metrics  # noqa: E402 - ignore import order
+from hub.presence import presence  # noqa: E402 - ignore import order
+from hub.result_cache import skill_result_cache  # noqa: E402 - ignore import order
+from hub.session_context import session_context  # noqa: E402 - ignore import order
+from hub.session_writer import session_writer  # noqa: E402 - ignore import order
+from hub.skill_index import skill_index  # noqa: E402 - ignore import order
+from hub.skill_routing import skill_router  # noqa: E402 - ignore import order
+from hub.skill_service import system_prompt_cache  # noqa: E402 - ignore import order
+from hub.tracing import tracer  # noqa: E402 - ignore import order
+
+
+@pytest.fixture(autouse=True)
+def no_streaming_gateway(monkeypatch):
+    """Keep tests off the real TensorZero gateway for streaming inference.
+
+    The chat code falls back to ``tz_inference`` when streaming fails, so
+    tests that only mock ``tz_inference`` keep working. Streaming tests
+    patch ``hub.routers.chat.tz_inference_stream`` themselves.
+    """
+
+    async def _unavailable(*args, **kwargs):
+        raise RuntimeError("streaming inference disabled in tests")
+
+    monkeypatch.setattr("hub.routers.chat.tz_inference_stream", _unavailable)
 
 
 @pytest.fixture(scope="function")
@@ -45,12 +72,27 @@ async def setup_test_db():
     # Reset engine to pick up test DATABASE_URL
     reset_engine()
 
+    # Drop in-memory skill index, presence, routing and cache state from earlier tests
+    skill_index.clear()
+    device_directory.clear()
+    presence.clear()
+    skill_router.clear()
+    skill_result_cache.clear()
+    system_prompt_cache.clear()
+    session_context.clear()
+    context_compactor.clear()
+    artifact_store.clear()
+    session_writer.clear()
+    metrics.clear()
+    tracer.clear()
+
     # Initialize database tables
     await database.init_db()
 
     yield
 
-    # Cleanup - reset engine and remove test db
+    # Cleanup - drop queued writes, reset engine and remove test db
+    session_writer.clear()
     await dispose_engine()
     reset_engine()
     if TEST_DB_PATH.exists():
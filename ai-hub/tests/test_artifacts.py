@@ -0,0 +1,75 @@
+"""Tests for oversized tool results stored as artifacts."""
+
+import re
+
+import pytest
+
+from hub.artifacts import ARTIFACT_PAGE_CHARS, ARTIFACT_PREVIEW_CHARS, ArtifactStore
+from hub.skill_service import HubSkillService
+
+
+def _handle(preview: str) -> str:
+    return re.search(r'artifact "(art_[0-9a-f]+)"', preview).group(1)
+
+
+def test_short_results_pass_through():
+    store = ArtifactStore(max_chars=100)
+
+    assert store.offload("s1", "small") == "small"
+    assert store.get_stats()["stored"] == 0
+
+
+def test_long_result_is_previewed_and_paged():
+    store = ArtifactStore(max_chars=100)
+    text = "".join(str(i % 10) for i in range(10_000))
+
+    preview = store.offload("s1", text)
+
+    assert preview.startswith(text[:ARTIFACT_PREVIEW_CHARS])
+    assert "10000 chars total" in preview
+    handle = _handle(preview)
+
+    page = store.read("s1", handle, offset=ARTIFACT_PREVIEW_CHARS)
+    end = ARTIFACT_PREVIEW_CHARS + ARTIFACT_PAGE_CHARS
+    assert page.startswith(text[ARTIFACT_PREVIEW_CHARS:end])
+    assert f'read_artifact("{handle}", offset={end})' in page
+
+    last = store.read("s1", handle, offset=9_990)
+    assert last == text[9_990:]
+
+
+def test_handles_are_scoped():
+    store = ArtifactStore(max_chars=10)
+    handle = _handle(store.offload("s1", "x" * 50))
+
+    with pytest.raises(KeyError):
+        store.read("s2", handle)
+
+    store.invalidate("s1")
+    with pytest.raises(KeyError):
+        store.read("s1", handle)
+
+
+@pytest.mark.asyncio
+async def test_python_exec_reads_artifact_of_earlier_tool_call():
+    service = HubSkillService(
+        db=None, user_id="u", connection_manager=None, session_id="s1"
+    )
+
+    first = await service.execute_tool("python_exec", {"code": "print('ab' * 5000)"})
+    assert len(first["result"]) < 2000
+    handle = _handle(first["result"])
+
+    second = await service.execute_tool(
+        "python_exec", {"code": f"print(read_artifact('{handle}', offset=9990))"}
+    )
+    assert second == {"result": "ab" * 5}
+
+    # Another session cannot read it.
+    other = HubSkillService(
+        db=None, user_id="u", connection_manager=None, session_id="s2"
+    )
+    denied = await other.execute_tool(
+        "python_exec", {"code": f"print(read_artifact('{handle}'))"}
+    )
+    assert "error" in denied
@@ -0,0 +1,134 @@
+"""Tests for the pooled python_exec executor."""
+
+import asyncio
+import threading
+
+import pytest
+
+from hub.asteval_executor import PythonExecExecutor
+
+
+class FakeDevicesProxy:
+    """Async devices proxy whose skill calls take ``delay`` seconds."""
+
+    def __init__(self, name: str = "pc", delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+
+    async def execute_skill(self, device_name, skill_name, method_name, args, kwargs):
+        await asyncio.sleep(self.delay)
+        return f"{self.name}:{skill_name}.{method_name}{tuple(args)}"
+
+
+@pytest.fixture
+def executor():
+    executor = PythonExecExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_runs_do_not_leak_state(executor):
+    first = await executor.run(
+        "secret = 41\nlen = None\ntype.marker = 1\nprint(secret + 1)",
+        FakeDevicesProxy(),
+    )
+    assert first == {"result": "42"}
+
+    second = await executor.run("print(len([1, 2]))\nprint(secret)", FakeDevicesProxy())
+    assert "error" in second
+    assert "secret" in second["error"]
+
+    # Attribute writes on shared helpers stay with the interpreter too.
+    third = await executor.run(
+        "print(len([1, 2]))\n"
+        "try:\n"
+        "    print(type.marker)\n"
+        "except AttributeError:\n"
+        "    print('clean')",
+        FakeDevicesProxy(),
+    )
+    assert third == {"result": "2\nclean"}
+
+    stats = executor.get_stats()
+    # Each run gets a fresh interpreter; after the first, one built ahead.
+    assert stats["interpreters_prebuilt"] == 2
+    assert stats["interpreters_created"] == 4
+    assert stats["executions"] == 3
+    assert stats["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_devices_rebound_per_run(executor):
+    code = "print(devices.pc.Music.play(1))"
+    results = await asyncio.gather(
+        executor.run(code, FakeDevicesProxy("alice")),
+        executor.run(code, FakeDevicesProxy("bob")),
+    )
+    assert results == [
+        {"result": "alice:Music.play(1,)"},
+        {"result": "bob:Music.play(1,)"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_runs_bounded_by_dedicated_pool(executor):
+    delay = 0.1
+    proxy = FakeDevicesProxy(delay=delay)
+
+    results = await asyncio.gather(
+        *(executor.run(f"print(devices.pc.S.m({i}))", proxy) for i in range(4))
+    )
+
+    assert [r["result"] for r in results] == [f"pc:S.m({i},)" for i in range(4)]
+    stats = executor.get_stats()
+    # Two workers, four runs: the second pair waited for a free thread.
+    assert stats["queue_wait_max"] >= delay * 0.8
+    assert stats["exec_time_max"] >= delay * 0.8
+    assert stats["idle_interpreters"] == 2
+    names = {t.name for t in threading.enumerate()}
+    assert any(name.startswith("python-exec") for name in names)
+
+
+@pytest.mark.asyncio
+async def test_gather_runs_device_calls_concurrently_in_order(executor):
+    delay = 0.2
+    code = (
+        "print(devices.gather(\n"
+        "    devices.kitchen.Lights.off.defer(1),\n"
+        "    devices.office.Lights.off.defer(2),\n"
+        "    devices.garage.Lights.off.defer(3),\n"
+        "))"
+    )
+    start = asyncio.get_running_loop().time()
+    result = await executor.run(code, FakeDevicesProxy(delay=delay))
+    elapsed = asyncio.get_running_loop().time() - start
+
+    assert result == {
+        "result": "['pc:Lights.off(1,)', 'pc:Lights.off(2,)', 'pc:Lights.off(3,)']"
+    }
+    assert elapsed < 2 * delay
+
+
+@pytest.mark.asyncio
+async def test_gather_accepts_list_and_reports_failures(executor):
+    class FlakyProxy(FakeDevicesProxy):
+        async def execute_skill(self, device_name, **kwargs):
+            if device_name == "bad":
+                raise ValueError("Device 'bad' not found")
+            return await super().execute_skill(device_name, **kwargs)
+
+    code = (
+        "calls = [devices.good.S.m.defer(), devices.bad.S.m.defer()]\n"
+        "results = devices.parallel(calls, return_exceptions=True)\n"
+        "print(results[0])\n"
+        "print(isinstance(results[1], Exception))"
+    )
+    result = await executor.run(code, FlakyProxy())
+    assert result == {"result": "pc:S.m()\nTrue"}
+
+    failed = await executor.run("devices.gather(devices.bad.S.m.defer())", FlakyProxy())
+    assert "not found" in failed["error"]
+
+    misuse = await executor.run("devices.gather(devices.good.S.m())", FlakyProxy())
+    assert ".defer" in misuse["error"]
@@ -0,0 +1,310 @@
+"""Tests for SSE streaming in pass-through chat."""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from hub.database import Device
+from hub.routers.chat import (
+    ChatCompletionRequest,
+    ChatMessage,
+    _agent_loop_events,
+    _stream_chat_completions,
+    _StreamedBlocks,
+)
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+        self.variant_name = "test_variant"
+
+
+def _request() -> ChatCompletionRequest:
+    return ChatCompletionRequest(
+        messages=[ChatMessage(role="user", content="hi")],
+        stream=True,
+        enable_tools=False,
+    )
+
+
+def _events(frames: list[str]) -> list[dict]:
+    return [json.loads(f.removeprefix("data: ")) for f in frames]
+
+
+async def _collect(stream) -> tuple[list[str], list[float]]:
+    frames, arrival = [], []
+    start = time.perf_counter()
+    async for frame in stream:
+        frames.append(frame)
+        arrival.append(time.perf_counter() - start)
+    return frames, arrival
+
+
+@pytest.mark.asyncio
+async def test_pass_through_forwards_first_chunk_before_stream_ends():
+    """First content_delta must not wait for the model to finish."""
+    chunk_delay = 0.2
+
+    async def slow_gateway_stream():
+        for text in ("Hello", " there", " friend"):
+            yield _Chunk(text)
+            await asyncio.sleep(chunk_delay)
+
+    async def mock_inference_stream(messages, function_name, system=None, **kwargs):
+        return slow_gateway_stream()
+
+    with patch("hub.routers.chat.tz_inference_stream", mock_inference_stream):
+        frames, arrival = await _collect(
+            _stream_chat_completions(
+                request=_request(), device=Device(), db=None, manager=None
+            )
+        )
+
+    events = _events(frames)
+    assert [e["delta"] for e in events if e["type"] == "content_delta"] == [
+        "Hello",
+        " there",
+        " friend",
+    ]
+    assert events[-2] == {"type": "assistant_message", "content": "Hello there friend"}
+    assert events[-1] == {"type": "done"}
+    # First byte arrives well before the gateway finishes streaming.
+    assert arrival[0] < chunk_delay
+    assert arrival[-1] >= 3 * chunk_delay
+
+
+@pytest.mark.asyncio
+async def test_pass_through_falls_back_to_non_streaming():
+    async def broken_stream(messages, function_name, system=None, **kwargs):
+        raise RuntimeError("streaming unsupported")
+
+    async def mock_inference(messages, function_name, system=None, **kwargs):
+        return _Response("one two three")
+
+    with (
+        patch("hub.routers.chat.tz_inference_stream", broken_stream),
+        patch("hub.routers.chat.tz_inference", side_effect=mock_inference),
+    ):
+        frames, _ = await _collect(
+            _stream_chat_completions(
+                request=_request(), device=Device(), db=None, manager=None
+            )
+        )
+
+    events = _events(frames)
+    deltas = [e["delta"] for e in events if e["type"] == "content_delta"]
+    assert deltas == ["one ", "two ", "three"]
+    assert events[-2]["content"] == "one two three"
+
+
+class _ToolChunk:
+    def __init__(self, call_id, raw_name, raw_arguments):
+        self.type = "tool_call"
+        self.id = call_id
+        self.raw_name = raw_name
+        self.raw_arguments = raw_arguments
+
+
+class _BlocksChunk:
+    def __init__(self, *blocks):
+        self.content = list(blocks)
+        self.variant_name = "test_variant"
+
+
+def test_streamed_blocks_split_calls_without_ids():
+    """A named chunk starts a new call even when providers send no ids."""
+    blocks = _StreamedBlocks()
+    closed = []
+    for chunk in (
+        _ToolChunk("", "search_skills", '{"query": '),
+        _ToolChunk(None, "", '"weather"}'),
+        _ToolChunk("", "describe_function", '{"path": "W.get"}'),
+    ):
+        closed += blocks.feed(_BlocksChunk(chunk))[1]
+    closed += blocks.finish()
+
+    assert [(tc["id"], tc["name"], tc["arguments"]) for tc in closed] == [
+        ("call_1", "search_skills", {"query": "weather"}),
+        ("call_2", "describe_function", {"path": "W.get"}),
+    ]
+
+
+class _FakeSkillService:
+    def __init__(self, *args, **kwargs):
+        self.calls: list[tuple[str, dict, float]] = []
+        _FakeSkillService.instance = self
+
+    async def get_system_prompt(self, requesting_device_key):
+        return "system"
+
+    async def execute_tool(self, name, arguments):
+        self.calls.append((name, arguments, time.perf_counter()))
+        return {"result": f"{name} ok"}
+
+
+def _tool_request() -> ChatCompletionRequest:
+    return ChatCompletionRequest(
+        messages=[ChatMessage(role="user", content="what's the weather?")],
+        stream=True,
+        enable_tools=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_agent_loop_starts_tool_before_stream_ends():
+    """A tool call runs as soon as its block closes, not after the stream."""
+    tail_delay = 0.3
+    stream_end: list[float] = []
+
+    async def tool_step():
+        yield _BlocksChunk(_ToolChunk("call_1", "search_skills", '{"query": '))
+        yield _BlocksChunk(_ToolChunk("call_1", "", '"weather"}'))
+        # A second block closes the first tool call; the model keeps going.
+        yield _BlocksChunk(_TextBlock("Checking"))
+        await asyncio.sleep(tail_delay)
+        yield _BlocksChunk(_TextBlock("..."))
+        stream_end.append(time.perf_counter())
+
+    async def answer_step():
+        yield _BlocksChunk(_TextBlock("It is"))
+        yield _BlocksChunk(_TextBlock(" sunny."))
+
+    steps = iter([tool_step, answer_step])
+
+    async def mock_inference_stream(messages, function_name, system=None, **kwargs):
+        return next(steps)()
+
+    with (
+        patch("hub.routers.chat.tz_inference_stream", mock_inference_stream),
+        patch("hub.skill_service.HubSkillService", _FakeSkillService),
+    ):
+        events = [
+            e
+            async for e in _agent_loop_events(
+                request=_tool_request(), device=Device(name="pc"), db=None, manager=None
+            )
+        ]
+
+    calls = _FakeSkillService.instance.calls
+    assert [(name, args) for name, args, _ in calls] == [
+        ("search_skills", {"query": "weather"})
+    ]
+    assert calls[0][2] < stream_end[0] - tail_delay / 2
+
+    types = [e["type"] for e in events]
+    assert types.index("tool_call_started") < types.index("tool_call_result")
+    assert [e["delta"] for e in events if e["type"] == "content_delta"][-2:] == [
+        "It is",
+        " sunny.",
+    ]
+    assert events[-1]["type"] == "assistant_message"
+    assert events[-1]["content"] == "It is sunny."
+    assert events[-1]["model"] == "test_variant"
+
+
+@pytest.mark.asyncio
+async def test_agent_loop_streams_final_answer_incrementally():
+    chunk_delay = 0.2
+
+    async def answer_step():
+        for text in ("Hello", " there"):
+            yield _BlocksChunk(_TextBlock(text))
+            await asyncio.sleep(chunk_delay)
+
+    async def mock_inference_stream(messages, function_name, system=None, **kwargs):
+        return answer_step()
+
+    with (
+        patch("hub.routers.chat.tz_inference_stream", mock_inference_stream),
+        patch("hub.skill_service.HubSkillService", _FakeSkillService),
+    ):
+        start = time.perf_counter()
+        stream = _agent_loop_events(
+            request=_tool_request(), device=Device(name="pc"), db=None, manager=None
+        )
+        first = await stream.__anext__()
+        first_at = time.perf_counter() - start
+        rest = [e async for e in stream]
+
+    assert first == {"type": "content_delta", "delta": "Hello"}
+    assert first_at < chunk_delay
+    assert rest[-1]["content"] == "Hello there"
+
+
+class _SlowSkillService(_FakeSkillService):
+    delay = 0.2
+
+    async def execute_tool(self, name, arguments):
+        self.calls.append((name, arguments, time.perf_counter()))
+        # Later calls finish first to prove results are reported in order.
+        await asyncio.sleep(self.delay / (len(self.calls)))
+        return {"result": f"{name} {arguments['query']}"}
+
+
+@pytest.mark.asyncio
+async def test_agent_loop_runs_independent_tool_calls_in_parallel():
+    delay = _SlowSkillService.delay
+
+    async def tool_step():
+        for i, query in enumerate(("weather", "news", "weather", "time")):
+            yield _BlocksChunk(
+                _ToolChunk(f"call_{i}", "search_skills", json.dumps({"query": query}))
+            )
+
+    async def answer_step():
+        yield _BlocksChunk(_TextBlock("Done."))
+
+    steps = iter([tool_step, answer_step])
+    seen_messages = []
+
+    async def mock_inference_stream(messages, function_name, system=None, **kwargs):
+        seen_messages.append(messages)
+        return next(steps)()
+
+    with (
+        patch("hub.routers.chat.tz_inference_stream", mock_inference_stream),
+        patch("hub.skill_service.HubSkillService", _SlowSkillService),
+    ):
+        start = time.perf_counter()
+        events = [
+            e
+            async for e in _agent_loop_events(
+                request=_tool_request(), device=Device(name="pc"), db=None, manager=None
+            )
+        ]
+        elapsed = time.perf_counter() - start
+
+    # Three distinct calls ran; the duplicate was skipped, not executed.
+    calls = _SlowSkillService.instance.calls
+    assert [args["query"] for _, args, _ in calls] == ["weather", "news", "time"]
+    assert elapsed < 2 * delay
+
+    results = [e for e in events if e["type"] == "tool_call_result"]
+    assert [e["tool_call_id"] for e in results] == [f"call_{i}" for i in range(4)]
+    assert [e["result"] for e in results] == [
+        "search_skills weather",
+        "search_skills news",
+        "(duplicate tool call skipped)",
+        "search_skills time",
+    ]
+    types = [e["type"] for e in events if e["type"].startswith("tool_call")]
+    assert types == ["tool_call_started", "tool_call_result"] * 4
+
+    tool_message = seen_messages[1][-1]["content"]
+    assert tool_message.index("weather") < tool_message.index("news")
+    assert tool_message.index("news") < tool_message.index("time")
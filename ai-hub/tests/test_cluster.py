@@ -0,0 +1,182 @@
+"""Tests for cross-worker skill routing."""
+
+import asyncio
+
+import pytest
+
+from hub.cluster import SqliteCluster, apply_event
+from hub.database import Device, Skill
+from hub.device_directory import DeviceDirectory, device_directory
+from hub.routers.websocket import ConnectionManager
+from hub.skill_index import SkillIndex, skill_index
+from hub.skill_service import DevicesProxy
+
+from .test_connection_manager import EchoWebSocket
+from .test_device_directory import FakeDb
+
+
+@pytest.fixture
+async def workers(tmp_path):
+    """Two workers sharing one directory file, each with its own manager."""
+    pairs = []
+    events = []
+    for name in ("w1", "w2"):
+        cluster = SqliteCluster(
+            tmp_path / "cluster.db", worker_id=name, refresh_interval=60
+        )
+        manager = ConnectionManager(cluster=cluster)
+        await cluster.start(manager.serve_remote_request, on_event=events.append)
+        pairs.append((manager, cluster))
+    for _, cluster in pairs:
+        await cluster.refresh()
+    yield pairs, events
+    for _, cluster in pairs:
+        await cluster.stop()
+
+
+@pytest.mark.asyncio
+async def test_request_reaches_device_on_other_worker(workers):
+    (m1, c1), (m2, _) = workers[0]
+    await m2.connect("d1", EchoWebSocket(m2, "d1"))
+
+    # The directory refreshes on a miss, so no wait for the refresh loop.
+    assert await m1.send_skill_request("d1", "S", "m", [1], {}) == ["d1", 1]
+    assert m1.is_connected("d1")
+    assert m1.get_connected_devices() == ["d1"]
+    assert c1.get_stats()["counters"]["forwarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_errors_keep_their_type(workers):
+    (m1, _), (m2, _) = workers[0]
+    ws = EchoWebSocket(m2, "d1", reply=False)
+    await m2.connect("d1", ws)
+
+    with pytest.raises(TimeoutError):
+        await m1.send_skill_request("d1", "S", "m", [], {}, timeout=0.05)
+    # The owning worker enforced the timeout and cancelled on the device.
+    assert ws.sent[-1] == {"type": "cancel", "request_id": ws.sent[0]["request_id"]}
+
+    with pytest.raises(ValueError):
+        await m1.send_skill_request("missing", "S", "m", [], {})
+
+
+@pytest.mark.asyncio
+async def test_cancelled_forward_cancels_on_device(workers):
+    (m1, _), (m2, _) = workers[0]
+    ws = EchoWebSocket(m2, "d1", reply=False)
+    await m2.connect("d1", ws)
+
+    call = asyncio.create_task(m1.send_skill_request("d1", "S", "m", [], {}))
+    for _ in range(100):
+        if m2.pending_count("d1"):
+            break
+        await asyncio.sleep(0.01)
+    assert m2.pending_count("d1") == 1
+    call.cancel()
+
+    for _ in range(100):
+        if len(ws.sent) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert ws.sent[-1]["type"] == "cancel"
+    assert m2.pending_count("d1") == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_and_worker_exit_leave_directory(workers):
+    (m1, c1), (m2, c2) = workers[0]
+    ws = EchoWebSocket(m2, "d1")
+    await m2.connect("d1", ws)
+    await m2.connect("d2", EchoWebSocket(m2, "d2"))
+    await c1.refresh()
+    assert sorted(m1.get_connected_devices()) == ["d1", "d2"]
+
+    await m2.disconnect("d1", ws)
+    await c1.refresh()
+    assert not m1.is_connected("d1")
+
+    await c2.stop()
+    await c1.refresh()
+    assert m1.get_connected_devices() == []
+
+
+@pytest.mark.asyncio
+async def test_events_reach_other_workers(workers):
+    (_, c1), _ = workers[0]
+    events = workers[1]
+
+    await c1.publish({"kind": "skills_changed", "user_id": "u", "device_id": "d1"})
+
+    for _ in range(100):
+        if events:
+            break
+        await asyncio.sleep(0.01)
+    assert events == [{"kind": "skills_changed", "user_id": "u", "device_id": "d1"}]
+
+
+def _skill(device_id, function_name):
+    return Skill(
+        device_id=device_id,
+        class_name="MediaSkill",
+        function_name=function_name,
+        signature=f"{function_name}()",
+        docstring=None,
+        device_agnostic=False,
+    )
+
+
+def test_peer_events_only_drop_the_affected_device():
+    skill_index.load_user("u", [], generation=skill_index.generation("u"))
+    skill_index.replace_device("u", "d1", [_skill("d1", "play_song")])
+    skill_index.replace_device("u", "d2", [_skill("d2", "pause_song")])
+    directory_generation = device_directory.generation("u")
+
+    apply_event({"kind": "skills_changed", "user_id": "u", "device_id": "d1"})
+
+    assert skill_index.is_loaded("u")
+    assert skill_index.has_device("u", "d2")
+    assert skill_index.stale_devices("u") == ["d1"]
+    assert device_directory.generation("u") == directory_generation
+
+    apply_event({"kind": "device_offline", "user_id": "u", "device_id": "d2"})
+
+    assert not skill_index.has_device("u", "d2")
+    assert device_directory.generation("u") == directory_generation
+
+    apply_event({"kind": "device_deleted", "user_id": "u", "device_id": "d1"})
+
+    assert skill_index.stale_devices("u") == []
+    assert device_directory.generation("u") > directory_generation
+
+
+@pytest.mark.asyncio
+async def test_search_reloads_only_stale_devices():
+    index = SkillIndex()
+    index.load_user("u", [], generation=index.generation("u"))
+    index.replace_device("u", "d1", [_skill("d1", "play_song")])
+    index.replace_device("u", "d2", [_skill("d2", "pause_song")])
+    index.mark_stale("u", "d1")
+    db = FakeDb(
+        [
+            Device(id="d1", name="PC", is_active=True),
+            Device(id="d2", name="TV", is_active=True),
+        ],
+        [_skill("d1", "stop_song")],
+    )
+    proxy = DevicesProxy(
+        db=db,
+        user_id="u",
+        connection_manager=None,
+        skill_index=index,
+        device_directory=DeviceDirectory(),
+    )
+
+    results = await proxy.search_skills("song")
+
+    assert sorted(r["path"] for r in results) == [
+        "MediaSkill.pause_song",
+        "MediaSkill.stop_song",
+    ]
+    assert len(db.statements) == 2
+    assert index.stale_devices("u") == []
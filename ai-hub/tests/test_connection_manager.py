@@ -0,0 +1,202 @@
+"""Tests for ConnectionManager request tracking."""
+
+import asyncio
+
+import pytest
+
+from hub.routers.websocket import ConnectionManager
+
+
+class EchoWebSocket:
+    """Fake socket that answers skill requests through the manager."""
+
+    def __init__(self, manager: ConnectionManager, device_id: str, reply: bool = True):
+        self.manager = manager
+        self.device_id = device_id
+        self.reply = reply
+        self.sent: list[dict] = []
+        self.closed = False
+
+    async def send_json(self, message: dict) -> None:
+        self.sent.append(message)
+        if self.reply:
+            asyncio.get_running_loop().call_soon(
+                asyncio.ensure_future,
+                self.manager.handle_skill_response(
+                    {
+                        "request_id": message["request_id"],
+                        "success": True,
+                        "result": [self.device_id, *message["args"]],
+                    },
+                    device_id=self.device_id,
+                ),
+            )
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed = True
+
+
+async def _wait_for_pending(manager: ConnectionManager, device_id: str, count: int):
+    for _ in range(100):
+        if manager.pending_count(device_id) == count:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("requests never became pending")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_resolve_per_device():
+    manager = ConnectionManager()
+    for device_id in ("d1", "d2"):
+        await manager.connect(device_id, EchoWebSocket(manager, device_id))
+
+    results = await asyncio.gather(
+        *(
+            manager.send_skill_request(f"d{i % 2 + 1}", "S", "m", [i], {})
+            for i in range(200)
+        )
+    )
+
+    assert results == [[f"d{i % 2 + 1}", i] for i in range(200)]
+    assert manager.pending_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_fails_only_that_devices_requests():
+    manager = ConnectionManager()
+    await manager.connect("d1", EchoWebSocket(manager, "d1", reply=False))
+    await manager.connect("d2", EchoWebSocket(manager, "d2", reply=False))
+
+    d1_calls = [
+        asyncio.create_task(manager.send_skill_request("d1", "S", "m", [], {}))
+        for _ in range(3)
+    ]
+    d2_call = asyncio.create_task(manager.send_skill_request("d2", "S", "m", [], {}))
+    await _wait_for_pending(manager, "d1", 3)
+    await _wait_for_pending(manager, "d2", 1)
+
+    await manager.disconnect("d1")
+
+    for task in d1_calls:
+        with pytest.raises(ConnectionError):
+            await task
+    assert not d2_call.done()
+    assert manager.pending_count("d2") == 1
+    d2_call.cancel()
+
+
+@pytest.mark.asyncio
+async def test_response_from_other_device_is_ignored():
+    manager = ConnectionManager()
+    ws = EchoWebSocket(manager, "d1", reply=False)
+    await manager.connect("d1", ws)
+    await manager.connect("d2", EchoWebSocket(manager, "d2", reply=False))
+
+    call = asyncio.create_task(
+        manager.send_skill_request("d1", "S", "m", [], {}, timeout=0.2)
+    )
+    await _wait_for_pending(manager, "d1", 1)
+    request_id = ws.sent[0]["request_id"]
+
+    await manager.handle_skill_response(
+        {"request_id": request_id, "success": True, "result": 1}, device_id="d2"
+    )
+    with pytest.raises(TimeoutError):
+        await call
+
+
+@pytest.mark.asyncio
+async def test_replaced_connection_survives_stale_disconnect():
+    """The old socket's cleanup must not drop the newer connection."""
+    manager = ConnectionManager()
+    old_ws = EchoWebSocket(manager, "d1")
+    new_ws = EchoWebSocket(manager, "d1")
+    await manager.connect("d1", old_ws)
+    await manager.connect("d1", new_ws)
+    assert old_ws.closed
+
+    await manager.disconnect("d1", old_ws)
+
+    assert manager.is_connected("d1")
+    assert await manager.send_skill_request("d1", "S", "m", [7], {}) == ["d1", 7]
+
+
+@pytest.mark.asyncio
+async def test_timeout_sends_cancel_to_device():
+    manager = ConnectionManager()
+    ws = EchoWebSocket(manager, "d1", reply=False)
+    await manager.connect("d1", ws)
+
+    with pytest.raises(TimeoutError):
+        await manager.send_skill_request("d1", "S", "m", [], {}, timeout=0.05)
+
+    request_id = ws.sent[0]["request_id"]
+    assert ws.sent[-1] == {"type": "cancel", "request_id": request_id}
+
+
+async def _start_request(manager: ConnectionManager, ws: EchoWebSocket):
+    call = asyncio.create_task(
+        manager.send_skill_request("d1", "S", "m", [], {}, timeout=1.0)
+    )
+    await _wait_for_pending(manager, "d1", 1)
+    return call, ws.sent[0]["request_id"]
+
+
+def _chunk(request_id: str, seq: int, data: str) -> dict:
+    return {
+        "type": "skill_response_chunk",
+        "request_id": request_id,
+        "seq": seq,
+        "data": data,
+    }
+
+
+@pytest.mark.asyncio
+async def test_chunked_result_is_assembled():
+    manager = ConnectionManager()
+    ws = EchoWebSocket(manager, "d1", reply=False)
+    await manager.connect("d1", ws)
+    call, request_id = await _start_request(manager, ws)
+
+    for seq, part in enumerate(["line 1\n", "line 2\n", "line 3\n"]):
+        await manager.handle_skill_response_chunk(_chunk(request_id, seq, part), "d1")
+    await manager.handle_skill_response(
+        {"request_id": request_id, "success": True, "chunks": 3}, device_id="d1"
+    )
+
+    assert await call == "line 1\nline 2\nline 3\n"
+    assert manager.pending_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_chunk_fails_request():
+    manager = ConnectionManager()
+    ws = EchoWebSocket(manager, "d1", reply=False)
+    await manager.connect("d1", ws)
+    call, request_id = await _start_request(manager, ws)
+
+    await manager.handle_skill_response_chunk(_chunk(request_id, 0, "a"), "d1")
+    await manager.handle_skill_response(
+        {"request_id": request_id, "success": True, "chunks": 2}, device_id="d1"
+    )
+
+    with pytest.raises(RuntimeError, match="got 1 of 2 chunks"):
+        await call
+
+
+@pytest.mark.asyncio
+async def test_oversized_chunked_result_is_aborted(monkeypatch):
+    monkeypatch.setattr("hub.config.settings.skill_result_max_bytes", 1024)
+    manager = ConnectionManager()
+    ws = EchoWebSocket(manager, "d1", reply=False)
+    await manager.connect("d1", ws)
+    call, request_id = await _start_request(manager, ws)
+
+    await manager.handle_skill_response_chunk(_chunk(request_id, 0, "x" * 600), "d1")
+    await manager.handle_skill_response_chunk(_chunk(request_id, 1, "x" * 600), "d1")
+
+    with pytest.raises(RuntimeError, match="exceeded 1024 bytes"):
+        await call
+    assert ws.sent[-1] == {"type": "cancel", "request_id": request_id}
+    # Chunks still in flight from the device are dropped quietly.
+    await manager.handle_skill_response_chunk(_chunk(request_id, 2, "x"), "d1")
@@ -0,0 +1,134 @@
+"""Tests for agent-loop prompt compaction."""
+
+from unittest.mock import patch
+
+import pytest
+
+from hub.context_budget import ContextCompactor, context_compactor, estimate_tokens
+from hub.database import Device
+from hub.routers.chat import ChatCompletionRequest, ChatMessage, _agent_loop_events
+
+
+def _tool_output(i: int) -> dict:
+    return {"role": "user", "content": f"[Tool Results]\nTool t{i}: " + "x" * 4000}
+
+
+def _conversation(turns: int) -> list[dict]:
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}"})
+        messages.append({"role": "assistant", "content": ""})
+        messages.append(_tool_output(i))
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+def test_under_budget_is_sent_unchanged():
+    compactor = ContextCompactor(token_budget=100_000, keep_recent=2)
+    messages = _conversation(3)
+
+    assert compactor.fit(messages, "system") == messages
+    assert compactor.get_stats()["compactions"] == 0
+
+
+def test_old_tool_output_is_summarized_and_recent_kept():
+    compactor = ContextCompactor(token_budget=2000, keep_recent=4)
+    messages = _conversation(3)
+
+    fitted = compactor.fit(messages, "system", session_id="s1")
+
+    assert len(fitted) == len(messages)
+    # The newest turn, including its tool output, is untouched.
+    assert fitted[-4:] == messages[-4:]
+    assert fitted[2]["content"].startswith("[Tool Results] (summarized)")
+    assert "chars of older tool output omitted" in fitted[2]["content"]
+    # Plain messages are never rewritten.
+    assert fitted[0] == messages[0]
+    assert messages[2]["content"].endswith("x")  # input is not modified
+    stats = compactor.get_stats()
+    assert stats["tokens_after_max"] <= 2000
+    assert stats["tokens_before_total"] > stats["tokens_after_total"]
+
+
+def test_summaries_are_cached_per_session():
+    compactor = ContextCompactor(token_budget=2000, keep_recent=4)
+    messages = _conversation(3)
+
+    compactor.fit(messages, session_id="s1")
+    compactor.fit(messages, session_id="s1")
+
+    stats = compactor.get_stats()
+    assert stats["summaries_computed"] == 2
+    assert stats["summary_cache_hits"] == 2
+
+
+def test_oldest_messages_dropped_when_summaries_are_not_enough():
+    compactor = ContextCompactor(token_budget=1300, keep_recent=2)
+    messages = [{"role": "user", "content": "y" * 2000} for _ in range(4)]
+
+    fitted = compactor.fit(messages)
+
+    assert fitted[0]["content"] == "[2 earlier messages omitted to fit the context]"
+    assert fitted[1:] == messages[2:]
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _ToolCallBlock:
+    def __init__(self, call_id):
+        self.type = "tool_call"
+        self.id = call_id
+        self.name = "python_exec"
+        self.arguments = {"code": f"print({call_id!r})"}
+
+
+class _Response:
+    def __init__(self, blocks):
+        self.content = blocks
+        self.variant_name = "test_variant"
+
+
+@pytest.mark.asyncio
+async def test_agent_loop_sends_compacted_prompt(monkeypatch):
+    """Tool output from earlier iterations is summarized before resending."""
+    monkeypatch.setattr(context_compactor, "_token_budget", 1500)
+    monkeypatch.setattr(context_compactor, "_keep_recent", 2)
+    prompts: list[list[dict]] = []
+
+    async def mock_inference(messages, function_name, system=None, **kwargs):
+        prompts.append(messages)
+        if len(prompts) < 3:
+            return _Response([_ToolCallBlock(f"call_{len(prompts)}")])
+        return _Response([_TextBlock("done")])
+
+    async def big_result(self, tool_name, arguments):
+        return {"result": "z" * 5000}
+
+    request = ChatCompletionRequest(
+        messages=[ChatMessage(role="user", content="hi")], enable_tools=True
+    )
+    with (
+        patch("hub.routers.chat.tz_inference", side_effect=mock_inference),
+        patch("hub.skill_service.HubSkillService.execute_tool", big_result),
+        patch(
+            "hub.skill_service.HubSkillService.get_system_prompt",
+            return_value="system",
+        ),
+    ):
+        events = [
+            e
+            async for e in _agent_loop_events(
+                request=request, device=Device(user_id="u"), db=None, manager=None
+            )
+        ]
+
+    assert events[-1]["content"] == "done"
+    last_prompt = prompts[-1]
+    assert last_prompt[2]["content"].startswith("[Tool Results] (summarized)")
+    assert last_prompt[-1]["content"].startswith("[Tool Results]\n")
+    assert sum(estimate_tokens(m["content"]) for m in last_prompt) < 1500
+    assert context_compactor.get_stats()["steps"] == 3
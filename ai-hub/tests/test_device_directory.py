@@ -0,0 +1,112 @@
+"""Tests for the per-user device directory."""
+
+import pytest
+
+from hub.database import Device, Skill
+from hub.device_directory import DeviceDirectory
+from hub.skill_index import SkillIndex
+from hub.skill_service import DevicesProxy
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class FakeDb:
+    """Session stand-in answering each execute() with the next canned rows."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Result(self.results.pop(0))
+
+
+def _rows():
+    return [
+        Device(id="d1", name="Living Room", is_active=True),
+        Device(id="d2", name="Old PC", is_active=False),
+        Device(id="d3", name="living-room", is_active=False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_devices_load_once_and_resolve_by_name():
+    directory = DeviceDirectory()
+    db = FakeDb(_rows())
+
+    first = await directory.get("u", db.execute)
+    second = await directory.get("u", db.execute)
+
+    assert second is first
+    assert len(db.statements) == 1
+    assert sorted(first.active) == ["living_room"]
+    # An active device wins a normalized-name clash with an inactive one.
+    assert first.find("Living Room").id == "d1"
+    assert first.find("old pc").id == "d2"
+    assert first.find("kitchen") is None
+    assert directory.get_stats() == {
+        "hits": 1,
+        "loads": 1,
+        "invalidations": 0,
+        "users": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_cached():
+    directory = DeviceDirectory()
+    db = FakeDb(_rows(), _rows())
+
+    async def racing_execute(stmt):
+        directory.invalidate("u")
+        return await db.execute(stmt)
+
+    await directory.get("u", racing_execute)
+    await directory.get("u", db.execute)
+
+    assert len(db.statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_agnostic_candidates_come_from_the_skill_index():
+    directory = DeviceDirectory()
+    index = SkillIndex()
+    db = FakeDb(
+        _rows(),
+        [
+            Skill(
+                device_id="d1",
+                class_name="WeatherSkill",
+                function_name="get",
+                signature="get()",
+                device_agnostic=True,
+            )
+        ],
+    )
+    proxy = DevicesProxy(
+        db=db,
+        user_id="u",
+        connection_manager=None,
+        skill_index=index,
+        device_directory=directory,
+    )
+    devices = await proxy._get_user_devices()
+
+    assert await proxy._agnostic_candidates(devices, "WeatherSkill", "get") == ["d1"]
+    assert "def get():" in await proxy.describe_function("WeatherSkill.get")
+    # One query for the devices and one to hydrate the index, then none.
+    assert len(db.statements) == 2
+
+    directory.invalidate_candidates("u")
+    assert await proxy._agnostic_candidates(devices, "WeatherSkill", "get") == ["d1"]
+    assert len(db.statements) == 2
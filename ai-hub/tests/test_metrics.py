@@ -0,0 +1,112 @@
+"""Tests for the Prometheus-style /metrics endpoint."""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from hub.config import settings
+from hub.metrics import (
+    MetricsRegistry,
+    db_query_seconds,
+    inference_seconds,
+    instrument_engine,
+)
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+        self.variant_name = "test_variant"
+
+
+async def _mock_inference(messages, function_name, system=None, **kwargs):
+    return _Response("hi there")
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("op",), (0.1, 1.0))
+    latency.observe(0.05, "read")
+    latency.observe(0.5, "read")
+    latency.observe(5.0, "read")
+
+    assert registry.render().splitlines() == [
+        "# HELP op_seconds Op latency.",
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{op="read",le="0.1"} 1',
+        'op_seconds_bucket{op="read",le="1.0"} 2',
+        'op_seconds_bucket{op="read",le="+Inf"} 3',
+        'op_seconds_sum{op="read"} 5.55',
+        'op_seconds_count{op="read"} 3',
+    ]
+
+
+def test_counter_escapes_label_values():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors.", ("kind",))
+    errors.inc('say "hi"')
+    errors.inc('say "hi"', amount=2)
+
+    assert 'errors_total{kind="say \\"hi\\""} 3.0' in registry.render()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op latency.")
+    with latency.time():
+        pass
+
+    assert latency.count() == 0
+
+
+def test_failed_query_leaves_no_timer_behind():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = db_query_seconds.count("background")
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+        assert not conn.info.get("hub_query_start")
+
+    assert db_query_seconds.count("background") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_chat_hot_paths(auth_client):
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    with patch("hub.routers.chat.tz_inference", side_effect=_mock_inference):
+        response = await auth_client.post(
+            "/api/v1/chat/completions",
+            json={
+                "messages": [{"role": "user", "content": "hello"}],
+                "session_id": session_id,
+            },
+        )
+    assert response.status_code == 200
+
+    metrics = await auth_client.get("/metrics")
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert inference_seconds.count("chat_no_tools", "test_variant") == 1
+    assert db_query_seconds.count("/sessions") > 0
+    assert (
+        'hub_inference_seconds_count{function="chat_no_tools",variant="test_variant"} 1'
+        in metrics.text
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    assert (await client.get("/metrics")).status_code == 404
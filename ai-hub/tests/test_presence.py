@@ -0,0 +1,162 @@
+"""Tests for device-level skill presence."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, text
+
+from hub.database import Device, DevicePresence, get_engine, get_session_factory
+from hub.presence import PresenceTracker, presence
+
+SKILLS = [
+    {
+        "class_name": "MusicSkill",
+        "function_name": name,
+        "signature": f"{name}() -> None",
+        "docstring": "Control music playback",
+    }
+    for name in ("play", "pause", "stop")
+]
+
+
+async def _backdate_presence(seconds: int) -> None:
+    stale = datetime.now(timezone.utc) - timedelta(seconds=seconds)
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE device_presence SET last_heartbeat = :ts"), {"ts": stale}
+        )
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_writes_presence_not_skill_rows(auth_client):
+    """A heartbeat refreshes one presence row, not every skill row."""
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    engine = get_engine()
+    async with engine.begin() as conn:
+        before = (
+            await conn.execute(text("SELECT id, last_heartbeat FROM skills"))
+        ).fetchall()
+
+    response = await auth_client.post("/skills/heartbeat")
+    assert response.status_code == 200
+    assert "3 skills" in response.json()["message"]
+
+    async with engine.begin() as conn:
+        after = (
+            await conn.execute(text("SELECT id, last_heartbeat FROM skills"))
+        ).fetchall()
+        presence_rows = (
+            await conn.execute(text("SELECT device_id FROM device_presence"))
+        ).fetchall()
+    assert after == before
+    assert len(presence_rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweep_expires_stale_devices(auth_client):
+    """Swept devices drop out of list and search until they heartbeat again."""
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    assert (await auth_client.get("/skills/search", params={"query": "music"})).json()[
+        "total"
+    ] == 3
+
+    await _backdate_presence(seconds=7200)
+    expired = await presence.sweep()
+    assert len(expired) == 1
+
+    assert (await auth_client.get("/skills")).json()["total"] == 0
+    assert (await auth_client.get("/skills/search", params={"query": "music"})).json()[
+        "total"
+    ] == 0
+    listed = await auth_client.get("/skills", params={"include_expired": "true"})
+    assert listed.json()["total"] == 3
+
+    await auth_client.post("/skills/heartbeat")
+    assert (await auth_client.get("/skills")).json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_sweep_keeps_connected_devices(auth_client):
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    await _backdate_presence(seconds=7200)
+
+    factory = get_session_factory()
+    async with factory() as db:
+        device_id = (await db.execute(select(DevicePresence.device_id))).scalar_one()
+
+    assert await presence.sweep(connected_device_ids=[device_id]) == []
+    assert (await auth_client.get("/skills")).json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_touch_coalesces_frequent_pings(auth_client):
+    """Pings inside the write interval do not hit the database."""
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    tracker = PresenceTracker()
+
+    factory = get_session_factory()
+    async with factory() as db:
+        device = (await db.execute(select(Device))).scalar_one()
+        now = datetime.now(timezone.utc)
+        assert await tracker.touch(db, device, now, min_interval=30)
+        assert not await tracker.touch(
+            db, device, now + timedelta(seconds=5), min_interval=30
+        )
+        assert await tracker.touch(
+            db, device, now + timedelta(seconds=31), min_interval=30
+        )
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_ignores_rows_cached_by_a_long_lived_session(auth_client):
+    """A WebSocket's session may still hold a presence row the sweeper deleted."""
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    tracker = PresenceTracker()
+
+    factory = get_session_factory()
+    async with factory() as ws_db:
+        device = (await ws_db.execute(select(Device))).scalar_one()
+        # Held, so the identity map keeps serving this (soon stale) row.
+        cached = await ws_db.get(DevicePresence, device.id)
+        assert cached is not None
+
+        await _backdate_presence(seconds=7200)
+        assert await presence.sweep() == [device.id]
+
+        now = datetime.now(timezone.utc)
+        assert await tracker.heartbeat(device, now)
+
+    assert (await auth_client.get("/skills")).json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_drop_hides_skills_until_reconnect(auth_client):
+    """A closed WebSocket hides the device's skills but keeps their rows."""
+    from hub.routers.websocket import _restore_indexed_skills
+
+    await auth_client.post("/skills/register", json={"skills": SKILLS})
+    assert (await auth_client.get("/skills/search", params={"query": "music"})).json()[
+        "total"
+    ] == 3
+
+    factory = get_session_factory()
+    async with factory() as db:
+        device = (await db.execute(select(Device))).scalar_one()
+        await presence.drop(db, device)
+        await db.commit()
+
+    assert (await auth_client.get("/skills/search", params={"query": "music"})).json()[
+        "total"
+    ] == 0
+    listed = await auth_client.get("/skills", params={"include_expired": "true"})
+    assert listed.json()["total"] == 3
+
+    async with factory() as db:
+        device = (await db.execute(select(Device))).scalar_one()
+        await presence.touch(db, device, datetime.now(timezone.utc))
+        await db.commit()
+        await _restore_indexed_skills(db, device)
+    assert (await auth_client.get("/skills/search", params={"query": "music"})).json()[
+        "total"
+    ] == 3
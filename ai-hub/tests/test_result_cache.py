@@ -0,0 +1,155 @@
+"""Tests for the skill result cache."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from hub.database import Device, get_session_factory
+from hub.main import app
+from hub.result_cache import SkillResultCache, make_key, skill_result_cache
+from hub.routers.skills import skill_content_hash
+
+SKILLS = [
+    {
+        "class_name": "NewsSkill",
+        "function_name": "get_top_headlines",
+        "signature": "get_top_headlines(country: str = 'us') -> dict",
+        "docstring": "Get top headlines",
+        "cache_ttl_seconds": 600,
+    },
+    {
+        "class_name": "NewsSkill",
+        "function_name": "set_sources",
+        "signature": "set_sources(sources: list) -> None",
+        "docstring": "Choose news sources",
+    },
+]
+
+
+class CountingWebSocket:
+    """Fake device socket that answers every request and counts them."""
+
+    def __init__(self, manager, device_id):
+        self.manager = manager
+        self.device_id = device_id
+        self.requests: list[dict] = []
+
+    async def send_json(self, message):
+        if message.get("type") != "skill_request":
+            return
+        self.requests.append(message)
+        asyncio.get_running_loop().call_soon(
+            asyncio.ensure_future,
+            self.manager.handle_skill_response(
+                {
+                    "request_id": message["request_id"],
+                    "success": True,
+                    "result": {"call": len(self.requests), "args": message["args"]},
+                },
+                device_id=self.device_id,
+            ),
+        )
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = SkillResultCache(max_entries=2)
+    keys = [make_key("u", "d", "S", "m", [i], {}) for i in range(3)]
+    for key in keys:
+        cache.put(key, {"v": key[-1]}, ttl_seconds=10, now=0)
+
+    assert cache.get(keys[0], now=1) == (False, None)  # evicted (LRU)
+    assert cache.get(keys[2], now=1) == (True, {"v": keys[2][-1]})
+    assert cache.get(keys[2], now=11) == (False, None)  # expired
+
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_keys_normalize_kwargs_and_results_are_copied():
+    cache = SkillResultCache(max_entries=10)
+    cache.put(make_key("u", "d", "S", "m", [], {"a": 1, "b": 2}), [1], ttl_seconds=5)
+
+    hit, value = cache.get(make_key("u", "d", "S", "m", [], {"b": 2, "a": 1}))
+    assert hit and value == [1]
+    value.append(2)
+    assert cache.get(make_key("u", "d", "S", "m", [], {"a": 1, "b": 2}))[1] == [1]
+
+    assert cache.invalidate("u", skill_name="Other") == 0
+    assert cache.invalidate("u", skill_name="S") == 1
+    assert len(cache) == 0
+
+
+def test_cache_ttl_only_hashed_when_set():
+    plain = dict(SKILLS[1])
+    assert skill_content_hash(plain) == skill_content_hash(
+        {**plain, "cache_ttl_seconds": 0}
+    )
+    assert skill_content_hash(SKILLS[0]) != skill_content_hash(
+        {**SKILLS[0], "cache_ttl_seconds": 60}
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeat_calls_served_from_cache(auth_client):
+    assert (
+        await auth_client.post("/skills/register", json={"skills": SKILLS})
+    ).status_code == 200
+    factory = get_session_factory()
+    async with factory() as db:
+        device = (await db.execute(select(Device))).scalar_one()
+
+    manager = app.state.connection_manager
+    ws = CountingWebSocket(manager, device.id)
+    await manager.connect(device.id, ws)
+
+    async def call(method, *args):
+        response = await auth_client.post(
+            "/skills/execute",
+            json={
+                "device_name": "Test Device",
+                "skill_name": "NewsSkill",
+                "method_name": method,
+                "args": list(args),
+            },
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["result"]
+
+    try:
+        first = await call("get_top_headlines", "us")
+        assert await call("get_top_headlines", "us") == first
+        assert len(ws.requests) == 1
+
+        await call("get_top_headlines", "gb")
+        assert len(ws.requests) == 2
+
+        # A non-cacheable call on the same skill may change state.
+        await call("set_sources", ["bbc"])
+        await call("get_top_headlines", "us")
+        assert len(ws.requests) == 4
+
+        # Re-registration and explicit invalidation drop cached results.
+        await auth_client.post("/skills/register", json={"skills": SKILLS})
+        await call("get_top_headlines", "us")
+        assert len(ws.requests) == 5
+        invalidated = await auth_client.delete(
+            "/skills/cache", params={"skill_name": "NewsSkill"}
+        )
+        assert invalidated.json() == {"invalidated": 1}
+    finally:
+        await manager.disconnect(device.id)
+
+    stats = skill_result_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+    listed = (await auth_client.get("/skills")).json()["skills"]
+    ttls = {s["function_name"]: s["cache_ttl_seconds"] for s in listed}
+    assert ttls == {"get_top_headlines": 600, "set_sources": 0}
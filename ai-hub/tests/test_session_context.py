@@ -0,0 +1,127 @@
+"""Tests for incremental chat requests backed by the session context cache."""
+
+from unittest.mock import patch
+
+import pytest
+
+from hub.session_context import session_context
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+        self.variant_name = "test_variant"
+
+
+class RecordingInference:
+    """Fake gateway that records the messages of every call."""
+
+    def __init__(self):
+        self.calls: list[list[dict]] = []
+
+    async def __call__(self, messages, function_name, system=None, **kwargs):
+        self.calls.append(messages)
+        return _Response(f"reply {len(self.calls)}")
+
+
+async def _chat(client, session_id, version, text):
+    return await client.post(
+        "/api/v1/chat/completions",
+        json={
+            "messages": [{"role": "user", "content": text}],
+            "session_id": session_id,
+            "context_version": version,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_incremental_requests_rebuild_context(auth_client):
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    inference = RecordingInference()
+
+    with patch("hub.routers.chat.tz_inference", new=inference):
+        first = await _chat(auth_client, session_id, 0, "hello")
+        assert first.status_code == 200
+        assert first.json()["context_version"] == 2
+
+        second = await _chat(auth_client, session_id, 2, "and again")
+        assert second.status_code == 200
+        assert second.json()["context_version"] == 4
+
+    assert inference.calls[1] == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "reply 1"},
+        {"role": "user", "content": "and again"},
+    ]
+    # The second turn was served from memory, with no history query.
+    stats = session_context.get_stats()
+    assert stats["loads"] == 1
+    assert stats["hits"] == 1
+
+    messages = (await auth_client.get(f"/sessions/{session_id}/messages")).json()
+    assert [m["content"] for m in messages["messages"]] == [
+        "hello",
+        "reply 1",
+        "and again",
+        "reply 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stale_context_version_is_rejected(auth_client):
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    inference = RecordingInference()
+
+    with patch("hub.routers.chat.tz_inference", new=inference):
+        await _chat(auth_client, session_id, 0, "hello")
+        response = await _chat(auth_client, session_id, 0, "hello again")
+
+    assert response.status_code == 409
+    assert len(inference.calls) == 1
+    # Nothing from the rejected request was persisted.
+    session = (await auth_client.get(f"/sessions/{session_id}")).json()
+    assert session["message_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_messages_added_elsewhere_are_picked_up(auth_client):
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    inference = RecordingInference()
+
+    with patch("hub.routers.chat.tz_inference", new=inference):
+        await _chat(auth_client, session_id, 0, "hello")
+        await auth_client.post(
+            f"/sessions/{session_id}/messages",
+            json={"role": "user", "content": "typed on another device"},
+        )
+        # Simulate a write the cache missed (e.g. from another worker).
+        session_context.invalidate(session_id)
+        response = await _chat(auth_client, session_id, 3, "next")
+
+    assert response.status_code == 200
+    assert [m["content"] for m in inference.calls[1]] == [
+        "hello",
+        "reply 1",
+        "typed on another device",
+        "next",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_context_version_requires_session(auth_client):
+    response = await auth_client.post(
+        "/api/v1/chat/completions",
+        json={
+            "messages": [{"role": "user", "content": "hi"}],
+            "context_version": 0,
+        },
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,191 @@
+"""Tests for write-behind batching of session messages."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from hub.database import Message, Session, get_session_factory
+from hub.session_writer import session_writer
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+        self.variant_name = "test_variant"
+
+
+async def _mock_inference(messages, function_name, system=None, **kwargs):
+    return _Response("hi there")
+
+
+async def _stored_messages(session_id):
+    async with get_session_factory()() as db:
+        result = await db.execute(
+            select(Message.role, Message.content)
+            .where(Message.session_id == session_id)
+            .order_by(Message.id)
+        )
+        return result.all()
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_is_written_in_one_batch(auth_client, monkeypatch):
+    monkeypatch.setattr(session_writer, "_delay_seconds", 60.0)
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+
+    with patch("hub.routers.chat.tz_inference", side_effect=_mock_inference):
+        response = await auth_client.post(
+            "/api/v1/chat/completions",
+            json={
+                "messages": [{"role": "user", "content": "hello"}],
+                "session_id": session_id,
+            },
+        )
+    assert response.status_code == 200
+    assert session_writer.get_stats()["pending"] == 2
+    assert await _stored_messages(session_id) == []
+
+    # Session reads see queued messages (read-your-writes).
+    info = (await auth_client.get(f"/sessions/{session_id}")).json()
+    assert info["message_count"] == 2
+    assert info["title"] == "hello"
+
+    stats = session_writer.get_stats()
+    assert stats["batches"] == 1
+    assert stats["written"] == 2
+    assert stats["pending"] == 0
+    assert await _stored_messages(session_id) == [
+        ("user", "hello"),
+        ("assistant", "hi there"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_add_message_returns_written_id(auth_client):
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+
+    response = await auth_client.post(
+        f"/sessions/{session_id}/messages",
+        json={"role": "user", "content": "note"},
+    )
+
+    assert response.status_code == 200
+    assert isinstance(response.json()["id"], int)
+    listed = (await auth_client.get("/sessions")).json()["sessions"]
+    assert listed[0]["message_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_close_writes_queued_messages(auth_client, monkeypatch):
+    monkeypatch.setattr(session_writer, "_delay_seconds", 60.0)
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    async with get_session_factory()() as db:
+        session = await db.get(Session, session_id)
+        await session_writer.append(session, "user", "one")
+        await session_writer.append(session, "assistant", "two")
+
+    await session_writer.close()
+
+    assert await _stored_messages(session_id) == [("user", "one"), ("assistant", "two")]
+    async with get_session_factory()() as db:
+        session = await db.get(Session, session_id)
+        assert session.message_count == 2
+        assert session.title == "one"
+
+
+@pytest.mark.asyncio
+async def test_read_waits_for_batch_being_written(auth_client, monkeypatch):
+    monkeypatch.setattr(session_writer, "_delay_seconds", 60.0)
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    async with get_session_factory()() as db:
+        session = await db.get(Session, session_id)
+        await session_writer.append(session, "user", "one")
+
+    release = asyncio.Event()
+    write = session_writer._write
+
+    async def slow_write(batch):
+        await release.wait()
+        await write(batch)
+
+    monkeypatch.setattr(session_writer, "_write", slow_write)
+    flushing = asyncio.create_task(session_writer.flush())
+    await asyncio.sleep(0)
+    assert not session_writer.has_pending(session_id)
+
+    read = asyncio.create_task(session_writer.flush_for_read(session_id))
+    await asyncio.sleep(0.01)
+    assert not read.done()
+
+    release.set()
+    await asyncio.gather(flushing, read)
+    assert await _stored_messages(session_id) == [("user", "one")]
+
+
+@pytest.mark.asyncio
+async def test_failed_session_does_not_block_others(auth_client, monkeypatch):
+    monkeypatch.setattr(session_writer, "_delay_seconds", 60.0)
+    monkeypatch.setattr(session_writer, "RETRY_DELAY_SECONDS", 60.0)
+    good_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    bad_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    async with get_session_factory()() as db:
+        good = await db.get(Session, good_id)
+        bad = await db.get(Session, bad_id)
+        await session_writer.append(good, "user", "kept")
+        await session_writer.append(bad, "user", "poison")
+
+    write = session_writer._write
+
+    async def failing_write(batch):
+        if any(p.session_id == bad_id for p in batch):
+            raise RuntimeError("constraint failed")
+        await write(batch)
+
+    monkeypatch.setattr(session_writer, "_write", failing_write)
+
+    # Neither the flush nor a read of the good session raises.
+    await session_writer.flush()
+    await session_writer.flush_for_read(good_id)
+    assert await _stored_messages(good_id) == [("user", "kept")]
+    assert session_writer.has_pending(bad_id)
+    # A retry is scheduled even though nothing else is appended.
+    assert session_writer._task is not None and not session_writer._task.done()
+
+    for _ in range(session_writer.MAX_WRITE_ATTEMPTS - 1):
+        await session_writer.flush()
+
+    stats = session_writer.get_stats()
+    assert stats["pending"] == 0
+    assert stats["dropped"] == 1
+    assert await _stored_messages(bad_id) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_add_message_is_not_written_later(auth_client, monkeypatch):
+    """A 503 from add_message means the message was not (and will not be) stored."""
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    write = session_writer._write
+
+    async def failing_write(batch):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(session_writer, "_write", failing_write)
+    response = await auth_client.post(
+        f"/sessions/{session_id}/messages", json={"role": "user", "content": "hi"}
+    )
+    assert response.status_code == 503
+    assert not session_writer.has_pending(session_id)
+
+    monkeypatch.setattr(session_writer, "_write", write)
+    await session_writer.flush()
+    assert await _stored_messages(session_id) == []
+    session = (await auth_client.get(f"/sessions/{session_id}")).json()
+    assert session["message_count"] == 0
@@ -132,3 +132,108 @@ async def test_sessions_requires_auth(client):
     """Test that /sessions requires authentication."""
     response = await client.get("/sessions")
     assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_messages_cursor_pagination(auth_client):
+    """after_id/limit page through messages; next_after_id marks more pages."""
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    for i in range(5):
+        await auth_client.post(
+            f"/sessions/{session_id}/messages",
+            json={"role": "user", "content": f"m{i}"},
+        )
+
+    first = (
+        await auth_client.get(f"/sessions/{session_id}/messages", params={"limit": 2})
+    ).json()
+    assert [m["content"] for m in first["messages"]] == ["m0", "m1"]
+    assert first["total"] == 5
+
+    contents = [m["content"] for m in first["messages"]]
+    cursor = first["next_after_id"]
+    while cursor is not None:
+        page = (
+            await auth_client.get(
+                f"/sessions/{session_id}/messages",
+                params={"after_id": cursor, "limit": 2},
+            )
+        ).json()
+        contents.extend(m["content"] for m in page["messages"])
+        cursor = page["next_after_id"]
+    assert contents == [f"m{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_messages_etag(auth_client):
+    """If-None-Match returns 304 until a message is added."""
+    session_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    url = f"/sessions/{session_id}/messages"
+    await auth_client.post(url, json={"role": "user", "content": "hi"})
+
+    response = await auth_client.get(url)
+    etag = response.headers["ETag"]
+
+    cached = await auth_client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    await auth_client.post(url, json={"role": "assistant", "content": "hello"})
+    changed = await auth_client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    # Each page has its own validator.
+    etag = changed.headers["ETag"]
+    page = await auth_client.get(
+        url, params={"limit": 1}, headers={"If-None-Match": etag}
+    )
+    assert page.status_code == 200
+    assert [m["content"] for m in page.json()["messages"]] == ["hi"]
+    cached = await auth_client.get(
+        url, params={"limit": 1}, headers={"If-None-Match": page.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_total_and_since(auth_client):
+    """total counts every match; since returns only recently active sessions."""
+    old_id = (await auth_client.post("/sessions", json={})).json()["id"]
+    await auth_client.post("/sessions", json={})
+
+    page = (await auth_client.get("/sessions", params={"limit": 1})).json()
+    assert len(page["sessions"]) == 1
+    assert page["total"] == 2
+
+    newest = page["sessions"][0]["last_activity"]
+    await auth_client.patch(f"/sessions/{old_id}", json={"title": "Renamed"})
+
+    changed = (await auth_client.get("/sessions", params={"since": newest})).json()
+    ids = [s["id"] for s in changed["sessions"]]
+    # The feed is oldest activity first, so the rename comes last.
+    assert ids[-1] == old_id
+
+
+@pytest.mark.asyncio
+async def test_since_feed_pages_by_key(auth_client):
+    """Activity during paging moves a session to the end, never skips one."""
+    ids = [(await auth_client.post("/sessions", json={})).json()["id"] for _ in range(3)]
+
+    async def page(since, after_id=None):
+        params = {"since": since, "limit": 1}
+        if after_id is not None:
+            params["after_id"] = after_id
+        return (await auth_client.get("/sessions", params=params)).json()["sessions"]
+
+    first = await page("2000-01-01T00:00:00")
+    assert [s["id"] for s in first] == ids[:1]
+
+    # The first-listed session changes before the next page is read.
+    await auth_client.patch(f"/sessions/{ids[0]}", json={"title": "Renamed"})
+
+    seen = []
+    last = first[-1]
+    while rows := await page(last["last_activity"], last["id"]):
+        seen.extend(s["id"] for s in rows)
+        last = rows[-1]
+    assert seen == [ids[1], ids[2], ids[0]]
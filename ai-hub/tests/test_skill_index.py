@@ -0,0 +1,95 @@
+"""Tests for the in-memory skill search index."""
+
+import pytest
+
+from hub.skill_index import IndexedSkill, SkillIndex, parse_query, tokenize
+
+
+def _skill(device_id, class_name, function_name, docstring=None):
+    return IndexedSkill(
+        device_id=device_id,
+        class_name=class_name,
+        function_name=function_name,
+        signature=f"{function_name}()",
+        docstring=docstring,
+    )
+
+
+@pytest.fixture
+def index():
+    """Return a hydrated index for user u1 with two devices."""
+    idx = SkillIndex()
+    idx.load_user("u1", [], generation=idx.generation("u1"))
+    idx.replace_device(
+        "u1",
+        "d1",
+        [
+            _skill("d1", "HomeAssistantSkill", "HassTurnOn", "Turn on a device."),
+            _skill("d1", "WeatherSkill", "get_current_weather", "Current weather."),
+            _skill("d1", "InformationSkill", "get_info", "General information."),
+        ],
+    )
+    idx.replace_device(
+        "u1",
+        "d2",
+        [_skill("d2", "MusicSkill", "play_song", "Play a song by name.")],
+    )
+    return idx
+
+
+def test_tokenize_splits_camel_case_and_underscores():
+    assert tokenize("HassTurnOn get_current_weather") == [
+        "hass",
+        "turn",
+        "on",
+        "get",
+        "current",
+        "weather",
+    ]
+
+
+def test_parse_query_strips_stop_words():
+    assert parse_query("what is the weather") == ["weather"]
+    # Stop-word-only queries keep their words rather than matching everything
+    assert parse_query("the") == ["the"]
+
+
+def test_search_uses_word_boundaries(index):
+    """'turn on' must not match 'information' via substring."""
+    results = index.search("u1", "turn on")
+    assert [s.function_name for s, _ in results] == ["HassTurnOn"]
+
+
+def test_search_matches_prefixes(index):
+    results = index.search("u1", "weath")
+    assert [s.class_name for s, _ in results] == ["WeatherSkill"]
+
+
+def test_search_falls_back_to_any_word_and_ranks(index):
+    results = index.search("u1", "play weather")
+    names = [s.function_name for s, _ in results]
+    assert set(names) == {"play_song", "get_current_weather"}
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_replace_and_remove_device_update_postings(index):
+    index.replace_device("u1", "d2", [_skill("d2", "LampSkill", "dim", "Dim lamp.")])
+    assert index.search("u1", "song") == []
+    assert [s.class_name for s, _ in index.search("u1", "lamp")] == ["LampSkill"]
+
+    index.remove_device("u1", "d2")
+    assert index.search("u1", "lamp") == []
+
+
+def test_search_respects_device_allow_list(index):
+    assert index.search("u1", "song", device_ids=["d1"]) == []
+
+
+def test_mutations_during_hydration_force_reload():
+    idx = SkillIndex()
+    generation = idx.generation("u1")
+    # A registration lands while the hydration query is in flight.
+    idx.replace_device("u1", "d1", [_skill("d1", "LampSkill", "dim")])
+    idx.load_user("u1", [], generation=generation)
+    assert not idx.is_loaded("u1")
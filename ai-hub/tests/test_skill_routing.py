@@ -1,11 +1,16 @@
+"""Tests for skill search ordering and device-agnostic routing."""
 
+import asyncio
+import time
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from hub.config import settings
 from hub.database import Device, Skill
-from hub.skill_service import DEVICE_AGNOSTIC_KEY, HubSkillService
+from hub.skill_routing import SkillRouter, skill_router
+from hub.skill_service import DEVICE_AGNOSTIC_KEY, DevicesProxy, HubSkillService
 
 
 @pytest.fixture
@@ -13,6 +18,7 @@ def mock_db_session():
     """Return an async mock database session."""
     return AsyncMock()
 
+
 @pytest.fixture
 def mock_connection_manager():
     """Return a mock connection manager."""
@@ -20,6 +26,7 @@ def mock_connection_manager():
     cm.is_connected = MagicMock(return_value=False)
     return cm
 
+
 @pytest.mark.asyncio
 async def test_search_skills_prioritizes_connected_devices(
     mock_db_session,
@@ -199,7 +206,15 @@ async def test_execute_skill_hub_fallback_tries_next_device(
         ),
     ]
 
-    mock_db_session.execute.side_effect = [devices_result, skills_result]
+    # Device-agnostic candidates, latest heartbeat first.
+    candidates_result = MagicMock()
+    candidates_result.scalars.return_value.all.return_value = ["d1", "d2"]
+
+    mock_db_session.execute.side_effect = [
+        devices_result,
+        skills_result,
+        candidates_result,
+    ]
     mock_connection_manager.is_connected.side_effect = lambda device_id: device_id in {
         "d1",
         "d2",
@@ -220,3 +235,99 @@ async def test_execute_skill_hub_fallback_tries_next_device(
     assert result == 3
     assert mock_connection_manager.send_skill_request.await_count == 2
 
+
+SKILL = "WeatherSkill.get_current_weather"
+
+
+class FakeManager:
+    """Connection manager whose devices answer after a fixed delay."""
+
+    def __init__(self, behaviour: dict):
+        # device_id -> (delay seconds, error or None)
+        self.behaviour = behaviour
+        self.sent: list[str] = []
+        self.cancelled: list[str] = []
+
+    def is_connected(self, device_id):
+        return True
+
+    async def send_skill_request(
+        self, device_id, skill_name, method_name, args, kwargs, timeout
+    ):
+        self.sent.append(device_id)
+        delay, error = self.behaviour[device_id]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(device_id)
+            raise
+        if error:
+            raise error
+        return f"sunny via {device_id}"
+
+
+def _devices(*ids):
+    return {i: Device(id=i, name=i) for i in ids}
+
+
+async def _route(manager, *ids):
+    proxy = DevicesProxy(db=None, user_id="u", connection_manager=manager)
+    return await proxy._route_device_agnostic(
+        list(ids), _devices(*ids), "WeatherSkill", "get_current_weather", [], {}
+    )
+
+
+def test_rank_prefers_fast_healthy_devices():
+    router = SkillRouter()
+    for _ in range(5):
+        router.record("slow", SKILL, 0.5, ok=True)
+        router.record("fast", SKILL, 0.05, ok=True)
+        router.record("flaky", SKILL, 0.01, ok=False)
+
+    assert router.rank(["flaky", "slow", "fast"], SKILL) == ["fast", "slow", "flaky"]
+    # Unmeasured devices are tried first so they get measured.
+    assert router.rank(["slow", "new"], SKILL) == ["new", "slow"]
+    assert router.hedge_delay("fast", SKILL, default=1.0) == pytest.approx(0.05)
+    assert router.hedge_delay("new", SKILL, default=1.0) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_failure_falls_over_immediately():
+    manager = FakeManager({"a": (0.0, TimeoutError("no answer")), "b": (0.0, None)})
+
+    assert await _route(manager, "a", "b") == "sunny via b"
+
+    stats = skill_router.get_stats()
+    assert stats["counters"] == {"failovers": 1, "routed": 1}
+    assert stats["routed_by_device"] == {"b": 1}
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_learned_device():
+    manager = FakeManager({"a": (0.05, None), "b": (0.0, None)})
+    await _route(manager, "a")
+    await _route(manager, "b")
+
+    assert await _route(manager, "a", "b") == "sunny via b"
+    assert manager.sent[-1] == "b"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_uses_first_answer(monkeypatch):
+    monkeypatch.setattr(settings, "skill_hedging_enabled", True)
+    # "a" has been fast, so it is tried first with a small p95 hedge delay.
+    for _ in range(5):
+        skill_router.record("a", SKILL, 0.02, ok=True)
+        skill_router.record("b", SKILL, 0.03, ok=True)
+    manager = FakeManager({"a": (1.0, None), "b": (0.0, None)})
+
+    start = time.perf_counter()
+    assert await _route(manager, "a", "b") == "sunny via b"
+    assert time.perf_counter() - start < 0.5
+
+    await asyncio.sleep(0)
+    assert manager.sent == ["a", "b"]
+    assert manager.cancelled == ["a"]
+    counters = skill_router.get_stats()["counters"]
+    assert counters["hedges_sent"] == 1
+    assert counters["hedge_wins"] == 1
@@ -4,6 +4,7 @@ import pytest
 from sqlalchemy import text
 
 from hub.database import get_engine
+from hub.routers.skills import manifest_hash, skill_content_hash
 
 
 @pytest.mark.asyncio
@@ -127,3 +128,108 @@ async def test_skills_table_has_device_agnostic_column(client):
         result = await conn.execute(text("PRAGMA table_info(skills)"))
         columns = {row[1] for row in result.fetchall()}
     assert "device_agnostic" in columns
+
+
+def _skill(function_name: str, docstring: str = "") -> dict:
+    return {
+        "class_name": "MusicSkill",
+        "function_name": function_name,
+        "signature": f"{function_name}() -> None",
+        "docstring": docstring,
+        "device_agnostic": False,
+    }
+
+
+async def _skill_row_ids() -> dict:
+    engine = get_engine()
+    async with engine.begin() as conn:
+        result = await conn.execute(text("SELECT function_name, id FROM skills"))
+        return dict(result.fetchall())
+
+
+@pytest.mark.asyncio
+async def test_sync_unchanged_manifest_skips_writes(auth_client):
+    """Re-announcing the same manifest does not touch skill rows."""
+    skills = [_skill("play_song"), _skill("stop")]
+    await auth_client.post("/skills/register", json={"skills": skills})
+    before = await _skill_row_ids()
+
+    hashes = [skill_content_hash(s) for s in skills]
+    response = await auth_client.post(
+        "/skills/sync",
+        json={"manifest_hash": manifest_hash(hashes), "method_hashes": hashes},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "unchanged", "missing": [], "removed": 0}
+    assert await _skill_row_ids() == before
+
+
+@pytest.mark.asyncio
+async def test_sync_delta_uploads_only_changed_methods(auth_client):
+    """A changed manifest deletes stale rows and uploads only new methods."""
+    await auth_client.post(
+        "/skills/register",
+        json={"skills": [_skill("play_song"), _skill("stop")]},
+    )
+    before = await _skill_row_ids()
+
+    skills = [_skill("play_song"), _skill("pause", "Pause playback")]
+    hashes = [skill_content_hash(s) for s in skills]
+    manifest = manifest_hash(hashes)
+
+    response = await auth_client.post(
+        "/skills/sync",
+        json={"manifest_hash": manifest, "method_hashes": hashes},
+    )
+    data = response.json()
+    assert data["status"] == "incomplete"
+    assert data["missing"] == [hashes[1]]
+    assert data["removed"] == 1
+
+    response = await auth_client.post(
+        "/skills/register",
+        json={
+            "skills": [skills[1]],
+            "manifest_hash": manifest,
+            "method_hashes": hashes,
+        },
+    )
+    assert response.status_code == 200
+
+    after = await _skill_row_ids()
+    assert set(after) == {"play_song", "pause"}
+    # The unchanged method kept its row.
+    assert after["play_song"] == before["play_song"]
+
+    response = await auth_client.post(
+        "/skills/sync",
+        json={"manifest_hash": manifest, "method_hashes": hashes},
+    )
+    assert response.json()["status"] == "unchanged"
+
+
+@pytest.mark.asyncio
+async def test_sync_rejects_mismatched_manifest(auth_client):
+    hashes = [skill_content_hash(_skill("play_song"))]
+    response = await auth_client.post(
+        "/skills/sync",
+        json={"manifest_hash": "0" * 64, "method_hashes": hashes},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_delta_register_requires_every_missing_method(auth_client):
+    skills = [_skill("play_song"), _skill("stop")]
+    hashes = [skill_content_hash(s) for s in skills]
+    response = await auth_client.post(
+        "/skills/register",
+        json={
+            "skills": [skills[0]],
+            "manifest_hash": manifest_hash(hashes),
+            "method_hashes": hashes,
+        },
+    )
+    assert response.status_code == 409
+    assert await _skill_row_ids() == {}
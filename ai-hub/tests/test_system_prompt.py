@@ -0,0 +1,59 @@
+"""Tests for the cached, prefix-stable online-mode system prompt."""
+
+import pytest
+
+from hub.database import Device
+from hub.device_directory import device_directory
+from hub.skill_service import HubSkillService, system_prompt_prefix
+
+from .test_device_directory import FakeDb
+
+
+async def _prompt(db, user_id="u", requester="pc"):
+    service = HubSkillService(db=db, user_id=user_id, connection_manager=None)
+    return await service.get_system_prompt(requesting_device_key=requester)
+
+
+@pytest.mark.asyncio
+async def test_prefix_is_identical_and_device_keys_come_last():
+    prefix = system_prompt_prefix()
+    small = await _prompt(FakeDb([Device(id="a", name="PC", is_active=True)]), "u1")
+    large = await _prompt(
+        FakeDb(
+            [
+                Device(id="c", name="Kitchen", is_active=True),
+                Device(id="b", name="strawberry_hub", is_active=True),
+                Device(id="a", name="PC", is_active=True),
+            ]
+        ),
+        "u2",
+    )
+
+    for prompt in (small, large):
+        assert prompt.startswith(prefix)
+        assert prompt[len(prefix) :].startswith("VALID DEVICE KEYS")
+    assert small.endswith("\nhub, pc\n")
+    # Row order does not leak into the prompt; the hub device stays hidden.
+    assert large.endswith("\nhub, kitchen, pc\n")
+
+
+@pytest.mark.asyncio
+async def test_prompt_cached_until_device_set_changes():
+    db = FakeDb(
+        [Device(id="a", name="PC", is_active=True)],
+        [
+            Device(id="a", name="PC", is_active=True),
+            Device(id="b", name="Laptop", is_active=True),
+        ],
+    )
+
+    first = await _prompt(db)
+    assert await _prompt(db) is first
+    assert len(db.statements) == 1
+
+    device_directory.invalidate("u")
+    updated = await _prompt(db)
+
+    assert len(db.statements) == 2
+    assert updated.endswith("\nhub, laptop, pc\n")
+    assert updated[: len(system_prompt_prefix())] == first[: len(system_prompt_prefix())]
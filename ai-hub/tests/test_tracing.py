@@ -0,0 +1,170 @@
+"""Tests for end-to-end chat request traces."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from hub.config import settings
+from hub.routers.websocket import ConnectionManager
+from hub.tracing import Tracer, tracer
+
+
+class _TextBlock:
+    def __init__(self, text):
+        self.type = "text"
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = [_TextBlock(text)]
+        self.variant_name = "test_variant"
+
+
+async def _mock_inference(messages, function_name, system=None, **kwargs):
+    return _Response("hi there")
+
+
+class TimedWebSocket:
+    """Fake device that answers skill requests with a timing breakdown."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self.sent: list[dict] = []
+
+    async def send_json(self, message: dict) -> None:
+        self.sent.append(message)
+        asyncio.get_running_loop().call_soon(
+            asyncio.ensure_future,
+            self.manager.handle_skill_response(
+                {
+                    "request_id": message["request_id"],
+                    "success": True,
+                    "result": "ok",
+                    "trace_id": message.get("trace_id"),
+                    "span_id": message.get("span_id"),
+                    "timing": {"queue_ms": 1.5, "exec_ms": 0.25},
+                },
+                device_id="d1",
+            ),
+        )
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        pass
+
+
+def _traced(name: str):
+    local = Tracer()
+    root = local.start_trace(name)
+    with local.span("tool", tool="python_exec") as tool:
+        inner = local.start_span("skill_request")
+        local.end_span(inner)
+        abandoned = local.start_span("skill_request")
+    local.finish(root)
+    return local, root, tool, inner, abandoned
+
+
+def test_spans_nest_under_current_span():
+    local, root, tool, inner, abandoned = _traced("chat")
+
+    trace = local.get(root.trace_id)
+    assert [s["name"] for s in trace["spans"]] == [
+        "chat",
+        "tool",
+        "skill_request",
+        "skill_request",
+    ]
+    assert tool.parent_id == root.span_id
+    assert inner.parent_id == tool.span_id
+    assert abandoned.attributes == {"unfinished": True}
+    assert local.recent()[0]["span_count"] == 4
+    assert local.get_stats()["active"] == 0
+
+
+def test_spans_outside_a_trace_record_nothing():
+    local = Tracer()
+    with local.span("tool") as span:
+        assert span is None
+    assert local.start_span("llm") is None
+
+
+def test_disabled_tracing_and_ring_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "trace_buffer_size", 2)
+    local = Tracer()
+    for i in range(3):
+        local.finish(local.start_trace(f"chat-{i}"))
+    assert [t["name"] for t in local.recent()] == ["chat-2", "chat-1"]
+
+    monkeypatch.setattr(settings, "tracing_enabled", False)
+    assert local.start_trace("chat") is None
+
+
+def test_finished_traces_are_exported_as_jsonl(monkeypatch, tmp_path):
+    path = tmp_path / "traces" / "hub.jsonl"
+    monkeypatch.setattr(settings, "trace_export_path", path)
+    local, root, *_ = _traced("chat")
+
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)["trace_id"] == root.trace_id
+
+
+@pytest.mark.asyncio
+async def test_skill_request_span_splits_device_time_from_transit():
+    manager = ConnectionManager()
+    websocket = TimedWebSocket(manager)
+    await manager.connect("d1", websocket)
+
+    root = tracer.start_trace("chat")
+    assert await manager.send_skill_request("d1", "S", "m", [], {}) == "ok"
+    tracer.finish(root)
+
+    (message,) = websocket.sent
+    span = tracer.get(root.trace_id)["spans"][1]
+    assert message["trace_id"] == root.trace_id
+    assert message["span_id"] == span["span_id"]
+    assert span["name"] == "skill_request"
+    assert span["attributes"]["skill"] == "S.m"
+    assert span["attributes"]["device_queue_ms"] == 1.5
+    assert span["attributes"]["device_exec_ms"] == 0.25
+    assert span["attributes"]["transit_ms"] == pytest.approx(
+        span["duration_ms"] - 1.75, abs=0.01
+    )
+
+
+@pytest.mark.asyncio
+async def test_untraced_skill_request_has_no_trace_fields():
+    manager = ConnectionManager()
+    websocket = TimedWebSocket(manager)
+    await manager.connect("d1", websocket)
+
+    await manager.send_skill_request("d1", "S", "m", [], {})
+
+    assert "trace_id" not in websocket.sent[0]
+
+
+@pytest.mark.asyncio
+async def test_chat_request_trace_is_served_to_admins(auth_client):
+    with patch("hub.routers.chat.tz_inference", side_effect=_mock_inference):
+        response = await auth_client.post(
+            "/api/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hello"}]},
+        )
+    assert response.status_code == 200
+
+    login = await auth_client.post(
+        "/api/users/login", json={"username": "admin", "password": "password"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    listing = (await auth_client.get("/api/traces", headers=headers)).json()
+    (summary,) = listing["traces"]
+    trace = (
+        await auth_client.get(f"/api/traces/{summary['trace_id']}", headers=headers)
+    ).json()
+
+    assert summary["name"] == "chat_completions"
+    assert [s["name"] for s in trace["spans"]] == ["chat_completions", "llm"]
+    assert trace["spans"][1]["attributes"]["variant"] == "test_variant"
+    missing = await auth_client.get("/api/traces/nope", headers=headers)
+    assert missing.status_code == 404
@@ -0,0 +1,112 @@
+"""Tests for the WebSocket wire codecs (protocol v1 JSON, v2 msgpack)."""
+
+import os
+
+import msgpack
+import pytest
+from starlette.testclient import TestClient
+
+from hub.main import app
+from hub.wire import (
+    FRAME_PLAIN,
+    FRAME_ZLIB,
+    JsonCodec,
+    MsgpackCodec,
+    WireError,
+    decode_frame,
+    get_codec,
+)
+
+SKILL_RESPONSE = {
+    "type": "skill_response",
+    "request_id": "req-1",
+    "success": True,
+    "result": {"temp": 55.4, "hours": [1, 2, 3], "raw": b"\x00\x01"},
+}
+
+
+def test_pong_frame_matches_documented_bytes():
+    """The example in docs/wire-schema-v2.md stays accurate."""
+    frame = MsgpackCodec(compress_threshold=0).encode({"type": "pong"})
+    assert frame.hex(" ") == "00 81 a4 74 79 70 65 a4 70 6f 6e 67"
+
+
+def test_v2_round_trip_keeps_bytes_and_int_keys():
+    message = dict(SKILL_RESPONSE, counts={1: "one"})
+    assert decode_frame(MsgpackCodec().encode(message)) == message
+
+
+def test_v2_compresses_large_frames_only():
+    codec = MsgpackCodec(compress_threshold=64)
+    small = codec.encode({"type": "pong"})
+    large_message = {"type": "skill_response", "result": "weather " * 200}
+    large = codec.encode(large_message)
+
+    assert small[0] == FRAME_PLAIN
+    assert large[0] == FRAME_ZLIB
+    assert len(large) < len(msgpack.packb(large_message))
+    assert decode_frame(large) == large_message
+
+
+def test_v2_skips_compression_that_does_not_help():
+    # Random bytes do not shrink under zlib.
+    message = {"type": "skill_response", "result": os.urandom(512)}
+    frame = MsgpackCodec(compress_threshold=16).encode(message)
+    assert frame[0] == FRAME_PLAIN
+
+
+def test_text_frames_decode_as_json():
+    assert decode_frame(JsonCodec().encode({"type": "ping"})) == {"type": "ping"}
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [b"", b"\x07\x80", b"\x00\xc1", b"\x01not-zlib", b"\x00\x93\x01\x02\x03", "[1]"],
+)
+def test_malformed_frames_raise_wire_error(frame):
+    with pytest.raises(WireError):
+        decode_frame(frame)
+
+
+def test_get_codec_defaults_to_v1():
+    assert isinstance(get_codec(None), JsonCodec)
+    assert isinstance(get_codec("v1"), JsonCodec)
+    assert isinstance(get_codec("v2"), MsgpackCodec)
+
+
+def _device_token(client: TestClient) -> str:
+    client.post("/api/users/setup", json={"username": "admin", "password": "password"})
+    login = client.post(
+        "/api/users/login", json={"username": "admin", "password": "password"}
+    )
+    resp = client.post(
+        "/api/devices/token",
+        json={"name": "Spoke"},
+        headers={"Authorization": f"Bearer {login.json()['access_token']}"},
+    )
+    return resp.json()["token"]
+
+
+def test_v2_socket_uses_binary_frames(setup_test_db):
+    client = TestClient(app)
+    token = _device_token(client)
+    codec = MsgpackCodec()
+
+    with client.websocket_connect(f"/ws/device?token={token}&protocol_version=v2") as ws:
+        # Malformed frames are dropped without closing the connection.
+        ws.send_bytes(b"\x07garbage")
+        ws.send_bytes(codec.encode({"type": "ping"}))
+        assert decode_frame(ws.receive_bytes()) == {"type": "pong"}
+
+        # A text frame is still understood on a v2 connection.
+        ws.send_json({"type": "ping"})
+        assert decode_frame(ws.receive_bytes()) == {"type": "pong"}
+
+
+def test_v1_socket_keeps_json_frames(setup_test_db):
+    client = TestClient(app)
+    token = _device_token(client)
+
+    with client.websocket_connect(f"/ws/device?token={token}") as ws:
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
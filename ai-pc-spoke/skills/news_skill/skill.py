@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 class NewsSkill:
     """Provides news with clear configuration status."""
 
+    # Headlines change slowly; let the Hub reuse results for 10 minutes.
+    cache_ttl_seconds = 600
+
     def __init__(self):
         self._api_key = os.environ.get("NEWS_API_KEY")
         self._base_url = "https://newsapi.org/v2"
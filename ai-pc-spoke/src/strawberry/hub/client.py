@@ -1,8 +1,11 @@
 """HTTP client for communicating with the Strawberry AI Hub."""
 
 import asyncio
+import contextlib
+import hashlib
 import json
 import logging
+import time
 from dataclasses import dataclass
 from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from urllib.parse import urlparse, urlunparse
@@ -26,11 +29,21 @@ except ImportError:
     ClientConnection = None
 
 from ..models import ChatMessage, ChatResponse
+from .wire import (
+    JsonCodec,
+    WireCodec,
+    decode_frame,
+    get_codec,
+    is_streamed_result,
+    iter_result_chunks,
+    preferred_version,
+)
 
 logger = logging.getLogger(__name__)
 
 # Wire protocol version sent to Hub on every HTTP request.
-# Must match a version in Hub's SUPPORTED_VERSIONS set.
+# Must match a version in Hub's SUPPORTED_VERSIONS set. The WebSocket
+# negotiates its own version (see ``wire.preferred_version``).
 PROTOCOL_VERSION = "v1"
 PROTOCOL_VERSION_HEADER = "X-Protocol-Version"
 
@@ -43,6 +56,44 @@ except NameError:  # pragma: no cover
     from exceptiongroup import BaseExceptionGroup  # type: ignore[assignment]
 
 
+# Method descriptor fields covered by the skill content hash. Must match
+# the Hub's ``SKILL_HASH_FIELDS`` (see docs/wire-schema-v1.md).
+SKILL_HASH_FIELDS = (
+    "class_name",
+    "function_name",
+    "signature",
+    "docstring",
+    "device_agnostic",
+)
+
+# Hashed only when they differ from their default, so descriptors that do
+# not use them keep their existing hashes. Must match the Hub.
+OPTIONAL_HASH_FIELDS = {"cache_ttl_seconds": 0}
+
+
+def compute_skill_hash(skill: Dict[str, Any]) -> str:
+    """Compute the content hash of one skill registration entry.
+
+    sha256 over compact, key-sorted JSON of ``SKILL_HASH_FIELDS``, plus
+    any ``OPTIONAL_HASH_FIELDS`` that are set.
+    """
+    defaults = {"docstring": None, "device_agnostic": False}
+    data = {f: skill.get(f, defaults.get(f)) for f in SKILL_HASH_FIELDS}
+    data["device_agnostic"] = bool(data["device_agnostic"])
+    for name, default in OPTIONAL_HASH_FIELDS.items():
+        value = skill.get(name, default)
+        if value is not None and value != default:
+            data[name] = value
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def compute_manifest_hash(method_hashes: List[str]) -> str:
+    """Compute the manifest hash over a device's method hashes."""
+    joined = "\n".join(sorted(set(method_hashes)))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
 def _normalize_hub_url(url: str) -> str:
     """Normalize Hub base URL.
 
@@ -72,6 +123,8 @@ class HubConfig:
     url: str
     token: str
     timeout: float = 30.0
+    # Skill requests from the Hub executed at once; extra requests queue.
+    max_concurrent_skill_requests: int = 8
 
     def __post_init__(self) -> None:
         self.url = _normalize_hub_url(self.url)
@@ -122,6 +175,18 @@ _retry_config = retry(
 )
 
 
+def _may_reject_protocol(error: Exception) -> bool:
+    """Whether a failed WebSocket handshake may be a protocol version refusal.
+
+    A Hub refusing the version closes the socket before accepting it, which
+    reaches the client as HTTP 403 (or 400). Auth failures and server
+    errors (401, 5xx) must not push the client onto v1.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", getattr(error, "status_code", None))
+    return status in (400, 403)
+
+
 class HubClient:
     """Client for communicating with the Strawberry AI Hub.
 
@@ -144,6 +209,12 @@ class HubClient:
         ] = None
         self._connection_callback: Optional[Callable[[bool], Awaitable[None]]] = None
         self._reconnect_delay = 1.0  # Start with 1 second
+        # WebSocket wire protocol; drops to v1 if the Hub rejects v2.
+        self._ws_protocol = preferred_version()
+        self._ws_codec: WireCodec = JsonCodec()
+        # In-flight Hub skill requests, keyed by request_id.
+        self._skill_tasks: Dict[str, asyncio.Task] = {}
+        self._skill_slots = asyncio.Semaphore(config.max_concurrent_skill_requests)
 
         # Hub-assigned device identity (populated by register_device).
         self._device_id: Optional[str] = None
@@ -302,6 +373,7 @@ class HubClient:
         model: Optional[str],
         max_tokens: Optional[int],
         session_id: Optional[str],
+        context_version: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Build Hub chat payload with optional fields."""
         payload: Dict[str, Any] = {
@@ -316,6 +388,8 @@ class HubClient:
             payload["max_tokens"] = max_tokens
         if session_id:
             payload["session_id"] = session_id
+        if context_version is not None:
+            payload["context_version"] = context_version
         return payload
 
     @_retry_config
@@ -328,6 +402,7 @@ class HubClient:
         enable_tools: bool = False,
         stream: bool = False,
         session_id: Optional[str] = None,
+        context_version: Optional[int] = None,
     ) -> ChatResponse:
         """Send a chat completion request to the Hub.
 
@@ -339,6 +414,9 @@ class HubClient:
             enable_tools: If True, Hub runs agent loop and executes tools.
                          If False, Hub just passes through to LLM.
             session_id: Optional Hub session identifier for continuity.
+            context_version: Hub session version last seen. When set,
+                ``messages`` holds only the new turns; a stale version
+                raises HubError with status 409.
 
         Returns:
             ChatResponse with the assistant's reply
@@ -351,6 +429,7 @@ class HubClient:
             model=model,
             max_tokens=max_tokens,
             session_id=session_id,
+            context_version=context_version,
         )
 
         response = await self.client.post("/api/v1/chat/completions", json=payload)
@@ -374,6 +453,7 @@ class HubClient:
         max_tokens: Optional[int] = None,
         enable_tools: bool = False,
         session_id: Optional[str] = None,
+        context_version: Optional[int] = None,
     ) -> AsyncIterator[Dict[str, Any]]:
         """Stream Hub chat completion events.
 
@@ -387,6 +467,7 @@ class HubClient:
             max_tokens: Optional token cap.
             enable_tools: If True, Hub executes tools and streams tool events.
             session_id: Optional Hub session identifier for continuity.
+            context_version: Hub session version last seen (see ``chat``).
 
         Yields:
             Parsed event dicts.
@@ -399,6 +480,7 @@ class HubClient:
             model=model,
             max_tokens=max_tokens,
             session_id=session_id,
+            context_version=context_version,
         )
 
         stream_cm = self.client.stream(
@@ -490,6 +572,53 @@ class HubClient:
         self._check_response(response)
         return response.json()
 
+    @_retry_config
+    async def sync_skills(self, skills: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Register skills using content-hash deltas.
+
+        Announces the manifest via ``/skills/sync`` and uploads only the
+        methods the Hub reports as missing. An unchanged skill set costs a
+        single request and no database writes on the Hub. Falls back to a
+        full ``register_skills`` against Hubs without the sync endpoint.
+
+        Args:
+            skills: Same entries as ``register_skills``.
+
+        Returns:
+            Dict with ``status`` (``unchanged``, ``updated``, ``incomplete``
+            or ``registered``) and ``uploaded`` (methods sent).
+        """
+        by_hash = {compute_skill_hash(s): s for s in skills}
+        method_hashes = sorted(by_hash)
+        manifest = compute_manifest_hash(method_hashes)
+
+        response = await self.client.post(
+            "/skills/sync",
+            json={"manifest_hash": manifest, "method_hashes": method_hashes},
+        )
+        if response.status_code in (404, 405):
+            logger.info("Hub has no /skills/sync; using full registration")
+            result = await self.register_skills(skills)
+            return {**result, "status": "registered", "uploaded": len(skills)}
+        self._check_response(response)
+        result = response.json()
+
+        missing = result.get("missing") or []
+        if result.get("status") != "incomplete" or not missing:
+            return {**result, "uploaded": 0}
+
+        upload = [by_hash[h] for h in missing if h in by_hash]
+        response = await self.client.post(
+            "/skills/register",
+            json={
+                "skills": upload,
+                "manifest_hash": manifest,
+                "method_hashes": method_hashes,
+            },
+        )
+        self._check_response(response)
+        return {**response.json(), "status": "updated", "uploaded": len(upload)}
+
     @_retry_config
     async def heartbeat(self) -> Dict[str, Any]:
         """Send heartbeat to keep skills alive."""
@@ -661,20 +790,34 @@ class HubClient:
         return response.json()
 
     async def list_sessions(
-        self, limit: int = 50, days: Optional[int] = None
+        self,
+        limit: int = 50,
+        days: Optional[int] = None,
+        since: Optional[str] = None,
+        after_id: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """List chat sessions for the current user.
 
         Args:
             limit: Maximum number of sessions to return
             days: If provided, only return sessions from the last N days
+            since: If provided (an ISO timestamp, typically the newest
+                ``last_activity`` seen so far), only return sessions with
+                activity at or after it
+            after_id: With ``since``, skip sessions up to this one among
+                those whose activity is exactly ``since`` (for paging)
 
         Returns:
-            List of session info dicts
+            List of session info dicts, most recently active first; with
+            ``since``, oldest activity first
         """
         params: Dict[str, Any] = {"limit": limit}
         if days is not None:
             params["days"] = days
+        if since is not None:
+            params["since"] = since
+        if after_id is not None:
+            params["after_id"] = after_id
         response = await self.client.get("/api/sessions", params=params)
         self._check_response(response)
         return response.json()["sessions"]
@@ -692,18 +835,71 @@ class HubClient:
         self._check_response(response)
         return response.json()
 
-    async def get_session_messages(self, session_id: str) -> List[Dict[str, Any]]:
-        """Get all messages for a session.
+    async def get_session_messages(
+        self,
+        session_id: str,
+        after_id: Optional[int] = None,
+        page_size: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """Get the messages of a session, oldest first.
+
+        Fetches page by page, following the Hub's cursor.
 
         Args:
             session_id: Session ID
+            after_id: Only return messages with a Hub ID greater than this
+            page_size: Messages requested per page
 
         Returns:
             List of message dicts
         """
-        response = await self.client.get(f"/api/sessions/{session_id}/messages")
+        messages: List[Dict[str, Any]] = []
+        cursor = after_id
+        while True:
+            page = await self.get_session_messages_page(
+                session_id, after_id=cursor, limit=page_size
+            )
+            messages.extend(page["messages"])
+            cursor = page.get("next_after_id")
+            if cursor is None:
+                return messages
+
+    async def get_session_messages_page(
+        self,
+        session_id: str,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Get one page of a session's messages.
+
+        Args:
+            session_id: Session ID
+            after_id: Only return messages with a Hub ID greater than this
+            limit: Maximum number of messages to return
+            etag: ETag of a copy of this same page the caller holds; sent
+                as If-None-Match
+
+        Returns:
+            The response dict (``messages``, ``total``, ``next_after_id``
+            and the response ``etag``), or None if the Hub answered 304
+            because nothing changed since ``etag``.
+        """
+        params: Dict[str, Any] = {}
+        if after_id is not None:
+            params["after_id"] = after_id
+        if limit is not None:
+            params["limit"] = limit
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self.client.get(
+            f"/api/sessions/{session_id}/messages", params=params, headers=headers
+        )
+        if response.status_code == 304:
+            return None
         self._check_response(response)
-        return response.json()["messages"]
+        page = response.json()
+        page["etag"] = response.headers.get("ETag")
+        return page
 
     async def add_session_message(
         self, session_id: str, role: str, content: str
@@ -814,6 +1010,7 @@ class HubClient:
 
     async def disconnect_websocket(self):
         """Disconnect WebSocket connection."""
+        self._cancel_skill_tasks()
         if self._ws_task:
             self._ws_task.cancel()
             try:
@@ -852,13 +1049,19 @@ class HubClient:
                 # Include device_id if set (multi-device-per-token).
                 if self._device_id:
                     ws_url += f"&device_id={self._device_id}"
+                ws_url += f"&protocol_version={self._ws_protocol}"
 
                 logger.info("Connecting to WebSocket: %s", ws_url)
 
                 async with websockets.connect(ws_url) as websocket:
                     self._websocket = websocket
+                    self._ws_codec = get_codec(self._ws_protocol)
+                    # A v1 fallback lasts one connection; reconnects try v2 again.
+                    self._ws_protocol = preferred_version()
                     self._reconnect_delay = 1.0
-                    logger.info("WebSocket connected")
+                    logger.info(
+                        "WebSocket connected (protocol %s)", self._ws_codec.version
+                    )
 
                     # Notify connected
                     if self._connection_callback:
@@ -870,7 +1073,7 @@ class HubClient:
                     # Handle incoming messages
                     async for message in websocket:
                         try:
-                            data = json.loads(message)
+                            data = decode_frame(message)
                             await self._handle_websocket_message(data)
                         except Exception as e:
                             logger.error("Error handling WebSocket message: %s", e)
@@ -878,6 +1081,7 @@ class HubClient:
                 # Server closed connection cleanly
                 logger.warning("WebSocket closed by server")
                 self._websocket = None
+                self._cancel_skill_tasks()
                 await self._notify_disconnected()
                 await self._reconnect_backoff()
 
@@ -885,9 +1089,26 @@ class HubClient:
                 logger.info("WebSocket connection cancelled")
                 break
 
+            except websockets.exceptions.InvalidHandshake as e:
+                if self._ws_protocol != "v1" and _may_reject_protocol(e):
+                    # Hubs that predate v2 refuse the handshake outright.
+                    logger.warning(
+                        "Hub rejected WebSocket protocol %s (%s); falling back to v1",
+                        self._ws_protocol,
+                        e,
+                    )
+                    self._ws_protocol = "v1"
+                    continue
+                logger.error("WebSocket handshake rejected: %s", e)
+                self._ws_protocol = preferred_version()
+                self._websocket = None
+                await self._notify_disconnected()
+                await self._reconnect_backoff()
+
             except Exception as e:
                 logger.error("WebSocket connection error: %s", e)
                 self._websocket = None
+                self._cancel_skill_tasks()
                 await self._notify_disconnected()
                 await self._reconnect_backoff()
 
@@ -900,7 +1121,10 @@ class HubClient:
         msg_type = message.get("type")
 
         if msg_type == "skill_request":
-            await self._handle_skill_request(message)
+            self._dispatch_skill_request(message)
+
+        elif msg_type == "cancel":
+            self._cancel_skill_request(message.get("request_id"))
 
         elif msg_type == "pong":
             # Heartbeat response
@@ -912,12 +1136,51 @@ class HubClient:
                 msg_type,
             )
 
-    async def _handle_skill_request(self, request: dict):
+    def _dispatch_skill_request(self, request: dict) -> None:
+        """Run a skill request as a task so the receive loop keeps reading.
+
+        Responses go out as each request finishes, keyed by ``request_id``,
+        so a slow skill does not hold up other requests or pongs.
+        """
+        request_id = request.get("request_id")
+        received = time.perf_counter()
+        task = asyncio.create_task(self._run_skill_request(request, received))
+        if request_id:
+            self._skill_tasks[request_id] = task
+            task.add_done_callback(
+                lambda _t, rid=request_id: self._skill_tasks.pop(rid, None)
+            )
+
+    async def _run_skill_request(self, request: dict, received: float) -> None:
+        """Handle one skill request once a concurrency slot is free."""
+        async with self._skill_slots:
+            queue_ms = (time.perf_counter() - received) * 1000
+            await self._handle_skill_request(request, queue_ms=queue_ms)
+
+    def _cancel_skill_request(self, request_id: Optional[str]) -> None:
+        """Cancel an in-flight skill request the Hub gave up on."""
+        task = self._skill_tasks.get(request_id) if request_id else None
+        if task and not task.done():
+            logger.info("Hub cancelled skill request %s", request_id)
+            task.cancel()
+
+    def _cancel_skill_tasks(self) -> None:
+        """Cancel every in-flight skill request (connection is gone)."""
+        for task in list(self._skill_tasks.values()):
+            task.cancel()
+        self._skill_tasks.clear()
+
+    async def _handle_skill_request(self, request: dict, queue_ms: float = 0.0):
         """Handle skill execution request from Hub.
 
+        Traced requests (with ``trace_id``) get their ``trace_id`` and
+        ``span_id`` echoed back with a ``timing`` breakdown, so the Hub can
+        split the round trip into queueing, execution and transit.
+
         Args:
             request: Skill request with request_id, skill_name,
                 method_name, args, kwargs
+            queue_ms: Time the request waited for a concurrency slot
         """
         request_id = request.get("request_id")
         skill_name = request.get("skill_name")
@@ -926,6 +1189,7 @@ class HubClient:
         kwargs = request.get("kwargs", {})
 
         logger.info(f"Received skill request {request_id}: {skill_name}.{method_name}")
+        started = time.perf_counter()
 
         # Execute skill via callback
         try:
@@ -939,8 +1203,16 @@ class HubClient:
                 "type": "skill_response",
                 "request_id": request_id,
                 "success": True,
-                "result": result,
             }
+            if not is_streamed_result(result):
+                response["result"] = result
+            elif self._ws_codec.version == "v2":
+                response["chunks"] = await self._stream_result(request_id, result)
+            else:
+                # v1 Hubs only take whole results
+                response["result"] = "".join(
+                    [chunk async for chunk in iter_result_chunks(result)]
+                )
 
         except Exception as e:
             logger.error(f"Skill execution error: {e}")
@@ -952,8 +1224,35 @@ class HubClient:
                 "error": str(e),
             }
 
+        if request.get("trace_id"):
+            response["trace_id"] = request["trace_id"]
+            response["span_id"] = request.get("span_id")
+            response["timing"] = {
+                "queue_ms": round(queue_ms, 3),
+                "exec_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+
         # Send response back to Hub
         if self._websocket:
-            import json
+            await self._websocket.send(self._ws_codec.encode(response))
+
+    async def _stream_result(self, request_id: Optional[str], result: Any) -> int:
+        """Send a generator skill's result as ``skill_response_chunk`` frames.
 
-            await self._websocket.send(json.dumps(response))
+        Returns:
+            Number of chunks sent, for the closing ``skill_response``.
+        """
+        seq = 0
+        async with contextlib.aclosing(iter_result_chunks(result)) as chunks:
+            async for data in chunks:
+                if not self._websocket:
+                    raise ConnectionError("WebSocket closed while streaming result")
+                chunk = {
+                    "type": "skill_response_chunk",
+                    "request_id": request_id,
+                    "seq": seq,
+                    "data": data,
+                }
+                await self._websocket.send(self._ws_codec.encode(chunk))
+                seq += 1
+        return seq
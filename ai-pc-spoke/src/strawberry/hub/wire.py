@@ -0,0 +1,209 @@
+"""WebSocket frame codecs for the Spoke side of the Hub wire protocol.
+
+``v1`` sends JSON text frames. ``v2`` sends binary frames: one header
+byte, then the msgpack-encoded message, zlib-compressed when it is larger
+than the compression threshold and compression saves space. Message
+shapes are identical in both versions (docs/wire-schema-v2.md).
+
+The Spoke asks for ``v2`` when msgpack is installed and falls back to
+``v1`` otherwise, or when the Hub rejects the handshake. Incoming frames
+are decoded by frame type, so a text frame is always read as JSON.
+
+On ``v2`` connections, results of generator skills (and very long text
+results) are sent ahead of the ``skill_response`` as numbered
+``skill_response_chunk`` frames.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# First byte of a v2 frame. Must match the Hub.
+FRAME_PLAIN = 0x00
+FRAME_ZLIB = 0x01
+
+ZLIB_LEVEL = 1
+DEFAULT_COMPRESS_THRESHOLD = 1024
+
+# Characters per skill_response_chunk frame when a result is streamed.
+RESULT_CHUNK_CHARS = 64 * 1024
+
+# Returned by next() once a sync generator result is used up
+_EXHAUSTED = object()
+
+Frame = Union[str, bytes]
+
+
+class WireError(ValueError):
+    """A frame could not be decoded."""
+
+
+class JsonCodec:
+    """Protocol v1: JSON text frames."""
+
+    version = "v1"
+
+    def encode(self, message: Dict[str, Any]) -> str:
+        """Encode a message as a text frame."""
+        return json.dumps(message)
+
+
+class MsgpackCodec:
+    """Protocol v2: msgpack binary frames, compressed above a threshold."""
+
+    version = "v2"
+
+    def __init__(self, compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD) -> None:
+        """Initialize the codec.
+
+        Args:
+            compress_threshold: Payload size (bytes) above which frames are
+                compressed (0 disables compression).
+        """
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("msgpack is not installed; wire protocol v2 unavailable")
+        self.compress_threshold = compress_threshold
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        """Encode a message as a binary frame."""
+        payload = msgpack.packb(message, use_bin_type=True)
+        if self.compress_threshold > 0 and len(payload) > self.compress_threshold:
+            compressed = zlib.compress(payload, ZLIB_LEVEL)
+            if len(compressed) < len(payload):
+                return bytes((FRAME_ZLIB,)) + compressed
+        return bytes((FRAME_PLAIN,)) + payload
+
+
+WireCodec = Union[JsonCodec, MsgpackCodec]
+
+
+def preferred_version() -> str:
+    """Newest wire protocol version this Spoke can speak."""
+    return "v2" if MSGPACK_AVAILABLE else "v1"
+
+
+def get_codec(version: str) -> WireCodec:
+    """Return the codec for a protocol version."""
+    if version == "v2":
+        return MsgpackCodec()
+    return JsonCodec()
+
+
+def decode_frame(frame: Frame) -> Dict[str, Any]:
+    """Decode a text (v1) or binary (v2) frame into a message.
+
+    Raises:
+        WireError: If the frame is malformed or needs msgpack that is missing.
+    """
+    try:
+        if isinstance(frame, str):
+            message = json.loads(frame)
+        else:
+            if not frame:
+                raise WireError("Empty binary frame")
+            if not MSGPACK_AVAILABLE:
+                raise WireError("Binary frame received but msgpack is not installed")
+            header, payload = frame[0], frame[1:]
+            if header == FRAME_ZLIB:
+                payload = zlib.decompress(payload)
+            elif header != FRAME_PLAIN:
+                raise WireError(f"Unknown frame header {header:#04x}")
+            message = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    except WireError:
+        raise
+    except Exception as e:
+        raise WireError(f"Malformed frame: {e}") from e
+
+    if not isinstance(message, dict):
+        raise WireError("Frame does not hold an object")
+    return message
+
+
+def is_streamed_result(result: Any) -> bool:
+    """Whether a skill result should go out in ``skill_response_chunk`` frames.
+
+    Generator skills are always streamed, as are text results longer than
+    one chunk.
+    """
+    if inspect.isgenerator(result) or inspect.isasyncgen(result):
+        return True
+    return isinstance(result, str) and len(result) > RESULT_CHUNK_CHARS
+
+
+async def _result_items(result: Any) -> AsyncIterator[Any]:
+    """Iterate a generator (sync or async) or a single text result."""
+    if isinstance(result, str):
+        yield result
+    elif inspect.isasyncgen(result):
+        try:
+            async for item in result:
+                yield item
+        finally:
+            await result.aclose()
+    else:
+        # Sync generators may block, so each item is produced off the loop.
+        loop = asyncio.get_running_loop()
+        step: Optional[asyncio.Future] = None
+        try:
+            while True:
+                step = loop.run_in_executor(None, next, result, _EXHAUSTED)
+                item = await asyncio.shield(step)
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            if step is not None and not step.done():
+                # Cancelled mid-item: close once the generator yields it.
+                step.add_done_callback(
+                    lambda _: loop.run_in_executor(None, result.close)
+                )
+            else:
+                await asyncio.to_thread(result.close)
+
+
+async def iter_result_chunks(
+    result: Any, chunk_chars: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Coalesce a streamed skill result into text chunks.
+
+    String items are concatenated as they are. Anything else is written as
+    one JSON line, so a generator of dicts streams as JSON Lines.
+
+    Args:
+        result: Generator, async generator or long string
+        chunk_chars: Characters per chunk (default ``RESULT_CHUNK_CHARS``)
+    """
+    chunk_chars = chunk_chars or RESULT_CHUNK_CHARS
+    parts: List[str] = []
+    length = 0
+    # Close the skill's generator even when the request is cancelled.
+    items = _result_items(result)
+    try:
+        async for item in items:
+            text = item if isinstance(item, str) else json.dumps(item, default=str) + "\n"
+            parts.append(text)
+            length += len(text)
+            if length < chunk_chars:
+                continue
+            buffer = "".join(parts)
+            while len(buffer) >= chunk_chars:
+                yield buffer[:chunk_chars]
+                buffer = buffer[chunk_chars:]
+            parts = [buffer] if buffer else []
+            length = len(buffer)
+    finally:
+        await items.aclose()
+    if parts:
+        yield "".join(parts)
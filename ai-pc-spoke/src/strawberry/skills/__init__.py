@@ -1,6 +1,6 @@
 """Skill loading and management."""
 
-from .loader import SkillInfo, SkillLoader
+from .loader import SkillInfo, SkillLoader, cacheable
 from .registry import SkillRegistry
 from .remote import (
     LOCAL_MODE_PROMPT,
@@ -20,6 +20,7 @@ __all__ = [
     "SkillRegistry",
     "SkillService",
     "SkillCallResult",
+    "cacheable",
     # Remote mode
     "DeviceManager",
     "RemoteSkillResult",
@@ -0,0 +1,166 @@
+"""Per-session store for oversized tool results.
+
+Tool results (page text, MCP responses, search dumps) are added to the
+conversation and resent to the model on every later iteration. Results
+longer than ``max_chars`` are kept here instead; the model gets a preview
+and a handle and reads further with ``read_artifact(handle, offset)``
+through python_exec.
+
+The sandbox cannot see host objects, so ``read_artifact`` calls are
+answered by ``SkillService`` before the code reaches it (see
+``parse_read_artifact_call``). Artifacts are scoped per chat session and
+kept in memory only.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Results longer than this are stored as artifacts.
+DEFAULT_MAX_CHARS = 4000
+# Characters returned per read_artifact() call; below the offload threshold
+# so that reading a page does not create another artifact.
+ARTIFACT_PAGE_CHARS = 3000
+# Characters of the original result shown to the model.
+ARTIFACT_PREVIEW_CHARS = 1500
+MAX_ARTIFACTS_PER_SCOPE = 32
+MAX_SCOPES = 64
+
+
+class ArtifactStore:
+    """Bounded, scope-keyed store of large tool results (thread-safe)."""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS) -> None:
+        """Initialize the store.
+
+        Args:
+            max_chars: Results longer than this are stored (0 disables).
+        """
+        self.max_chars = max_chars
+        self._scopes: OrderedDict[str, OrderedDict[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def offload(self, scope: str, text: str) -> str:
+        """Return ``text``, or a preview plus handle if it is too long."""
+        if self.max_chars <= 0 or len(text) <= self.max_chars:
+            return text
+        handle = self.put(scope, text)
+        preview = text[:ARTIFACT_PREVIEW_CHARS]
+        return (
+            f"{preview}\n"
+            f"[... truncated: {len(text)} chars total. The full result is stored "
+            f'as artifact "{handle}". Read more with python_exec: '
+            f'print(read_artifact("{handle}", offset={len(preview)}))]'
+        )
+
+    def put(self, scope: str, content: str) -> str:
+        """Store ``content`` in ``scope`` and return its handle."""
+        handle = "art_" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            artifacts = self._scopes.get(scope)
+            if artifacts is None:
+                artifacts = self._scopes[scope] = OrderedDict()
+                while len(self._scopes) > MAX_SCOPES:
+                    self._scopes.popitem(last=False)
+            self._scopes.move_to_end(scope)
+            artifacts[handle] = content
+            artifacts.move_to_end(handle)
+            while len(artifacts) > MAX_ARTIFACTS_PER_SCOPE:
+                artifacts.popitem(last=False)
+        logger.debug("Stored artifact %s (%d chars) in %s", handle, len(content), scope)
+        return handle
+
+    def read(
+        self,
+        scope: str,
+        handle: str,
+        offset: int = 0,
+        length: int = ARTIFACT_PAGE_CHARS,
+    ) -> str:
+        """Return one page of an artifact, noting where the next page starts.
+
+        Raises:
+            KeyError: If the handle is unknown in this scope (or evicted).
+        """
+        with self._lock:
+            content = self._scopes.get(scope, {}).get(str(handle))
+        if content is None:
+            raise KeyError(f"Unknown or expired artifact handle: {handle}")
+
+        offset = max(0, int(offset))
+        length = max(1, min(int(length), ARTIFACT_PAGE_CHARS))
+        page = content[offset : offset + length]
+        end = offset + len(page)
+        if end < len(content):
+            page += (
+                f"\n[... {len(content) - end} more chars; next: "
+                f'read_artifact("{handle}", offset={end})]'
+            )
+        return page
+
+    def invalidate(self, scope: str) -> None:
+        """Drop every artifact of a scope."""
+        with self._lock:
+            self._scopes.pop(scope, None)
+
+
+def parse_read_artifact_call(code: str) -> Optional[Tuple[str, int, int]]:
+    """Recognize python_exec code that only reads an artifact.
+
+    Accepts ``read_artifact(handle, offset, length)`` optionally wrapped in
+    ``print(...)``, with literal arguments (positional or keyword).
+
+    Returns:
+        ``(handle, offset, length)``, or None if ``code`` is anything else.
+    """
+    try:
+        module = ast.parse(code.strip())
+    except SyntaxError:
+        return None
+    if len(module.body) != 1 or not isinstance(module.body[0], ast.Expr):
+        return None
+
+    call = module.body[0].value
+    if (
+        isinstance(call, ast.Call)
+        and isinstance(call.func, ast.Name)
+        and call.func.id == "print"
+        and len(call.args) == 1
+        and not call.keywords
+    ):
+        call = call.args[0]
+    if not (
+        isinstance(call, ast.Call)
+        and isinstance(call.func, ast.Name)
+        and call.func.id == "read_artifact"
+    ):
+        return None
+
+    try:
+        values = [ast.literal_eval(arg) for arg in call.args]
+        named = {kw.arg: ast.literal_eval(kw.value) for kw in call.keywords}
+    except ValueError:
+        return None
+    params = dict(zip(("handle", "offset", "length"), values))
+    params.update(named)
+    if not isinstance(params.get("handle"), str) or set(params) - {
+        "handle",
+        "offset",
+        "length",
+    }:
+        return None
+    try:
+        return (
+            params["handle"],
+            int(params.get("offset", 0)),
+            int(params.get("length", ARTIFACT_PAGE_CHARS)),
+        )
+    except (TypeError, ValueError):
+        return None
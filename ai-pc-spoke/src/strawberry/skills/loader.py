@@ -15,6 +15,39 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def cacheable(ttl_seconds: int) -> Callable[[Callable], Callable]:
+    """Mark a read-only skill method as cacheable by the Hub.
+
+    The Hub may answer repeat calls with the same arguments from its
+    result cache for ``ttl_seconds``. Equivalent to setting a
+    ``cache_ttl_seconds`` attribute on the function; a class-level
+    ``cache_ttl_seconds`` applies to every method without its own.
+
+    Example:
+        ```python
+        class WeatherSkill:
+            @cacheable(ttl_seconds=300)
+            def get_current_weather(self, location: str) -> str: ...
+        ```
+    """
+
+    def decorate(func: Callable) -> Callable:
+        func.cache_ttl_seconds = int(ttl_seconds)
+        return func
+
+    return decorate
+
+
+def _cache_ttl(method: Callable, class_default: Any) -> int:
+    """Resolve a method's cache TTL, falling back to the class attribute."""
+    ttl = getattr(method, "cache_ttl_seconds", class_default)
+    try:
+        return max(0, int(ttl or 0))
+    except (TypeError, ValueError):
+        logger.warning("Ignoring invalid cache_ttl_seconds %r on %s", ttl, method)
+        return 0
+
+
 @dataclass
 class SkillLoadFailure:
     """Record of a skill that failed to load."""
@@ -31,6 +64,8 @@ class SkillMethod:
     signature: str
     docstring: Optional[str]
     callable: Callable
+    # Seconds the Hub may cache this method's results (0 = never).
+    cache_ttl_seconds: int = 0
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for API."""
@@ -73,6 +108,7 @@ class SkillInfo:
                 "signature": m.signature,
                 "docstring": m.docstring,
                 "device_agnostic": self.device_agnostic,
+                "cache_ttl_seconds": m.cache_ttl_seconds,
             }
             for m in self.methods
         ]
@@ -523,6 +559,7 @@ class SkillLoader:
             SkillInfo with methods.
         """
         methods = []
+        class_cache_ttl = getattr(cls, "cache_ttl_seconds", 0)
 
         for method_name, method in inspect.getmembers(cls, inspect.isfunction):
             # Skip private methods
@@ -548,6 +585,7 @@ class SkillLoader:
                     signature=sig_str,
                     docstring=docstring,
                     callable=method,
+                    cache_ttl_seconds=_cache_ttl(method, class_cache_ttl),
                 )
             )
 
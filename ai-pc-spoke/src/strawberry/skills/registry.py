@@ -82,7 +82,7 @@ class SkillRegistry:
             )
 
         try:
-            result = await self.hub_client.register_skills(skills_data)
+            result = await self.hub_client.sync_skills(skills_data)
             self._registered = True
 
             logger.info(f"Registered {len(skills_data)} skills with Hub")
@@ -10,6 +10,7 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from ..hub import HubClient
+from .artifacts import ArtifactStore, parse_read_artifact_call
 from .loader import SkillInfo, SkillLoader
 from .prompt import DEFAULT_SYSTEM_PROMPT_TEMPLATE, build_system_prompt
 from .proxies import (
@@ -37,6 +38,7 @@ class SkillService:
     - Send heartbeats to keep skills alive
     - Generate system prompt for LLM
     - Parse and execute skill calls from LLM responses
+    - Keep oversized tool results as per-session artifacts
     """
 
     # Re-export from prompt module for backward compatibility
@@ -90,6 +92,9 @@ class SkillService:
         self._gatekeeper: Optional[Gatekeeper] = None
         self._proxy_gen: Optional[ProxyGenerator] = None
 
+        # Tool results too large to paste into the conversation
+        self._artifacts = ArtifactStore()
+
         # Sandbox components (initialized after skills are loaded)
         self._sandbox: Optional[SandboxExecutor] = None
         self._sandbox_config = sandbox_config or SandboxConfig(enabled=use_sandbox)
@@ -350,11 +355,14 @@ class SkillService:
             logger.info("No skills to register")
             return True
 
-        # Register skills
-        success = await self.hub_client.register_skills(skills_data)
+        # Register skills (only changed methods are uploaded)
+        result = await self.hub_client.sync_skills(skills_data)
         self._registered = True
-        logger.info(f"Registered {len(skills_data)} skill methods with Hub")
-        return success
+        logger.info(
+            f"Registered {len(skills_data)} skill methods with Hub "
+            f"({result.get('status')}, uploaded {result.get('uploaded')})"
+        )
+        return result
 
     async def start_heartbeat(self):
         """Start the heartbeat task."""
@@ -747,16 +755,30 @@ class SkillService:
     # TensorZero Tool Call Execution
     # =========================================================================
 
-    def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    def execute_tool(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        session_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """Execute a TensorZero tool call.
 
         Args:
             tool_name: Name of the tool (search_skills, describe_function, python_exec)
             arguments: Tool arguments
+            session_id: Chat session owning any artifacts the call creates or reads
 
         Returns:
             Dict with "result" or "error" key
         """
+        scope = session_id or "default"
+        artifact_read = self._read_artifact_tool(tool_name, arguments, scope)
+        if artifact_read is not None:
+            return artifact_read
+        return self._offload_result(self._execute_tool(tool_name, arguments), scope)
+
+    def _execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a tool call without offloading its result."""
         try:
             if tool_name == "search_skills":
                 query = arguments.get("query", "")
@@ -902,17 +924,64 @@ class SkillService:
             self._proxy_gen.set_mode(SkillMode.LOCAL)
 
     async def execute_tool_async(
-        self, tool_name: str, arguments: Dict[str, Any]
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        session_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Execute a TensorZero tool call (async version for sandbox).
 
+        Results longer than the artifact threshold are stored and replaced
+        by a preview with a handle; ``read_artifact(handle, offset)`` code
+        sent to python_exec is answered from the store.
+
         Args:
             tool_name: Name of the tool (search_skills, describe_function, python_exec)
             arguments: Tool arguments
+            session_id: Chat session owning any artifacts the call creates or reads
 
         Returns:
             Dict with "result" or "error" key
         """
+        scope = session_id or "default"
+        artifact_read = self._read_artifact_tool(tool_name, arguments, scope)
+        if artifact_read is not None:
+            return artifact_read
+        result = await self._execute_tool_async(tool_name, arguments)
+        return self._offload_result(result, scope)
+
+    def _read_artifact_tool(
+        self, tool_name: str, arguments: Dict[str, Any], scope: str
+    ) -> Optional[Dict[str, Any]]:
+        """Answer python_exec code that only calls read_artifact(), else None."""
+        if tool_name != "python_exec":
+            return None
+        call = parse_read_artifact_call(str(arguments.get("code", "") or ""))
+        if call is None:
+            return None
+        handle, offset, length = call
+        try:
+            return {"result": self._artifacts.read(scope, handle, offset, length)}
+        except KeyError as e:
+            return {"error": str(e.args[0])}
+
+    def _offload_result(self, result: Dict[str, Any], scope: str) -> Dict[str, Any]:
+        """Replace an oversized result with a preview and artifact handle."""
+        value = result.get("result")
+        if isinstance(value, str):
+            offloaded = self._artifacts.offload(scope, value)
+            if offloaded is not value:
+                return {**result, "result": offloaded}
+        return result
+
+    def clear_artifacts(self, session_id: str) -> None:
+        """Drop the artifacts of a chat session."""
+        self._artifacts.invalidate(session_id)
+
+    async def _execute_tool_async(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run a tool call without offloading its result."""
         try:
             mode = self._get_effective_mode()
             if tool_name == "search_skills":
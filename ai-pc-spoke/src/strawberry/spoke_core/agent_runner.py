@@ -25,7 +25,9 @@ from .events import (
 if TYPE_CHECKING:
     from ..hub import HubClient
     from ..llm.tensorzero_client import TensorZeroClient
+    from ..models import ChatMessage
     from ..skills.service import SkillService
+    from ..storage import SyncManager
     from .session import ChatSession
 
 logger = logging.getLogger(__name__)
@@ -52,6 +54,23 @@ class AgentRunner(ABC):
         pass
 
 
+def _messages_covering(session: "ChatSession", count: int) -> Optional[int]:
+    """Length of the prefix of ``session.messages`` holding ``count`` uploads.
+
+    System messages are never uploaded, so they do not count. Returns None
+    if the chat has fewer than ``count`` uploadable messages.
+    """
+    if count == 0:
+        return 0
+    uploaded = 0
+    for index, msg in enumerate(session.messages):
+        if msg.role != "system":
+            uploaded += 1
+            if uploaded == count:
+                return index + 1
+    return None
+
+
 class HubAgentRunner(AgentRunner):
     """Agent runner that forwards messages to Hub for processing.
 
@@ -66,15 +85,21 @@ class HubAgentRunner(AgentRunner):
         self,
         get_hub_client: Callable[[], Optional["HubClient"]],
         emit: Callable[[CoreEvent], Any],
+        sync_manager: Optional["SyncManager"] = None,
     ) -> None:
         """Initialize HubAgentRunner.
 
         Args:
             get_hub_client: Callback to get the current HubClient (or None).
             emit: Async callback to emit CoreEvent instances.
+            sync_manager: Sync manager of the local session store, so chats
+                stored locally share one Hub session with their synced copy.
         """
         self._get_hub_client = get_hub_client
         self._emit = emit
+        self._sync_manager = sync_manager
+        # Cleared if the Hub does not report session context versions.
+        self._incremental = True
 
     async def _dispatch_stream_event(
         self,
@@ -131,56 +156,173 @@ class HubAgentRunner(AgentRunner):
 
         return False, None
 
+    async def _ensure_hub_session(
+        self,
+        hub_client: "HubClient",
+        session: "ChatSession",
+    ) -> None:
+        """Create the Hub session backing this chat, if there is none yet.
+
+        A chat stored locally reuses the Hub session its stored copy is
+        synced to, and a new Hub session is linked to the stored copy, so
+        sync never creates or imports the conversation a second time.
+        """
+        if session.hub_session_id is not None or not self._incremental:
+            return
+        if await self._adopt_synced_session(hub_client, session):
+            return
+        try:
+            info = await hub_client.create_session()
+        except HubError as e:
+            logger.warning("Could not create Hub session, sending full history: %s", e)
+            return
+        session.hub_session_id = str(info["id"])
+        session.hub_context_version = 0
+        session.hub_synced_count = 0
+        if self._sync_manager and session.local_session_id:
+            self._sync_manager.link_hub_session(
+                session.local_session_id, session.hub_session_id
+            )
+
+    async def _adopt_synced_session(
+        self,
+        hub_client: "HubClient",
+        session: "ChatSession",
+    ) -> bool:
+        """Continue in the Hub session the chat's stored copy is synced to.
+
+        Returns:
+            False if a new Hub session should be created. True otherwise,
+            including when the synced session cannot be used this turn
+            (the turn then sends the full history without a session).
+        """
+        if not (self._sync_manager and session.local_session_id):
+            return False
+        hub_id = self._sync_manager.hub_session_id(session.local_session_id)
+        if not hub_id:
+            return False
+        try:
+            info = await hub_client.get_session(hub_id)
+        except HubError as e:
+            if e.status_code == 404:
+                return False
+            logger.warning("Could not read synced Hub session %s: %s", hub_id, e)
+            return True
+
+        version = int(info.get("message_count") or 0)
+        synced_count = _messages_covering(session, version)
+        if synced_count is None:
+            logger.warning(
+                "Hub session %s has more messages than the chat; sending full history",
+                hub_id,
+            )
+            return True
+        session.hub_session_id = hub_id
+        session.hub_context_version = version
+        session.hub_synced_count = synced_count
+        return True
+
+    def _pending_messages(self, session: "ChatSession") -> list["ChatMessage"]:
+        """Messages to upload: only those the Hub session lacks, if it has one."""
+        from ..models import ChatMessage
+
+        start = session.hub_synced_count if session.hub_session_id else 0
+        return [
+            ChatMessage(role=msg.role, content=msg.content)
+            for msg in session.messages[start:]
+            if msg.role != "system"
+        ]
+
+    async def _stream_turn(
+        self,
+        hub_client: "HubClient",
+        session: "ChatSession",
+    ) -> tuple[bool, Optional[str], Optional[int]]:
+        """Send one turn to the Hub and dispatch its stream events.
+
+        Returns:
+            (aborted, final_content, context_version)
+        """
+        incremental = session.hub_session_id is not None
+        final_content: Optional[str] = None
+        context_version: Optional[int] = None
+
+        stream = hub_client.chat_stream(
+            messages=self._pending_messages(session),
+            enable_tools=True,
+            session_id=session.hub_session_id,
+            context_version=session.hub_context_version if incremental else None,
+        )
+        try:
+            while True:
+                event = await stream.__anext__()
+                event_type = str(event.get("type") or "")
+
+                if event_type == "done":
+                    version = event.get("context_version")
+                    if isinstance(version, int):
+                        context_version = version
+                    elif incremental:
+                        # Hub predates incremental context; send full history
+                        # from now on.
+                        self._incremental = False
+                    await asyncio.shield(stream.aclose())
+                    break
+
+                should_abort, content = await self._dispatch_stream_event(
+                    event_type,
+                    event,
+                    session,
+                )
+                if should_abort:
+                    return True, None, None
+                if content is not None:
+                    final_content = content
+
+        except StopAsyncIteration:
+            pass
+        finally:
+            await asyncio.shield(stream.aclose())
+
+        return False, final_content, context_version
+
     async def run(
         self,
         session: "ChatSession",
         max_iterations: int = 5,
     ) -> Optional[str]:
-        """Run agent loop via Hub (Hub executes tools on registered devices)."""
-        from ..models import ChatMessage
+        """Run agent loop via Hub (Hub executes tools on registered devices).
 
+        The conversation lives in a Hub session, so after the first turn
+        only messages added since the last online turn are uploaded. If the
+        Hub rejects the session version (409) or lost the session (404),
+        the full conversation is resent once in a fresh session.
+        """
         hub_client = self._get_hub_client()
         if not hub_client:
             await self._emit(CoreError(error="Hub client not available"))
             return None
 
-        # Build messages for Hub (exclude system messages)
-        messages: list[ChatMessage] = [
-            ChatMessage(role=msg.role, content=msg.content)
-            for msg in session.messages
-            if msg.role != "system"
-        ]
+        if session.hub_synced_count > len(session.messages):
+            session.reset_hub_context()
 
         try:
-            final_content: Optional[str] = None
-
-            stream = hub_client.chat_stream(
-                messages=messages,
-                enable_tools=True,
-            )
+            await self._ensure_hub_session(hub_client, session)
             try:
-                while True:
-                    event = await stream.__anext__()
-                    event_type = str(event.get("type") or "")
-
-                    if event_type == "done":
-                        await asyncio.shield(stream.aclose())
-                        break
-
-                    should_abort, content = await self._dispatch_stream_event(
-                        event_type,
-                        event,
-                        session,
-                    )
-                    if should_abort:
-                        return None
-                    if content is not None:
-                        final_content = content
-
-            except StopAsyncIteration:
-                pass
-            finally:
-                await asyncio.shield(stream.aclose())
+                aborted, final_content, version = await self._stream_turn(
+                    hub_client, session
+                )
+            except HubError as e:
+                if session.hub_session_id is None or e.status_code not in (404, 409):
+                    raise
+                logger.info("Hub session context out of date, resending: %s", e)
+                session.reset_hub_context()
+                await self._ensure_hub_session(hub_client, session)
+                aborted, final_content, version = await self._stream_turn(
+                    hub_client, session
+                )
+            if aborted:
+                return None
 
             if final_content and final_content.strip():
                 session.add_message("assistant", final_content)
@@ -196,6 +338,15 @@ class HubAgentRunner(AgentRunner):
                 logger.error(error)
                 await self._emit(CoreError(error=error))
 
+            if session.hub_session_id is not None:
+                if version is None:
+                    # Old Hub, or the stream ended without ``done`` (dropped
+                    # connection, error frame): resend the conversation next turn.
+                    session.reset_hub_context()
+                else:
+                    session.hub_context_version = version
+                    session.hub_synced_count = len(session.messages)
+
         except HubError as e:
             logger.error(f"Hub chat failed: {e}")
             await self._emit(CoreError(error=f"Hub error: {e}"))
@@ -218,6 +369,7 @@ class LocalAgentRunner(AgentRunner):
         llm: "TensorZeroClient",
         skills: "SkillService",
         emit: Callable[[CoreEvent], Any],
+        max_parallel_tools: int = 4,
     ) -> None:
         """Initialize LocalAgentRunner.
 
@@ -225,10 +377,13 @@ class LocalAgentRunner(AgentRunner):
             llm: TensorZero client for LLM calls.
             skills: SkillService for tool execution.
             emit: Async callback to emit CoreEvent instances.
+            max_parallel_tools: Max tool calls from one model step that
+                run concurrently.
         """
         self._llm = llm
         self._skills = skills
         self._emit = emit
+        self._max_parallel_tools = max(1, max_parallel_tools)
 
     async def _emit_assistant_message(
         self,
@@ -335,6 +490,10 @@ class LocalAgentRunner(AgentRunner):
         Returns:
             True if loop should abort (duplicate detected), False to continue.
         """
+        # Guards run first, in model order. Calls before a repeated one
+        # still run (as they did when calls ran one at a time).
+        runnable: List[Any] = []
+        duplicate = False
         for tool_call in tool_calls:
             tool_key = json.dumps(
                 {
@@ -344,22 +503,12 @@ class LocalAgentRunner(AgentRunner):
                 sort_keys=True,
             )
             if tool_key in seen_tool_calls:
-                error = (
-                    "Model attempted to repeat the same tool call. "
-                    "Aborting to prevent an infinite loop."
-                )
-                await self._emit(CoreError(error=error))
-                session.add_message("assistant", error)
-                await self._emit(
-                    MessageAdded(
-                        session_id=session.id,
-                        role="assistant",
-                        content=error,
-                    )
-                )
-                return True
+                duplicate = True
+                break
             seen_tool_calls.add(tool_key)
+            runnable.append(tool_call)
 
+        for tool_call in runnable:
             await self._emit(
                 ToolCallStarted(
                     session_id=session.id,
@@ -368,11 +517,20 @@ class LocalAgentRunner(AgentRunner):
                 )
             )
 
-            # Execute tool
-            result = await self._skills.execute_tool_async(
-                tool_call.name, tool_call.arguments
-            )
+        # Independent calls run concurrently, bounded so one model step
+        # cannot flood the sandbox or the Hub.
+        slots = asyncio.Semaphore(self._max_parallel_tools)
+
+        async def execute(tool_call: Any) -> dict:
+            async with slots:
+                return await self._skills.execute_tool_async(
+                    tool_call.name, tool_call.arguments, session_id=session.id
+                )
+
+        results = await asyncio.gather(*(execute(tc) for tc in runnable))
 
+        # Report results and extend the transcript in the original order.
+        for tool_call, result in zip(runnable, results):
             success = "error" not in result
             result_text = result.get("result", result.get("error", ""))
 
@@ -394,6 +552,22 @@ class LocalAgentRunner(AgentRunner):
             )
             session.add_message("user", tool_msg)
 
+        if duplicate:
+            error = (
+                "Model attempted to repeat the same tool call. "
+                "Aborting to prevent an infinite loop."
+            )
+            await self._emit(CoreError(error=error))
+            session.add_message("assistant", error)
+            await self._emit(
+                MessageAdded(
+                    session_id=session.id,
+                    role="assistant",
+                    content=error,
+                )
+            )
+            return True
+
         return False
 
     async def _handle_legacy_code_blocks(
@@ -417,7 +591,9 @@ class LocalAgentRunner(AgentRunner):
             )
 
             # Execute via python_exec tool
-            result = await self._skills.execute_tool_async("python_exec", {"code": code})
+            result = await self._skills.execute_tool_async(
+                "python_exec", {"code": code}, session_id=session.id
+            )
 
             success = "error" not in result
             result_text = result.get("result", result.get("error", ""))
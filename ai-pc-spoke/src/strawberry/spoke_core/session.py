@@ -15,12 +15,24 @@ class ChatSession:
         last_mode: The mode ("online" or "offline") when the last message
             was processed. ``None`` means no message has been sent yet.
             Used to detect mode switches mid-conversation.
+        hub_session_id: Hub session holding this conversation's context, so
+            online turns only upload new messages. ``None`` until the first
+            online turn.
+        hub_context_version: Hub session version after the last online turn.
+        hub_synced_count: Number of ``messages`` the Hub session already has.
+        local_session_id: ID of this chat in the local session store, if it
+            is stored there. Online turns then use the Hub session the
+            stored copy is synced to.
     """
 
     id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
     messages: List[ChatMessage] = field(default_factory=list)
     busy: bool = False
     last_mode: Optional[str] = None
+    hub_session_id: Optional[str] = None
+    hub_context_version: int = 0
+    hub_synced_count: int = 0
+    local_session_id: Optional[str] = None
 
     def add_message(self, role: str, content: str) -> ChatMessage:
         """Add a message to the session."""
@@ -31,3 +43,10 @@ class ChatSession:
     def clear(self) -> None:
         """Clear all messages."""
         self.messages.clear()
+        self.reset_hub_context()
+
+    def reset_hub_context(self) -> None:
+        """Forget the Hub session so the next online turn resends everything."""
+        self.hub_session_id = None
+        self.hub_context_version = 0
+        self.hub_synced_count = 0
@@ -204,7 +204,7 @@ class SkillManager:
             )
         )
         result = await self._service.execute_tool_async(
-            "search_skills", {"query": ""}
+            "search_skills", {"query": ""}, session_id=session.id
         )
         success = "error" not in result
         result_text = result.get("result", result.get("error", ""))
@@ -241,7 +241,7 @@ class SkillManager:
             )
         )
         result = await self._service.execute_tool_async(
-            "python_exec", {"code": code}
+            "python_exec", {"code": code}, session_id=session.id
         )
         success = "error" not in result
         result_text = result.get("result", result.get("error", ""))
@@ -23,7 +23,8 @@ def _to_utc(dt: datetime) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
-def _parse_datetime(value: Any) -> datetime:
+def parse_datetime(value: Any) -> datetime:
+    """Parse a stored or Hub timestamp as an aware UTC datetime."""
     if isinstance(value, datetime):
         return _to_utc(value)
     if value is None:
@@ -412,8 +413,8 @@ class LocalSessionDB:
         created_at = remote.get("created_at", _utc_now().isoformat())
         last_activity = remote.get("last_activity", created_at)
 
-        created_at_dt = _parse_datetime(created_at)
-        last_activity_dt = _parse_datetime(last_activity)
+        created_at_dt = parse_datetime(created_at)
+        last_activity_dt = parse_datetime(last_activity)
 
         conn = self._get_conn()
         cursor = conn.cursor()
@@ -535,6 +536,23 @@ class LocalSessionDB:
         )
         conn.commit()
 
+    def get_last_hub_message_id(self, session_id: str) -> Optional[int]:
+        """Get the highest Hub message ID stored for a session.
+
+        Args:
+            session_id: Local session ID
+
+        Returns:
+            The Hub message ID, or None if no message came from or went to the Hub
+        """
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT MAX(hub_message_id) FROM local_messages WHERE session_id = ?",
+            (session_id,),
+        )
+        return cursor.fetchone()[0]
+
     def import_remote_message(self, session_id: str, remote: Dict[str, Any]) -> Message:
         """Import a message from Hub.
 
@@ -556,7 +574,7 @@ class LocalSessionDB:
         )
         seq_num = cursor.fetchone()[0]
 
-        created_at_dt = _parse_datetime(remote.get("created_at", _utc_now().isoformat()))
+        created_at_dt = parse_datetime(remote.get("created_at", _utc_now().isoformat()))
 
         cursor.execute(
             """
@@ -686,11 +704,11 @@ class LocalSessionDB:
 
     def _row_to_session(self, row: sqlite3.Row) -> Session:
         """Convert database row to Session object."""
-        created_at = _parse_datetime(row["created_at"])
-        last_activity = _parse_datetime(row["last_activity"])
+        created_at = parse_datetime(row["created_at"])
+        last_activity = parse_datetime(row["last_activity"])
 
         deleted_raw = row["deleted_at"]
-        deleted_at = _parse_datetime(deleted_raw) if deleted_raw else None
+        deleted_at = parse_datetime(deleted_raw) if deleted_raw else None
 
         return Session(
             id=row["id"],
@@ -705,7 +723,7 @@ class LocalSessionDB:
 
     def _row_to_message(self, row: sqlite3.Row) -> Message:
         """Convert database row to Message object."""
-        created_at = _parse_datetime(row["created_at"])
+        created_at = parse_datetime(row["created_at"])
 
         return Message(
             id=row["id"],
@@ -720,7 +738,7 @@ class LocalSessionDB:
 
     def _row_to_sync_op(self, row: sqlite3.Row) -> SyncOperation:
         """Convert database row to SyncOperation object."""
-        created_at = _parse_datetime(row["created_at"])
+        created_at = parse_datetime(row["created_at"])
 
         return SyncOperation(
             id=row["id"],
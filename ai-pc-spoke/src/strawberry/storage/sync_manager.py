@@ -2,10 +2,11 @@
 
 import asyncio
 import logging
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..hub import HubClient, HubError
-from .session_db import LocalSessionDB, SyncStatus
+from .session_db import LocalSessionDB, Session, SyncStatus, parse_datetime
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,10 @@ class SyncManager:
     # Default sync window (days)
     SYNC_DAYS = 30
 
+    # Page sizes for listing remote sessions and fetching their messages
+    LIST_PAGE_SIZE = 50
+    MESSAGE_PAGE_SIZE = 200
+
     def __init__(self, db: LocalSessionDB, hub_client: Optional[HubClient] = None):
         """Initialize sync manager.
 
@@ -39,6 +44,11 @@ class SyncManager:
         self.hub_client = hub_client
         self._sync_in_progress = False
         self._sync_task: Optional[asyncio.Task] = None
+        # Newest remote last_activity seen; later pulls ask only for changes.
+        self._remote_watermark: Optional[str] = None
+        # Per Hub session, the after_id of the last first-page request and
+        # its ETag, sent back as If-None-Match when the request repeats.
+        self._message_etags: Dict[str, Tuple[Optional[int], str]] = {}
 
     def set_hub_client(self, hub_client: Optional[HubClient]) -> None:
         """Set or update the Hub client.
@@ -48,6 +58,23 @@ class SyncManager:
         """
         self.hub_client = hub_client
 
+    def hub_session_id(self, local_session_id: str) -> Optional[str]:
+        """Hub session a local session is synced to, if any."""
+        return self.db.get_hub_session_id(local_session_id)
+
+    def link_hub_session(self, local_session_id: str, hub_session_id: str) -> None:
+        """Record that a Hub session created elsewhere holds a local session.
+
+        Online chat turns create the Hub session themselves. Linking it
+        keeps sync from creating another one for the local session and
+        from importing the Hub session as a new conversation.
+
+        Args:
+            local_session_id: Local session ID
+            hub_session_id: Hub session ID
+        """
+        self.db.update_session(local_session_id, hub_id=hub_session_id)
+
     async def _hub_available(self) -> bool:
         """Check if Hub is available."""
         if not self.hub_client:
@@ -269,50 +296,157 @@ class SyncManager:
     async def _pull_remote(self) -> None:
         """Pull remote sessions and merge into local storage.
 
+        The first pull lists the last ``SYNC_DAYS`` of sessions. Later pulls
+        pass the newest ``last_activity`` seen as ``since``, so only
+        sessions changed in between are listed.
+
         Behavior:
         - Import sessions/messages that don't exist locally.
-        - Update local metadata (e.g. title) for sessions that already exist.
+        - Update local metadata (e.g. title) for sessions that already exist,
+          and fetch their messages newer than the last one stored locally.
         """
         try:
-            remote_sessions = await self.hub_client.list_sessions(days=self.SYNC_DAYS)
+            remote_sessions = await self._list_remote_changes()
         except Exception as e:
             logger.error(f"Failed to fetch remote sessions: {e}")
             return
 
         imported_count = 0
+        complete = True
 
         for remote in remote_sessions:
             hub_id = remote.get("id")
             if not hub_id:
                 continue
 
-            # If we already have this session, update local metadata.
+            # If we already have this session, update local metadata and
+            # append messages added elsewhere.
             if self.db.has_hub_session(hub_id):
                 local_session = self.db.get_session_by_hub_id(hub_id)
-                if local_session:
-                    remote_title = remote.get("title")
-                    if remote_title is not None and remote_title != local_session.title:
-                        self.db.update_session(local_session.id, title=remote_title)
-                continue
-
-            # Import remote session locally
-            try:
-                local_session = self.db.import_remote_session(remote)
-                logger.debug(f"Imported remote session {hub_id} -> {local_session.id}")
-
-                # Fetch and import messages
-                messages = await self.hub_client.get_session_messages(hub_id)
-                for msg in messages:
-                    self.db.import_remote_message(local_session.id, msg)
-
+                if local_session and not await self._refresh_session(
+                    local_session, remote
+                ):
+                    complete = False
+            elif await self._import_session(remote):
                 imported_count += 1
+            else:
+                complete = False
 
-            except Exception as e:
-                logger.error(f"Failed to import session {hub_id}: {e}")
+        # Only advance past changes that were fully applied.
+        if complete:
+            self._advance_watermark(remote_sessions)
 
         if imported_count > 0:
             logger.info(f"Imported {imported_count} remote sessions")
 
+    async def _list_remote_changes(self) -> List[Dict[str, Any]]:
+        """List every remote session changed since the watermark.
+
+        The Hub's change feed is ordered oldest first by ``(last_activity,
+        id)`` and returns at most ``LIST_PAGE_SIZE`` sessions per call, so
+        each page starts after the last session of the previous one. A
+        session that gains activity meanwhile moves to the end of the feed
+        rather than shifting pages, so none is skipped. The first pull
+        reads the last ``SYNC_DAYS`` of the feed.
+        """
+        since = self._remote_watermark
+        if since is None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.SYNC_DAYS)
+            since = cutoff.isoformat()
+        after_id: Optional[str] = None
+        sessions: List[Dict[str, Any]] = []
+        while True:
+            page = await self.hub_client.list_sessions(
+                limit=self.LIST_PAGE_SIZE, since=since, after_id=after_id
+            )
+            sessions.extend(page)
+            if len(page) < self.LIST_PAGE_SIZE:
+                return sessions
+            since, after_id = page[-1]["last_activity"], page[-1]["id"]
+
+    async def _refresh_session(
+        self, local_session: Session, remote: Dict[str, Any]
+    ) -> bool:
+        """Apply remote metadata and new messages to a local session."""
+        remote_title = remote.get("title")
+        if remote_title is not None and remote_title != local_session.title:
+            self.db.update_session(local_session.id, title=remote_title)
+        if self._remote_watermark is None:
+            return True
+        try:
+            after_id = self.db.get_last_hub_message_id(local_session.id)
+            count = await self._pull_messages(
+                local_session.id, remote["id"], after_id=after_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to pull messages for {remote['id']}: {e}")
+            return False
+        if count:
+            logger.debug(f"Pulled {count} new messages for session {remote['id']}")
+        return True
+
+    async def _import_session(self, remote: Dict[str, Any]) -> bool:
+        """Import a remote session and its messages."""
+        hub_id = remote["id"]
+        try:
+            local_session = self.db.import_remote_session(remote)
+            logger.debug(f"Imported remote session {hub_id} -> {local_session.id}")
+            await self._pull_messages(local_session.id, hub_id)
+        except Exception as e:
+            logger.error(f"Failed to import session {hub_id}: {e}")
+            return False
+        return True
+
+    async def _pull_messages(
+        self,
+        local_session_id: str,
+        hub_id: str,
+        after_id: Optional[int] = None,
+    ) -> int:
+        """Import a session's Hub messages after ``after_id``, oldest first.
+
+        When the first request repeats the previous pull's (nothing was
+        imported since), it carries that pull's ETag as ``If-None-Match``,
+        so a session listed only because it was renamed costs a 304 instead
+        of a message page. The ETag is stored once every page has been
+        imported.
+
+        Returns:
+            Number of messages imported
+        """
+        previous = self._message_etags.get(hub_id)
+        etag = previous[1] if previous and previous[0] == after_id else None
+        new_etag: Optional[str] = None
+        cursor = after_id
+        count = 0
+        while True:
+            page = await self.hub_client.get_session_messages_page(
+                hub_id, after_id=cursor, limit=self.MESSAGE_PAGE_SIZE, etag=etag
+            )
+            if page is None:
+                return count
+            new_etag = new_etag or page.get("etag")
+            etag = None
+            for msg in page["messages"]:
+                self.db.import_remote_message(local_session_id, msg)
+            count += len(page["messages"])
+            cursor = page.get("next_after_id")
+            if cursor is None:
+                break
+        if new_etag:
+            self._message_etags[hub_id] = (after_id, new_etag)
+        return count
+
+    def _advance_watermark(self, remote_sessions: List[Dict[str, Any]]) -> None:
+        """Move the watermark to the newest ``last_activity`` listed."""
+        for remote in remote_sessions:
+            activity = remote.get("last_activity")
+            if activity and (
+                self._remote_watermark is None
+                or parse_datetime(activity) > parse_datetime(self._remote_watermark)
+            ):
+                self._remote_watermark = activity
+
     # =========================================================================
     # Queue Operations
     # =========================================================================
@@ -0,0 +1,97 @@
+"""Tests for LocalAgentRunner tool-call execution."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from strawberry.models import ToolCall
+from strawberry.spoke_core.agent_runner import LocalAgentRunner
+from strawberry.spoke_core.events import CoreError, ToolCallResult, ToolCallStarted
+from strawberry.spoke_core.session import ChatSession
+
+
+class SlowSkills:
+    """Fake SkillService whose tools take ``delay`` seconds."""
+
+    def __init__(self, delay: float = 0.2) -> None:
+        self.delay = delay
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def execute_tool_async(
+        self, tool_name: str, arguments: dict, session_id: str | None = None
+    ) -> dict:
+        self.calls.append(arguments["code"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later calls finish first to prove results are reported in order.
+        await asyncio.sleep(self.delay / len(self.calls))
+        self.in_flight -= 1
+        return {"result": f"ran {arguments['code']}"}
+
+
+def _runner(skills: SlowSkills, **kwargs) -> tuple[LocalAgentRunner, list]:
+    events: list = []
+
+    async def emit(event) -> None:
+        events.append(event)
+
+    return LocalAgentRunner(llm=None, skills=skills, emit=emit, **kwargs), events
+
+
+def _call(i: int, code: str) -> ToolCall:
+    return ToolCall(id=f"call_{i}", name="python_exec", arguments={"code": code})
+
+
+async def test_independent_tool_calls_run_in_parallel_in_order() -> None:
+    skills = SlowSkills()
+    runner, events = _runner(skills)
+    session = ChatSession()
+
+    start = time.perf_counter()
+    aborted = await runner._handle_tool_calls(
+        session, [_call(i, f"step{i}") for i in range(3)], set()
+    )
+    elapsed = time.perf_counter() - start
+
+    assert aborted is False
+    assert elapsed < 2 * skills.delay
+    assert skills.max_in_flight == 3
+    assert [type(e) for e in events] == [ToolCallStarted] * 3 + [ToolCallResult] * 3
+    assert [e.result for e in events[3:]] == ["ran step0", "ran step1", "ran step2"]
+    assert [m.content.split("\n")[1] for m in session.messages] == [
+        "ran step0",
+        "ran step1",
+        "ran step2",
+    ]
+
+
+async def test_parallelism_is_bounded() -> None:
+    skills = SlowSkills(delay=0.05)
+    runner, _ = _runner(skills, max_parallel_tools=2)
+
+    await runner._handle_tool_calls(
+        ChatSession(), [_call(i, f"step{i}") for i in range(5)], set()
+    )
+
+    assert skills.max_in_flight == 2
+    assert len(skills.calls) == 5
+
+
+async def test_repeated_tool_call_aborts_after_earlier_calls() -> None:
+    skills = SlowSkills(delay=0.01)
+    runner, events = _runner(skills)
+    session = ChatSession()
+
+    aborted = await runner._handle_tool_calls(
+        session,
+        [_call(0, "a"), _call(1, "b"), _call(2, "a"), _call(3, "c")],
+        set(),
+    )
+
+    assert aborted is True
+    assert skills.calls == ["a", "b"]
+    assert isinstance(events[-2], CoreError)
+    assert session.messages[-1].role == "assistant"
@@ -0,0 +1,172 @@
+"""Tests for HubAgentRunner incremental session context."""
+
+from __future__ import annotations
+
+from strawberry.hub import HubError
+from strawberry.spoke_core.agent_runner import HubAgentRunner
+from strawberry.spoke_core.session import ChatSession
+from strawberry.storage import LocalSessionDB, SyncManager
+
+
+class FakeHub:
+    """HubClient stand-in that keeps session message counts like the Hub."""
+
+    def __init__(self, report_version: bool = True) -> None:
+        self.report_version = report_version
+        self.drop_next = False
+        self.counts: dict[str, int] = {}
+        self.requests: list[dict] = []
+
+    async def create_session(self) -> dict:
+        session_id = f"hub-{len(self.counts) + 1}"
+        self.counts[session_id] = 0
+        return {"id": session_id}
+
+    async def get_session(self, session_id: str) -> dict:
+        if session_id not in self.counts:
+            raise HubError("Hub API error: not found", 404)
+        return {"id": session_id, "message_count": self.counts[session_id]}
+
+    async def chat_stream(self, messages, enable_tools, session_id, context_version):
+        self.requests.append(
+            {
+                "contents": [m.content for m in messages],
+                "session_id": session_id,
+                "context_version": context_version,
+            }
+        )
+        if context_version is not None and context_version != self.counts[session_id]:
+            raise HubError("Hub API error: version mismatch", 409)
+        reply = f"reply {len(self.requests)}"
+        yield {"type": "assistant_message", "content": reply}
+        if self.drop_next:
+            self.drop_next = False
+            return
+        done: dict = {"type": "done"}
+        if context_version is not None and self.report_version:
+            self.counts[session_id] += len(messages) + 1
+            done["context_version"] = self.counts[session_id]
+        yield done
+
+
+def _runner(hub: FakeHub, sync_manager=None) -> HubAgentRunner:
+    async def emit(event) -> None:
+        pass
+
+    return HubAgentRunner(
+        get_hub_client=lambda: hub, emit=emit, sync_manager=sync_manager
+    )
+
+
+async def test_only_new_messages_are_uploaded() -> None:
+    hub = FakeHub()
+    runner = _runner(hub)
+    session = ChatSession()
+
+    session.add_message("user", "first")
+    await runner.run(session)
+    session.add_message("user", "second")
+    await runner.run(session)
+
+    assert hub.requests[0]["contents"] == ["first"]
+    assert hub.requests[1] == {
+        "contents": ["second"],
+        "session_id": "hub-1",
+        "context_version": 2,
+    }
+    assert session.hub_synced_count == 4
+
+
+async def test_version_mismatch_resends_full_conversation() -> None:
+    hub = FakeHub()
+    runner = _runner(hub)
+    session = ChatSession()
+
+    session.add_message("user", "first")
+    await runner.run(session)
+    hub.counts["hub-1"] += 1  # Another client wrote to the session.
+    session.add_message("user", "second")
+    result = await runner.run(session)
+
+    assert result == "reply 3"
+    assert hub.requests[2] == {
+        "contents": ["first", "reply 1", "second"],
+        "session_id": "hub-2",
+        "context_version": 0,
+    }
+    assert session.hub_context_version == 4
+
+
+async def test_hub_without_versions_gets_full_history() -> None:
+    hub = FakeHub(report_version=False)
+    runner = _runner(hub)
+    session = ChatSession()
+
+    session.add_message("user", "first")
+    await runner.run(session)
+    session.add_message("user", "second")
+    await runner.run(session)
+
+    assert hub.requests[1] == {
+        "contents": ["first", "reply 1", "second"],
+        "session_id": None,
+        "context_version": None,
+    }
+
+
+async def test_dropped_stream_keeps_incremental_mode() -> None:
+    hub = FakeHub()
+    runner = _runner(hub)
+    session = ChatSession()
+
+    session.add_message("user", "first")
+    hub.drop_next = True
+    await runner.run(session)
+    session.add_message("user", "second")
+    await runner.run(session)
+    session.add_message("user", "third")
+    await runner.run(session)
+
+    assert hub.requests[1] == {
+        "contents": ["first", "reply 1", "second"],
+        "session_id": "hub-2",
+        "context_version": 0,
+    }
+    assert hub.requests[2]["contents"] == ["third"]
+
+
+async def test_chat_reuses_the_synced_hub_session(tmp_path) -> None:
+    db = LocalSessionDB(tmp_path / "sessions.db")
+    hub = FakeHub()
+    hub.counts["hub-synced"] = 2
+    stored = db.create_session(title="Chat")
+    db.mark_session_synced(stored.id, "hub-synced")
+    runner = _runner(hub, SyncManager(db, hub))
+
+    session = ChatSession(local_session_id=stored.id)
+    session.add_message("user", "first")
+    session.add_message("assistant", "reply 0")
+    session.add_message("user", "second")
+    await runner.run(session)
+    db.close()
+
+    assert hub.requests[0] == {
+        "contents": ["second"],
+        "session_id": "hub-synced",
+        "context_version": 2,
+    }
+
+
+async def test_new_hub_session_is_linked_for_sync(tmp_path) -> None:
+    db = LocalSessionDB(tmp_path / "sessions.db")
+    hub = FakeHub()
+    stored = db.create_session(title="Chat")
+    runner = _runner(hub, SyncManager(db, hub))
+
+    session = ChatSession(local_session_id=stored.id)
+    session.add_message("user", "first")
+    await runner.run(session)
+
+    assert db.get_hub_session_id(stored.id) == "hub-1"
+    assert db.has_hub_session("hub-1")
+    db.close()
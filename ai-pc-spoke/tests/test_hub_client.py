@@ -1,11 +1,21 @@
 """Tests for Hub client."""
 
+import asyncio
+import json
+import threading
 from unittest.mock import AsyncMock, MagicMock
 
 import httpx
 import pytest
 
-from strawberry.hub.client import ChatMessage, HubClient, HubConfig, HubError
+from strawberry.hub.client import (
+    ChatMessage,
+    HubClient,
+    HubConfig,
+    HubError,
+    compute_manifest_hash,
+    compute_skill_hash,
+)
 
 
 @pytest.fixture
@@ -113,6 +123,21 @@ class TestHubClientChat:
             session_id="session-123",
         )
         assert payload["session_id"] == "session-123"
+        assert "context_version" not in payload
+
+    def test_build_chat_payload_includes_context_version(self, hub_client):
+        """Incremental requests carry the Hub session version, even when 0."""
+        payload = hub_client._build_chat_payload(
+            messages=[ChatMessage(role="user", content="hello")],
+            temperature=0.7,
+            enable_tools=True,
+            stream=True,
+            model=None,
+            max_tokens=None,
+            session_id="session-123",
+            context_version=0,
+        )
+        assert payload["context_version"] == 0
 
     @pytest.mark.asyncio
     async def test_chat_success(self, hub_client, mock_client):
@@ -198,6 +223,78 @@ class TestHubClientSkills:
 
         assert "Registered" in result["message"]
 
+    @pytest.mark.asyncio
+    async def test_sync_skills_unchanged_sends_one_request(self, hub_client, mock_client):
+        """An unchanged manifest needs no upload."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"status": "unchanged", "missing": []}
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_client.is_closed = False
+
+        skills = [
+            {"class_name": "TestSkill", "function_name": "test", "signature": "test()"},
+        ]
+        result = await hub_client.sync_skills(skills)
+
+        assert result["status"] == "unchanged"
+        assert mock_client.post.await_count == 1
+        payload = mock_client.post.await_args.kwargs["json"]
+        assert payload["method_hashes"] == [compute_skill_hash(skills[0])]
+        assert payload["manifest_hash"] == compute_manifest_hash(
+            payload["method_hashes"]
+        )
+
+    def test_skill_hash_includes_cache_ttl_only_when_set(self):
+        """Uncached methods keep the hashes they had before the field existed."""
+        skill = {"class_name": "A", "function_name": "one", "signature": "one()"}
+        assert compute_skill_hash(skill) == compute_skill_hash(
+            {**skill, "cache_ttl_seconds": 0}
+        )
+        assert compute_skill_hash(skill) != compute_skill_hash(
+            {**skill, "cache_ttl_seconds": 60}
+        )
+
+    @pytest.mark.asyncio
+    async def test_sync_skills_uploads_only_missing(self, hub_client, mock_client):
+        """Only methods the Hub lacks are re-sent."""
+        skills = [
+            {"class_name": "A", "function_name": "one", "signature": "one()"},
+            {"class_name": "A", "function_name": "two", "signature": "two()"},
+        ]
+        missing = compute_skill_hash(skills[1])
+
+        sync_response = MagicMock(status_code=200)
+        sync_response.json.return_value = {"status": "incomplete", "missing": [missing]}
+        register_response = MagicMock(status_code=200)
+        register_response.json.return_value = {"message": "Registered 1 skills"}
+        mock_client.post = AsyncMock(side_effect=[sync_response, register_response])
+        mock_client.is_closed = False
+
+        result = await hub_client.sync_skills(skills)
+
+        assert result["uploaded"] == 1
+        call = mock_client.post.await_args
+        kwargs = call.kwargs
+        assert call.args[0] == "/skills/register"
+        assert kwargs["json"]["skills"] == [skills[1]]
+        assert len(kwargs["json"]["method_hashes"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_sync_skills_falls_back_on_old_hub(self, hub_client, mock_client):
+        """Hubs without /skills/sync get a full registration."""
+        not_found = MagicMock(status_code=404)
+        registered = MagicMock(status_code=200)
+        registered.json.return_value = {"message": "Registered 1 skills"}
+        mock_client.post = AsyncMock(side_effect=[not_found, registered])
+        mock_client.is_closed = False
+
+        skills = [{"class_name": "A", "function_name": "one", "signature": "one()"}]
+        result = await hub_client.sync_skills(skills)
+
+        assert result["status"] == "registered"
+        assert mock_client.post.await_args.kwargs["json"] == {"skills": skills}
+
     @pytest.mark.asyncio
     async def test_search_skills(self, hub_client, mock_client):
         """Test skill search."""
@@ -231,6 +328,42 @@ class TestHubClientSkills:
         assert len(results) == 1
         assert results[0]["path"] == "MusicSkill.play"
 
+    @pytest.mark.asyncio
+    async def test_get_session_messages_follows_cursor(self, hub_client, mock_client):
+        """All pages are fetched by passing next_after_id as after_id."""
+        pages = [
+            {"messages": [{"id": 1}, {"id": 2}], "total": 3, "next_after_id": 2},
+            {"messages": [{"id": 3}], "total": 3, "next_after_id": None},
+        ]
+        responses = []
+        for page in pages:
+            response = MagicMock(status_code=200, headers={"ETag": '"s-3"'})
+            response.json.return_value = page
+            responses.append(response)
+        mock_client.get = AsyncMock(side_effect=responses)
+        mock_client.is_closed = False
+
+        messages = await hub_client.get_session_messages("s", page_size=2)
+
+        assert [m["id"] for m in messages] == [1, 2, 3]
+        second_call = mock_client.get.await_args_list[1]
+        assert second_call.kwargs["params"] == {"after_id": 2, "limit": 2}
+
+    @pytest.mark.asyncio
+    async def test_get_session_messages_page_not_modified(
+        self, hub_client, mock_client
+    ):
+        """A 304 for a matching ETag is reported as None."""
+        mock_client.get = AsyncMock(return_value=MagicMock(status_code=304))
+        mock_client.is_closed = False
+
+        page = await hub_client.get_session_messages_page("s", etag='"s-3"')
+
+        assert page is None
+        assert mock_client.get.await_args.kwargs["headers"] == {
+            "If-None-Match": '"s-3"'
+        }
+
 
 class _MockStreamingErrorResponse:
     """Streaming response mock that requires aread() before json/text access."""
@@ -300,3 +433,249 @@ class TestHubClientChatStream:
         assert error_response._read_called is True
         assert exc_info.value.status_code == 400
         assert "bad request" in str(exc_info.value)
+
+
+class _RecordingWebSocket:
+    """Captures frames sent back to the Hub."""
+
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    async def send(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+
+class TestHubClientSkillRequests:
+    """Tests for concurrent handling of Hub skill requests."""
+
+    @staticmethod
+    def _request(request_id: str, method: str) -> dict:
+        return {
+            "type": "skill_request",
+            "request_id": request_id,
+            "skill_name": "TestSkill",
+            "method_name": method,
+            "args": [],
+            "kwargs": {},
+        }
+
+    @pytest.mark.asyncio
+    async def test_slow_request_does_not_block_others(self, hub_config):
+        client = HubClient(hub_config)
+        client._websocket = _RecordingWebSocket()
+        release_slow = asyncio.Event()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            if method_name == "slow":
+                await release_slow.wait()
+            return method_name
+
+        client.set_skill_callback(skill)
+        await client._handle_websocket_message(self._request("r1", "slow"))
+        await client._handle_websocket_message(self._request("r2", "fast"))
+
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert [m["request_id"] for m in client._websocket.sent] == ["r2"]
+
+        release_slow.set()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert [m["result"] for m in client._websocket.sent] == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_queues_requests(self):
+        config = HubConfig(
+            url="http://localhost:8000", token="t", max_concurrent_skill_requests=2
+        )
+        client = HubClient(config)
+        client._websocket = _RecordingWebSocket()
+        running = 0
+        peak = 0
+        release = asyncio.Event()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+        client.set_skill_callback(skill)
+        for i in range(5):
+            await client._handle_websocket_message(self._request(f"r{i}", "m"))
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert peak == 2
+
+        release.set()
+        for _ in range(50):
+            await asyncio.sleep(0)
+        assert len(client._websocket.sent) == 5
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_request_without_response(self, hub_config):
+        client = HubClient(hub_config)
+        client._websocket = _RecordingWebSocket()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        client.set_skill_callback(skill)
+        await client._handle_websocket_message(self._request("r1", "slow"))
+        await started.wait()
+
+        await client._handle_websocket_message({"type": "cancel", "request_id": "r1"})
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+
+        assert client._websocket.sent == []
+        assert client._skill_tasks == {}
+
+    @pytest.mark.asyncio
+    async def test_generator_result_is_streamed_in_chunks(self, hub_config):
+        pytest.importorskip("msgpack")
+        from strawberry.hub.wire import MsgpackCodec, decode_frame
+
+        client = HubClient(hub_config)
+        client._ws_codec = MsgpackCodec()
+        frames = []
+
+        class _BinaryWebSocket:
+            async def send(self, data: bytes) -> None:
+                frames.append(decode_frame(data))
+
+        client._websocket = _BinaryWebSocket()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            return ({"path": f"/tmp/{i}"} for i in range(3))
+
+        client.set_skill_callback(skill)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("strawberry.hub.wire.RESULT_CHUNK_CHARS", 40)
+            await client._handle_skill_request(self._request("r1", "ls"))
+
+        chunks, final = frames[:-1], frames[-1]
+        assert [c["seq"] for c in chunks] == list(range(len(chunks)))
+        assert len(chunks) > 1
+        assert final == {
+            "type": "skill_response",
+            "request_id": "r1",
+            "success": True,
+            "chunks": len(chunks),
+        }
+        lines = "".join(c["data"] for c in chunks).splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"path": "/tmp/0"},
+            {"path": "/tmp/1"},
+            {"path": "/tmp/2"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_generator_result_is_joined_for_v1_hub(self, hub_config):
+        client = HubClient(hub_config)
+        client._websocket = _RecordingWebSocket()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            return (f"line {i}\n" for i in range(3))
+
+        client.set_skill_callback(skill)
+        await client._handle_skill_request(self._request("r1", "read"))
+
+        assert client._websocket.sent == [
+            {
+                "type": "skill_response",
+                "request_id": "r1",
+                "success": True,
+                "result": "line 0\nline 1\nline 2\n",
+            }
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sync_generator_runs_off_the_event_loop(self, hub_config):
+        client = HubClient(hub_config)
+        client._websocket = _RecordingWebSocket()
+        loop_thread = threading.get_ident()
+        closed = []
+
+        def read_lines():
+            try:
+                for _ in range(3):
+                    yield f"{threading.get_ident() != loop_thread}\n"
+            finally:
+                closed.append(True)
+
+        async def skill(skill_name, method_name, args, kwargs):
+            return read_lines()
+
+        client.set_skill_callback(skill)
+        await client._handle_skill_request(self._request("r1", "read"))
+
+        assert client._websocket.sent[0]["result"] == "True\nTrue\nTrue\n"
+        assert closed == [True]
+
+    @pytest.mark.asyncio
+    async def test_traced_request_echoes_trace_and_timing(self, hub_config):
+        client = HubClient(hub_config)
+        client._websocket = _RecordingWebSocket()
+
+        async def skill(skill_name, method_name, args, kwargs):
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        client.set_skill_callback(skill)
+        request = dict(self._request("r1", "fast"), trace_id="t" * 32, span_id="s" * 16)
+        await client._handle_skill_request(request, queue_ms=2.5)
+
+        (response,) = client._websocket.sent
+        assert response["trace_id"] == "t" * 32
+        assert response["span_id"] == "s" * 16
+        assert response["timing"]["queue_ms"] == 2.5
+        assert response["timing"]["exec_ms"] >= 10
+
+
+class TestHubClientHandshake:
+    """Tests for WebSocket protocol fallback on rejected handshakes."""
+
+    @staticmethod
+    async def _attempts(hub_config, monkeypatch, statuses):
+        """Run the connect loop against handshakes failing with ``statuses``."""
+        from websockets.datastructures import Headers
+        from websockets.exceptions import InvalidStatus
+        from websockets.http11 import Response
+
+        monkeypatch.setattr("strawberry.hub.client.preferred_version", lambda: "v2")
+        client = HubClient(hub_config)
+        client._ws_protocol = "v2"
+        client._reconnect_backoff = AsyncMock(side_effect=asyncio.CancelledError)
+        versions = []
+        pending = list(statuses)
+
+        def connect(url):
+            versions.append(url.rsplit("protocol_version=", 1)[1])
+            raise InvalidStatus(Response(pending.pop(0), "", Headers()))
+
+        monkeypatch.setattr("strawberry.hub.client.websockets.connect", connect)
+        with pytest.raises(asyncio.CancelledError):
+            await client._websocket_loop()
+        return client, versions
+
+    @pytest.mark.asyncio
+    async def test_auth_failure_keeps_v2(self, hub_config, monkeypatch):
+        client, versions = await self._attempts(hub_config, monkeypatch, [401])
+        assert versions == ["v2"]
+        assert client._ws_protocol == "v2"
+
+    @pytest.mark.asyncio
+    async def test_refused_v1_retry_goes_back_to_v2(self, hub_config, monkeypatch):
+        client, versions = await self._attempts(hub_config, monkeypatch, [403, 403])
+        assert versions == ["v2", "v1"]
+        assert client._ws_protocol == "v2"
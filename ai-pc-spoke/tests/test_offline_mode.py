@@ -1,6 +1,6 @@
 """Tests for offline mode components."""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 
@@ -8,7 +8,7 @@ import pytest
 
 from strawberry.llm.offline_tracker import OfflineModeTracker
 from strawberry.llm.tensorzero_client import ChatMessage, ChatResponse, TensorZeroClient
-from strawberry.storage.session_db import LocalSessionDB, SyncStatus
+from strawberry.storage.session_db import LocalSessionDB, SyncStatus, parse_datetime
 from strawberry.storage.sync_manager import SyncManager
 
 
@@ -314,7 +314,9 @@ class TestSyncManager:
         client.list_sessions = AsyncMock(return_value=[])
         client.add_session_message = AsyncMock(return_value={"id": 1})
         client.delete_session = AsyncMock()
-        client.get_session_messages = AsyncMock(return_value=[])
+        client.get_session_messages_page = AsyncMock(
+            return_value={"messages": [], "next_after_id": None, "etag": None}
+        )
         return client
 
     @pytest.mark.asyncio
@@ -407,7 +409,6 @@ class TestSyncManager:
                 }
             ]
         )
-        mock_hub_client.get_session_messages = AsyncMock(return_value=[])
 
         sync_manager = SyncManager(db, mock_hub_client)
         await sync_manager.sync_all()
@@ -442,7 +443,6 @@ class TestSyncManager:
                 }
             ]
         )
-        mock_hub_client.get_session_messages = AsyncMock(return_value=[])
 
         sync_manager = SyncManager(db, mock_hub_client)
         result = await sync_manager.pull_remote_metadata()
@@ -451,6 +451,115 @@ class TestSyncManager:
         updated = db.get_session(local.id)
         assert updated.title == "New Title"
 
+    @pytest.mark.asyncio
+    async def test_pull_remote_uses_change_feed(
+        self, db: LocalSessionDB, mock_hub_client
+    ):
+        """Later pulls ask for changes since the last one and append new messages."""
+        local = db.create_session(title="Chat")
+        db.mark_session_synced(local.id, "hub-1")
+        msg = db.add_message(local.id, "user", "Hello")
+        db.mark_message_synced(msg.id, 7)
+
+        remote = {
+            "id": "hub-1",
+            "title": "Chat",
+            "created_at": "2026-01-01T10:00:00",
+            "last_activity": "2026-01-01T10:05:00",
+        }
+        mock_hub_client.list_sessions = AsyncMock(return_value=[remote])
+        sync_manager = SyncManager(db, mock_hub_client)
+
+        await sync_manager.pull_remote_metadata()
+        # The first pull reads the last SYNC_DAYS of the feed.
+        first_since = mock_hub_client.list_sessions.await_args.kwargs["since"]
+        assert parse_datetime(first_since) < datetime.now(timezone.utc) - timedelta(
+            days=SyncManager.SYNC_DAYS - 1
+        )
+
+        mock_hub_client.get_session_messages_page = AsyncMock(
+            return_value={
+                "messages": [
+                    {
+                        "id": 8,
+                        "role": "assistant",
+                        "content": "Hi from another device",
+                        "created_at": "2026-01-01T10:06:00",
+                    }
+                ],
+                "next_after_id": None,
+                "etag": '"hub-1-8-7-200"',
+            }
+        )
+        await sync_manager.pull_remote_metadata()
+
+        assert (
+            mock_hub_client.list_sessions.await_args.kwargs["since"]
+            == "2026-01-01T10:05:00"
+        )
+        mock_hub_client.get_session_messages_page.assert_awaited_once_with(
+            "hub-1", after_id=7, limit=SyncManager.MESSAGE_PAGE_SIZE, etag=None
+        )
+        contents = [m.content for m in db.get_messages(local.id)]
+        assert contents == ["Hello", "Hi from another device"]
+
+        # The next request pages from the new message, so the old ETag
+        # does not apply to it.
+        mock_hub_client.get_session_messages_page = AsyncMock(
+            return_value={
+                "messages": [],
+                "next_after_id": None,
+                "etag": '"hub-1-8-8-200"',
+            }
+        )
+        await sync_manager.pull_remote_metadata()
+        mock_hub_client.get_session_messages_page.assert_awaited_once_with(
+            "hub-1", after_id=8, limit=SyncManager.MESSAGE_PAGE_SIZE, etag=None
+        )
+
+        # A rename-only change repeats that request with its ETag.
+        mock_hub_client.get_session_messages_page = AsyncMock(return_value=None)
+        await sync_manager.pull_remote_metadata()
+        mock_hub_client.get_session_messages_page.assert_awaited_once_with(
+            "hub-1",
+            after_id=8,
+            limit=SyncManager.MESSAGE_PAGE_SIZE,
+            etag='"hub-1-8-8-200"',
+        )
+        assert len(db.get_messages(local.id)) == 2
+
+    @pytest.mark.asyncio
+    async def test_pull_remote_pages_through_changes(
+        self, db: LocalSessionDB, mock_hub_client
+    ):
+        """The watermark only advances after every page has been listed."""
+        page_size = SyncManager.LIST_PAGE_SIZE
+        remotes = [
+            {
+                "id": f"hub-{i}",
+                "title": f"Chat {i}",
+                "created_at": "2026-01-01T10:00:00",
+                "last_activity": f"2026-01-01T10:{i:02d}:00",
+            }
+            for i in range(page_size + 1)
+        ]
+        mock_hub_client.list_sessions = AsyncMock(
+            side_effect=[remotes[:page_size], remotes[page_size:]]
+        )
+        sync_manager = SyncManager(db, mock_hub_client)
+
+        await sync_manager.pull_remote_metadata()
+
+        # The second page starts after the last session of the first.
+        second = mock_hub_client.list_sessions.await_args_list[1].kwargs
+        last = remotes[page_size - 1]
+        assert (second["since"], second["after_id"]) == (
+            last["last_activity"],
+            last["id"],
+        )
+        assert db.has_hub_session(f"hub-{page_size}")
+        assert sync_manager._remote_watermark == f"2026-01-01T10:{page_size:02d}:00"
+
 
 class TestTensorZeroClient:
     """Tests for TensorZeroClient (embedded gateway)."""
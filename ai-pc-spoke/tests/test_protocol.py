@@ -64,3 +64,42 @@ def test_hub_client_sets_version_header():
 
     # Cleanup (sync only; async requires await)
     client.sync_client.close()
+
+
+# ── WebSocket frame codec tests ────────────────────────────────────────────
+
+
+def test_ws_v1_frames_are_json():
+    """v1 encodes text frames that decode back to the same message."""
+    from strawberry.hub.wire import JsonCodec, decode_frame, get_codec
+
+    assert isinstance(get_codec("v1"), JsonCodec)
+    assert decode_frame(JsonCodec().encode({"type": "ping"})) == {"type": "ping"}
+
+
+def test_ws_v2_pong_frame_matches_hub():
+    """The Spoke encodes v2 frames byte-for-byte like docs/wire-schema-v2.md."""
+    pytest.importorskip("msgpack")
+    from strawberry.hub.wire import MsgpackCodec
+
+    frame = MsgpackCodec(compress_threshold=0).encode({"type": "pong"})
+    assert frame.hex(" ") == "00 81 a4 74 79 70 65 a4 70 6f 6e 67"
+
+
+def test_ws_v2_large_frames_round_trip_compressed():
+    """Frames above the threshold are zlib-compressed and still decode."""
+    pytest.importorskip("msgpack")
+    from strawberry.hub.wire import FRAME_ZLIB, MsgpackCodec, decode_frame
+
+    message = {"type": "skill_response", "result": "sunny " * 500, "raw": b"\x00"}
+    frame = MsgpackCodec().encode(message)
+    assert frame[0] == FRAME_ZLIB
+    assert decode_frame(frame) == message
+
+
+def test_ws_malformed_frame_raises():
+    """Unknown frame headers are reported as WireError."""
+    from strawberry.hub.wire import WireError, decode_frame
+
+    with pytest.raises(WireError):
+        decode_frame(b"\x07\x80")
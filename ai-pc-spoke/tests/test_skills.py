@@ -139,6 +139,40 @@ class TestSkillLoader:
         assert greet_data["class_name"] == "TestSkill"
         assert "name: str" in greet_data["signature"]
         assert greet_data["device_agnostic"] is False
+        assert greet_data["cache_ttl_seconds"] == 0
+
+    def test_registration_carries_cache_ttl(self, tmp_path):
+        """Class-level and decorator cache TTLs reach the registration payload."""
+        (tmp_path / "cached_skill.py").write_text('''
+from strawberry.skills import cacheable
+
+
+class ForecastSkill:
+    """Forecasts."""
+
+    cache_ttl_seconds = 60
+
+    def today(self) -> str:
+        """Today's forecast."""
+        return "sunny"
+
+    @cacheable(ttl_seconds=600)
+    def this_week(self) -> str:
+        """This week's forecast."""
+        return "mixed"
+
+    @cacheable(ttl_seconds=0)
+    def refresh(self) -> None:
+        """Refetch forecasts."""
+''')
+        loader = SkillLoader(tmp_path)
+        loader.load_all()
+
+        ttls = {
+            d["function_name"]: d["cache_ttl_seconds"]
+            for d in loader.get_registration_data()
+        }
+        assert ttls == {"today": 60, "this_week": 600, "refresh": 0}
 
     def test_empty_skills_dir(self):
         """Test loading from empty directory."""
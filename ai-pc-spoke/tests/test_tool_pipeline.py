@@ -6,11 +6,13 @@ path in `SkillService`, using a temporary skills directory.
 
 from __future__ import annotations
 
+import re
 import textwrap
 from pathlib import Path
 
 import pytest
 
+from strawberry.skills.artifacts import parse_read_artifact_call
 from strawberry.skills.service import SkillService
 
 
@@ -99,3 +101,38 @@ async def test_unknown_tool_returns_error(skill_service: SkillService) -> None:
     result = await skill_service.execute_tool_async("not_a_tool", {})
     assert "error" in result
     assert "Unknown tool" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_long_python_exec_result_is_stored_as_artifact(
+    skill_service: SkillService,
+) -> None:
+    """Oversized results come back as a preview readable via read_artifact()."""
+    first = await skill_service.execute_tool_async(
+        "python_exec", {"code": "print('ab' * 5000)"}, session_id="s1"
+    )
+    assert len(first["result"]) < 2000
+    handle = re.search(r'artifact "(art_[0-9a-f]+)"', first["result"]).group(1)
+
+    second = await skill_service.execute_tool_async(
+        "python_exec",
+        {"code": f'print(read_artifact("{handle}", offset=9990))'},
+        session_id="s1",
+    )
+    assert second == {"result": "ab" * 5}
+
+    other = await skill_service.execute_tool_async(
+        "python_exec", {"code": f'read_artifact("{handle}")'}, session_id="s2"
+    )
+    assert "error" in other
+
+
+def test_parse_read_artifact_call() -> None:
+    """Only a lone read_artifact() call with literal arguments is intercepted."""
+    assert parse_read_artifact_call('read_artifact("art_1")') == ("art_1", 0, 3000)
+    assert parse_read_artifact_call(
+        'print(read_artifact("art_1", length=10, offset=5))'
+    ) == ("art_1", 5, 10)
+    assert parse_read_artifact_call("x = read_artifact('art_1')") is None
+    assert parse_read_artifact_call("read_artifact(handle)") is None
+    assert parse_read_artifact_call("print(device.WeatherSkill)") is None